@@ -0,0 +1,51 @@
+"""
+Shared helpers for the map tests.
+"""
+
+import sys
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+# Add the models directory to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), 'models'))
+
+from map_visualization.farm_index import FarmIndex
+from map_visualization.map_cache import MapCache
+from map_visualization.map_tiles import MapTiler
+
+# Mapper attributes pointing at its maps, databases and background queues
+MAPPER_STORAGE = ('output_dir', 'data_dir', 'map_cache', 'farm_index', 'tiler', 'upload_queue')
+
+@contextmanager
+def temporary_map_storage(mapper):
+    """
+    Point a mapper's maps, catalogue, farm index and tiles at a temporary directory.
+
+    Maps go in the directory itself and databases in its `data` subdirectory.
+
+    The mapper's own objects are restored afterwards, so tests never write to
+    the repository's map directories.
+
+    Parameters:
+    mapper (LandLayoutMapper): The mapper, e.g. map_api.mapper
+
+    Yields:
+    str: The temporary directory, holding the maps
+    """
+    directory = tempfile.mkdtemp()
+    saved = {name: getattr(mapper, name) for name in MAPPER_STORAGE}
+    try:
+        mapper.output_dir = directory
+        mapper.data_dir = os.path.join(directory, 'data')
+        mapper.map_cache = MapCache(directory, data_directory=mapper.data_dir)
+        mapper.farm_index = FarmIndex(os.path.join(mapper.data_dir, 'farms.sqlite3'))
+        mapper.tiler = MapTiler(mapper.farm_index, os.path.join(mapper.data_dir, 'tiles'))
+        mapper.upload_queue = None
+        yield directory
+    finally:
+        mapper.map_cache.flush()
+        for name, value in saved.items():
+            setattr(mapper, name, value)
+        shutil.rmtree(directory)
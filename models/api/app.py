@@ -5,6 +5,7 @@ API endpoints for Sasya-Mitra AI models.
 import os
 import sys
 import json
+import time
 import joblib
 import pandas as pd
 import numpy as np
@@ -16,8 +17,11 @@ import requests
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
 from preprocessing.data_processor import AgriDataPreprocessor
-from training.model_trainer import AgriYieldModel, AgriROIModel
+from training.model_trainer import AgriYieldModel, AgriROIModel, feature_matrix
+from training.prediction_intervals import interval_confidence
+from training.explanations import ModelExplainer, model_version
 from recommendation.engine import AgriRecommendationEngine, SoilData, WeatherData, EconomicData
+from shadow import ShadowScorer, CANDIDATE_VERSIONS_DIR
 
 app = Flask(__name__)
 # Configure CORS to allow requests from the frontend origin
@@ -29,6 +33,18 @@ roi_model = None
 recommendation_engine = None
 preprocessor = AgriDataPreprocessor()
 
+# Crop predicted for when a request names none
+DEFAULT_CROP = "Rice"
+
+# The yield model predicts kg per hectare, the unit of the historical yield tables
+ACRES_PER_HECTARE = 2.47105
+
+# Contribution explainers of the loaded models, one per target and model version
+explainers = {}
+
+# Candidate model version scored in the background alongside the active models
+shadow_scorer = None
+
 def load_models():
     """Load trained models."""
     global yield_model, roi_model, recommendation_engine
@@ -44,11 +60,44 @@ def load_models():
         roi_model.load_model("saved_models/roi_model")
         
         print("Models loaded successfully")
+        
+        # Shadow score a candidate version before it is promoted
+        shadow_version = os.environ.get("SHADOW_MODEL_VERSION")
+        if shadow_version:
+            start_shadow_scoring(shadow_version, os.environ.get("SHADOW_MODELS_DIR", CANDIDATE_VERSIONS_DIR))
         return True
     except Exception as e:
         print(f"Error loading models: {e}")
         return False
 
+def start_shadow_scoring(version, versions_dir=CANDIDATE_VERSIONS_DIR):
+    """
+    Start scoring live requests with a candidate model version in the background.
+    
+    Parameters:
+    version (str): Candidate version in versions_dir/v{version}
+    versions_dir (str): Directory holding the model versions
+    
+    Returns:
+    bool: Whether shadow scoring started
+    """
+    global shadow_scorer
+    try:
+        scorer = ShadowScorer.from_version(version, versions_dir)
+    except Exception as e:
+        print(f"Error starting shadow scoring: {e}")
+        return False
+    if shadow_scorer is not None:
+        shadow_scorer.stop()
+    shadow_scorer = scorer.start()
+    print(f"Shadow scoring candidate models v{version}")
+    return True
+
+def shadow_submit(target, features_df, active_model, active_prediction=None, active_ms=None):
+    """Hand a request's features to the shadow scorer, if one is running; never blocks."""
+    if shadow_scorer is not None:
+        shadow_scorer.submit(target, features_df, active_model, active_prediction, active_ms)
+
 def fetch_nasa_power_weather(lat, lon):
     """
     Fetch real-time weather data from NASA POWER API.
@@ -95,12 +144,13 @@ def fetch_nasa_power_weather(lat, lon):
             "solar_radiation": 5.5
         }
 
-def prepare_features_for_prediction(farmer_data):
+def prepare_features_for_prediction(farmer_data, weather_data=None):
     """
     Prepare features for model prediction based on farmer input and real-time data.
     
     Parameters:
     farmer_data (dict): Data entered by farmer including location and other details
+    weather_data (dict): Weather already fetched for the location (fetched if None)
     
     Returns:
     pd.DataFrame: Prepared feature matrix
@@ -114,10 +164,14 @@ def prepare_features_for_prediction(farmer_data):
     budget = farmer_data.get("budget_inr", 50000)
     
     # Fetch real-time weather from NASA POWER
-    weather_data = fetch_nasa_power_weather(lat, lon)
+    if weather_data is None:
+        weather_data = fetch_nasa_power_weather(lat, lon)
     
     # Create feature dictionary
     features = {
+        # Crop whose history a model trained on the training matrix predicts from
+        "crop": farmer_data.get("crop", DEFAULT_CROP),
+        
         # Weather features
         "avg_temperature": weather_data["avg_temperature_c"] or 25,
         "avg_humidity": weather_data["avg_humidity"] or 60,
@@ -147,6 +201,128 @@ def prepare_features_for_prediction(farmer_data):
     
     return features_df
 
+def model_feature_matrix(features_df, model):
+    """
+    Arrange prepared features in a model's training column order.
+    
+    Parameters:
+    features_df (pd.DataFrame): Prepared feature rows
+    model: The loaded yield or ROI model
+    
+    Returns:
+    pd.DataFrame: Feature rows the model can predict on
+    
+    Raises:
+    ValueError: If the features cannot supply most of the model's inputs
+    """
+    return feature_matrix(features_df, model.feature_names, getattr(model, 'season_features', None))
+
+def prepare_feature_batch(records):
+    """
+    Prepare features for a batch of requests, fetching the weather once per distinct location.
+    
+    Parameters:
+    records (list): Request bodies
+    
+    Returns:
+    pd.DataFrame: One prepared feature row per record
+    """
+    weather_by_location = {}
+    feature_rows = []
+    for record in records:
+        location = record.get("location", {})
+        key = (location.get("lat", 0), location.get("lng", 0))
+        if key not in weather_by_location:
+            weather_by_location[key] = fetch_nasa_power_weather(*key)
+        feature_rows.append(prepare_features_for_prediction(record, weather_by_location[key]))
+    return pd.concat(feature_rows, ignore_index=True)
+
+def get_explainer(target, model):
+    """
+    Contribution explainer for a loaded model, reused while its version is unchanged.
+    
+    Parameters:
+    target (str): 'yield' or 'roi'
+    model: The loaded model for the target
+    
+    Returns:
+    ModelExplainer: Explainer of the model's current version
+    """
+    explainer = explainers.get(target)
+    if explainer is None or explainer.model is not model or explainer.version != model_version(model):
+        explainer = explainers[target] = ModelExplainer(model)
+    return explainer
+
+def yield_prediction_intervals(features_df):
+    """
+    Predict yields with prediction intervals for a batch of feature rows.
+    
+    Parameters:
+    features_df (pd.DataFrame): Prepared feature rows
+    
+    Returns:
+    list: One dict per row with the yield and interval bounds in kg per acre,
+    the coverage and the confidence
+    """
+    start = time.perf_counter()
+    X = model_feature_matrix(features_df, yield_model)
+    intervals = yield_model.predict_intervals(X)
+    shadow_submit('yield', features_df, yield_model, intervals['prediction'],
+                  (time.perf_counter() - start) * 1000 / len(features_df))
+    confidence = interval_confidence(intervals['prediction'], intervals['lower'], intervals['upper'])
+    return [
+        {
+            "yield": float(prediction) / ACRES_PER_HECTARE,
+            "lower": float(lower) / ACRES_PER_HECTARE,
+            "upper": float(upper) / ACRES_PER_HECTARE,
+            "coverage": intervals['coverage'],
+            "confidence": round(float(row_confidence), 3)
+        }
+        for prediction, lower, upper, row_confidence
+        in zip(intervals['prediction'], intervals['lower'], intervals['upper'], confidence)
+    ]
+
+def farm_yield_interval(interval, land_area_acres):
+    """
+    Scale a per-acre yield interval to a farm's total yield.
+    
+    Parameters:
+    interval (dict): Row of yield_prediction_intervals
+    land_area_acres (float): Farm area
+    
+    Returns:
+    dict: The interval with its yield and bounds in kg for the whole farm
+    """
+    return {**interval, **{key: interval[key] * land_area_acres for key in ("yield", "lower", "upper")}}
+
+def roi_prediction_intervals(features_df):
+    """
+    Predict ROI with prediction intervals for a batch of feature rows.
+    
+    Parameters:
+    features_df (pd.DataFrame): Prepared feature rows
+    
+    Returns:
+    list: One dict per row with the prediction, interval bounds, coverage and confidence
+    """
+    start = time.perf_counter()
+    X = model_feature_matrix(features_df, roi_model)
+    intervals = roi_model.predict_intervals(X)
+    shadow_submit('roi', features_df, roi_model, intervals['prediction'],
+                  (time.perf_counter() - start) * 1000 / len(features_df))
+    confidence = interval_confidence(intervals['prediction'], intervals['lower'], intervals['upper'])
+    return [
+        {
+            "roi": float(prediction),
+            "lower": float(lower),
+            "upper": float(upper),
+            "coverage": intervals['coverage'],
+            "confidence": round(float(row_confidence), 3)
+        }
+        for prediction, lower, upper, row_confidence
+        in zip(intervals['prediction'], intervals['lower'], intervals['upper'], confidence)
+    ]
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint."""
@@ -164,31 +340,22 @@ def predict_yield():
             return jsonify({"error": "No input data provided"}), 400
         
         # Prepare features for prediction
-        features_df = prepare_features_for_prediction(data)
+        weather_data = fetch_nasa_power_weather(
+            data.get("location", {}).get("lat", 0),
+            data.get("location", {}).get("lng", 0)
+        )
+        features_df = prepare_features_for_prediction(data, weather_data)
         
         # Make prediction using trained model
         if yield_model and yield_model.is_trained:
-            # Use the trained model for prediction
-            prediction = yield_model.predict({
-                '1. NASA POWER Data (Rainfall, Temperature, Humidity, Radiation) 👆🏻': None,  # Not used directly
-                'All India level Average Yield of Principal Crops from 2001-02 to 2015-16': None,  # Not used directly
-                'All India level Area Under Principal Crops from 2001-02 to 2015-16': None,  # Not used directly
-                'Production of principle crops': None,  # Not used directly
-                'price': None,  # Not used directly
-                'Year-wise Damage Caused Due To Floods, Cyclonic Storm, Landslides etc': None  # Not used directly
-            })
-            
-            # For demonstration, we'll use a simplified approach
-            # In a real implementation, we would integrate the features properly
-            predicted_yield = 2500 * data.get("land_area_acres", 1)  # kg/acre default
+            # The model's point prediction for the whole farm, with the interval giving its confidence
+            interval = farm_yield_interval(yield_prediction_intervals(features_df)[0], data.get("land_area_acres", 1))
             
             return jsonify({
-                "predicted_yield_kg": predicted_yield,
-                "confidence": 0.85,
-                "weather_data": fetch_nasa_power_weather(
-                    data.get("location", {}).get("lat", 0),
-                    data.get("location", {}).get("lng", 0)
-                )
+                "predicted_yield_kg": interval["yield"],
+                "confidence": interval["confidence"],
+                "prediction_interval": interval,
+                "weather_data": weather_data
             }), 200
         else:
             # Fallback prediction if model not loaded
@@ -206,6 +373,69 @@ def predict_yield():
     except Exception as e:
         return jsonify({"error": f"Prediction failed: {str(e)}"}), 500
 
+@app.route('/predict/yield/batch', methods=['POST'])
+def predict_yield_batch():
+    """Predict yields with prediction intervals for a batch of farms in one model pass."""
+    try:
+        data = request.get_json()
+        records = data.get("records") if isinstance(data, dict) else None
+        if not records:
+            return jsonify({"error": "No records provided"}), 400
+        if not (yield_model and yield_model.is_trained):
+            return jsonify({"error": "Yield model not loaded"}), 503
+        
+        intervals = [
+            farm_yield_interval(interval, record.get("land_area_acres", 1))
+            for interval, record in zip(yield_prediction_intervals(prepare_feature_batch(records)), records)
+        ]
+        return jsonify({"predictions": intervals, "count": len(intervals)}), 200
+        
+    except Exception as e:
+        return jsonify({"error": f"Batch prediction failed: {str(e)}"}), 500
+
+@app.route('/predict/explain', methods=['POST'])
+def predict_explain():
+    """Explain yield and ROI predictions as per-feature contributions for a batch of farms."""
+    try:
+        data = request.get_json()
+        if not isinstance(data, dict):
+            return jsonify({"error": "No input data provided"}), 400
+        # A single request body is explained like a batch of one
+        records = data.get("records", [data] if "location" in data else [])
+        if not records:
+            return jsonify({"error": "No records provided"}), 400
+        targets = data.get("targets", ["yield", "roi"])
+        top = data.get("top")
+        if top is not None:
+            if isinstance(top, bool) or not str(top).isdigit() or int(top) < 1:
+                return jsonify({"error": "top must be a positive integer"}), 400
+            top = int(top)
+        models = {"yield": yield_model, "roi": roi_model}
+        unknown = [target for target in targets if target not in models]
+        if unknown:
+            return jsonify({"error": f"Unknown targets: {unknown}"}), 400
+        available = [target for target in targets if models[target] and models[target].is_trained]
+        if not available:
+            return jsonify({"error": "Models not loaded"}), 503
+        
+        features_df = prepare_feature_batch(records)
+        explanations = [{} for _ in records]
+        for target in available:
+            explainer = get_explainer(target, models[target])
+            explained = explainer.explain(model_feature_matrix(features_df, explainer.model))
+            for row, prediction, base_value, contributions in zip(
+                explanations, explained['prediction'], explained['base_value'], explained['contributions']
+            ):
+                row[target] = {
+                    "prediction": float(prediction),
+                    "base_value": float(base_value),
+                    "contributions": explainer.ranked_contributions(contributions, top)
+                }
+        return jsonify({"explanations": explanations, "count": len(explanations)}), 200
+        
+    except Exception as e:
+        return jsonify({"error": f"Explanation failed: {str(e)}"}), 500
+
 @app.route('/predict/roi', methods=['POST'])
 def predict_roi():
     """Predict ROI based on input features."""
@@ -222,23 +452,13 @@ def predict_roi():
         
         # Make prediction using trained model
         if roi_model and roi_model.is_trained:
-            # Use the trained model for prediction
-            prediction = roi_model.predict({
-                '1. NASA POWER Data (Rainfall, Temperature, Humidity, Radiation) 👆🏻': None,  # Not used directly
-                'All India level Average Yield of Principal Crops from 2001-02 to 2015-16': None,  # Not used directly
-                'All India level Area Under Principal Crops from 2001-02 to 2015-16': None,  # Not used directly
-                'Production of principle crops': None,  # Not used directly
-                'price': None,  # Not used directly
-                'Year-wise Damage Caused Due To Floods, Cyclonic Storm, Landslides etc': None  # Not used directly
-            })
-            
-            # For demonstration, we'll use a simplified approach
-            # In a real implementation, we would integrate the features properly
-            roi = 2.5  # Default ROI
+            # The model's point prediction, with the interval giving its confidence
+            interval = roi_prediction_intervals(features_df)[0]
             
             return jsonify({
-                "predicted_roi": roi,
-                "confidence": 0.80,
+                "predicted_roi": interval["roi"],
+                "confidence": interval["confidence"],
+                "prediction_interval": interval,
                 "weather_data": fetch_nasa_power_weather(
                     data.get("location", {}).get("lat", 0),
                     data.get("location", {}).get("lng", 0)
@@ -280,26 +500,28 @@ def predict_realtime():
         weather_data = fetch_nasa_power_weather(lat, lon)
         
         # Prepare features for prediction
-        features_df = prepare_features_for_prediction(data)
+        features_df = prepare_features_for_prediction(data, weather_data)
         
         # Make predictions using trained models
         yield_prediction = 2500 * data.get("land_area_acres", 1)  # kg/acre default
         roi_prediction = 2.5  # Default ROI
         
         # Try to use actual trained models if available
+        confidence = 0.85
+        prediction_interval = None
+        roi_interval = None
         if yield_model and yield_model.is_trained:
             try:
-                # This is a simplified approach - in a real implementation,
-                # we would properly integrate the features with the model
-                yield_prediction = 3000 * data.get("land_area_acres", 1)
+                prediction_interval = yield_prediction_intervals(features_df)[0]
+                yield_prediction = prediction_interval["yield"]
+                confidence = prediction_interval["confidence"]
             except:
                 pass
                 
         if roi_model and roi_model.is_trained:
             try:
-                # This is a simplified approach - in a real implementation,
-                # we would properly integrate the features with the model
-                roi_prediction = 2.8
+                roi_interval = roi_prediction_intervals(features_df)[0]
+                roi_prediction = roi_interval["roi"]
             except:
                 pass
         
@@ -308,7 +530,9 @@ def predict_realtime():
             "predictions": {
                 "yield_kg_per_acre": yield_prediction,
                 "roi": roi_prediction,
-                "confidence": 0.85
+                "confidence": confidence,
+                "prediction_interval": prediction_interval,
+                "roi_prediction_interval": roi_interval
             },
             "weather_data": weather_data,
             "recommendations": {
@@ -324,6 +548,13 @@ def predict_realtime():
     except Exception as e:
         return jsonify({"error": f"Real-time prediction failed: {str(e)}"}), 500
 
+@app.route('/shadow/stats', methods=['GET'])
+def shadow_stats():
+    """Divergence and latency of the shadow-scored candidate models."""
+    if shadow_scorer is None:
+        return jsonify({"enabled": False}), 200
+    return jsonify({"enabled": True, **shadow_scorer.snapshot()}), 200
+
 @app.route('/recommend', methods=['POST'])
 def generate_recommendation():
     """Generate agricultural recommendations."""
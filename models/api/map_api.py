@@ -5,13 +5,17 @@ API endpoints for land layout map visualization in Sasya-Mitra.
 import sys
 import os
 import json
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, Response, request, jsonify, send_file
 from flask_cors import CORS
 
 # Add the parent directory to the path to import modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from map_visualization.land_layout_mapper import LandLayoutMapper
+from map_visualization.map_cache import ENCODING_SUFFIXES, LEGACY_MAP_PATTERN, MAP_FILE_PATTERN, content_etag
+from map_visualization.map_catalogue import DEFAULT_NEAR_LIMIT, DEFAULT_NEAR_RADIUS_KM
+from map_visualization.land_subdivision import area_acres, boundary_from_geojson
+from map_visualization.map_tiles import TILE_ENCODINGS
 from recommendation.engine import SoilData, WeatherData, EconomicData
 
 # Initialize Firebase availability flag
@@ -32,6 +36,15 @@ except ImportError:
 app = Flask(__name__)
 CORS(app)
 
+# Most coordinate decimals a GeoJSON request may ask for
+MAX_GEOJSON_PRECISION = 15
+
+# Most farms a nearby farms or bounding box request may return
+MAX_FARMS_PER_QUERY = 500
+
+# Caching of served maps: browsers keep them but revalidate with their ETag on every view
+MAP_CACHE_CONTROL = 'public, no-cache'
+
 # Initialize the land layout mapper
 mapper = LandLayoutMapper()
 
@@ -69,6 +82,7 @@ if FIREBASE_AVAILABLE:
                 db = firestore.client()
                 bucket = storage.bucket('sasyayojana-79840.firebasestorage.app')
                 maps_collection = db.collection('land_layout_maps')
+                mapper.enable_firebase_uploads(bucket, db)
             except Exception as e:
                 print(f"Could not initialize Firestore/Storage: {e}")
                 FIREBASE_AVAILABLE = False
@@ -76,62 +90,174 @@ if FIREBASE_AVAILABLE:
         print(f"Error initializing Firebase: {e}")
         FIREBASE_AVAILABLE = False
 
-def store_map_in_firebase(map_data, map_html, filename):
+def store_map_in_firebase(map_data, rendered):
     """
-    Store map data and HTML file in Firebase.
+    Queue a generated map and its metadata for upload to Firebase.
+    
+    The upload and the Firestore write happen on the mapper's background
+    queue, so the map is served locally until then.
     
     Parameters:
     map_data (dict): Map metadata
-    map_html (str): HTML content of the map
+    rendered (RenderedMap): The generated map
+    
+    Returns:
+    dict: Storage result with the map's ID, local URL and upload status
+    """
+    upload_status = mapper.queue_upload(rendered, map_data)
+    messages = {
+        'queued': 'Map queued for upload to Firebase',
+        'cached': 'Map was generated before; its file is uploaded once and this request is queued for Firebase',
+        'local': 'Firebase not available, map stored locally'
+    }
+    return {
+        'success': True,
+        'message': messages[upload_status],
+        'map_id': rendered.key if upload_status != 'local' else 'local_' + rendered.key,
+        'map_url': f'/api/get-map/{rendered.filename}',
+        'upload_status': upload_status
+    }
+
+def parse_layout_request(data):
+    """
+    Read farm location, area and input data from a map request, with defaults.
+    
+    Parameters:
+    data (dict): Request payload as documented on generate_land_layout_map
+    
+    Returns:
+    tuple: (center_lat, center_lon, land_area_acres, location, soil_data, weather_data, economic_data, boundary)
+    """
+    # Extract required parameters
+    center_lat = data.get('center_lat', 12.971)
+    center_lon = data.get('center_lon', 77.592)
+    land_area_acres = data.get('land_area_acres', 5.0)
+    location = data.get('location', 'Unknown')
+    
+    # A drawn farm boundary sets the area, and the centre unless one is given
+    boundary = None
+    if data.get('boundary') is not None:
+        boundary = boundary_from_geojson(data['boundary'])
+        land_area_acres = float(area_acres([boundary])[0])
+        center = boundary.centroid
+        center_lat = data.get('center_lat', center.y)
+        center_lon = data.get('center_lon', center.x)
+    
+    # Extract soil data
+    soil_data_dict = data.get('soil_data', {})
+    soil_data = SoilData(
+        ph=soil_data_dict.get('ph', 6.7),
+        organic_carbon=soil_data_dict.get('organic_carbon', 1.2),
+        nitrogen=soil_data_dict.get('nitrogen', 150),
+        phosphorus=soil_data_dict.get('phosphorus', 40),
+        potassium=soil_data_dict.get('potassium', 200),
+        texture=soil_data_dict.get('texture', 'Loam'),
+        drainage=soil_data_dict.get('drainage', 'Moderate')
+    )
+    
+    # Extract weather data, reusing a neighbouring farm's when the request has none
+    weather_data_dict = data.get('weather_data') or mapper.neighbour_weather(center_lat, center_lon) or {}
+    weather_data = WeatherData(
+        rainfall_mm=weather_data_dict.get('rainfall_mm', 850),
+        temperature_c=weather_data_dict.get('temperature_c', 28),
+        humidity=weather_data_dict.get('humidity', 65),
+        solar_radiation=weather_data_dict.get('solar_radiation', 5.5)
+    )
+    
+    # Extract economic data
+    economic_data_dict = data.get('economic_data', {})
+    economic_data = EconomicData(
+        budget_inr=economic_data_dict.get('budget_inr', 60000),
+        labor_availability=economic_data_dict.get('labor_availability', 'Medium'),
+        input_cost_type=economic_data_dict.get('input_cost_type', 'Organic')
+    )
+    
+    return center_lat, center_lon, land_area_acres, location, soil_data, weather_data, economic_data, boundary
+
+def negotiate_encoding(key):
+    """
+    Pick the best precompressed variant of a map the client accepts.
+    
+    Parameters:
+    key (str): Map key
+    
+    Returns:
+    str: 'br', 'gzip', or None to send the map uncompressed
+    """
+    best, best_quality = None, 0
+    for encoding in ENCODING_SUFFIXES:
+        quality = request.accept_encodings.quality(encoding)
+        if quality > best_quality and os.path.exists(mapper.map_cache.variant_path(key, encoding)):
+            best, best_quality = encoding, quality
+    return best
+
+def serve_map(filename):
+    """
+    Serve a map, precompressed when the client accepts it.
+    
+    Generated maps carry a strong ETag from the hash of their content (one per
+    content coding) and are answered with 304 Not Modified when the client
+    already has them. A map still being written is served from memory.
+    
+    Only map HTML is served: sidecars, compressed variants (sent through
+    content negotiation) and any other file in the maps directory are not.
+    
+    Parameters:
     filename (str): Name of the map file
     
     Returns:
-    dict: Storage result with IDs and URLs
+    Response, or None if there is no such map
     """
-    global FIREBASE_AVAILABLE, db, bucket
-    if not FIREBASE_AVAILABLE or db is None or bucket is None:
-        # Firebase not available, return mock result
-        return {
-            'success': True,
-            'message': 'Firebase not available, map stored locally',
-            'map_id': 'local_' + filename.replace('.html', ''),
-            'map_url': f'/api/get-map/{filename}'
-        }
+    match = MAP_FILE_PATTERN.match(filename)
+    if not match or match.group(2) != 'html':
+        # Maps saved under their own names before maps were cached by key
+        file_path = os.path.join(mapper.output_dir, filename)
+        if LEGACY_MAP_PATTERN.match(filename) and os.path.exists(file_path):
+            return send_file(file_path, mimetype='text/html')
+        return None
     
-    try:
-        # Store map metadata in Firestore
-        map_doc_ref = maps_collection.document()
-        map_data_with_timestamp = {
-            **map_data,
-            'created_at': firestore.SERVER_TIMESTAMP,
-            'filename': filename
-        }
-        map_doc_ref.set(map_data_with_timestamp)
-        map_id = map_doc_ref.id
-        
-        # Upload HTML file to Firebase Storage
-        blob = bucket.blob(f'land-layout-maps/{filename}')
-        blob.upload_from_string(map_html, content_type='text/html')
-        
-        # Make the file publicly readable
-        blob.make_public()
-        map_url = blob.public_url
-        
-        return {
-            'success': True,
-            'message': 'Map successfully stored in Firebase',
-            'map_id': map_id,
-            'map_url': map_url
-        }
-    except Exception as e:
-        print(f"Error storing map in Firebase: {e}")
-        # Return fallback result
-        return {
-            'success': False,
-            'message': f'Failed to store map in Firebase: {str(e)}',
-            'map_id': None,
-            'map_url': None
-        }
+    key = match.group(1)
+    file_path = mapper.map_cache.map_path(key)
+    etag = mapper.map_cache.etag(key)
+    if etag is None:
+        return None
+    encoding = negotiate_encoding(key)
+    tag = f"{etag}-{encoding}" if encoding else etag
+    
+    if request.if_none_match.contains_weak(tag):
+        response = Response(status=304)
+    elif encoding:
+        response = send_file(mapper.map_cache.variant_path(key, encoding), mimetype='text/html',
+                             etag=False, conditional=False)
+        response.headers['Content-Encoding'] = encoding
+    elif os.path.exists(file_path):
+        response = send_file(file_path, mimetype='text/html', etag=False, conditional=False)
+    else:
+        # A map just generated may still be on its way to disk
+        content = mapper.map_cache.read(key)
+        if content is None:
+            return None
+        response = Response(content, mimetype='text/html')
+    
+    response.set_etag(tag)
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['Cache-Control'] = MAP_CACHE_CONTROL
+    return response
+
+def farm_collection(farms):
+    """GeoJSON FeatureCollection of farm index records, with their boundaries as geometries."""
+    return {
+        'type': 'FeatureCollection',
+        'features': [
+            {'type': 'Feature', 'id': farm['farm_id'], 'geometry': farm['boundary'],
+             'properties': {key: value for key, value in farm.items() if key != 'boundary'}}
+            for farm in farms
+        ]
+    }
+
+def catalogue_entry(record):
+    """JSON form of a map catalogue record, with the map's URL."""
+    return {**record, 'map_url': f"/api/get-map/{record['filename']}"}
 
 @app.route('/api/generate-land-layout-map', methods=['POST'])
 def generate_land_layout_map():
@@ -166,6 +292,10 @@ def generate_land_layout_map():
         }
     }
     
+    An optional "boundary" holds the farm as drawn by the user, a GeoJSON
+    Polygon or MultiPolygon (holes allowed). It replaces the square of
+    land_area_acres around the centre, and its own area is used as the farm's.
+    
     Returns:
     JSON response with map file path and recommendation details
     """
@@ -173,52 +303,20 @@ def generate_land_layout_map():
         # Parse request data
         data = request.get_json()
         
-        # Extract required parameters
-        center_lat = data.get('center_lat', 12.971)
-        center_lon = data.get('center_lon', 77.592)
-        land_area_acres = data.get('land_area_acres', 5.0)
-        location = data.get('location', 'Unknown')
-        
-        # Extract soil data
+        center_lat, center_lon, land_area_acres, location, soil_data, weather_data, economic_data, boundary = \
+            parse_layout_request(data)
         soil_data_dict = data.get('soil_data', {})
-        soil_data = SoilData(
-            ph=soil_data_dict.get('ph', 6.7),
-            organic_carbon=soil_data_dict.get('organic_carbon', 1.2),
-            nitrogen=soil_data_dict.get('nitrogen', 150),
-            phosphorus=soil_data_dict.get('phosphorus', 40),
-            potassium=soil_data_dict.get('potassium', 200),
-            texture=soil_data_dict.get('texture', 'Loam'),
-            drainage=soil_data_dict.get('drainage', 'Moderate')
-        )
-        
-        # Extract weather data
         weather_data_dict = data.get('weather_data', {})
-        weather_data = WeatherData(
-            rainfall_mm=weather_data_dict.get('rainfall_mm', 850),
-            temperature_c=weather_data_dict.get('temperature_c', 28),
-            humidity=weather_data_dict.get('humidity', 65),
-            solar_radiation=weather_data_dict.get('solar_radiation', 5.5)
-        )
-        
-        # Extract economic data
         economic_data_dict = data.get('economic_data', {})
-        economic_data = EconomicData(
-            budget_inr=economic_data_dict.get('budget_inr', 60000),
-            labor_availability=economic_data_dict.get('labor_availability', 'Medium'),
-            input_cost_type=economic_data_dict.get('input_cost_type', 'Organic')
-        )
+        user_id = data.get('user_id')
         
-        # Generate recommendation and map
-        map_filepath, recommendation = mapper.get_real_time_recommendation_and_map(
-            soil_data, weather_data, economic_data, land_area_acres, center_lat, center_lon, location
+        # Generate recommendation and map; the map is rendered into memory and written to disk in the background
+        rendered = mapper.generate_map(
+            soil_data, weather_data, economic_data, land_area_acres, center_lat, center_lon, location, user_id,
+            boundary
         )
-        
-        # Get the filename from the filepath
-        filename = os.path.basename(map_filepath)
-        
-        # Read the HTML content
-        with open(map_filepath, 'r', encoding='utf-8') as f:
-            map_html = f.read()
+        recommendation = rendered.recommendation
+        filename = rendered.filename
         
         # Prepare map data for storage
         map_data = {
@@ -230,22 +328,31 @@ def generate_land_layout_map():
             'weather_data': weather_data_dict,
             'economic_data': economic_data_dict,
             'recommendation': recommendation,
+            'user_id': user_id,
             'created_at': datetime.now().isoformat() if FIREBASE_AVAILABLE else None
         }
         
-        # Store map in Firebase
-        storage_result = store_map_in_firebase(map_data, map_html, filename)
+        # Queue the map for upload to Firebase; the response does not wait for it
+        storage_result = store_map_in_firebase(map_data, rendered)
         
         # Return success response
         return jsonify({
             'success': True,
-            'map_file_path': map_filepath,
+            'map_file_path': rendered.path,
             'map_url': storage_result.get('map_url', f'/api/get-map/{filename}'),
             'map_id': storage_result.get('map_id', 'local'),
+            'upload_status': storage_result['upload_status'],
             'recommendation': recommendation,
             'message': 'Land layout map generated successfully'
         }), 200
         
+    except ValueError as e:
+        # Malformed farm boundary or parameters
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'message': 'Failed to generate land layout map'
+        }), 400
     except Exception as e:
         # Return error response
         return jsonify({
@@ -254,11 +361,70 @@ def generate_land_layout_map():
             'message': 'Failed to generate land layout map'
         }), 500
 
+@app.route('/api/land-layout.geojson', methods=['GET', 'POST'])
+def get_land_layout_geojson():
+    """
+    Return the land layout as GeoJSON for rendering in the dashboard's own map.
+    
+    Takes the generate_land_layout_map payload as JSON (POST) or its top-level
+    fields as query parameters (GET). The optional `precision` parameter rounds
+    coordinates to that many decimal places (6 is about 10 cm).
+    
+    Returns:
+    FeatureCollection of the farm boundary and its land use polygons, with the
+    recommendation as a top-level member
+    """
+    try:
+        data = request.get_json(silent=True) if request.method == 'POST' else None
+        if data is None:
+            data = {key: float(value) for key, value in request.args.items()
+                    if key in ('center_lat', 'center_lon', 'land_area_acres', 'precision')}
+            if 'location' in request.args:
+                data['location'] = request.args['location']
+        
+        precision = data.get('precision')
+        if precision is not None:
+            precision = int(precision)
+            if not 0 <= precision <= MAX_GEOJSON_PRECISION:
+                return jsonify({
+                    'success': False,
+                    'message': f'precision must be between 0 and {MAX_GEOJSON_PRECISION}'
+                }), 400
+        
+        center_lat, center_lon, land_area_acres, location, soil_data, weather_data, economic_data, boundary = \
+            parse_layout_request(data)
+        recommendation = mapper.engine.generate_recommendation(
+            soil_data, weather_data, economic_data, land_area_acres, location
+        )
+        layout = mapper.generate_layout_geojson(recommendation, center_lat, center_lon, land_area_acres, precision,
+                                                boundary)
+        layout['recommendation'] = mapper.recommendation_to_dict(recommendation)
+        
+        return Response(json.dumps(layout, separators=(',', ':')), mimetype='application/geo+json')
+        
+    except ValueError as e:
+        # Malformed farm boundary or parameters
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'message': 'Failed to generate land layout GeoJSON'
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'message': 'Failed to generate land layout GeoJSON'
+        }), 500
+
 @app.route('/api/get-map/<path:filename>', methods=['GET'])
 def get_map(filename):
     """
     Serve generated map files.
     
+    Generated maps are sent gzip- or brotli-compressed according to the
+    request's Accept-Encoding, and a request whose If-None-Match holds the
+    map's ETag is answered with 304 Not Modified.
+    
     Parameters:
     filename (str): Name of the map file to serve
     
@@ -266,18 +432,13 @@ def get_map(filename):
     HTML file of the map
     """
     try:
-        # Construct full file path
-        file_path = os.path.join(mapper.output_dir, filename)
-        
-        # Check if file exists
-        if not os.path.exists(file_path):
+        response = serve_map(filename)
+        if response is None:
             return jsonify({
                 'success': False,
                 'message': 'Map file not found'
             }), 404
-        
-        # Serve the file
-        return send_file(file_path)
+        return response
         
     except Exception as e:
         return jsonify({
@@ -291,29 +452,23 @@ def get_latest_map():
     """
     Get the most recently generated map file.
     
+    The map is looked up in the map catalogue rather than by listing the maps
+    directory. The optional `user_id` query parameter selects that user's latest map.
+    
     Returns:
     HTML file of the latest map
     """
     try:
-        # List all HTML files in the output directory
-        html_files = [f for f in os.listdir(mapper.output_dir) if f.endswith('.html')]
+        record = mapper.map_cache.catalogue.latest(request.args.get('user_id'))
+        response = serve_map(record['filename']) if record else None
         
-        # If no files exist, return error
-        if not html_files:
+        # If no map exists, return error
+        if response is None:
             return jsonify({
                 'success': False,
                 'message': 'No map files available'
             }), 404
-        
-        # Sort files by modification time to get the latest
-        html_files.sort(key=lambda x: os.path.getmtime(os.path.join(mapper.output_dir, x)), reverse=True)
-        latest_file = html_files[0]
-        
-        # Construct full file path
-        file_path = os.path.join(mapper.output_dir, latest_file)
-        
-        # Serve the file
-        return send_file(file_path)
+        return response
         
     except Exception as e:
         return jsonify({
@@ -322,5 +477,164 @@ def get_latest_map():
             'message': 'Failed to serve latest map file'
         }), 500
 
+@app.route('/api/maps/near', methods=['GET'])
+def get_maps_near():
+    """
+    List maps of farms near a point, nearest first.
+    
+    Query parameters: `lat` and `lon` (required), `radius_km` (default 1) and
+    `limit` (default 20).
+    
+    Returns:
+    JSON with the catalogue records of the maps, each with its distance and URL
+    """
+    try:
+        lat = float(request.args['lat'])
+        lon = float(request.args['lon'])
+        radius_km = float(request.args.get('radius_km', DEFAULT_NEAR_RADIUS_KM))
+        limit = int(request.args.get('limit', DEFAULT_NEAR_LIMIT))
+    except (KeyError, ValueError):
+        return jsonify({
+            'success': False,
+            'message': 'lat and lon are required; radius_km and limit must be numbers'
+        }), 400
+    
+    try:
+        maps = mapper.map_cache.catalogue.near(lat, lon, radius_km, limit)
+        return jsonify({'success': True, 'maps': [catalogue_entry(record) for record in maps]}), 200
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'message': 'Failed to search maps'
+        }), 500
+
+@app.route('/api/farms/nearby', methods=['GET'])
+def get_farms_nearby():
+    """
+    Neighbouring farms and their plans, nearest first, as GeoJSON.
+    
+    Query parameters: `lat` and `lon` (required), and either `radius_km`
+    (default 1) for every farm within that distance, or `k` for the k nearest
+    farms. At most 500 farms are returned.
+    
+    Returns:
+    GeoJSON FeatureCollection of farm boundaries; properties hold each farm's
+    distance, map URL, weather, soil and recommendation
+    """
+    try:
+        lat = float(request.args['lat'])
+        lon = float(request.args['lon'])
+        radius_km = float(request.args.get('radius_km', DEFAULT_NEAR_RADIUS_KM))
+        k = int(request.args['k']) if 'k' in request.args else None
+    except (KeyError, ValueError):
+        return jsonify({
+            'success': False,
+            'message': 'lat and lon are required; radius_km and k must be numbers'
+        }), 400
+    
+    try:
+        if k is not None:
+            farms = mapper.farm_index.nearest(lat, lon, min(k, MAX_FARMS_PER_QUERY))
+        else:
+            farms = mapper.farm_index.within_km(lat, lon, radius_km, MAX_FARMS_PER_QUERY)
+        return Response(json.dumps(farm_collection(farms), separators=(',', ':')), mimetype='application/geo+json')
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'message': 'Failed to search farms'
+        }), 500
+
+@app.route('/api/farms/bbox', methods=['GET'])
+def get_farms_in_bbox():
+    """
+    Farms intersecting a bounding box, as GeoJSON.
+    
+    Query parameters: `bbox` as min_lon,min_lat,max_lon,max_lat (required).
+    At most 500 farms are returned.
+    
+    Returns:
+    GeoJSON FeatureCollection of farm boundaries; properties hold each farm's
+    map URL, weather, soil and recommendation
+    """
+    try:
+        min_lon, min_lat, max_lon, max_lat = (float(value) for value in request.args['bbox'].split(','))
+    except (KeyError, ValueError):
+        return jsonify({
+            'success': False,
+            'message': 'bbox is required as min_lon,min_lat,max_lon,max_lat'
+        }), 400
+    
+    try:
+        farms = mapper.farm_index.in_bbox(min_lon, min_lat, max_lon, max_lat, MAX_FARMS_PER_QUERY)
+        return Response(json.dumps(farm_collection(farms), separators=(',', ':')), mimetype='application/geo+json')
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'message': 'Failed to search farms'
+        }), 500
+
+@app.route('/api/tiles/<int:z>/<int:x>/<int:y>.geojson', methods=['GET'])
+def get_tile(z, x, y):
+    """
+    A regional tile of farm layouts, for overview maps of many farms.
+    
+    Tiles follow the web mercator z/x/y scheme of slippy maps, for zooms 0-20.
+    Below zoom 14 each land use type is merged across farms; from zoom 14 each
+    farm's zones are separate features with its crops and map URL. Tiles carry
+    a strong ETag per content coding and are answered with 304 Not Modified
+    when the client already has them.
+    
+    Returns:
+    GeoJSON FeatureCollection of the land use zones in the tile
+    """
+    best, best_quality = None, 0
+    for encoding in TILE_ENCODINGS:
+        quality = request.accept_encodings.quality(encoding)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    
+    try:
+        content = mapper.tiler.tile(z, x, y, best)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'message': 'Failed to build tile'
+        }), 500
+    
+    tag = content_etag(content)
+    if request.if_none_match.contains_weak(tag):
+        response = Response(status=304)
+    else:
+        response = Response(content, mimetype='application/geo+json')
+        if best:
+            response.headers['Content-Encoding'] = best
+    response.set_etag(tag)
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['Cache-Control'] = MAP_CACHE_CONTROL
+    return response
+
+@app.route('/api/upload-queue', methods=['GET'])
+def get_upload_queue():
+    """
+    Report the depth of the Firebase upload queue.
+    
+    Returns:
+    JSON with counts of map uploads and metadata documents by status, and the
+    total still pending
+    """
+    if mapper.upload_queue is None:
+        return jsonify({
+            'success': True,
+            'enabled': False,
+            'message': 'Firebase not available, maps are stored locally'
+        }), 200
+    return jsonify({'success': True, 'enabled': True, **mapper.upload_queue.stats()}), 200
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5001, debug=True)
\ No newline at end of file
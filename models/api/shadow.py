@@ -0,0 +1,333 @@
+"""
+Shadow scoring of candidate models against live API traffic.
+
+Request handlers score each request with the active models as usual and hand
+the prepared feature rows to a ShadowScorer. The scorer only appends them to a
+bounded queue, and drops them when the queue is full, so the user-facing
+response never waits on shadow work. A background thread drains the queue in
+batches, scores them with the candidate models (and with the active models when
+the handler did not), and records how far the candidate diverges from the
+active models and how long each takes per row.
+"""
+
+import os
+import time
+import queue
+import random
+import threading
+
+import numpy as np
+import pandas as pd
+
+from training.model_trainer import AgriYieldModel, AgriROIModel, feature_matrix
+
+# Directory the retraining job saves v{version} model directories to
+CANDIDATE_VERSIONS_DIR = "models/saved_models"
+
+# Requests waiting to be shadow scored; further requests are dropped
+SHADOW_QUEUE_SIZE = 1000
+
+# Most queued requests scored together in one pass over the models
+SHADOW_BATCH_SIZE = 64
+
+# Samples kept per statistic for percentiles
+RESERVOIR_SIZE = 2048
+
+# Relative divergence above which a candidate prediction counts as disagreeing
+DISAGREEMENT_THRESHOLD = 0.1
+
+# Weather columns of models retrained on feedback, and the API columns they are read from
+FEEDBACK_WEATHER_ALIASES = {'avg_temperature_c': 'avg_temperature', 'avg_rainfall_mm': 'avg_rainfall'}
+
+# Weather columns a model without season features must be given rather than zero-filled
+WEATHER_FEATURES = ['avg_temperature', 'avg_rainfall', 'avg_humidity', 'solar_radiation', *FEEDBACK_WEATHER_ALIASES]
+
+class Reservoir:
+    """
+    Fixed-size uniform sample of a stream of values, for percentiles.
+    """
+
+    def __init__(self, size=RESERVOIR_SIZE, seed=0):
+        self.size = size
+        self.values = []
+        self.seen = 0
+        self._random = random.Random(seed)
+
+    def add(self, values):
+        """Add values to the sample (reservoir sampling)."""
+        for value in values:
+            self.seen += 1
+            if len(self.values) < self.size:
+                self.values.append(float(value))
+            else:
+                slot = self._random.randrange(self.seen)
+                if slot < self.size:
+                    self.values[slot] = float(value)
+
+    def percentiles(self, points=(50, 95, 99)):
+        """
+        Percentiles of the sampled values.
+
+        Returns:
+        dict: p{point} -> value (None before any values)
+        """
+        if not self.values:
+            return {f"p{point}": None for point in points}
+        return {f"p{point}": float(value) for point, value in zip(points, np.percentile(self.values, points))}
+
+class DivergenceStats:
+    """
+    Running divergence and latency statistics for one target.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.sum_diff = 0.0
+        self.sum_abs_diff = 0.0
+        self.sum_sq_diff = 0.0
+        self.max_abs_diff = 0.0
+        self.disagreements = 0
+        self.abs_diff = Reservoir()
+        self.rel_diff = Reservoir()
+        self.active_ms = Reservoir()
+        self.candidate_ms = Reservoir()
+
+    def update(self, active, candidate, active_ms, candidate_ms):
+        """
+        Record a scored batch.
+
+        Parameters:
+        active (np.array): Active model predictions
+        candidate (np.array): Candidate model predictions
+        active_ms (np.array): Active latency per row in milliseconds
+        candidate_ms (float): Candidate latency per row in milliseconds
+        """
+        diff = candidate - active
+        abs_diff = np.abs(diff)
+        rel_diff = abs_diff / np.maximum(np.abs(active), np.finfo(float).eps)
+        self.count += len(diff)
+        self.sum_diff += float(diff.sum())
+        self.sum_abs_diff += float(abs_diff.sum())
+        self.sum_sq_diff += float((diff ** 2).sum())
+        self.max_abs_diff = max(self.max_abs_diff, float(abs_diff.max()))
+        self.disagreements += int((rel_diff > DISAGREEMENT_THRESHOLD).sum())
+        self.abs_diff.add(abs_diff)
+        self.rel_diff.add(rel_diff)
+        self.active_ms.add(active_ms)
+        self.candidate_ms.add([candidate_ms] * len(diff))
+
+    def summary(self):
+        """
+        Summarize the statistics.
+
+        Returns:
+        dict: Divergence and latency summary
+        """
+        if not self.count:
+            return {'count': 0}
+        return {
+            'count': self.count,
+            'mean_diff': self.sum_diff / self.count,
+            'mean_abs_diff': self.sum_abs_diff / self.count,
+            'rmse': (self.sum_sq_diff / self.count) ** 0.5,
+            'max_abs_diff': self.max_abs_diff,
+            'disagreement_rate': self.disagreements / self.count,
+            'abs_diff': self.abs_diff.percentiles(),
+            'rel_diff': self.rel_diff.percentiles(),
+            'active_ms_per_row': self.active_ms.percentiles(),
+            'candidate_ms_per_row': self.candidate_ms.percentiles(),
+        }
+
+def _predict(model, X):
+    """Point predictions of a yield ensemble or ROI model."""
+    if isinstance(model, AgriYieldModel):
+        return model.predict_intervals(X)['prediction']
+    return model.model.predict(X)
+
+def _feature_matrix(model, rows):
+    """
+    Arrange prepared feature rows in a model's training column order.
+
+    Models retrained on feedback name their weather columns after the stored
+    weather data, so the API's columns are renamed to match. Weather columns
+    the rows still lack would be zero-filled, so such rows are refused.
+
+    Raises:
+    ValueError: If the rows lack a weather column of a model without season features
+    """
+    season_features = getattr(model, 'season_features', None)
+    renamed = {alias: name for name, alias in FEEDBACK_WEATHER_ALIASES.items()
+               if name in model.feature_names and name not in rows.columns and alias in rows.columns}
+    rows = rows.rename(columns=renamed)
+    if season_features is None:
+        missing = [name for name in WEATHER_FEATURES if name in model.feature_names and name not in rows.columns]
+        if missing:
+            raise ValueError(f"Rows lack the model's weather features {missing}")
+    return feature_matrix(rows, model.feature_names, season_features)
+
+class ShadowScorer:
+    """
+    Scores live requests with candidate models on a background thread.
+    """
+
+    def __init__(self, candidates, version=None, queue_size=SHADOW_QUEUE_SIZE,
+                 batch_size=SHADOW_BATCH_SIZE, sample_rate=1.0):
+        self.candidates = candidates
+        self.version = version
+        self.batch_size = batch_size
+        self.sample_rate = sample_rate
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.stats = {target: DivergenceStats() for target in candidates}
+        self.submitted = 0
+        self.dropped = 0
+        self.errors = 0
+        self.last_error = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @classmethod
+    def from_version(cls, version, versions_dir=CANDIDATE_VERSIONS_DIR, **kwargs):
+        """
+        Create a scorer for a saved model version.
+
+        Parameters:
+        version (str): Version identifier of the v{version} directory
+        versions_dir (str): Directory holding the model versions
+
+        Returns:
+        ShadowScorer: Scorer for the version's available models
+        """
+        model_dir = os.path.join(versions_dir, f"v{version}")
+        candidates = {}
+        for target, model_class, name in (('yield', AgriYieldModel, 'yield_model'), ('roi', AgriROIModel, 'roi_model')):
+            try:
+                model = model_class()
+                model.load_model(os.path.join(model_dir, name))
+                candidates[target] = model
+            except Exception as e:
+                print(f"Shadow scoring: no candidate {name} in {model_dir}: {e}")
+        if not candidates:
+            raise ValueError(f"No candidate models found in {model_dir}")
+        return cls(candidates, version=version, **kwargs)
+
+    def start(self):
+        """Start the background worker."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="shadow-scorer", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=5.0):
+        """Stop the background worker after the batch in progress."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def submit(self, target, features_df, active_model, active_prediction=None, active_ms=None):
+        """
+        Queue feature rows for shadow scoring without blocking.
+
+        Parameters:
+        target (str): 'yield' or 'roi'
+        features_df (pd.DataFrame): Prepared feature rows of the request
+        active_model: Model that served the request
+        active_prediction (np.array): Its predictions, or None to score them in the background
+        active_ms (float): Time it took per row, if it was scored in the request
+
+        Returns:
+        bool: Whether the rows were queued
+        """
+        if target not in self.candidates or active_model is None:
+            return False
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return False
+        item = (target, features_df, active_model, active_prediction, active_ms)
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+        with self._lock:
+            self.submitted += 1
+        return True
+
+    def _next_batch(self):
+        """Wait for queued requests and take up to batch_size of them."""
+        try:
+            batch = [self.queue.get(timeout=0.2)]
+        except queue.Empty:
+            return []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def score_batch(self, batch):
+        """
+        Score queued requests with the candidate models and record the divergence.
+
+        Parameters:
+        batch (list): Queued (target, features_df, active_model, active_prediction, active_ms) items
+        """
+        for target in {item[0] for item in batch}:
+            items = [item for item in batch if item[0] == target]
+            candidate = self.candidates[target]
+            rows = pd.concat([item[1] for item in items], ignore_index=True)
+            sizes = [len(item[1]) for item in items]
+
+            active, active_ms = [], []
+            for (_, features_df, active_model, prediction, request_ms) in items:
+                if prediction is None:
+                    start = time.perf_counter()
+                    prediction = _predict(active_model, _feature_matrix(active_model, features_df))
+                    request_ms = (time.perf_counter() - start) * 1000 / len(features_df)
+                active.append(np.asarray(prediction, dtype=np.float64).reshape(-1))
+                active_ms.extend([request_ms if request_ms is not None else np.nan] * len(features_df))
+
+            start = time.perf_counter()
+            candidate_prediction = _predict(candidate, _feature_matrix(candidate, rows))
+            candidate_ms = (time.perf_counter() - start) * 1000 / sum(sizes)
+
+            active_ms = np.asarray(active_ms)
+            with self._lock:
+                self.stats[target].update(
+                    np.concatenate(active), np.asarray(candidate_prediction, dtype=np.float64),
+                    active_ms[~np.isnan(active_ms)], candidate_ms
+                )
+
+    def _run(self):
+        """Worker loop: drain the queue in batches until stopped."""
+        while not self._stop.is_set():
+            batch = self._next_batch()
+            if not batch:
+                continue
+            try:
+                self.score_batch(batch)
+            except Exception as e:
+                with self._lock:
+                    self.errors += len(batch)
+                    self.last_error = str(e)
+
+    def snapshot(self):
+        """
+        Current shadow scoring statistics.
+
+        Returns:
+        dict: Queue counters and divergence statistics per target
+        """
+        with self._lock:
+            return {
+                'candidate_version': self.version,
+                'running': self._thread is not None and self._thread.is_alive(),
+                'submitted': self.submitted,
+                'dropped': self.dropped,
+                'queued': self.queue.qsize(),
+                'errors': self.errors,
+                'last_error': self.last_error,
+                'targets': {target: stats.summary() for target, stats in self.stats.items()},
+            }
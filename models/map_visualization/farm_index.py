@@ -0,0 +1,281 @@
+"""
+Spatial index of the farms the land layout mapper has laid out.
+
+Each farm's boundary, land use zones, centre and layout data (recommendation,
+weather, soil) is kept in a SQLite table, so the index survives restarts, and its boundary in
+an in-memory STRtree for "farms within X km", "nearest k farms" and bounding
+box queries. An STRtree cannot be changed once built, so farms added since the
+last build sit in a small list that is searched directly, and the tree is
+rebuilt from scratch once that list grows past REBUILD_THRESHOLD.
+"""
+
+import json
+import time
+import sqlite3
+import threading
+
+import numpy as np
+import shapely
+from shapely import STRtree
+from shapely.geometry import GeometryCollection, Point, box
+
+from map_visualization.land_subdivision import to_local_metric
+from map_visualization.map_catalogue import KM_PER_DEGREE
+
+# Farms added since the tree was built that are searched directly before the tree is rebuilt
+REBUILD_THRESHOLD = 256
+
+# Nearest-farm search starts within this radius and doubles up to the maximum
+INITIAL_NEAREST_RADIUS_KM = 1.0
+MAX_NEAREST_RADIUS_KM = 512.0
+
+# Farm IDs looked up per query, below SQLite's limit on query parameters
+LOOKUP_BATCH_SIZE = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS farms (
+    farm_id TEXT PRIMARY KEY,
+    boundary BLOB NOT NULL,
+    center_lat REAL NOT NULL,
+    center_lon REAL NOT NULL,
+    data TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    zones BLOB
+);
+"""
+
+def km_box(lat, lon, radius_km):
+    """Longitude/latitude box holding every point within a distance of a point."""
+    lat_delta = radius_km / KM_PER_DEGREE
+    lon_delta = radius_km / (KM_PER_DEGREE * max(np.cos(np.radians(lat)), 1e-6))
+    return box(lon - lon_delta, lat - lat_delta, lon + lon_delta, lat + lat_delta)
+
+class FarmIndex:
+    """
+    Persistent STRtree index of farm boundaries.
+    """
+
+    def __init__(self, db_path, rebuild_threshold=REBUILD_THRESHOLD):
+        """
+        Parameters:
+        db_path (str): SQLite database file
+        rebuild_threshold (int): Farms added outside the tree before it is rebuilt
+        """
+        self.db_path = db_path
+        self.rebuild_threshold = rebuild_threshold
+        self._lock = threading.Lock()
+        with self._connect() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(SCHEMA)
+            # Indexes created before zones were stored gain the column, empty for existing farms
+            columns = [row[1] for row in connection.execute("PRAGMA table_info(farms)")]
+            if 'zones' not in columns:
+                connection.execute("ALTER TABLE farms ADD COLUMN zones BLOB")
+            rows = connection.execute("SELECT farm_id, boundary FROM farms ORDER BY updated_at").fetchall()
+        # Parallel lists of farm IDs and boundaries; positions of replaced farms are dead until the next build
+        self._ids = [farm_id for farm_id, _ in rows]
+        self._boundaries = list(shapely.from_wkb([boundary for _, boundary in rows])) if rows else []
+        self._alive = [True] * len(rows)
+        self._positions = {farm_id: position for position, farm_id in enumerate(self._ids)}
+        self._build()
+
+    def _connect(self):
+        """A connection for the calling thread."""
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def _build(self):
+        """Rebuild the tree from the live farms, dropping replaced ones."""
+        live = [position for position, alive in enumerate(self._alive) if alive]
+        self._ids = [self._ids[position] for position in live]
+        self._boundaries = [self._boundaries[position] for position in live]
+        self._alive = [True] * len(live)
+        self._positions = {farm_id: position for position, farm_id in enumerate(self._ids)}
+        self._tree = STRtree(self._boundaries)
+        self._tree_size = len(self._boundaries)
+
+    def __len__(self):
+        return len(self._positions)
+
+    def add(self, farm_id, boundary, data, zones=None):
+        """
+        Add a farm, or replace it if it is already indexed.
+
+        Parameters:
+        farm_id (str): Identifier of the farm
+        boundary (Polygon or MultiPolygon): Farm boundary in longitude/latitude
+        data (dict): JSON-serializable layout data returned with the farm
+        zones (list): The farm's land use zones in LAND_USE_ZONES order, if laid out
+
+        Returns:
+        bool: Whether the farm is new or its zones changed
+        """
+        center = boundary.centroid
+        zones_wkb = shapely.to_wkb(GeometryCollection(list(zones))) if zones is not None else None
+        with self._connect() as connection:
+            stored = connection.execute("SELECT zones FROM farms WHERE farm_id = ?", (farm_id,)).fetchone()
+            connection.execute(
+                "INSERT OR REPLACE INTO farms (farm_id, boundary, center_lat, center_lon, data, updated_at, zones) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (farm_id, shapely.to_wkb(boundary), center.y, center.x, json.dumps(data), time.time(), zones_wkb)
+            )
+        with self._lock:
+            previous = self._positions.get(farm_id)
+            if previous is not None:
+                self._alive[previous] = False
+            self._positions[farm_id] = len(self._ids)
+            self._ids.append(farm_id)
+            self._boundaries.append(boundary)
+            self._alive.append(True)
+            if len(self._ids) - self._tree_size > self.rebuild_threshold:
+                self._build()
+        return stored is None or stored[0] != zones_wkb
+
+    def _candidates(self, area):
+        """Positions of live farms whose bounding boxes intersect an area."""
+        with self._lock:
+            positions = list(self._tree.query(area)) if self._tree_size else []
+            recent = np.array(self._boundaries[self._tree_size:], dtype=object)
+            if len(recent):
+                positions += list(self._tree_size + np.flatnonzero(shapely.intersects(shapely.envelope(recent), area)))
+            return [(position, self._ids[position], self._boundaries[position])
+                    for position in positions if self._alive[position]]
+
+    def _lookup(self, columns, farm_ids, condition="1"):
+        """Rows of the given columns for farms, by ID, in batches."""
+        rows = []
+        with self._connect() as connection:
+            for start in range(0, len(farm_ids), LOOKUP_BATCH_SIZE):
+                batch = list(farm_ids[start:start + LOOKUP_BATCH_SIZE])
+                rows += connection.execute(
+                    f"SELECT {columns} FROM farms "
+                    f"WHERE {condition} AND farm_id IN ({', '.join('?' * len(batch))})", batch
+                ).fetchall()
+        return rows
+
+    def _farms(self, farm_ids):
+        """Stored centre and data of farms, by ID."""
+        rows = self._lookup("farm_id, center_lat, center_lon, data", farm_ids)
+        return {farm_id: {'farm_id': farm_id, 'center_lat': lat, 'center_lon': lon, **json.loads(data)}
+                for farm_id, lat, lon, data in rows}
+
+    def _results(self, matches, distances=None):
+        """Farm records for (ID, boundary) matches, with their boundaries as GeoJSON."""
+        farms = self._farms([farm_id for farm_id, _ in matches])
+        results = []
+        for i, (farm_id, boundary) in enumerate(matches):
+            if farm_id not in farms:
+                continue
+            record = {**farms[farm_id], 'boundary': boundary.__geo_interface__}
+            if distances is not None:
+                record['distance_km'] = float(distances[i])
+            results.append(record)
+        return results
+
+    def within_km(self, lat, lon, radius_km, limit=None):
+        """
+        Farms whose boundaries come within a distance of a point, nearest first.
+
+        Parameters:
+        lat, lon (float): The point
+        radius_km (float): Distance in kilometres
+        limit (int): Most farms returned
+
+        Returns:
+        list: Farm records with their data, boundary and 'distance_km' (0 inside the farm)
+        """
+        candidates = self._candidates(km_box(lat, lon, radius_km))
+        if not candidates:
+            return []
+        projected, _, _ = to_local_metric([boundary for _, _, boundary in candidates], origin=(lon, lat))
+        distances = shapely.distance(Point(0, 0), projected) / 1000
+        order = [i for i in np.argsort(distances, kind='stable') if distances[i] <= radius_km][:limit]
+        return self._results([candidates[i][1:] for i in order], distances[order])
+
+    def nearest(self, lat, lon, k=5):
+        """
+        The k farms nearest to a point.
+
+        Searches within a radius that doubles until k farms are found.
+
+        Parameters:
+        lat, lon (float): The point
+        k (int): Farms returned
+
+        Returns:
+        list: Farm records with their data, boundary and 'distance_km', nearest first
+        """
+        radius_km = INITIAL_NEAREST_RADIUS_KM
+        while True:
+            farms = self.within_km(lat, lon, radius_km, limit=k)
+            if len(farms) >= min(k, len(self)) or radius_km >= MAX_NEAREST_RADIUS_KM:
+                return farms
+            radius_km *= 2
+
+    def _in_area(self, area):
+        """IDs and boundaries of farms intersecting an area."""
+        candidates = self._candidates(area)
+        hits = shapely.intersects(np.array([boundary for _, _, boundary in candidates], dtype=object), area)
+        return [candidates[i][1:] for i in np.flatnonzero(hits)]
+
+    def in_bbox(self, min_lon, min_lat, max_lon, max_lat, limit=None):
+        """
+        Farms intersecting a longitude/latitude box.
+
+        Parameters:
+        min_lon, min_lat, max_lon, max_lat (float): The box
+        limit (int): Most farms returned; only these are read from the database
+
+        Returns:
+        list: Farm records with their data and boundary
+        """
+        return self._results(self._in_area(box(min_lon, min_lat, max_lon, max_lat))[:limit])
+
+    def overlapping(self, boundary, user_id):
+        """
+        A user's farms intersecting a boundary.
+
+        Parameters:
+        boundary (Polygon or MultiPolygon): The boundary in longitude/latitude
+        user_id (str): The user whose farms are searched
+
+        Returns:
+        list: (farm ID, boundary) of the user's farms
+        """
+        matches = self._in_area(boundary)
+        rows = self._lookup("farm_id, data", [farm_id for farm_id, _ in matches])
+        owned = {farm_id for farm_id, data in rows if json.loads(data).get('user_id') == user_id}
+        return [(farm_id, farm_boundary) for farm_id, farm_boundary in matches if farm_id in owned]
+
+    def remove(self, farm_id):
+        """
+        Remove a farm from the index.
+
+        Parameters:
+        farm_id (str): Identifier of the farm
+        """
+        with self._connect() as connection:
+            connection.execute("DELETE FROM farms WHERE farm_id = ?", (farm_id,))
+        with self._lock:
+            position = self._positions.pop(farm_id, None)
+            if position is not None:
+                self._alive[position] = False
+
+    def zones_in_bbox(self, min_lon, min_lat, max_lon, max_lat):
+        """
+        Land use zones of the farms intersecting a longitude/latitude box.
+
+        Farms indexed without zones are left out.
+
+        Parameters:
+        min_lon, min_lat, max_lon, max_lat (float): The box
+
+        Returns:
+        tuple: (farm IDs, their data, zone geometries of shape (farms, zones))
+        """
+        farm_ids = [farm_id for farm_id, _ in self._in_area(box(min_lon, min_lat, max_lon, max_lat))]
+        rows = self._lookup("farm_id, data, zones", farm_ids, "zones IS NOT NULL")
+        if not rows:
+            return [], [], np.empty((0, 0), dtype=object)
+        collections = shapely.from_wkb([zones for _, _, zones in rows])
+        zones = shapely.get_parts(collections).reshape(len(rows), -1)
+        return [farm_id for farm_id, _, _ in rows], [json.loads(data) for _, data, _ in rows], zones
@@ -16,6 +16,14 @@ from typing import Dict, List, Tuple
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from recommendation.engine import AgriRecommendationEngine, SoilData, WeatherData, EconomicData
+from map_visualization.map_renderer import RENDERER_VERSION, TemplateMapRenderer, land_use_color, land_use_tooltip
+from map_visualization.map_cache import (
+    DEFAULT_MAP_CACHE_BYTES, DEFAULT_MAP_CACHE_MAX_AGE, MAP_CATALOGUE_DB, MapCache, RenderedMap, map_cache_key
+)
+from map_visualization.upload_queue import MapUploadQueue, firebase_backends
+from map_visualization.land_subdivision import LAND_USE_ZONES, area_acres as boundary_area_acres, subdivide_farm
+from map_visualization.farm_index import FarmIndex
+from map_visualization.map_tiles import MapTiler
 
 # Initialize Firebase availability flag
 FIREBASE_AVAILABLE = False
@@ -31,15 +39,88 @@ try:
 except ImportError:
     print("Firebase Admin SDK not available. Map data will not be stored in Firebase.")
 
+# SQLite file of the Firebase upload queue, in the map data directory
+UPLOAD_QUEUE_DB = "map_upload_queue.sqlite3"
+
+# SQLite file of the spatial index of laid out farms, in the map data directory
+FARM_INDEX_DB = "farm_index.sqlite3"
+
+# Directory of cached regional tiles, in the map data directory
+TILE_CACHE_DIR = "tiles"
+
+# Files kept in the generated maps directory by earlier versions, moved to the map data directory
+MOVED_DATA_FILES = [
+    name + suffix
+    for name in (MAP_CATALOGUE_DB, UPLOAD_QUEUE_DB, FARM_INDEX_DB)
+    for suffix in ('', '-wal', '-shm')
+] + [TILE_CACHE_DIR]
+
+# Weather recorded for a farm within this distance is reused for a request without its own
+NEIGHBOUR_WEATHER_RADIUS_KM = 2.0
+
+# Coordinate decimals kept by default in GeoJSON responses (about 1 cm)
+DEFAULT_GEOJSON_PRECISION = 7
+
+def round_coordinates(coordinates, precision):
+    """
+    Round nested GeoJSON coordinates, dropping points that collapse onto their predecessor.
+    
+    Parameters:
+    coordinates: GeoJSON coordinates (a position or nested lists of positions)
+    precision (int): Decimal places to keep
+    
+    Returns:
+    list: Rounded coordinates
+    """
+    if not coordinates:
+        return []
+    if isinstance(coordinates[0], (int, float)):
+        return [round(value, precision) for value in coordinates]
+    rounded = []
+    for item in coordinates:
+        item = round_coordinates(item, precision)
+        if not rounded or item != rounded[-1] or not isinstance(item[0], float):
+            rounded.append(item)
+    return rounded
+
 class LandLayoutMapper:
     """
     Generates interactive land layout maps based on AI recommendations.
     """
     
-    def __init__(self):
+    def __init__(self, cache_max_bytes: int = None, cache_max_age_seconds: float = None):
+        """
+        Parameters:
+        cache_max_bytes (int): Size budget of generated maps (default MAP_CACHE_MAX_MB or 256 MB)
+        cache_max_age_seconds (float): Age after which generated maps are removed
+            (default MAP_CACHE_MAX_AGE_DAYS or 30 days)
+        """
         self.engine = AgriRecommendationEngine()
         self.output_dir = "models/map_visualization/generated_maps"
         os.makedirs(self.output_dir, exist_ok=True)
+        # Databases and tiles hold every user's data, so they live outside the served maps directory
+        self.data_dir = "models/map_visualization/map_data"
+        os.makedirs(self.data_dir, exist_ok=True)
+        for name in MOVED_DATA_FILES:
+            if os.path.exists(os.path.join(self.output_dir, name)) and not os.path.exists(os.path.join(self.data_dir, name)):
+                os.replace(os.path.join(self.output_dir, name), os.path.join(self.data_dir, name))
+        self.renderer = TemplateMapRenderer()
+        
+        # Generated maps are cached by their inputs under a size and age budget
+        if cache_max_bytes is None:
+            cache_max_bytes = int(float(os.environ.get("MAP_CACHE_MAX_MB", DEFAULT_MAP_CACHE_BYTES / 2**20)) * 2**20)
+        if cache_max_age_seconds is None:
+            cache_max_age_seconds = float(os.environ.get("MAP_CACHE_MAX_AGE_DAYS", DEFAULT_MAP_CACHE_MAX_AGE / 86400)) * 86400
+        self.map_cache = MapCache(self.output_dir, cache_max_bytes, cache_max_age_seconds, self.data_dir)
+        
+        # Every laid out farm is indexed by its boundary for nearby and bounding box queries
+        self.farm_index = FarmIndex(os.path.join(self.data_dir, FARM_INDEX_DB))
+        
+        # Regional overview tiles are cut from the farm index and cached until a farm they show changes
+        self.tiler = MapTiler(self.farm_index, os.path.join(self.data_dir, TILE_CACHE_DIR))
+        
+        # Uploads to Firebase go through a background queue once Firebase is initialized
+        self.upload_queue = None
         
         # Initialize Firebase if available
         global FIREBASE_AVAILABLE, db, bucket
@@ -59,6 +140,7 @@ class LandLayoutMapper:
                     try:
                         db = firestore.client()
                         bucket = storage.bucket('sasyayojana-79840.firebasestorage.app')
+                        self.enable_firebase_uploads(bucket, db)
                     except Exception as e:
                         print(f"Could not initialize Firestore/Storage: {e}")
                         FIREBASE_AVAILABLE = False
@@ -66,6 +148,43 @@ class LandLayoutMapper:
                 print(f"Error initializing Firebase: {e}")
                 FIREBASE_AVAILABLE = False
     
+    def enable_firebase_uploads(self, storage_bucket, firestore_client):
+        """
+        Start the background queue that uploads new maps and their metadata to Firebase.
+        
+        Parameters:
+        storage_bucket: Firebase Storage bucket for the map files
+        firestore_client: Firestore client; metadata goes to the land_layout_maps collection
+        
+        Returns:
+        MapUploadQueue: The running queue
+        """
+        if self.upload_queue is None:
+            self.upload_queue = MapUploadQueue(
+                os.path.join(self.data_dir, UPLOAD_QUEUE_DB),
+                *firebase_backends(storage_bucket, firestore_client.collection('land_layout_maps'), firestore_client)
+            ).start()
+        return self.upload_queue
+    
+    def queue_upload(self, rendered: RenderedMap, map_data: Dict) -> str:
+        """
+        Queue a map and its metadata for upload to Firebase.
+        
+        Reused maps are queued too: the queue uploads each map's file once, and
+        writes every request's Firestore document.
+        
+        Parameters:
+        rendered (RenderedMap): The map
+        map_data (Dict): JSON-serializable metadata for the map's Firestore document
+        
+        Returns:
+        str: 'queued', 'cached' if the map was generated before, or 'local' without Firebase
+        """
+        if self.upload_queue is None:
+            return 'local'
+        self.upload_queue.enqueue(rendered.content, rendered.filename, map_data)
+        return 'queued' if rendered.created else 'cached'
+    
     def generate_land_polygon(self, center_lat: float, center_lon: float, area_acres: float) -> Polygon:
         """
         Generate a polygon representing the farm land based on center coordinates and area.
@@ -126,56 +245,46 @@ class LandLayoutMapper:
             
         return ratios
     
+    def farm_boundary(self, center_lat: float, center_lon: float, area_acres: float, boundary=None):
+        """
+        The farm's boundary: the drawn one if given, otherwise a square of its area around its centre.
+        
+        Parameters:
+        center_lat (float): Latitude of farm center
+        center_lon (float): Longitude of farm center
+        area_acres (float): Area of farm in acres
+        boundary (Polygon or MultiPolygon): User-drawn boundary in longitude/latitude
+        
+        Returns:
+        Polygon or MultiPolygon: The farm boundary
+        """
+        if boundary is not None:
+            return boundary
+        return self.generate_land_polygon(center_lat, center_lon, area_acres)
+    
     def create_land_use_polygons(self, land_poly: Polygon, ratios: Dict[str, float]) -> gpd.GeoDataFrame:
         """
         Create sub-polygons for different land use types based on ratios.
         
+        The farm is split into south-to-north bands whose areas match the ratios
+        exactly, whatever its shape; holes (ponds, buildings) are left out of every zone.
+        
         Parameters:
-        land_poly (Polygon): The main land polygon
+        land_poly (Polygon): The main land polygon (a Polygon or MultiPolygon, holes allowed)
         ratios (Dict[str, float]): Area ratios for different land use types
         
         Returns:
         gpd.GeoDataFrame: GeoDataFrame with land use polygons
         """
-        # Get bounds of the land polygon
-        minx, miny, maxx, maxy = land_poly.bounds
-        width = maxx - minx
-        height = maxy - miny
-        
-        # Calculate vertical divisions based on ratios
-        main_crop_limit = miny + height * ratios['main_crop_ratio']
-        intercrop_limit = main_crop_limit + height * ratios['intercrop_ratio']
-        
-        # Create sub-polygons
-        main_crop_poly = Polygon([
-            (minx, miny), 
-            (maxx, miny), 
-            (maxx, main_crop_limit), 
-            (minx, main_crop_limit),
-            (minx, miny)
-        ])
-        
-        intercrop_poly = Polygon([
-            (minx, main_crop_limit), 
-            (maxx, main_crop_limit), 
-            (maxx, intercrop_limit), 
-            (minx, intercrop_limit),
-            (minx, main_crop_limit)
-        ])
-        
-        tree_poly = Polygon([
-            (minx, intercrop_limit), 
-            (maxx, intercrop_limit), 
-            (maxx, maxy), 
-            (minx, maxy),
-            (minx, intercrop_limit)
-        ])
+        # Horizontal bands with exact area shares, found in a local metric projection
+        zones = subdivide_farm(land_poly, ratios)
+        land_use_types = [land_use_type for land_use_type, _ in LAND_USE_ZONES]
         
         # Create GeoDataFrame
         land_use = gpd.GeoDataFrame({
-            'geometry': [main_crop_poly, intercrop_poly, tree_poly],
-            'land_use_type': ['Main Crop', 'Intercrop', 'Trees'],
-            'color': ['green', 'yellow', 'darkgreen']
+            'geometry': zones,
+            'land_use_type': land_use_types,
+            'color': [land_use_color(land_use_type) for land_use_type in land_use_types]
         })
         
         return land_use
@@ -221,12 +330,7 @@ class LandLayoutMapper:
         # Add land use polygons to the map
         for _, row in land_use_gdf.iterrows():
             # Determine color based on land use type
-            color_map = {
-                'Main Crop': 'green',
-                'Intercrop': 'yellow',
-                'Trees': 'darkgreen'
-            }
-            color = color_map.get(row['land_use_type'], 'blue')
+            color = land_use_color(row['land_use_type'])
             
             # Add polygon to map
             folium.GeoJson(
@@ -238,7 +342,7 @@ class LandLayoutMapper:
                     'weight': 2,
                     'fillOpacity': 0.6
                 },
-                tooltip=f"{row['land_use_type']}: {getattr(recommendation, row['land_use_type'].lower().replace(' ', '_'), 'N/A')}"
+                tooltip=land_use_tooltip(row['land_use_type'], recommendation)
             ).add_to(m)
         
         # Add layer control
@@ -266,6 +370,41 @@ class LandLayoutMapper:
         
         return m
     
+    def render_map_html(self, land_use_gdf: gpd.GeoDataFrame, center_lat: float,
+                        center_lon: float, recommendation) -> str:
+        """
+        Render the land layout map as HTML from the precompiled template.
+        
+        Draws the same layers, tooltips and legend as generate_interactive_map
+        without building a folium object graph.
+        
+        Parameters:
+        land_use_gdf (gpd.GeoDataFrame): GeoDataFrame with land use polygons
+        center_lat (float): Latitude of farm center
+        center_lon (float): Longitude of farm center
+        recommendation: Recommendation object from AI engine
+        
+        Returns:
+        str: HTML of the map
+        """
+        return self.renderer.render(land_use_gdf, center_lat, center_lon, recommendation)
+    
+    def save_map_html(self, map_html: str, filename: str = "sasyayojana_live_map.html") -> str:
+        """
+        Save rendered map HTML to a file.
+        
+        Parameters:
+        map_html (str): HTML of the map
+        filename (str): Name of the output file
+        
+        Returns:
+        str: Path to the saved file
+        """
+        filepath = os.path.join(self.output_dir, filename)
+        with open(filepath, 'w', encoding='utf-8') as f:
+            f.write(map_html)
+        return filepath
+    
     def save_map(self, map_obj: folium.Map, filename: str = "sasyayojana_live_map.html") -> str:
         """
         Save the map to an HTML file.
@@ -281,22 +420,67 @@ class LandLayoutMapper:
         map_obj.save(filepath)
         return filepath
     
-    def generate_layout_from_recommendation(self, recommendation, center_lat: float, 
-                                          center_lon: float, area_acres: float) -> str:
+    def cached_map(self, cache_key: str, location: str = None, user_id: str = None) -> RenderedMap:
         """
-        Generate a complete land layout map from an AI recommendation.
+        Look up a previously generated map, recording its reuse in the map catalogue.
+        
+        Parameters:
+        cache_key (str): Key of the map's inputs
+        location (str): Location name of this request
+        user_id (str): User making this request
+        
+        Returns:
+        RenderedMap: The cached map, or None if it is not cached
+        """
+        cached = self.map_cache.get(cache_key)
+        if cached is None:
+            return None
+        content = self.map_cache.read(cache_key)
+        if content is None:
+            return None
+        path, metadata = cached
+        self.map_cache.record(cache_key, len(content), {
+            **metadata, 'location': location or metadata.get('location'), 'user_id': user_id
+        })
+        return RenderedMap(cache_key, path, content, metadata['recommendation'])
+    
+    def render_layout(self, recommendation, center_lat: float, center_lon: float,
+                      area_acres: float, cache_key: str = None, location: str = None,
+                      user_id: str = None, boundary=None) -> RenderedMap:
+        """
+        Render a land layout map into memory and persist it in the background.
+        
+        A map already generated for the same inputs is reused without re-rendering.
         
         Parameters:
         recommendation: Recommendation object from AI engine
         center_lat (float): Latitude of farm center
         center_lon (float): Longitude of farm center
         area_acres (float): Area of farm in acres
+        cache_key (str): Key of the map's inputs; defaults to a hash of the
+            recommendation, location and area
+        location (str): Location name, recorded in the map catalogue
+        user_id (str): User the map is generated for, recorded in the map catalogue
+        boundary (Polygon or MultiPolygon): User-drawn farm boundary; defaults to a square of the area
         
         Returns:
-        str: Path to the generated HTML map file
+        RenderedMap: The map's bytes, key, path and land use zones; `persisted` completes once it is on disk
         """
+        recommendation_fields = dict(vars(recommendation))
+        if cache_key is None:
+            inputs = {
+                'recommendation': recommendation_fields, 'center_lat': center_lat, 'center_lon': center_lon,
+                'area_acres': area_acres, 'renderer_version': RENDERER_VERSION
+            }
+            if boundary is not None:
+                inputs['boundary'] = boundary.__geo_interface__
+            cache_key = map_cache_key(inputs)
+        cached = self.cached_map(cache_key, location, user_id)
+        if cached is not None:
+            return cached
+        
         # Generate land polygon
-        land_poly = self.generate_land_polygon(center_lat, center_lon, area_acres)
+        land_poly = self.farm_boundary(center_lat, center_lon, area_acres, boundary)
         
         # Calculate layout ratios
         ratios = self.calculate_layout_ratios(recommendation)
@@ -304,39 +488,52 @@ class LandLayoutMapper:
         # Create land use polygons
         land_use_gdf = self.create_land_use_polygons(land_poly, ratios)
         
-        # Generate interactive map
-        map_obj = self.generate_interactive_map(land_use_gdf, center_lat, center_lon, recommendation)
-        
-        # Save map
-        filepath = self.save_map(map_obj, f"sasyayojana_live_map_{int(center_lat*1000)}_{int(center_lon*1000)}.html")
-        
-        return filepath
+        # Render the interactive map from the precompiled template
+        content = self.render_map_html(land_use_gdf, center_lat, center_lon, recommendation).encode('utf-8')
+        
+        # Save map under its inputs' key off the request path, evicting old maps beyond the cache budget
+        persisted = self.map_cache.put_async(cache_key, content, {
+            'center_lat': center_lat,
+            'center_lon': center_lon,
+            'land_area_acres': area_acres,
+            'location': location,
+            'user_id': user_id,
+            'recommendation': recommendation_fields
+        })
+        return RenderedMap(cache_key, self.map_cache.map_path(cache_key), content, recommendation_fields,
+                           created=True, persisted=persisted, zones=list(land_use_gdf.geometry))
     
-    def get_real_time_recommendation_and_map(self, soil_data: SoilData, weather_data: WeatherData, 
-                                           economic_data: EconomicData, land_area_acres: float,
-                                           center_lat: float, center_lon: float, location: str) -> Tuple[str, Dict]:
+    def generate_layout_from_recommendation(self, recommendation, center_lat: float, 
+                                          center_lon: float, area_acres: float, cache_key: str = None) -> str:
         """
-        Get real-time recommendation from AI engine and generate corresponding map.
+        Generate a complete land layout map from an AI recommendation.
         
         Parameters:
-        soil_data (SoilData): Soil data
-        weather_data (WeatherData): Weather data
-        economic_data (EconomicData): Economic data
-        land_area_acres (float): Land area in acres
+        recommendation: Recommendation object from AI engine
         center_lat (float): Latitude of farm center
         center_lon (float): Longitude of farm center
-        location (str): Location name
+        area_acres (float): Area of farm in acres
+        cache_key (str): Key of the map's inputs; defaults to a hash of the
+            recommendation, location and area
         
         Returns:
-        Tuple[str, Dict]: (map_file_path, recommendation_dict)
+        str: Path to the generated HTML map file
         """
-        # Generate recommendation from AI engine
-        recommendation = self.engine.generate_recommendation(
-            soil_data, weather_data, economic_data, land_area_acres, location
-        )
+        rendered = self.render_layout(recommendation, center_lat, center_lon, area_acres, cache_key)
+        rendered.wait()
+        return rendered.path
+    
+    def recommendation_to_dict(self, recommendation) -> Dict:
+        """
+        Convert a recommendation to a dictionary for JSON serialization.
+        
+        Parameters:
+        recommendation: Recommendation object from AI engine
         
-        # Convert recommendation to dictionary for JSON serialization
-        recommendation_dict = {
+        Returns:
+        Dict: Recommendation fields
+        """
+        return {
             'main_crop': recommendation.main_crop,
             'intercrop': recommendation.intercrop,
             'trees': recommendation.trees,
@@ -346,49 +543,207 @@ class LandLayoutMapper:
             'roi': recommendation.roi,
             'sustainability_tips': recommendation.sustainability_tips
         }
+    
+    def generate_layout_geojson(self, recommendation, center_lat: float, center_lon: float,
+                                area_acres: float, precision: int = DEFAULT_GEOJSON_PRECISION,
+                                boundary=None) -> Dict:
+        """
+        Generate the land layout as a GeoJSON FeatureCollection for client-side rendering.
         
-        # Generate map
-        map_filepath = self.generate_layout_from_recommendation(
-            recommendation, center_lat, center_lon, land_area_acres
-        )
+        Parameters:
+        recommendation: Recommendation object from AI engine
+        center_lat (float): Latitude of farm center
+        center_lon (float): Longitude of farm center
+        area_acres (float): Area of farm in acres
+        precision (int): Coordinate decimal places to keep, or None for full precision
+        boundary (Polygon or MultiPolygon): User-drawn farm boundary; defaults to a square of the area
         
-        # Store map data in Firebase if available
-        global FIREBASE_AVAILABLE, db, bucket
-        if FIREBASE_AVAILABLE and db is not None and bucket is not None:
-            try:
-                # Read the HTML content
-                with open(map_filepath, 'r', encoding='utf-8') as f:
-                    map_html = f.read()
-                
-                # Prepare map data for storage
-                map_data = {
-                    'center_lat': center_lat,
-                    'center_lon': center_lon,
-                    'land_area_acres': land_area_acres,
-                    'location': location,
-                    'recommendation': recommendation_dict,
-                    'created_at': datetime.now().isoformat()
+        Returns:
+        Dict: FeatureCollection with the farm boundary followed by the land use polygons
+        """
+        land_poly = self.farm_boundary(center_lat, center_lon, area_acres, boundary)
+        ratios = self.calculate_layout_ratios(recommendation)
+        land_use_gdf = self.create_land_use_polygons(land_poly, ratios)
+        # Shares of the farm measured in square metres, not square degrees
+        zone_acres = boundary_area_acres(list(land_use_gdf.geometry), farm=land_poly)
+        farm_acres = boundary_area_acres([land_poly])[0]
+        
+        features = [{
+            'type': 'Feature',
+            'geometry': land_poly.__geo_interface__,
+            'properties': {'land_use_type': 'Farm Boundary', 'area_acres': area_acres}
+        }]
+        for land_use_type, geometry, acres in zip(land_use_gdf['land_use_type'], land_use_gdf.geometry, zone_acres):
+            share = acres / farm_acres
+            features.append({
+                'type': 'Feature',
+                'geometry': geometry.__geo_interface__,
+                'properties': {
+                    'land_use_type': land_use_type,
+                    'color': land_use_color(land_use_type),
+                    'tooltip': land_use_tooltip(land_use_type, recommendation),
+                    'share': round(share, 4),
+                    'area_acres': round(area_acres * share, 4)
                 }
-                
-                # Get filename from filepath
-                filename = os.path.basename(map_filepath)
-                
-                # Upload HTML file to Firebase Storage
-                blob = bucket.blob(f'land-layout-maps/{filename}')
-                blob.upload_from_string(map_html, content_type='text/html')
-                blob.make_public()
-                
-                # Store metadata in Firestore
-                doc_ref = db.collection('land_layout_maps').document()
-                doc_ref.set({
-                    **map_data,
-                    'filename': filename,
-                    'map_url': blob.public_url,
-                    'created_at': firestore.SERVER_TIMESTAMP
-                })
-                
-                print(f"Map data stored in Firebase with ID: {doc_ref.id}")
-            except Exception as e:
-                print(f"Error storing map data in Firebase: {e}")
+            })
+        
+        if precision is not None:
+            for feature in features:
+                geometry = feature['geometry']
+                feature['geometry'] = {'type': geometry['type'],
+                                       'coordinates': round_coordinates(geometry['coordinates'], precision)}
+        return {'type': 'FeatureCollection', 'features': features}
+    
+    def generate_map(self, soil_data: SoilData, weather_data: WeatherData, economic_data: EconomicData,
+                     land_area_acres: float, center_lat: float, center_lon: float, location: str,
+                     user_id: str = None, boundary=None) -> RenderedMap:
+        """
+        Get a recommendation and its map, rendered into memory.
+        
+        Identical inputs give the same recommendation and map, so a cached map
+        is returned without running the engine or the renderer. The farm is
+        indexed either way, since the cache key does not name the user.
+        
+        Parameters:
+        soil_data (SoilData): Soil data
+        weather_data (WeatherData): Weather data
+        economic_data (EconomicData): Economic data
+        land_area_acres (float): Land area in acres
+        center_lat (float): Latitude of farm center
+        center_lon (float): Longitude of farm center
+        location (str): Location name
+        user_id (str): User the map is generated for, recorded in the map catalogue
+        boundary (Polygon or MultiPolygon): User-drawn farm boundary; defaults to a square of the area
+        
+        Returns:
+        RenderedMap: The map and its recommendation dictionary
+        """
+        inputs = {
+            'soil_data': soil_data, 'weather_data': weather_data, 'economic_data': economic_data,
+            'land_area_acres': land_area_acres, 'center_lat': center_lat, 'center_lon': center_lon,
+            'location': location, 'renderer_version': RENDERER_VERSION
+        }
+        if boundary is not None:
+            inputs['boundary'] = boundary.__geo_interface__
+        cache_key = map_cache_key(inputs)
+        rendered = self.cached_map(cache_key, location, user_id)
+        if rendered is None:
+            # Generate recommendation from AI engine
+            recommendation = self.engine.generate_recommendation(
+                soil_data, weather_data, economic_data, land_area_acres, location
+            )
+            rendered = self.render_layout(recommendation, center_lat, center_lon, land_area_acres, cache_key,
+                                          location, user_id, boundary)
+            
+            # Convert recommendation to dictionary for JSON serialization
+            rendered.recommendation = self.recommendation_to_dict(recommendation)
+        self.index_farm(rendered, center_lat, center_lon, land_area_acres, location, user_id, boundary,
+                        soil_data, weather_data)
+        return rendered
+    
+    def index_farm(self, rendered: RenderedMap, center_lat: float, center_lon: float, area_acres: float,
+                   location: str, user_id: str, boundary, soil_data: SoilData, weather_data: WeatherData) -> str:
+        """
+        Add a farm and its latest plan to the farm index, replacing the farm's earlier plan.
+        
+        A user's farm keeps its ID when its boundary is redrawn or its area
+        changes: the user's farms overlapping the new boundary are replaced by it.
+        The farm's land use zones are stored for the regional tiles, and the
+        cached tiles showing the farm, before and after, are invalidated if they changed.
+        
+        Parameters:
+        rendered (RenderedMap): The farm's map and recommendation, with its zones if it was just rendered
+        center_lat (float): Latitude of farm center
+        center_lon (float): Longitude of farm center
+        area_acres (float): Area of farm in acres
+        location (str): Location name
+        user_id (str): User the map is generated for
+        boundary (Polygon or MultiPolygon): User-drawn farm boundary; defaults to a square of the area
+        soil_data (SoilData): Soil data
+        weather_data (WeatherData): Weather data
+        
+        Returns:
+        str: The farm's ID; the ID of the user's overlapping farm, or else a hash of its boundary and user
+        """
+        land_poly = self.farm_boundary(center_lat, center_lon, area_acres, boundary)
+        replaced = self.farm_index.overlapping(land_poly, user_id) if user_id is not None else []
+        if replaced:
+            farm_id = replaced[0][0]
+        else:
+            identity = {'boundary': land_poly.__geo_interface__}
+            if user_id is not None:
+                identity['user_id'] = user_id
+            farm_id = map_cache_key(identity)
+        for other_id, _ in replaced[1:]:
+            self.farm_index.remove(other_id)
+        # Maps served from the cache were not rendered, so their zones are cut here
+        zones = rendered.zones
+        if zones is None:
+            zones = subdivide_farm(land_poly, self.calculate_layout_ratios(rendered.recommendation))
+        changed = self.farm_index.add(farm_id, land_poly, {
+            'land_area_acres': area_acres,
+            'location': location,
+            'user_id': user_id,
+            'map_url': f'/api/get-map/{rendered.filename}',
+            'soil_data': vars(soil_data),
+            'weather_data': vars(weather_data),
+            'recommendation': rendered.recommendation
+        }, zones)
+        if changed:
+            self.tiler.invalidate(land_poly.bounds)
+        for _, previous in replaced:
+            if not previous.equals(land_poly):
+                self.tiler.invalidate(previous.bounds)
+        return farm_id
+    
+    def neighbour_weather(self, center_lat: float, center_lon: float) -> Dict:
+        """
+        Weather recorded for the nearest indexed farm around a point.
+        
+        Parameters:
+        center_lat (float): Latitude of farm center
+        center_lon (float): Longitude of farm center
+        
+        Returns:
+        Dict: The neighbour's weather data, or None if no farm is within NEIGHBOUR_WEATHER_RADIUS_KM
+        """
+        neighbours = self.farm_index.within_km(center_lat, center_lon, NEIGHBOUR_WEATHER_RADIUS_KM, limit=1)
+        return neighbours[0]['weather_data'] if neighbours else None
+    
+    def get_real_time_recommendation_and_map(self, soil_data: SoilData, weather_data: WeatherData, 
+                                           economic_data: EconomicData, land_area_acres: float,
+                                           center_lat: float, center_lon: float, location: str,
+                                           user_id: str = None) -> Tuple[str, Dict]:
+        """
+        Get real-time recommendation from AI engine and generate corresponding map.
+        
+        Parameters:
+        soil_data (SoilData): Soil data
+        weather_data (WeatherData): Weather data
+        economic_data (EconomicData): Economic data
+        land_area_acres (float): Land area in acres
+        center_lat (float): Latitude of farm center
+        center_lon (float): Longitude of farm center
+        location (str): Location name
+        user_id (str): User the map is generated for, recorded in the map catalogue
+        
+        Returns:
+        Tuple[str, Dict]: (map_file_path, recommendation_dict)
+        """
+        rendered = self.generate_map(
+            soil_data, weather_data, economic_data, land_area_acres, center_lat, center_lon, location, user_id
+        )
+        recommendation_dict = rendered.recommendation
+        
+        # Upload newly generated maps to Firebase in the background, from the rendered buffer
+        self.queue_upload(rendered, {
+            'center_lat': center_lat,
+            'center_lon': center_lon,
+            'land_area_acres': land_area_acres,
+            'location': location,
+            'user_id': user_id,
+            'recommendation': recommendation_dict
+        })
         
-        return map_filepath, recommendation_dict
\ No newline at end of file
+        rendered.wait()
+        return rendered.path, recommendation_dict
@@ -0,0 +1,487 @@
+"""
+Content-addressed cache of generated land layout maps.
+
+Maps are stored under a hash of everything that determines them (the farm's
+location and area, its soil, weather and economic inputs, and the renderer
+version), so different farms never overwrite each other's maps and a repeated
+request is answered with the existing file. Each map has a JSON sidecar with
+the recommendation it shows. The directory is kept under a total size budget
+and a maximum age: expired maps are removed first, then the least recently
+used until the budget is met. Writes are checked against a running total of
+the cached bytes, so the directory is only scanned when the budget is exceeded
+or, to sweep expired maps, once per eviction interval.
+
+A rendered map is kept as one in-memory buffer: it is hashed, served and
+uploaded from that buffer while a background thread writes it to disk, and
+lookups see the buffer until the write has finished.
+
+Each map is written with gzip and, when the brotli package is installed,
+brotli variants next to it, and its sidecar records the SHA-256 of its bytes,
+so maps can be served compressed and revalidated without re-reading them.
+
+Every stored or reused map is also recorded in the directory's map catalogue,
+so the latest and nearby maps are found without listing the directory.
+"""
+
+import os
+import re
+import gzip
+import json
+import time
+import hashlib
+import tempfile
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field, is_dataclass
+from typing import Dict, Optional
+
+from map_visualization.map_catalogue import MapCatalogue
+
+# Initialize brotli availability flag
+BROTLI_AVAILABLE = False
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    pass
+
+# Default total size budget of the cached maps
+DEFAULT_MAP_CACHE_BYTES = 256 * 1024 * 1024
+
+# Default age after which a cached map is removed (30 days)
+DEFAULT_MAP_CACHE_MAX_AGE = 30 * 24 * 3600
+
+# Expired maps are swept from the directory at most this often
+DEFAULT_EVICTION_INTERVAL = 3600
+
+# Hex digits of the input hash used in file names
+KEY_LENGTH = 20
+
+# Decimals kept when normalizing floats, so equal inputs hash equally (coordinates: about 1 cm)
+KEY_FLOAT_DECIMALS = 7
+
+# SQLite file of the map catalogue, in the cache directory
+MAP_CATALOGUE_DB = "map_catalogue.sqlite3"
+
+# Compression levels of the precompressed variants (maps are compressed once, so use the best)
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+
+# File suffix of each content coding's variant, in order of preference
+ENCODING_SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+MAP_PREFIX = "sasyayojana_live_map_"
+MAP_FILE_PATTERN = re.compile(rf"^{MAP_PREFIX}([0-9a-f]{{{KEY_LENGTH}}})\.(html|json|html\.gz|html\.br)$")
+
+# Maps saved under other names before maps were cached by key, e.g. per location
+LEGACY_MAP_PATTERN = re.compile(rf"^{MAP_PREFIX}[A-Za-z0-9_-]+\.html$")
+
+def compressed_variants(content):
+    """
+    Precompressed variants of a map.
+
+    Parameters:
+    content (bytes): The map
+
+    Returns:
+    dict: Content coding ('gzip', and 'br' if brotli is installed) -> compressed bytes
+    """
+    # mtime=0 keeps the gzip output identical for identical maps
+    variants = {'gzip': gzip.compress(content, compresslevel=GZIP_LEVEL, mtime=0)}
+    if BROTLI_AVAILABLE:
+        variants['br'] = brotli.compress(content, quality=BROTLI_QUALITY)
+    return variants
+
+def content_etag(content):
+    """SHA-256 of a map's bytes, used as its entity tag."""
+    return hashlib.sha256(content).hexdigest()
+
+def normalize_inputs(value):
+    """
+    Canonical JSON-ready form of map inputs.
+
+    Dataclasses become dicts, numbers become rounded floats and strings are
+    stripped, so inputs differing only in representation hash the same.
+
+    Parameters:
+    value: Inputs (dicts, lists, dataclasses, numbers, strings)
+
+    Returns:
+    Normalized inputs
+    """
+    if is_dataclass(value) and not isinstance(value, type):
+        value = asdict(value)
+    if isinstance(value, dict):
+        return {str(key): normalize_inputs(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [normalize_inputs(item) for item in value]
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, (int, float)):
+        return round(float(value), KEY_FLOAT_DECIMALS)
+    return str(value).strip()
+
+def map_cache_key(inputs):
+    """
+    Hash identifying a map by its inputs.
+
+    Parameters:
+    inputs (dict): Everything the map depends on
+
+    Returns:
+    str: Hex key
+    """
+    canonical = json.dumps(normalize_inputs(inputs), sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:KEY_LENGTH]
+
+@dataclass
+class RenderedMap:
+    """
+    A generated map held in memory, with where it is (or will be) persisted.
+    """
+    key: str
+    path: str
+    content: bytes
+    recommendation: Dict
+    created: bool = False
+    persisted: Optional[Future] = None
+    zones: Optional[list] = field(default=None, repr=False)
+    _etag: Optional[str] = field(default=None, repr=False)
+
+    @property
+    def filename(self) -> str:
+        """File name of the map."""
+        return os.path.basename(self.path)
+
+    @property
+    def html(self) -> str:
+        """The map's HTML text."""
+        return self.content.decode('utf-8')
+
+    @property
+    def etag(self) -> str:
+        """SHA-256 of the map's bytes."""
+        if self._etag is None:
+            self._etag = content_etag(self.content)
+        return self._etag
+
+    def wait(self):
+        """Block until the map is on disk."""
+        if self.persisted is not None:
+            self.persisted.result()
+
+class MapCache:
+    """
+    Directory of generated maps keyed by their inputs' hash.
+    """
+
+    def __init__(self, directory, max_bytes=DEFAULT_MAP_CACHE_BYTES, max_age_seconds=DEFAULT_MAP_CACHE_MAX_AGE,
+                 data_directory=None, eviction_interval=DEFAULT_EVICTION_INTERVAL):
+        """
+        Parameters:
+        directory (str): Directory of the maps
+        max_bytes (int): Size budget of the maps
+        max_age_seconds (float): Age after which maps are removed
+        data_directory (str): Directory of the map catalogue database, kept out of
+            the served maps directory (default `directory`)
+        eviction_interval (float): Seconds between sweeps for expired maps
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.eviction_interval = eviction_interval
+        os.makedirs(directory, exist_ok=True)
+        # Bytes of the cached maps as of the last scan plus those written since; None until the first scan
+        self._bytes = None
+        self._last_eviction = 0.0
+        # Maps handed to the writer thread and not yet on disk: key -> (content, metadata)
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._writer = None
+        # Index of the maps for latest and nearby lookups; maps from before it existed are indexed once
+        data_directory = data_directory or directory
+        os.makedirs(data_directory, exist_ok=True)
+        self.catalogue = MapCatalogue(os.path.join(data_directory, MAP_CATALOGUE_DB))
+        if self.catalogue.count() == 0:
+            self.catalogue.rebuild(self)
+
+    def map_path(self, key):
+        """Path of the map HTML for a key."""
+        return os.path.join(self.directory, f"{MAP_PREFIX}{key}.html")
+
+    def metadata_path(self, key):
+        """Path of the map's JSON sidecar for a key."""
+        return os.path.join(self.directory, f"{MAP_PREFIX}{key}.json")
+
+    def variant_path(self, key, encoding):
+        """Path of the map's precompressed variant for a content coding ('gzip' or 'br')."""
+        return self.map_path(key) + ENCODING_SUFFIXES[encoding]
+
+    def get(self, key):
+        """
+        Look up a cached map, marking it as recently used.
+
+        Parameters:
+        key (str): Map key
+
+        Returns:
+        tuple: (map path, metadata dict), or None if not cached or expired
+        """
+        path = self.map_path(key)
+        with self._lock:
+            pending = self._pending.get(key)
+        if pending is not None:
+            return path, pending[1]
+        try:
+            if time.time() - os.path.getmtime(path) > self.max_age_seconds:
+                return None
+            with open(self.metadata_path(key), 'r', encoding='utf-8') as f:
+                metadata = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return path, metadata
+
+    def read(self, key):
+        """
+        Bytes of a cached map, from memory while its write is pending.
+
+        Parameters:
+        key (str): Map key
+
+        Returns:
+        bytes: The map, or None if not cached
+        """
+        with self._lock:
+            pending = self._pending.get(key)
+        if pending is not None:
+            return pending[0]
+        try:
+            with open(self.map_path(key), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def etag(self, key):
+        """
+        Entity tag of a cached map: the SHA-256 of its bytes.
+
+        Parameters:
+        key (str): Map key
+
+        Returns:
+        str: The tag, or None if not cached
+        """
+        with self._lock:
+            pending = self._pending.get(key)
+        if pending is not None:
+            return content_etag(pending[0])
+        try:
+            with open(self.metadata_path(key), 'r', encoding='utf-8') as f:
+                etag = json.load(f).get('etag')
+        except (OSError, ValueError):
+            etag = None
+        if etag is None:
+            # Maps stored before tags were recorded are hashed on demand
+            content = self.read(key)
+            return content_etag(content) if content is not None else None
+        return etag
+
+    def _write(self, path, data):
+        """Write a file atomically, so readers never see a partial map."""
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".tmp_")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def _paths(self, key):
+        """Paths of a map, its sidecar and its compressed variants."""
+        return [self.map_path(key), self.metadata_path(key)] + [
+            self.variant_path(key, encoding) for encoding in ENCODING_SUFFIXES
+        ]
+
+    def _size(self, key):
+        """Bytes on disk of a map with its sidecar and variants."""
+        size = 0
+        for path in self._paths(key):
+            try:
+                size += os.path.getsize(path)
+            except OSError:
+                pass
+        return size
+
+    def _store(self, key, map_html, metadata):
+        """Write a map, its compressed variants and its metadata, then evict if over the budget."""
+        if isinstance(map_html, str):
+            map_html = map_html.encode('utf-8')
+        replaced = self._size(key)
+        sidecar = json.dumps({**metadata, 'etag': content_etag(map_html)}).encode('utf-8')
+        variants = compressed_variants(map_html)
+        self._write(self.metadata_path(key), sidecar)
+        for encoding, data in variants.items():
+            self._write(self.variant_path(key, encoding), data)
+        # The map itself is written last: once it exists, so do its variants
+        self._write(self.map_path(key), map_html)
+        written = len(map_html) + len(sidecar) + sum(len(data) for data in variants.values())
+        with self._lock:
+            if self._bytes is not None:
+                self._bytes += written - replaced
+            due = (self._bytes is None or self._bytes > self.max_bytes
+                   or time.time() - self._last_eviction >= self.eviction_interval)
+        if due:
+            self.evict(keep=key)
+        return self.map_path(key)
+
+    def record(self, key, size, metadata):
+        """
+        Record a stored or reused map in the catalogue.
+
+        Parameters:
+        key (str): Map key
+        size (int): Bytes of the map
+        metadata (dict): Data about the map; its location and user are indexed
+        """
+        self.catalogue.record(key, os.path.basename(self.map_path(key)), size, metadata)
+
+    def put(self, key, map_html, metadata):
+        """
+        Store a map and its metadata, then evict to stay within the budget.
+
+        Parameters:
+        key (str): Map key
+        map_html (str or bytes): HTML of the map
+        metadata (dict): JSON-serializable data about the map
+
+        Returns:
+        str: Path of the stored map
+        """
+        path = self._store(key, map_html, metadata)
+        self.record(key, os.path.getsize(path), metadata)
+        return path
+
+    def _persist(self, key, content, metadata):
+        """Writer thread: store a pending map, then release its buffer."""
+        try:
+            return self._store(key, content, metadata)
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+
+    def put_async(self, key, content, metadata):
+        """
+        Store a map and its metadata on a background thread.
+
+        Until the write finishes, get() and read() answer from the buffer.
+
+        Parameters:
+        key (str): Map key
+        content (bytes): The map
+        metadata (dict): JSON-serializable data about the map
+
+        Returns:
+        Future: Resolves to the stored map's path
+        """
+        with self._lock:
+            self._pending[key] = (content, metadata)
+            if self._writer is None:
+                self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="map-writer")
+        # Catalogued straight away: the map is served from the buffer until it is on disk
+        self.record(key, len(content), metadata)
+        return self._writer.submit(self._persist, key, content, metadata)
+
+    def flush(self):
+        """Wait for all pending writes."""
+        with self._lock:
+            writer = self._writer
+        if writer is not None:
+            writer.submit(lambda: None).result()
+
+    def entries(self):
+        """
+        Cached maps with their total size and last use.
+
+        Returns:
+        dict: key -> {'bytes', 'last_used'}
+        """
+        entries = {}
+        with os.scandir(self.directory) as scan:
+            for entry in scan:
+                match = MAP_FILE_PATTERN.match(entry.name)
+                if not match:
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                item = entries.setdefault(match.group(1), {'bytes': 0, 'last_used': 0.0})
+                item['bytes'] += stat.st_size
+                if match.group(2) == 'html':
+                    item['last_used'] = stat.st_mtime
+        return entries
+
+    def remove(self, key):
+        """Remove a cached map, its variants, its metadata and its catalogue record."""
+        self.catalogue.remove(key)
+        removed = 0
+        for path in self._paths(key):
+            try:
+                size = os.path.getsize(path)
+                os.remove(path)
+                removed += size
+            except FileNotFoundError:
+                pass
+        with self._lock:
+            if self._bytes is not None:
+                self._bytes -= removed
+
+    def evict(self, keep=None):
+        """
+        Remove expired maps, then the least recently used until within the size budget.
+
+        Scans the directory, and resets the running total of cached bytes.
+
+        Parameters:
+        keep (str): Key that is never evicted, such as the map just stored
+
+        Returns:
+        list: Evicted keys
+        """
+        entries = self.entries()
+        now = time.time()
+        evicted = [key for key, item in entries.items()
+                   if key != keep and now - item['last_used'] > self.max_age_seconds]
+        total = sum(item['bytes'] for key, item in entries.items() if key not in evicted)
+        for key in sorted(entries, key=lambda key: entries[key]['last_used']):
+            if total <= self.max_bytes:
+                break
+            if key != keep and key not in evicted:
+                evicted.append(key)
+                total -= entries[key]['bytes']
+        for key in evicted:
+            self.remove(key)
+        with self._lock:
+            self._bytes = total
+            self._last_eviction = now
+        return evicted
+
+    def stats(self):
+        """
+        Size of the cache.
+
+        Returns:
+        dict: Number of maps, their total bytes and the budget
+        """
+        entries = self.entries()
+        return {
+            'maps': len(entries),
+            'bytes': sum(item['bytes'] for item in entries.values()),
+            'max_bytes': self.max_bytes,
+            'max_age_seconds': self.max_age_seconds
+        }
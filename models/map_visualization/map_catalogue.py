@@ -0,0 +1,200 @@
+"""
+Indexed catalogue of generated land layout maps.
+
+Each generated map has one row in a SQLite table with its key, location,
+size and when it was first and last used, indexed by time and by position;
+reusing a map updates its row. The users a map was made or reused for are
+kept in a second table, indexed by user and time. The "latest map", "latest
+map for a user" and "maps near a point" queries are answered from those
+indexes instead of listing and stat-ing the maps directory.
+"""
+
+import os
+import json
+import math
+import time
+import sqlite3
+
+# Kilometres per degree of latitude
+KM_PER_DEGREE = 111.32
+
+# Default radius and number of results of a nearby maps query
+DEFAULT_NEAR_RADIUS_KM = 1.0
+DEFAULT_NEAR_LIMIT = 20
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS maps (
+    map_key TEXT PRIMARY KEY,
+    filename TEXT NOT NULL,
+    user_id TEXT,
+    location TEXT,
+    center_lat REAL,
+    center_lon REAL,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL,
+    uses INTEGER NOT NULL DEFAULT 1,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS maps_by_last_used ON maps (last_used);
+CREATE INDEX IF NOT EXISTS maps_by_position ON maps (center_lat, center_lon);
+CREATE TABLE IF NOT EXISTS map_users (
+    map_key TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (map_key, user_id)
+);
+CREATE INDEX IF NOT EXISTS map_users_by_user ON map_users (user_id, last_used);
+"""
+
+COLUMNS = ('map_key', 'filename', 'user_id', 'location', 'center_lat', 'center_lon',
+           'created_at', 'last_used', 'uses', 'size')
+
+def distance_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance between two points in kilometres."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((phi2 - phi1) / 2) ** 2
+         + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+    return 2 * 6371.0 * math.asin(math.sqrt(min(1.0, a)))
+
+class MapCatalogue:
+    """
+    SQLite index of generated maps.
+    """
+
+    def __init__(self, db_path):
+        """
+        Parameters:
+        db_path (str): SQLite database file
+        """
+        self.db_path = db_path
+        with self._connect() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(SCHEMA)
+
+    def _connect(self):
+        """A connection for the calling thread."""
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def record(self, key, filename, size, metadata, created_at=None):
+        """
+        Record that a map was generated or reused.
+
+        A new map gets a row; a known one has its last use and use count
+        updated. The user is added to the map's users.
+
+        Parameters:
+        key (str): Map key (hash of the map's inputs)
+        filename (str): File name of the map
+        size (int): Bytes of the map
+        metadata (dict): Map metadata; center_lat, center_lon, location and user_id are indexed
+        created_at (float): Unix time of the use (default now)
+        """
+        used_at = time.time() if created_at is None else created_at
+        user_id = metadata.get('user_id')
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT INTO maps (map_key, filename, user_id, location, center_lat, center_lon, "
+                "created_at, last_used, size) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (map_key) DO UPDATE SET filename = excluded.filename, size = excluded.size, "
+                "last_used = MAX(last_used, excluded.last_used), uses = uses + 1",
+                (key, filename, user_id, metadata.get('location'),
+                 metadata.get('center_lat'), metadata.get('center_lon'), used_at, used_at, size)
+            )
+            if user_id is not None:
+                connection.execute(
+                    "INSERT INTO map_users (map_key, user_id, last_used) VALUES (?, ?, ?) "
+                    "ON CONFLICT (map_key, user_id) DO UPDATE SET last_used = MAX(last_used, excluded.last_used)",
+                    (key, user_id, used_at)
+                )
+
+    def remove(self, key):
+        """Forget a map and its users, e.g. once it is evicted."""
+        with self._connect() as connection:
+            connection.execute("DELETE FROM maps WHERE map_key = ?", (key,))
+            connection.execute("DELETE FROM map_users WHERE map_key = ?", (key,))
+
+    def count(self):
+        """Number of maps."""
+        with self._connect() as connection:
+            return connection.execute("SELECT COUNT(*) FROM maps").fetchone()[0]
+
+    def latest(self, user_id=None):
+        """
+        Most recently generated or reused map.
+
+        Parameters:
+        user_id (str): Only consider the maps made or reused for this user
+
+        Returns:
+        dict: The record, or None if there is none
+        """
+        with self._connect() as connection:
+            if user_id is None:
+                row = connection.execute(
+                    f"SELECT {', '.join(COLUMNS)} FROM maps ORDER BY last_used DESC LIMIT 1"
+                ).fetchone()
+            else:
+                row = connection.execute(
+                    f"SELECT {', '.join('maps.' + column for column in COLUMNS)} FROM map_users "
+                    "JOIN maps ON maps.map_key = map_users.map_key "
+                    "WHERE map_users.user_id = ? ORDER BY map_users.last_used DESC LIMIT 1", (user_id,)
+                ).fetchone()
+        return dict(zip(COLUMNS, row)) if row else None
+
+    def near(self, lat, lon, radius_km=DEFAULT_NEAR_RADIUS_KM, limit=DEFAULT_NEAR_LIMIT):
+        """
+        Maps centred within a distance of a point, nearest first.
+
+        Candidates come from the position index by bounding box and are then
+        filtered by great-circle distance.
+
+        Parameters:
+        lat, lon (float): The point
+        radius_km (float): Search radius in kilometres
+        limit (int): Most maps returned
+
+        Returns:
+        list: Records with an added 'distance_km'
+        """
+        lat_delta = radius_km / KM_PER_DEGREE
+        lon_delta = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(lat)), 1e-6))
+        with self._connect() as connection:
+            rows = connection.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM maps "
+                "WHERE center_lat BETWEEN ? AND ? AND center_lon BETWEEN ? AND ?",
+                (lat - lat_delta, lat + lat_delta, lon - lon_delta, lon + lon_delta)
+            ).fetchall()
+        matches = []
+        for row in rows:
+            record = dict(zip(COLUMNS, row))
+            record['distance_km'] = distance_km(lat, lon, record['center_lat'], record['center_lon'])
+            if record['distance_km'] <= radius_km:
+                matches.append(record)
+        matches.sort(key=lambda record: record['distance_km'])
+        return matches[:limit]
+
+    def rebuild(self, map_cache):
+        """
+        Record the maps already in a cache directory from their JSON sidecars.
+
+        Used once, to index maps generated before the catalogue existed.
+
+        Parameters:
+        map_cache (MapCache): Cache whose maps to record
+
+        Returns:
+        int: Number of maps recorded
+        """
+        recorded = 0
+        entries = map_cache.entries()
+        for key in sorted(entries, key=lambda key: entries[key]['last_used']):
+            path = map_cache.map_path(key)
+            try:
+                with open(map_cache.metadata_path(key), 'r', encoding='utf-8') as f:
+                    metadata = json.load(f)
+                size = os.path.getsize(path)
+            except (OSError, ValueError):
+                continue
+            self.record(key, os.path.basename(path), size, metadata, created_at=entries[key]['last_used'])
+            recorded += 1
+        return recorded
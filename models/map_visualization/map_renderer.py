@@ -0,0 +1,204 @@
+"""
+Template-based rendering of land layout maps for Sasya-Mitra.
+
+Building a folium Map object graph (tile layers, one GeoJson element per
+polygon, legend and title elements) and serializing it costs far more than the
+map data it carries. The template renderer instead fills a fixed HTML/JS page,
+split once into literal chunks and slots, with only the per-farm data: the
+GeoJSON, colours and tooltip of each land use polygon and the legend's area
+percentages. The page draws the same layers, tooltips, layer control and
+legend as the folium map.
+"""
+
+import os
+import re
+import sys
+import html
+import json
+import time
+import argparse
+from types import SimpleNamespace
+
+# Fill colour of each land use type on the map
+LAND_USE_COLORS = {
+    'Main Crop': 'green',
+    'Intercrop': 'yellow',
+    'Trees': 'darkgreen'
+}
+DEFAULT_LAND_USE_COLOR = 'blue'
+
+# Version of the rendered page; part of the map cache key, so bump it when the template or layout changes
+RENDERER_VERSION = 2
+
+# Page title and initial zoom of the map
+MAP_TITLE = "AI-Generated Land Use Layout"
+MAP_ZOOM = 16
+
+# HTML/JS page the per-farm data is filled into
+TEMPLATE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates", "land_layout_map.html")
+
+# Slot markers in the template, e.g. {{ layout }}
+SLOT_PATTERN = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+
+def land_use_color(land_use_type):
+    """Map fill colour of a land use type."""
+    return LAND_USE_COLORS.get(land_use_type, DEFAULT_LAND_USE_COLOR)
+
+def land_use_tooltip(land_use_type, recommendation):
+    """
+    Tooltip text of a land use polygon.
+
+    Parameters:
+    land_use_type (str): Land use type, e.g. 'Main Crop'
+    recommendation: Recommendation object from AI engine
+
+    Returns:
+    str: "<type>: <recommended crops>"
+    """
+    return f"{land_use_type}: {getattr(recommendation, land_use_type.lower().replace(' ', '_'), 'N/A')}"
+
+def script_json(value):
+    """Serialize a value as JSON that is safe inside a <script> element."""
+    return json.dumps(value, separators=(',', ':')).replace("</", "<\\/")
+
+class MapTemplate:
+    """
+    HTML template split once into literal chunks and named slots.
+    """
+
+    def __init__(self, text):
+        parts = SLOT_PATTERN.split(text)
+        # split() alternates literal text and slot names
+        self.chunks = parts[0::2]
+        self.slots = parts[1::2]
+
+    @classmethod
+    def from_file(cls, path=TEMPLATE_PATH):
+        """Load and compile a template file."""
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(f.read())
+
+    def render(self, **values):
+        """
+        Fill the slots.
+
+        Parameters:
+        **values (str): Text for each slot name
+
+        Returns:
+        str: The filled template
+        """
+        out = [self.chunks[0]]
+        for slot, chunk in zip(self.slots, self.chunks[1:]):
+            out.append(values[slot])
+            out.append(chunk)
+        return ''.join(out)
+
+class TemplateMapRenderer:
+    """
+    Renders land layout maps by filling a precompiled HTML/JS template.
+    """
+
+    def __init__(self, template_path=TEMPLATE_PATH):
+        self.template = MapTemplate.from_file(template_path)
+
+    def layout_data(self, land_use_gdf, center_lat, center_lon, recommendation):
+        """
+        Per-farm data the template draws.
+
+        Parameters:
+        land_use_gdf (gpd.GeoDataFrame): GeoDataFrame with land use polygons
+        center_lat (float): Latitude of farm center
+        center_lon (float): Longitude of farm center
+        recommendation: Recommendation object from AI engine
+
+        Returns:
+        dict: center, zoom, layers (name, color, tooltip, geojson, share of the area)
+        """
+        geometries = list(land_use_gdf.geometry)
+        total_area = sum(geometry.area for geometry in geometries) or 1.0
+        layers = []
+        for land_use_type, geometry in zip(land_use_gdf['land_use_type'], geometries):
+            layers.append({
+                'name': land_use_type,
+                'color': land_use_color(land_use_type),
+                'tooltip': html.escape(land_use_tooltip(land_use_type, recommendation)),
+                'geojson': geometry.__geo_interface__,
+                'share': geometry.area / total_area
+            })
+        return {'center': [center_lat, center_lon], 'zoom': MAP_ZOOM, 'layers': layers}
+
+    def legend_html(self, layers):
+        """Legend rows with each land use's colour and share of the farm."""
+        return "<br>\n".join(
+            f'        <i class="fa fa-square" style="color:{layer["color"]}"></i> '
+            f'{html.escape(layer["name"])} ({layer["share"]:.0%})'
+            for layer in layers
+        )
+
+    def render(self, land_use_gdf, center_lat, center_lon, recommendation):
+        """
+        Render the land layout map page.
+
+        Parameters:
+        land_use_gdf (gpd.GeoDataFrame): GeoDataFrame with land use polygons
+        center_lat (float): Latitude of farm center
+        center_lon (float): Longitude of farm center
+        recommendation: Recommendation object from AI engine
+
+        Returns:
+        str: HTML of the map
+        """
+        layout = self.layout_data(land_use_gdf, center_lat, center_lon, recommendation)
+        return self.template.render(
+            title=MAP_TITLE,
+            legend=self.legend_html(layout['layers']),
+            layout=script_json(layout)
+        )
+
+def benchmark_renderers(mapper, repeats=20, center_lat=12.971, center_lon=77.592, area_acres=5.0):
+    """
+    Time rendering one land layout map with folium and with the template.
+
+    Parameters:
+    mapper (LandLayoutMapper): Mapper providing the layout and both renderers
+    repeats (int): Renders timed per renderer
+    center_lat, center_lon (float): Farm center
+    area_acres (float): Farm area
+
+    Returns:
+    dict: Mean milliseconds per map for each renderer, the speedup and the page sizes
+    """
+    recommendation = SimpleNamespace(main_crop='Maize', intercrop='Cowpea', trees=['Mango', 'Gliricidia'])
+    land_poly = mapper.generate_land_polygon(center_lat, center_lon, area_acres)
+    land_use_gdf = mapper.create_land_use_polygons(land_poly, mapper.calculate_layout_ratios(recommendation))
+
+    def folium_render():
+        return mapper.generate_interactive_map(land_use_gdf, center_lat, center_lon, recommendation).get_root().render()
+
+    def template_render():
+        return mapper.render_map_html(land_use_gdf, center_lat, center_lon, recommendation)
+
+    results = {}
+    for name, render in (('folium', folium_render), ('template', template_render)):
+        page = render()
+        start = time.perf_counter()
+        for _ in range(repeats):
+            render()
+        results[f'{name}_ms'] = (time.perf_counter() - start) * 1000 / repeats
+        results[f'{name}_bytes'] = len(page.encode('utf-8'))
+    results['speedup'] = results['folium_ms'] / results['template_ms']
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the folium and template land layout map renderers")
+    parser.add_argument("--repeats", type=int, default=20, help="Renders timed per renderer")
+    args = parser.parse_args()
+
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from map_visualization.land_layout_mapper import LandLayoutMapper
+
+    results = benchmark_renderers(LandLayoutMapper(), args.repeats)
+    print(f"folium:   {results['folium_ms']:.2f} ms/map, {results['folium_bytes']} bytes")
+    print(f"template: {results['template_ms']:.3f} ms/map, {results['template_bytes']} bytes")
+    print(f"speedup:  {results['speedup']:.0f}x")
@@ -0,0 +1,252 @@
+"""
+Regional tiles of farm layouts for overview maps.
+
+Farms' land use zones are cut into the web mercator quadtree (z/x/y, as used
+by Leaflet and other slippy maps) as GeoJSON tiles. Each zoom level simplifies
+the zones to half a pixel and snaps them to a grid finer than a pixel, and
+below DETAIL_ZOOM the zones of each land use type are merged across farms, so
+a district-wide tile stays small. Tiles are built on first request and cached
+on disk; when a farm's layout changes only the tiles covering it are removed.
+"""
+
+import os
+import json
+import math
+import tempfile
+import threading
+
+import numpy as np
+import shapely
+
+from map_visualization.map_cache import BROTLI_AVAILABLE, ENCODING_SUFFIXES, compressed_variants
+from map_visualization.map_renderer import land_use_color
+from map_visualization.land_subdivision import LAND_USE_ZONES
+
+# Bump when tile contents change, so tiles cached by an older tiler are not served
+TILER_VERSION = 1
+
+# Zoom levels served: 0 is the whole world, 20 about 15 cm per pixel
+MIN_TILE_ZOOM = 0
+MAX_TILE_ZOOM = 20
+
+# Below this zoom each land use type is merged across farms instead of listed per farm
+DETAIL_ZOOM = 14
+
+# Pixels across a tile
+TILE_SIZE = 256
+
+# Simplification tolerance, in pixels of the tile's zoom
+SIMPLIFY_PIXELS = 0.5
+
+# Zones are kept this many pixels beyond a tile's edges, so neighbouring tiles join seamlessly
+TILE_BUFFER_PIXELS = 4
+
+# Coordinates are snapped to a grid at least this many times finer than a pixel
+GRID_STEPS_PER_PIXEL = 16
+
+# Web mercator covers latitudes up to this
+MAX_LATITUDE = 85.0511287798
+
+# Precompressed variants written with each tile
+TILE_ENCODINGS = [encoding for encoding in ENCODING_SUFFIXES if encoding != 'br' or BROTLI_AVAILABLE]
+
+def tile_bounds(z, x, y):
+    """
+    Longitude/latitude bounds of a tile.
+
+    Parameters:
+    z, x, y (int): Zoom, column and row (row 0 is the north)
+
+    Returns:
+    tuple: (min_lon, min_lat, max_lon, max_lat)
+    """
+    n = 2 ** z
+    def latitude(row):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * row / n))))
+    return x / n * 360 - 180, latitude(y + 1), (x + 1) / n * 360 - 180, latitude(y)
+
+def tile_containing(lon, lat, z):
+    """
+    The tile of a zoom level containing a point.
+
+    Parameters:
+    lon, lat (float): The point
+    z (int): Zoom level
+
+    Returns:
+    tuple: (x, y)
+    """
+    n = 2 ** z
+    lat = math.radians(min(max(lat, -MAX_LATITUDE), MAX_LATITUDE))
+    x = int((lon + 180) / 360 * n)
+    y = int((1 - math.asinh(math.tan(lat)) / math.pi) / 2 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+def pixel_degrees(z):
+    """Degrees of longitude across a pixel at a zoom level."""
+    return 360 / (2 ** z * TILE_SIZE)
+
+def quantize(geometries, digits):
+    """Snap geometries to a grid of `digits` decimal places, dropping parts that collapse."""
+    grid = 10.0 ** -digits
+    snapped = shapely.set_precision(geometries, grid)
+    coords = shapely.get_coordinates(snapped)
+    # Rounding on the same grid only trims float noise from the JSON
+    return shapely.set_coordinates(snapped, np.round(coords, digits))
+
+class MapTiler:
+    """
+    Builds, caches and invalidates GeoJSON tiles of the farms in a FarmIndex.
+    """
+
+    def __init__(self, farm_index, directory):
+        """
+        Parameters:
+        farm_index (FarmIndex): Farms and their land use zones
+        directory (str): Tile cache directory; tiles go under a subdirectory per TILER_VERSION
+        """
+        self.farm_index = farm_index
+        self.directory = os.path.join(directory, f"v{TILER_VERSION}")
+        os.makedirs(self.directory, exist_ok=True)
+        # Tiles built while an invalidation ran may be stale, so they are returned but not cached
+        self._lock = threading.Lock()
+        self._invalidations = 0
+
+    def tile_path(self, z, x, y, encoding=None):
+        """Path of a cached tile, or of its precompressed variant."""
+        suffix = ENCODING_SUFFIXES[encoding] if encoding else ''
+        return os.path.join(self.directory, str(z), str(x), f"{y}.geojson{suffix}")
+
+    def _write(self, path, data):
+        """Write a file atomically, so readers never see a partial tile."""
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp_")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def build(self, z, x, y):
+        """
+        Cut a tile from the farm index.
+
+        Parameters:
+        z, x, y (int): Zoom, column and row
+
+        Returns:
+        dict: GeoJSON FeatureCollection of the tile's land use zones
+        """
+        min_lon, min_lat, max_lon, max_lat = tile_bounds(z, x, y)
+        margin = TILE_BUFFER_PIXELS * pixel_degrees(z)
+        farm_ids, farms, zones = self.farm_index.zones_in_bbox(
+            min_lon - margin, min_lat - margin, max_lon + margin, max_lat + margin
+        )
+        if not farm_ids:
+            return {'type': 'FeatureCollection', 'features': []}
+
+        # A pixel spans fewer degrees of latitude than of longitude, so its height sets the scale
+        pixel = pixel_degrees(z) * math.cos(math.radians((min_lat + max_lat) / 2))
+        digits = math.ceil(-math.log10(pixel / GRID_STEPS_PER_PIXEL))
+        zones = shapely.clip_by_rect(zones, min_lon - margin, min_lat - margin, max_lon + margin, max_lat + margin)
+        zones = shapely.simplify(zones, SIMPLIFY_PIXELS * pixel, preserve_topology=True)
+        # Snapping also removes the slivers left for zones with no share
+        zones = quantize(zones, digits)
+
+        features = []
+        if z < DETAIL_ZOOM:
+            # Overview: one feature per land use type, with the number of farms it covers
+            for i, (land_use_type, _) in enumerate(LAND_USE_ZONES):
+                present = shapely.area(zones[:, i]) > 0
+                if not present.any():
+                    continue
+                merged = quantize(shapely.union_all(zones[present, i], grid_size=10.0 ** -digits), digits)
+                if merged.area == 0:
+                    continue
+                features.append({
+                    'type': 'Feature', 'geometry': merged.__geo_interface__,
+                    'properties': {'land_use_type': land_use_type, 'color': land_use_color(land_use_type),
+                                   'farms': int(present.sum())}
+                })
+        else:
+            for farm_id, farm, farm_zones in zip(farm_ids, farms, zones):
+                recommendation = farm.get('recommendation') or {}
+                for (land_use_type, _), zone in zip(LAND_USE_ZONES, farm_zones):
+                    if zone.area == 0:
+                        continue
+                    features.append({
+                        'type': 'Feature', 'geometry': zone.__geo_interface__,
+                        'properties': {
+                            'farm_id': farm_id, 'land_use_type': land_use_type,
+                            'color': land_use_color(land_use_type),
+                            'crops': recommendation.get(land_use_type.lower().replace(' ', '_')),
+                            'map_url': farm.get('map_url')
+                        }
+                    })
+        return {'type': 'FeatureCollection', 'features': features}
+
+    def tile(self, z, x, y, encoding=None):
+        """
+        A tile's GeoJSON, from the cache or built and cached.
+
+        Parameters:
+        z, x, y (int): Zoom, column and row
+        encoding (str): One of TILE_ENCODINGS for a precompressed tile, or None
+
+        Returns:
+        bytes: The tile, compressed with `encoding` if given
+        """
+        if not MIN_TILE_ZOOM <= z <= MAX_TILE_ZOOM or not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+            raise ValueError(f"No tile {z}/{x}/{y}; zoom must be {MIN_TILE_ZOOM}-{MAX_TILE_ZOOM}")
+        try:
+            with open(self.tile_path(z, x, y, encoding), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            pass
+
+        with self._lock:
+            invalidations = self._invalidations
+        content = json.dumps(self.build(z, x, y), separators=(',', ':')).encode('utf-8')
+        variants = compressed_variants(content)
+        with self._lock:
+            if invalidations == self._invalidations:
+                for variant_encoding, data in variants.items():
+                    self._write(self.tile_path(z, x, y, variant_encoding), data)
+                # The tile itself is written last: once it exists, so do its variants
+                self._write(self.tile_path(z, x, y), content)
+        return variants[encoding] if encoding else content
+
+    def invalidate(self, bounds):
+        """
+        Remove the cached tiles at every zoom level that show an area.
+
+        Parameters:
+        bounds (tuple): (min_lon, min_lat, max_lon, max_lat) of the changed farm
+
+        Returns:
+        int: Number of tiles removed
+        """
+        min_lon, min_lat, max_lon, max_lat = bounds
+        removed = 0
+        with self._lock:
+            self._invalidations += 1
+            for z in range(MIN_TILE_ZOOM, MAX_TILE_ZOOM + 1):
+                # Tiles include zones just beyond their edges
+                margin = TILE_BUFFER_PIXELS * pixel_degrees(z)
+                min_x, max_y = tile_containing(min_lon - margin, min_lat - margin, z)
+                max_x, min_y = tile_containing(max_lon + margin, max_lat + margin, z)
+                for x in range(min_x, max_x + 1):
+                    for y in range(min_y, max_y + 1):
+                        path = self.tile_path(z, x, y)
+                        if os.path.exists(path):
+                            removed += 1
+                        for encoding in [None, *ENCODING_SUFFIXES]:
+                            try:
+                                os.remove(self.tile_path(z, x, y, encoding))
+                            except FileNotFoundError:
+                                pass
+        return removed
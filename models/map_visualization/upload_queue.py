@@ -0,0 +1,289 @@
+"""
+Durable write-behind queue for map uploads to Firebase.
+
+Request handlers only record a generated map in a local SQLite database and
+return; a background worker uploads the map files to Firebase Storage and
+writes their Firestore documents. Map files are stored once per content hash,
+so a map that was already queued or uploaded is never uploaded again, and
+pending documents are written together in batches. Failed uploads and writes
+are retried with exponential backoff, and the queue survives restarts.
+"""
+
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+# Retries of a failed upload or document write: delay doubles from the base up to the cap
+BASE_BACKOFF_SECONDS = 2.0
+MAX_BACKOFF_SECONDS = 600.0
+
+# Attempts after which an upload or document is left as failed
+MAX_ATTEMPTS = 10
+
+# Most documents written in one Firestore batch (Firestore allows 500)
+DOCUMENT_BATCH_SIZE = 100
+
+# Most map files uploaded per pass of the worker
+UPLOAD_BATCH_SIZE = 20
+
+# Longest the worker sleeps between passes when nothing wakes it
+POLL_SECONDS = 1.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS uploads (
+    content_hash TEXT PRIMARY KEY,
+    filename TEXT NOT NULL,
+    content BLOB,
+    url TEXT,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt REAL NOT NULL DEFAULT 0,
+    last_error TEXT
+);
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    content_hash TEXT NOT NULL REFERENCES uploads (content_hash),
+    data TEXT NOT NULL,
+    document_id TEXT,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt REAL NOT NULL DEFAULT 0,
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS uploads_pending ON uploads (status, next_attempt);
+CREATE INDEX IF NOT EXISTS documents_pending ON documents (status, next_attempt);
+"""
+
+def backoff_seconds(attempts):
+    """Delay before retrying after a number of failed attempts."""
+    return min(BASE_BACKOFF_SECONDS * 2 ** (attempts - 1), MAX_BACKOFF_SECONDS)
+
+def firebase_backends(bucket, collection, client):
+    """
+    Upload and document-writing functions backed by Firebase.
+
+    Parameters:
+    bucket: Firebase Storage bucket
+    collection: Firestore collection for the map documents
+    client: Firestore client, for batched writes
+
+    Returns:
+    tuple: (upload_map(filename, content) -> url, write_documents(list of dicts) -> list of ids)
+    """
+    from firebase_admin import firestore
+
+    def upload_map(filename, content):
+        blob = bucket.blob(f'land-layout-maps/{filename}')
+        blob.upload_from_string(content, content_type='text/html')
+        blob.make_public()
+        return blob.public_url
+
+    def write_documents(documents):
+        batch = client.batch()
+        refs = []
+        for document in documents:
+            ref = collection.document()
+            batch.set(ref, {**document, 'created_at': firestore.SERVER_TIMESTAMP})
+            refs.append(ref)
+        batch.commit()
+        return [ref.id for ref in refs]
+
+    return upload_map, write_documents
+
+class MapUploadQueue:
+    """
+    SQLite-backed queue of map uploads and their metadata documents.
+    """
+
+    def __init__(self, db_path, upload_map, write_documents):
+        """
+        Parameters:
+        db_path (str): SQLite database file
+        upload_map (callable): upload_map(filename, content) -> public URL
+        write_documents (callable): write_documents(list of dicts) -> list of document IDs
+        """
+        self.db_path = db_path
+        self.upload_map = upload_map
+        self.write_documents = write_documents
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        with self._connect() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(SCHEMA)
+
+    def _connect(self):
+        """A connection for the calling thread."""
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def enqueue(self, content, filename, metadata):
+        """
+        Queue a map for upload and its metadata document for writing.
+
+        A map already queued or uploaded is not uploaded again; one that was
+        given up on is retried.
+
+        Parameters:
+        content (bytes): The map's HTML
+        filename (str): File name in storage
+        metadata (dict): JSON-serializable document fields; the map's URL is added on upload
+
+        Returns:
+        str: The map's content hash
+        """
+        content_hash = hashlib.sha256(content).hexdigest()
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT OR IGNORE INTO uploads (content_hash, filename, content) VALUES (?, ?, ?)",
+                (content_hash, filename, content)
+            )
+            connection.execute(
+                "UPDATE uploads SET status = 'pending', attempts = 0, next_attempt = 0 "
+                "WHERE content_hash = ? AND status = 'failed'", (content_hash,)
+            )
+            connection.execute(
+                "INSERT INTO documents (content_hash, data) VALUES (?, ?)",
+                (content_hash, json.dumps({**metadata, 'filename': filename}))
+            )
+        self._wake.set()
+        return content_hash
+
+    def _fail(self, connection, table, key_column, keys, error):
+        """
+        Schedule a retry of failed rows, or mark them failed after MAX_ATTEMPTS.
+
+        Returns:
+        list: Keys of the rows that were given up on
+        """
+        now = time.time()
+        given_up = []
+        for key in keys:
+            attempts = connection.execute(
+                f"SELECT attempts FROM {table} WHERE {key_column} = ?", (key,)
+            ).fetchone()[0] + 1
+            status = 'failed' if attempts >= MAX_ATTEMPTS else 'pending'
+            connection.execute(
+                f"UPDATE {table} SET attempts = ?, status = ?, next_attempt = ?, last_error = ? WHERE {key_column} = ?",
+                (attempts, status, now + backoff_seconds(attempts), str(error), key)
+            )
+            if status == 'failed':
+                given_up.append(key)
+        return given_up
+
+    def _upload_pending(self):
+        """Upload map files that are due; returns how many succeeded."""
+        with self._connect() as connection:
+            rows = connection.execute(
+                "SELECT content_hash, filename, content FROM uploads "
+                "WHERE status = 'pending' AND next_attempt <= ? ORDER BY next_attempt LIMIT ?",
+                (time.time(), UPLOAD_BATCH_SIZE)
+            ).fetchall()
+        uploaded = 0
+        for content_hash, filename, content in rows:
+            try:
+                url = self.upload_map(filename, content)
+            except Exception as e:
+                with self._connect() as connection:
+                    if self._fail(connection, 'uploads', 'content_hash', [content_hash], e):
+                        # Documents of a map that was never uploaded have no URL to point at
+                        connection.execute(
+                            "UPDATE documents SET status = 'failed', last_error = ? "
+                            "WHERE content_hash = ? AND status = 'pending'", (str(e), content_hash)
+                        )
+                continue
+            # The local map file keeps the content; drop the queued copy
+            with self._connect() as connection:
+                connection.execute(
+                    "UPDATE uploads SET status = 'done', url = ?, content = NULL, last_error = NULL "
+                    "WHERE content_hash = ?", (url, content_hash)
+                )
+            uploaded += 1
+        return uploaded
+
+    def _write_pending(self):
+        """Write one batch of due documents whose maps are uploaded; returns how many were written."""
+        with self._connect() as connection:
+            rows = connection.execute(
+                "SELECT documents.id, documents.data, uploads.url FROM documents "
+                "JOIN uploads ON uploads.content_hash = documents.content_hash "
+                "WHERE documents.status = 'pending' AND documents.next_attempt <= ? AND uploads.status = 'done' "
+                "ORDER BY documents.id LIMIT ?",
+                (time.time(), DOCUMENT_BATCH_SIZE)
+            ).fetchall()
+        if not rows:
+            return 0
+        ids = [row[0] for row in rows]
+        try:
+            document_ids = self.write_documents([{**json.loads(data), 'map_url': url} for _, data, url in rows])
+        except Exception as e:
+            with self._connect() as connection:
+                self._fail(connection, 'documents', 'id', ids, e)
+            return 0
+        with self._connect() as connection:
+            connection.executemany(
+                "UPDATE documents SET status = 'done', document_id = ?, last_error = NULL WHERE id = ?",
+                list(zip(document_ids, ids))
+            )
+        return len(rows)
+
+    def drain(self):
+        """
+        Process everything that is due now.
+
+        Returns:
+        dict: Numbers of maps uploaded and documents written
+        """
+        uploaded = self._upload_pending()
+        written = 0
+        while True:
+            batch = self._write_pending()
+            if not batch:
+                break
+            written += batch
+        return {'uploaded': uploaded, 'written': written}
+
+    def _run(self):
+        """Worker loop: drain, then sleep until woken or the next poll."""
+        while not self._stop.is_set():
+            try:
+                self.drain()
+            except Exception as e:
+                print(f"Error draining map upload queue: {e}")
+            self._wake.wait(POLL_SECONDS)
+            self._wake.clear()
+
+    def start(self):
+        """Start the background worker."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="map-upload-queue", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=5.0):
+        """Stop the background worker after its current pass."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def stats(self):
+        """
+        Depth of the queue.
+
+        Returns:
+        dict: Counts of uploads and documents by status, and the total still pending
+        """
+        with self._connect() as connection:
+            counts = {
+                table: dict(connection.execute(f"SELECT status, COUNT(*) FROM {table} GROUP BY status").fetchall())
+                for table in ('uploads', 'documents')
+            }
+        stats = {
+            f"{table}_{status}": counts[table].get(status, 0)
+            for table in ('uploads', 'documents') for status in ('pending', 'done', 'failed')
+        }
+        stats['depth'] = stats['uploads_pending'] + stats['documents_pending']
+        return stats
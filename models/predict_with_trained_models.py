@@ -4,9 +4,10 @@ Example script showing how to use the trained models for predictions.
 
 import pandas as pd
 import numpy as np
-import joblib
 from pathlib import Path
 
+from training.model_trainer import AgriYieldModel, AgriROIModel, feature_matrix
+
 def load_trained_models():
     """
     Load the trained models from disk.
@@ -15,26 +16,25 @@ def load_trained_models():
     tuple: (yield_model, roi_model)
     """
     try:
-        # Load yield prediction models
-        rf_model = joblib.load("saved_models/yield_model_rf.pkl")
-        xgb_model = joblib.load("saved_models/yield_model_xgb.pkl")
-        scaler = joblib.load("saved_models/yield_model_scaler.pkl")
-        feature_names = joblib.load("saved_models/yield_model_features.pkl")
+        # Load yield prediction models (a bundle, or the older separate pickles)
+        yield_model = AgriYieldModel()
+        yield_model.load_model("saved_models/yield_model")
         
         # Load ROI prediction model
-        roi_model = joblib.load("saved_models/roi_model_roi.pkl")
-        roi_scaler = joblib.load("saved_models/roi_model_scaler.pkl")
-        roi_feature_names = joblib.load("saved_models/roi_model_features.pkl")
+        roi_model = AgriROIModel()
+        roi_model.load_model("saved_models/roi_model")
         
         print("✅ Loaded all trained models successfully")
         return {
-            'yield_rf': rf_model,
-            'yield_xgb': xgb_model,
-            'yield_scaler': scaler,
-            'yield_features': feature_names,
-            'roi': roi_model,
-            'roi_scaler': roi_scaler,
-            'roi_features': roi_feature_names
+            'yield_rf': yield_model.rf_model,
+            'yield_xgb': yield_model.xgb_model,
+            'yield_scaler': yield_model.scaler,
+            'yield_features': yield_model.feature_names,
+            'yield_season_features': yield_model.season_features,
+            'roi': roi_model.model,
+            'roi_scaler': roi_model.scaler,
+            'roi_features': roi_model.feature_names,
+            'roi_season_features': roi_model.season_features
         }
     except Exception as e:
         print(f"❌ Error loading models: {e}")
@@ -49,6 +49,8 @@ def create_sample_input_data():
     """
     # Sample weather conditions
     sample_data = {
+        # Crop to predict
+        'crop': 'Rice',
         'avg_temperature': 26.5,  # Celsius
         'avg_humidity': 68.0,     # Percentage
         'avg_rainfall': 1150.0,   # mm/year
@@ -76,36 +78,25 @@ def create_sample_input_data():
     
     return sample_data
 
-def prepare_features_for_prediction(sample_data, feature_names):
+def prepare_features_for_prediction(sample_data, feature_names, season_features=None):
     """
     Prepare features for model prediction.
     
+    Models trained on the training matrix take the crop's next-season
+    features, overridden by the sample's own values.
+    
     Parameters:
     sample_data (dict): Sample input data
     feature_names (list): List of feature names the model expects
+    season_features (pd.DataFrame): The model's season features, if it has them
     
     Returns:
     pd.DataFrame: Prepared feature matrix
-    """
-    # Create a DataFrame with all required features
-    features = {}
-    
-    # Fill in the provided data
-    for key, value in sample_data.items():
-        features[key] = value
     
-    # Fill missing features with 0
-    for feature in feature_names:
-        if feature not in features:
-            features[feature] = 0.0
-    
-    # Ensure correct order of features
-    ordered_features = {feature: features[feature] for feature in feature_names}
-    
-    # Convert to DataFrame
-    X = pd.DataFrame([ordered_features])
-    
-    return X
+    Raises:
+    ValueError: If the sample supplies too few of the model's features
+    """
+    return feature_matrix(pd.DataFrame([sample_data]), feature_names, season_features)
 
 def make_predictions(models, sample_data):
     """
@@ -121,7 +112,7 @@ def make_predictions(models, sample_data):
     print("Making predictions with trained models...")
     
     # Prepare features for yield prediction
-    X_yield = prepare_features_for_prediction(sample_data, models['yield_features'])
+    X_yield = prepare_features_for_prediction(sample_data, models['yield_features'], models['yield_season_features'])
     
     # Make yield predictions
     yield_rf_pred = models['yield_rf'].predict(X_yield)[0]
@@ -131,7 +122,7 @@ def make_predictions(models, sample_data):
     yield_ensemble_pred = (yield_rf_pred + yield_xgb_pred) / 2
     
     # Prepare features for ROI prediction
-    X_roi = prepare_features_for_prediction(sample_data, models['roi_features'])
+    X_roi = prepare_features_for_prediction(sample_data, models['roi_features'], models['roi_season_features'])
     
     # Make ROI prediction
     roi_pred = models['roi'].predict(X_roi)[0]
@@ -7,6 +7,13 @@ import numpy as np
 from sklearn.preprocessing import StandardScaler, LabelEncoder
 from sklearn.model_selection import train_test_split
 
+# Agmarknet price table layout
+PRICE_CATEGORICAL_COLUMNS = ['State', 'District', 'Market', 'Commodity', 'Variety', 'Grade']
+PRICE_DATE_COLUMN = 'Arrival_Date'
+PRICE_DATE_FORMAT = '%d/%m/%Y'
+# Day number stored for arrival dates that could not be parsed
+MISSING_DAY_NUMBER = -1
+
 class AgriDataPreprocessor:
     """
     Preprocessing class for agricultural datasets.
@@ -15,6 +22,8 @@ class AgriDataPreprocessor:
     def __init__(self):
         self.scaler = StandardScaler()
         self.label_encoders = {}
+        # Category dictionaries shared by every price table loaded through this preprocessor
+        self.price_categories = {}
         
     def load_nasa_power_data(self, data):
         """
@@ -49,10 +58,17 @@ class AgriDataPreprocessor:
     def load_crop_price_data(self, data):
         """
         Load and preprocess crop price data.
-        
+
+        The table is stored compactly: text columns become categoricals whose
+        dictionaries are shared across every price table loaded by this
+        preprocessor, prices become float32 and the arrival date becomes an
+        int32 day number (days since 1970-01-01, -1 when unparseable). Group by
+        the text columns with observed=True, and concatenate tables with
+        concat_price_tables.
+
         Parameters:
         data (pd.DataFrame or str): Crop price data DataFrame or file path
-        
+
         Returns:
         pd.DataFrame: Processed crop price data
         """
@@ -61,16 +77,113 @@ class AgriDataPreprocessor:
             data = pd.read_csv(data)
         elif not isinstance(data, pd.DataFrame):
             raise ValueError("Data must be a DataFrame or file path")
-        
+
+        memory_before = data.memory_usage(deep=True).sum()
+
         # Handle missing values
         data = data.fillna(0)
-        
+
         # Convert price columns to numeric
         price_columns = [col for col in data.columns if 'price' in col.lower() or 'rate' in col.lower()]
         for col in price_columns:
-            data[col] = pd.to_numeric(data[col], errors='coerce').fillna(0)
-            
+            data[col] = pd.to_numeric(data[col], errors='coerce').fillna(0).astype(np.float32)
+
+        # Parse arrival dates once into day numbers
+        if PRICE_DATE_COLUMN in data.columns:
+            data[PRICE_DATE_COLUMN] = self.encode_price_dates(data[PRICE_DATE_COLUMN])
+
+        # Dictionary-encode the text columns
+        for col in PRICE_CATEGORICAL_COLUMNS:
+            if col in data.columns:
+                data[col] = self.encode_price_category(col, data[col])
+
+        memory_after = data.memory_usage(deep=True).sum()
+        print(f"Price table memory: {memory_before / 1e6:.2f} MB -> {memory_after / 1e6:.2f} MB "
+              f"({len(data)} rows)")
+
         return data
+
+    def encode_price_dates(self, dates):
+        """
+        Convert Agmarknet arrival dates to int32 day numbers.
+
+        Parameters:
+        dates (pd.Series): Arrival dates as '%d/%m/%Y' strings
+
+        Returns:
+        pd.Series: Days since 1970-01-01 as int32
+        """
+        if pd.api.types.is_integer_dtype(dates):
+            # Already encoded
+            return dates.astype(np.int32)
+
+        parsed = pd.to_datetime(dates.astype(str), format=PRICE_DATE_FORMAT, errors='coerce')
+        day_numbers = (parsed - pd.Timestamp('1970-01-01')).dt.days
+        return day_numbers.fillna(MISSING_DAY_NUMBER).astype(np.int32)
+
+    def decode_price_dates(self, day_numbers):
+        """
+        Convert int32 day numbers back to timestamps.
+
+        Parameters:
+        day_numbers (pd.Series): Days since 1970-01-01
+
+        Returns:
+        pd.Series: Timestamps (NaT for missing dates)
+        """
+        days = day_numbers.where(day_numbers != MISSING_DAY_NUMBER)
+        return pd.Timestamp('1970-01-01') + pd.to_timedelta(days, unit='D')
+
+    def encode_price_category(self, column, values):
+        """
+        Dictionary-encode a price table text column.
+
+        The category dictionary for each column is kept on the preprocessor and
+        only ever grows, so codes stay stable between tables and
+        concat_price_tables keeps concatenated tables categorical. A dictionary
+        can hold categories a table does not contain, so group by these columns
+        with observed=True to leave them out.
+
+        Parameters:
+        column (str): Column name
+        values (pd.Series): Column values
+
+        Returns:
+        pd.Series: Categorical column
+        """
+        values = values.astype(str)
+        known = self.price_categories.get(column)
+        new_values = pd.Index(values.unique())
+        if known is None:
+            categories = new_values.sort_values()
+        else:
+            unseen = new_values.difference(known.categories)
+            categories = known.categories.append(unseen) if len(unseen) else known.categories
+
+        dtype = pd.CategoricalDtype(categories=categories)
+        self.price_categories[column] = dtype
+        return values.astype(dtype)
+
+    def concat_price_tables(self, tables):
+        """
+        Concatenate price tables loaded by this preprocessor.
+
+        Tables loaded earlier carry a shorter category dictionary, and pandas
+        only keeps a column categorical when every table has the same one, so
+        each table's columns are first extended to the current dictionaries.
+
+        Parameters:
+        tables (list): Tables returned by load_crop_price_data
+
+        Returns:
+        pd.DataFrame: The concatenated table, with categorical text columns
+        """
+        aligned = []
+        for table in tables:
+            columns = {col: table[col].astype(dtype) for col, dtype in self.price_categories.items()
+                       if col in table.columns}
+            aligned.append(table.assign(**columns))
+        return pd.concat(aligned, ignore_index=True)
     
     def load_yield_data(self, data):
         """
@@ -0,0 +1,191 @@
+"""
+Feedback-to-training-set join for Sasya-Mitra model retraining.
+
+Flattens the nested prediction documents column by column and joins them to
+the farmer feedback on prediction_id, without looping over records.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Training columns taken from the prediction documents: (flattened source column, default)
+PREDICTION_COLUMNS = {
+    # Original predictions
+    'predicted_yield': ('predictions.yield_kg_per_acre', 0),
+    'predicted_roi': ('predictions.roi', 0),
+    # Farmer input data
+    'land_area_acres': ('farmer_data.land_area_acres', 1),
+    'budget_inr': ('farmer_data.budget_inr', 50000),
+    # Soil data
+    'soil_ph': ('farmer_data.soil.ph', 6.5),
+    'soil_organic_carbon': ('farmer_data.soil.organic_carbon', 1.0),
+    'soil_nitrogen': ('farmer_data.soil.nitrogen', 150),
+    'soil_phosphorus': ('farmer_data.soil.phosphorus', 30),
+    'soil_potassium': ('farmer_data.soil.potassium', 150),
+    # Weather data (if available in prediction)
+    'avg_temperature_c': ('weather_data.avg_temperature_c', 25),
+    'avg_rainfall_mm': ('weather_data.avg_rainfall_mm', 1000),
+    'avg_humidity': ('weather_data.avg_humidity', 65),
+    'solar_radiation': ('weather_data.solar_radiation', 5)
+}
+
+# Training columns taken from the feedback records; targets have no default
+# so that missing actuals stay NaN instead of becoming zero yields
+FEEDBACK_COLUMNS = {
+    'actual_yield': ('yield_actual', None),
+    'actual_roi': ('roi_actual', None),
+    'accuracy_rating': ('accuracy_rating', 3)
+}
+
+# Inputs the retrained models learn from (known before the season starts)
+FEEDBACK_FEATURE_COLUMNS = [
+    'land_area_acres', 'budget_inr',
+    'soil_ph', 'soil_organic_carbon', 'soil_nitrogen', 'soil_phosphorus', 'soil_potassium',
+    'avg_temperature_c', 'avg_rainfall_mm', 'avg_humidity', 'solar_radiation'
+]
+
+def _column_tree(columns, sep='.'):
+    """
+    Turn flattened column names into a tree of nested keys.
+
+    Parameters:
+    columns (list): Column names such as "farmer_data.soil.ph"
+    sep (str): Separator between parent and child key names
+
+    Returns:
+    dict: Nested dict of keys; leaves are empty dicts
+    """
+    tree = {}
+    for column in columns:
+        node = tree
+        for key in column.split(sep):
+            node = node.setdefault(key, {})
+    return tree
+
+def _expand_nested_columns(frame, sep='.', tree=None):
+    """
+    Replace every column holding dicts with one column per nested key.
+
+    Parameters:
+    frame (pd.DataFrame): Frame whose object columns may hold dicts
+    sep (str): Separator between parent and child key names
+    tree (dict): Nested keys to keep (all keys if None)
+
+    Returns:
+    pd.DataFrame: Frame with nested keys as flat columns
+    """
+    parts = []
+    for column in frame.columns:
+        subtree = None if tree is None else tree.get(column, {})
+        values = frame[column]
+        if values.dtype != object or subtree == {}:
+            parts.append(values)
+            continue
+        values = values.tolist()
+        if not any(isinstance(value, dict) for value in values):
+            parts.append(frame[column])
+            continue
+        # Missing or non-dict entries expand to an all-NaN row
+        nested = pd.DataFrame.from_records(
+            [value if isinstance(value, dict) else {} for value in values],
+            index=frame.index,
+            columns=None if subtree is None else list(subtree)
+        )
+        parts.append(_expand_nested_columns(nested, sep, subtree).add_prefix(f"{column}{sep}"))
+    if not parts:
+        return frame
+    return pd.concat(parts, axis=1)
+
+def flatten_records(records, sep='.', columns=None):
+    """
+    Flatten nested dict records into a DataFrame (json_normalize-style).
+
+    Parameters:
+    records (list): List of (possibly nested) dicts
+    sep (str): Separator between parent and child key names
+    columns (list): Flattened columns to extract (all if None); naming them
+        up front skips scanning every record for its keys
+
+    Returns:
+    pd.DataFrame: One row per record, one column per key path
+    """
+    if not records:
+        return pd.DataFrame(columns=columns)
+    tree = None if columns is None else _column_tree(columns, sep)
+    frame = pd.DataFrame.from_records(records, columns=None if tree is None else list(tree))
+    return _expand_nested_columns(frame, sep, tree)
+
+def _select_columns(frame, columns):
+    """
+    Pick and default the training columns from a flattened frame.
+
+    Parameters:
+    frame (pd.DataFrame): Flattened frame
+    columns (dict): Output column -> (source column, default)
+
+    Returns:
+    dict: Output column -> values
+    """
+    selected = {}
+    for name, (source, default) in columns.items():
+        if source in frame.columns:
+            values = pd.to_numeric(frame[source], errors='coerce')
+        else:
+            values = pd.Series(np.nan, index=frame.index)
+        selected[name] = values if default is None else values.fillna(default)
+    return selected
+
+def prepare_feedback_training_data(feedback_data, prediction_data):
+    """
+    Join feedback records to their predictions as a training table.
+
+    Parameters:
+    feedback_data (list): List of feedback records
+    prediction_data (dict): Dictionary mapping prediction IDs to prediction data
+
+    Returns:
+    pd.DataFrame: One row per feedback record with a known prediction, keyed
+        by feedback_id and prediction_id
+    """
+    if not feedback_data or not prediction_data:
+        return pd.DataFrame()
+
+    feedback_columns = ['id', 'prediction_id', 'timestamp'] + [source for source, _ in FEEDBACK_COLUMNS.values()]
+    feedback = flatten_records(feedback_data, columns=feedback_columns)
+    feedback = feedback[feedback['prediction_id'].notna() & (feedback['prediction_id'] != '')]
+
+    predictions = flatten_records(
+        list(prediction_data.values()),
+        columns=[source for source, _ in PREDICTION_COLUMNS.values()]
+    )
+    predictions['prediction_id'] = list(prediction_data.keys())
+
+    # Hash join on prediction_id; feedback order is preserved
+    merged = feedback.merge(predictions, on='prediction_id', how='inner')
+
+    return pd.DataFrame({
+        'feedback_id': merged['id'],
+        'prediction_id': merged['prediction_id'],
+        **_select_columns(merged, PREDICTION_COLUMNS),
+        **_select_columns(merged, FEEDBACK_COLUMNS),
+        'timestamp': merged['timestamp']
+    })
+
+def feedback_training_set(training_df, target):
+    """
+    Select the rows and columns a model trains on from the feedback table.
+
+    Parameters:
+    training_df (pd.DataFrame): Output of prepare_feedback_training_data
+    target (str): 'yield' or 'roi'
+
+    Returns:
+    tuple: (X, y) for the records that report the actual outcome
+    """
+    if training_df.empty:
+        return pd.DataFrame(columns=FEEDBACK_FEATURE_COLUMNS, dtype=np.float32), pd.Series(dtype=float)
+    y = training_df[f"actual_{target}"]
+    # Yields of zero are unreported harvests; any reported ROI is usable
+    has_target = (y > 0) if target == 'yield' else y.notna()
+    X = training_df.loc[has_target, FEEDBACK_FEATURE_COLUMNS].astype(np.float32)
+    return X, y[has_target]
@@ -0,0 +1,215 @@
+"""
+Watermark-based incremental feedback ingestion for Sasya-Mitra model retraining.
+
+Each run pages through only the feedback written since the last run, ordered by
+(timestamp, document ID), and appends it to a local training snapshot. The
+position reached is persisted as a watermark so the next run resumes there.
+Feedback whose prediction could not be fetched yet is kept in a small list of
+its own, so later runs can join it without re-reading the whole snapshot.
+"""
+
+import os
+import json
+from datetime import datetime, timedelta
+
+# Feedback documents read per query page
+DEFAULT_PAGE_SIZE = 500
+
+# Local snapshot of ingested feedback and the predictions it refers to
+DEFAULT_SNAPSHOT_DIR = "models/feedback_snapshot"
+
+# Firestore's field path for the document ID
+DOCUMENT_ID_FIELD = '__name__'
+
+def _encode_value(value):
+    """Serialize Firestore values (timestamps) that JSON cannot represent."""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+class FeedbackIngestor:
+    """
+    Appends new feedback to a local snapshot, resuming from a persisted watermark.
+    """
+
+    def __init__(self, db, snapshot_dir=DEFAULT_SNAPSHOT_DIR, page_size=DEFAULT_PAGE_SIZE,
+                 collection='feedback'):
+        self.db = db
+        self.snapshot_dir = snapshot_dir
+        self.page_size = page_size
+        self.collection = collection
+        self.feedback_path = os.path.join(snapshot_dir, "feedback.jsonl")
+        self.predictions_path = os.path.join(snapshot_dir, "predictions.jsonl")
+        self.watermark_path = os.path.join(snapshot_dir, "watermark.json")
+        self.unjoined_path = os.path.join(snapshot_dir, "unjoined.jsonl")
+        os.makedirs(snapshot_dir, exist_ok=True)
+
+    def load_watermark(self):
+        """
+        Load the position reached by the last ingestion.
+
+        Returns:
+        dict: timestamp (datetime), document_id and total_records, or None on the first run
+        """
+        if not os.path.exists(self.watermark_path):
+            return None
+        with open(self.watermark_path, 'r') as f:
+            watermark = json.load(f)
+        watermark['timestamp'] = datetime.fromisoformat(watermark['timestamp'])
+        return watermark
+
+    def save_watermark(self, timestamp, document_id, total_records):
+        """
+        Persist the ingestion position atomically.
+
+        Parameters:
+        timestamp (datetime): Timestamp of the last ingested document
+        document_id (str): ID of the last ingested document
+        total_records (int): Records in the snapshot
+        """
+        watermark = {
+            'timestamp': timestamp.isoformat(),
+            'document_id': document_id,
+            'total_records': total_records,
+            'updated_at': datetime.now().isoformat()
+        }
+        tmp_path = f"{self.watermark_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(watermark, f, indent=2)
+        os.replace(tmp_path, self.watermark_path)
+
+    def _page_query(self, watermark, since):
+        """
+        Build the query for the page after the watermark.
+
+        Parameters:
+        watermark (dict): Position to resume after (None on the first run)
+        since (datetime): Oldest feedback to read on the first run
+
+        Returns:
+        Firestore query
+        """
+        query = self.db.collection(self.collection)
+        if watermark is None and since is not None:
+            query = query.where('timestamp', '>=', since)
+        # The document ID breaks ties between feedback with equal timestamps
+        query = query.order_by('timestamp').order_by(DOCUMENT_ID_FIELD)
+        if watermark is not None:
+            query = query.start_after({
+                'timestamp': watermark['timestamp'],
+                DOCUMENT_ID_FIELD: watermark['document_id']
+            })
+        return query.limit(self.page_size)
+
+    def _append(self, path, records):
+        """Append records to a JSON lines snapshot file."""
+        with open(path, 'a') as f:
+            for record in records:
+                f.write(json.dumps(record, default=_encode_value) + "\n")
+
+    def ingest(self, days_back=30):
+        """
+        Page through feedback newer than the watermark and append it to the snapshot.
+
+        Parameters:
+        days_back (int): How far back to read on the first run
+
+        Returns:
+        list: Newly ingested feedback records
+        """
+        watermark = self.load_watermark()
+        since = None if watermark is not None else datetime.now() - timedelta(days=days_back)
+        total_records = watermark['total_records'] if watermark else 0
+
+        new_feedback = []
+        while True:
+            page = [{'id': doc.id, **doc.to_dict()} for doc in self._page_query(watermark, since).stream()]
+            if not page:
+                break
+
+            # Write the page before moving the watermark so that a crash never skips feedback
+            self._append(self.feedback_path, page)
+            total_records += len(page)
+            watermark = {'timestamp': page[-1]['timestamp'], 'document_id': page[-1]['id'], 'total_records': total_records}
+            self.save_watermark(watermark['timestamp'], watermark['document_id'], total_records)
+            new_feedback.extend(page)
+
+            if len(page) < self.page_size:
+                break
+
+        print(f"Ingested {len(new_feedback)} new feedback records ({total_records} in snapshot)")
+        return new_feedback
+
+    def append_predictions(self, prediction_data):
+        """
+        Add the predictions referenced by newly ingested feedback to the snapshot.
+
+        Parameters:
+        prediction_data (dict): Dictionary mapping prediction IDs to prediction data
+        """
+        self._append(self.predictions_path, [
+            {'id': prediction_id, 'data': prediction} for prediction_id, prediction in prediction_data.items()
+        ])
+
+    def _read(self, path):
+        """Read a JSON lines snapshot file, keeping the last copy of each record."""
+        records = {}
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                for line in f:
+                    if line.strip():
+                        record = json.loads(line)
+                        records[record['id']] = record
+        return records
+
+    def load_predictions(self):
+        """
+        Load the predictions in the snapshot.
+
+        Returns:
+        dict: Dictionary mapping prediction IDs to prediction data
+        """
+        return {
+            prediction_id: record['data']
+            for prediction_id, record in self._read(self.predictions_path).items()
+        }
+
+    def load_snapshot(self):
+        """
+        Load the accumulated feedback and predictions.
+
+        Returns:
+        tuple: (list of feedback records, dict mapping prediction IDs to prediction data)
+        """
+        return list(self._read(self.feedback_path).values()), self.load_predictions()
+
+    def load_unjoined(self):
+        """
+        Load the feedback waiting for its prediction to be fetched.
+
+        Snapshots written before this list was kept are scanned once to build it;
+        call this before ingest() so the scan does not include the new feedback.
+
+        Returns:
+        list: Feedback records whose prediction is not in the snapshot
+        """
+        if os.path.exists(self.unjoined_path):
+            return list(self._read(self.unjoined_path).values())
+        feedback_data, prediction_data = self.load_snapshot()
+        return [
+            feedback for feedback in feedback_data
+            if feedback.get('prediction_id') and feedback['prediction_id'] not in prediction_data
+        ]
+
+    def save_unjoined(self, feedback_data):
+        """
+        Replace the list of feedback waiting for its prediction, atomically.
+
+        Parameters:
+        feedback_data (list): Feedback records whose prediction is not in the snapshot
+        """
+        tmp_path = f"{self.unjoined_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            for record in feedback_data:
+                f.write(json.dumps(record, default=_encode_value) + "\n")
+        os.replace(tmp_path, self.unjoined_path)
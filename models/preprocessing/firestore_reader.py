@@ -0,0 +1,96 @@
+"""
+Batched Firestore document reads for Sasya-Mitra model retraining.
+
+Looks documents up by ID in multi-document batches issued concurrently from a
+bounded thread pool, instead of one round trip per document. Works with any
+client exposing collection().document() and get_all(), so it runs unchanged
+against the Firestore emulator (FIRESTORE_EMULATOR_HOST) or an in-memory
+stand-in.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# Documents per get_all() call
+DEFAULT_BATCH_SIZE = 100
+
+# Concurrent get_all() calls
+DEFAULT_MAX_WORKERS = 8
+
+# Retry rounds for batches that failed
+DEFAULT_MAX_RETRIES = 3
+
+def _fetch_batch(db, collection, document_ids):
+    """
+    Read one batch of documents in a single round trip.
+
+    Parameters:
+    db: Firestore client
+    collection (str): Collection name
+    document_ids (list): Document IDs in the batch
+
+    Returns:
+    dict: Document ID -> document data for the documents that exist
+    """
+    collection_ref = db.collection(collection)
+    references = [collection_ref.document(document_id) for document_id in document_ids]
+    return {
+        snapshot.id: snapshot.to_dict()
+        for snapshot in db.get_all(references)
+        if snapshot.exists
+    }
+
+def fetch_documents(db, collection, document_ids, batch_size=DEFAULT_BATCH_SIZE,
+                    max_workers=DEFAULT_MAX_WORKERS, max_retries=DEFAULT_MAX_RETRIES,
+                    retry_delay=0.5):
+    """
+    Fetch documents by ID in concurrent batches, retrying failed batches.
+
+    Parameters:
+    db: Firestore client
+    collection (str): Collection name
+    document_ids (list): Document IDs (duplicates and empty IDs are ignored)
+    batch_size (int): Documents per get_all() call
+    max_workers (int): Concurrent get_all() calls
+    max_retries (int): Retry rounds for failed batches
+    retry_delay (float): Seconds before the first retry, doubled each round
+
+    Returns:
+    tuple: (dict of document ID -> data, list of IDs that could not be fetched)
+    """
+    document_ids = list(dict.fromkeys(document_id for document_id in document_ids if document_id))
+    pending = [document_ids[i:i + batch_size] for i in range(0, len(document_ids), batch_size)]
+    documents = {}
+    n_done = 0
+    next_report = 0.1
+
+    for attempt in range(max_retries + 1):
+        if not pending:
+            break
+        if attempt > 0:
+            print(f"Retrying {len(pending)} failed {collection} batches (attempt {attempt}/{max_retries})")
+            time.sleep(retry_delay * 2 ** (attempt - 1))
+
+        failed = []
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(pending))) as executor:
+            futures = {executor.submit(_fetch_batch, db, collection, batch): batch for batch in pending}
+            for future in as_completed(futures):
+                batch = futures[future]
+                try:
+                    documents.update(future.result())
+                except Exception as e:
+                    print(f"Error fetching {len(batch)} {collection} documents: {e}")
+                    failed.append(batch)
+                    continue
+
+                # Report progress every 10% of the requested documents
+                n_done += len(batch)
+                if n_done >= next_report * len(document_ids):
+                    print(f"Fetched {n_done}/{len(document_ids)} {collection} documents")
+                    next_report = (int(10 * n_done / len(document_ids)) + 1) / 10
+        pending = failed
+
+    failed_ids = [document_id for batch in pending for document_id in batch]
+    if failed_ids:
+        print(f"Could not fetch {len(failed_ids)} {collection} documents after {max_retries} retries")
+    return documents, failed_ids
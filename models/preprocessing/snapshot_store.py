@@ -0,0 +1,183 @@
+"""
+Date-partitioned local store of joined feedback and prediction rows.
+
+Rows are written as immutable columnar part files under one directory per
+feedback date (date=YYYY-MM-DD/part-00000.parquet), indexed by a manifest.
+Reads prune partitions by date range from the manifest alone and load only
+the requested columns, so retraining, offline evaluation and analytics load
+their data locally and reproducibly instead of querying Firestore.
+
+Parquet files are written when pyarrow is installed; otherwise the store falls
+back to CSV part files with the same layout.
+"""
+
+import os
+import json
+from datetime import datetime, date
+
+import pandas as pd
+
+# Try to import the Parquet engine
+PARQUET_AVAILABLE = False
+try:
+    import pyarrow  # noqa: F401
+    PARQUET_AVAILABLE = True
+except ImportError:
+    print("pyarrow not available. The training snapshot will be stored as CSV.")
+
+# Default location of the training snapshot store
+DEFAULT_STORE_DIR = "models/training_snapshot"
+
+# Column holding the timestamp that rows are partitioned by
+PARTITION_COLUMN = 'timestamp'
+
+# Column identifying a row; later copies of a row replace earlier ones on read
+ROW_ID_COLUMN = 'feedback_id'
+
+def _to_date(value):
+    """Convert a date, datetime or ISO string to a date."""
+    if value is None or isinstance(value, date) and not isinstance(value, datetime):
+        return value
+    return pd.Timestamp(value).date()
+
+class SnapshotStore:
+    """
+    Date-partitioned columnar snapshot of the training rows.
+    """
+
+    def __init__(self, store_dir=DEFAULT_STORE_DIR, file_format=None):
+        self.store_dir = store_dir
+        self.manifest_path = os.path.join(store_dir, "manifest.json")
+        os.makedirs(store_dir, exist_ok=True)
+        self.manifest = self.load_manifest()
+        # The format of an existing store wins over the available engine
+        self.file_format = self.manifest.get('format') or file_format or ('parquet' if PARQUET_AVAILABLE else 'csv')
+
+    def load_manifest(self):
+        """
+        Load the manifest describing the partitions and columns.
+
+        Returns:
+        dict: format, columns (name -> dtype), partitions (date -> list of parts)
+        """
+        if not os.path.exists(self.manifest_path):
+            return {'format': None, 'columns': {}, 'partitions': {}}
+        with open(self.manifest_path, 'r') as f:
+            return json.load(f)
+
+    def save_manifest(self):
+        """Persist the manifest atomically, after the part files it lists."""
+        self.manifest['format'] = self.file_format
+        self.manifest['updated_at'] = datetime.now().isoformat()
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.manifest_path)
+
+    def dates(self):
+        """
+        List the partition dates in the store.
+
+        Returns:
+        list: Sorted partition dates as ISO strings
+        """
+        return sorted(self.manifest['partitions'])
+
+    def _write_part(self, partition, frame):
+        """Write one immutable part file into a date partition."""
+        partition_dir = os.path.join(self.store_dir, f"date={partition}")
+        os.makedirs(partition_dir, exist_ok=True)
+        n_part = len(self.manifest['partitions'].get(partition, []))
+        filename = f"part-{n_part:05d}.{self.file_format}"
+        path = os.path.join(partition_dir, filename)
+        if self.file_format == 'parquet':
+            frame.to_parquet(path, index=False)
+        else:
+            frame.to_csv(path, index=False)
+        return {'file': os.path.join(f"date={partition}", filename), 'rows': len(frame)}
+
+    def append(self, rows):
+        """
+        Append rows to the store, one new part file per date they fall on.
+
+        Parameters:
+        rows (pd.DataFrame): Rows with a timestamp column
+
+        Returns:
+        int: Number of rows written
+        """
+        if rows is None or rows.empty:
+            return 0
+        rows = rows.copy()
+        rows[PARTITION_COLUMN] = pd.to_datetime(rows[PARTITION_COLUMN], utc=True, format='mixed')
+        partition_keys = rows[PARTITION_COLUMN].dt.strftime('%Y-%m-%d').fillna('unknown')
+
+        for partition, frame in rows.groupby(partition_keys, sort=True):
+            part = self._write_part(partition, frame)
+            self.manifest['partitions'].setdefault(partition, []).append(part)
+        for column, dtype in rows.dtypes.items():
+            self.manifest['columns'].setdefault(column, str(dtype))
+
+        self.save_manifest()
+        return len(rows)
+
+    def _read_part(self, path, columns):
+        """Read the requested columns of one part file."""
+        if self.file_format == 'parquet':
+            return pd.read_parquet(path, columns=columns)
+        available = pd.read_csv(path, nrows=0).columns
+        usecols = None if columns is None else [column for column in columns if column in available]
+        return pd.read_csv(path, usecols=usecols)
+
+    def read(self, start_date=None, end_date=None, columns=None):
+        """
+        Read the rows of the partitions within a date range.
+
+        Parameters:
+        start_date: First date to include (date, datetime or ISO string; None for all)
+        end_date: Last date to include (None for all)
+        columns (list): Columns to load (all if None)
+
+        Returns:
+        pd.DataFrame: Rows in date order, with later copies of a row replacing earlier ones
+        """
+        start_date, end_date = _to_date(start_date), _to_date(end_date)
+        read_columns = None
+        if columns is not None:
+            # The row ID is needed to drop superseded copies
+            read_columns = list(dict.fromkeys(list(columns) + [ROW_ID_COLUMN]))
+            read_columns = [column for column in read_columns if column in self.manifest['columns']]
+
+        frames = []
+        for partition in self.dates():
+            if partition != 'unknown':
+                partition_date = date.fromisoformat(partition)
+                if (start_date and partition_date < start_date) or (end_date and partition_date > end_date):
+                    continue
+            elif start_date or end_date:
+                continue
+            for part in self.manifest['partitions'][partition]:
+                frames.append(self._read_part(os.path.join(self.store_dir, part['file']), read_columns))
+
+        if not frames:
+            return pd.DataFrame(columns=columns if columns is not None else list(self.manifest['columns']))
+        rows = pd.concat(frames, ignore_index=True)
+        if PARTITION_COLUMN in rows.columns:
+            rows[PARTITION_COLUMN] = pd.to_datetime(rows[PARTITION_COLUMN], utc=True, format='mixed')
+        if ROW_ID_COLUMN in rows.columns:
+            rows = rows.drop_duplicates(subset=ROW_ID_COLUMN, keep='last').reset_index(drop=True)
+        if columns is not None:
+            rows = rows[[column for column in columns if column in rows.columns]]
+        return rows
+
+    def describe(self):
+        """
+        Summarize the store for analytics.
+
+        Returns:
+        pd.DataFrame: Part files and rows per date
+        """
+        return pd.DataFrame([
+            {'date': partition, 'parts': len(parts), 'rows': sum(part['rows'] for part in parts)}
+            for partition, parts in sorted(self.manifest['partitions'].items())
+        ], columns=['date', 'parts', 'rows'])
@@ -0,0 +1,416 @@
+"""
+Training matrix builder for Sasya-Mitra AI models.
+
+Turns the wide historical tables (area, yield, production) into one row per
+(crop, year) observation - or (district, crop, year) when the tables carry a
+District column - and joins crop-level prices, year-level damage and weather
+onto each row. The matrix is assembled chunk by chunk into a single float32
+array so district-level history with millions of rows stays affordable.
+"""
+
+import re
+
+import numpy as np
+import pandas as pd
+
+# Rows assembled per chunk when filling the feature matrix
+DEFAULT_CHUNK_SIZE = 100_000
+
+# Target column of the matrix
+TARGET_COLUMN = 'Yield'
+
+# Category prefixes used by the government crop tables ("Food grains (cereals) - Rice")
+_CROP_PREFIX = re.compile(r'^\s*(food\s*grains?\s*(\((cereals|pulses)\))?|oilseeds)\s*-\s*', re.IGNORECASE)
+_PARENTHETICAL = re.compile(r'\([^)]*\)')
+_NON_LETTERS = re.compile(r'[^a-z]')
+
+# NASA POWER parameters aggregated per year, named like the summary features
+_WEATHER_COLUMNS = {
+    'T2M': 'avg_temperature',
+    'RH2M': 'avg_humidity',
+    'PRECTOTCORR': 'avg_rainfall',
+    'ALLSKY_SFC_SW_DWN': 'solar_radiation',
+}
+
+
+def crop_key(name):
+    """
+    Reduce a crop or commodity name to a key shared across datasets.
+
+    "Food Grains (Cereals) - Rice (000 tonnes)", "Foodgrains(cereals) - Rice"
+    and "Rice" all map to "rice".
+
+    Parameters:
+    name (str): Crop name as it appears in a dataset
+
+    Returns:
+    str: Normalized crop key
+    """
+    name = _CROP_PREFIX.sub('', str(name))
+    name = _NON_LETTERS.sub('', _PARENTHETICAL.sub('', name).lower())
+    if name.endswith('es') and len(name) > 5:
+        return name[:-2]
+    if name.endswith('s') and len(name) > 4:
+        return name[:-1]
+    return name
+
+
+def parse_year(value):
+    """
+    Parse a crop year such as "2001-02" or 2001 into its starting year.
+
+    Parameters:
+    value: Year value from a dataset
+
+    Returns:
+    float: Starting year, or NaN when it cannot be parsed
+    """
+    match = re.match(r'\s*(\d{4})', str(value))
+    return float(match.group(1)) if match else np.nan
+
+
+def _map_unique(series, func):
+    """Apply func once per distinct value instead of once per row."""
+    codes, uniques = pd.factorize(series)
+    mapped = np.array([func(value) for value in uniques])
+    result = mapped[codes] if len(mapped) else np.array([], dtype=object)
+    return pd.Series(result, index=series.index)
+
+
+def _clean_column_name(name):
+    """Turn a dataset column header into a snake_case feature suffix."""
+    name = _PARENTHETICAL.sub('', str(name)).strip().lower()
+    return re.sub(r'[^a-z0-9]+', '_', name).strip('_')
+
+
+class TrainingMatrixBuilder:
+    """
+    Builds a row-per-observation float32 training matrix from historical datasets.
+    """
+
+    def __init__(self, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        self.feature_names = None
+        self.crop_index = None
+        self.district_index = None
+        self.observation_keys = None
+
+    def to_long(self, df, value_name):
+        """
+        Convert a crop table to long format keyed by ([District,] Crop, Year).
+
+        Wide tables (a Year column plus one column per crop) are melted; tables
+        that already have Crop and Year columns are used as they are.
+
+        Parameters:
+        df (pd.DataFrame): Crop table
+        value_name (str): Name of the value column ('Area', 'Yield' or 'Production')
+
+        Returns:
+        pd.DataFrame: Long table, or None if the table has no usable layout
+        """
+        if df is None or df.empty or 'Year' not in df.columns:
+            return None
+
+        if 'Crop' in df.columns:
+            keys = [col for col in ('District', 'Crop', 'Year') if col in df.columns]
+            value_col = value_name if value_name in df.columns else None
+            if value_col is None:
+                numeric = [col for col in df.columns if col not in keys and pd.api.types.is_numeric_dtype(df[col])]
+                if not numeric:
+                    return None
+                value_col = numeric[0]
+            long_df = df[keys + [value_col]].rename(columns={value_col: value_name})
+        else:
+            crop_columns = [col for col in df.columns if col != 'Year']
+            long_df = df.melt(id_vars=['Year'], value_vars=crop_columns, var_name='Crop', value_name=value_name)
+            keys = ['Crop', 'Year']
+
+        long_df = long_df.copy()
+        long_df[value_name] = pd.to_numeric(long_df[value_name], errors='coerce').astype(np.float32)
+        # Key columns are kept categorical so joins and sorts work on small integer codes
+        long_df['Crop'] = _map_unique(long_df['Crop'], crop_key).astype('category')
+        long_df['Year'] = _map_unique(long_df['Year'], parse_year)
+        if 'District' in long_df.columns:
+            long_df['District'] = long_df['District'].astype(str).astype('category')
+        long_df = long_df.dropna(subset=['Year', value_name])
+        long_df['Year'] = long_df['Year'].astype(np.int32)
+
+        # Several source columns can share a crop key; keep the first one
+        return long_df.drop_duplicates(subset=keys, keep='first')
+
+    def build_observations(self, datasets):
+        """
+        Join the crop tables into one row per observation with lag features.
+
+        Parameters:
+        datasets (dict): Datasets keyed 'area', 'yield', 'production', ...
+
+        Returns:
+        pd.DataFrame: Observation table sorted by its keys, or None without yield data
+        """
+        observations = self.to_long(datasets.get('yield'), 'Yield')
+        if observations is not None:
+            # The loaders fill missing yields with 0; those are not observations
+            observations = observations[observations['Yield'] > 0]
+        if observations is None or observations.empty:
+            return None
+
+        keys = [col for col in ('District', 'Crop', 'Year') if col in observations.columns]
+        for name, value_name in (('area', 'Area'), ('production', 'Production')):
+            table = self.to_long(datasets.get(name), value_name)
+            if table is None:
+                observations[value_name] = np.float32(np.nan)
+                continue
+            join_keys = [key for key in keys if key in table.columns]
+            if 'District' in keys and 'District' not in table.columns:
+                # National table joined onto district rows
+                table = table.drop_duplicates(subset=join_keys)
+            observations = observations.merge(table[join_keys + [value_name]], on=join_keys, how='left')
+
+        observations = observations.sort_values(keys, kind='mergesort').reset_index(drop=True)
+
+        # Lag features from earlier years of the same crop (and district)
+        group_keys = [key for key in keys if key != 'Year']
+        grouped = observations.groupby(group_keys, sort=False, observed=True)
+        yield_lags = np.column_stack([grouped['Yield'].shift(k).to_numpy(dtype=np.float32) for k in (1, 2, 3)])
+        observations['yield_lag1'] = yield_lags[:, 0]
+        with np.errstate(all='ignore'):
+            counts = np.sum(~np.isnan(yield_lags), axis=1)
+            totals = np.nansum(yield_lags, axis=1)
+            observations['yield_rolling3'] = np.where(counts > 0, totals / np.maximum(counts, 1), np.nan).astype(np.float32)
+        observations['area_lag1'] = grouped['Area'].shift(1).astype(np.float32)
+        observations['production_lag1'] = grouped['Production'].shift(1).astype(np.float32)
+
+        self.observation_keys = keys
+        return observations
+
+    def crop_price_table(self, price_data, by_district=False):
+        """
+        Average Agmarknet min/max/modal prices per crop key.
+
+        Parameters:
+        price_data (pd.DataFrame): Price table (raw or from load_crop_price_data)
+        by_district (bool): Also group by District when the table has one
+
+        Returns:
+        pd.DataFrame: Prices indexed by crop key (and district), or None
+        """
+        if price_data is None or price_data.empty or 'Commodity' not in price_data.columns:
+            return None
+
+        price_columns = {}
+        for col in price_data.columns:
+            lowered = col.lower()
+            if 'price' not in lowered:
+                continue
+            for kind in ('min', 'max', 'modal'):
+                if lowered.startswith(kind):
+                    price_columns[col] = f'price_{kind}'
+        if not price_columns:
+            return None
+
+        group_keys = ['District', 'Crop'] if by_district and 'District' in price_data.columns else ['Crop']
+        prices = pd.DataFrame({
+            new: pd.to_numeric(price_data[old], errors='coerce').astype(np.float32)
+            for old, new in price_columns.items()
+        })
+        prices['Crop'] = _map_unique(price_data['Commodity'].astype(str), crop_key)
+        if 'District' in group_keys:
+            prices['District'] = price_data['District'].astype(str).to_numpy()
+        return prices.groupby(group_keys)[list(price_columns.values())].mean()
+
+    def yearly_table(self, data, columns):
+        """
+        Average selected columns per year.
+
+        Parameters:
+        data (pd.DataFrame): Year-level table
+        columns (dict): Mapping of source column to feature name
+
+        Returns:
+        pd.DataFrame: Features indexed by starting year, or None
+        """
+        if data is None or data.empty:
+            return None
+        year_col = next((col for col in ('Year', 'YEAR') if col in data.columns), None)
+        columns = {src: dst for src, dst in columns.items() if src in data.columns}
+        if year_col is None or not columns:
+            return None
+
+        yearly = pd.DataFrame({
+            dst: pd.to_numeric(data[src], errors='coerce') for src, dst in columns.items()
+        })
+        yearly['Year'] = _map_unique(data[year_col], parse_year).to_numpy()
+        yearly = yearly.dropna(subset=['Year']).groupby('Year').mean()
+        if 'avg_rainfall' in yearly.columns:
+            # Same kg/m2/s -> mm/year convention as the summary features
+            yearly['avg_rainfall'] = yearly['avg_rainfall'] * 3650
+        return yearly.astype(np.float32)
+
+    def _lookup(self, table, index_values):
+        """Gather rows of a lookup table for the given index values (NaN when absent)."""
+        positions = table.index.get_indexer(index_values)
+        values = table.to_numpy(dtype=np.float32)
+        gathered = values[np.maximum(positions, 0)]
+        gathered[positions < 0] = np.nan
+        return gathered
+
+    def _prepare(self, datasets):
+        """Collect the observation table and the lookup tables for the feature chunks."""
+        observations = self.build_observations(datasets)
+        if observations is None:
+            return None
+
+        by_district = 'District' in observations.columns
+        self.crop_index = pd.Index(sorted(observations['Crop'].unique()))
+        self.district_index = pd.Index(sorted(observations['District'].unique())) if by_district else None
+
+        # Prices without a District column stay per crop; the chunks look them up by their index levels
+        prices = self.crop_price_table(datasets.get('price'), by_district=by_district)
+
+        damage = datasets.get('damage')
+        damage_columns = {}
+        if damage is not None and not damage.empty:
+            damage_columns = {
+                col: f'damage_{_clean_column_name(col)}' for col in damage.columns if col not in ('Year', 'YEAR')
+            }
+
+        lookups = {
+            'prices': prices,
+            'damage': self.yearly_table(damage, damage_columns),
+            'weather': self.yearly_table(datasets.get('nasa_power'), _WEATHER_COLUMNS),
+        }
+
+        feature_names = ['year', 'crop_code']
+        if self.district_index is not None:
+            feature_names.append('district_code')
+        feature_names += ['area', 'area_lag1', 'yield_lag1', 'yield_rolling3', 'production_lag1']
+        for table in lookups.values():
+            if table is not None:
+                feature_names += list(table.columns)
+        self.feature_names = feature_names
+        return observations, lookups
+
+    def _feature_chunk(self, observations, lookups, start, stop):
+        """Assemble the float32 feature block for observation rows [start, stop)."""
+        chunk = observations.iloc[start:stop]
+        blocks = [
+            chunk['Year'].to_numpy(dtype=np.float32)[:, None],
+            self.crop_index.get_indexer(chunk['Crop']).astype(np.float32)[:, None],
+        ]
+        if self.district_index is not None:
+            blocks.append(self.district_index.get_indexer(chunk['District']).astype(np.float32)[:, None])
+        blocks.append(chunk[['Area', 'area_lag1', 'yield_lag1', 'yield_rolling3', 'production_lag1']].to_numpy(dtype=np.float32))
+
+        prices = lookups['prices']
+        if prices is not None:
+            if prices.index.nlevels == 2:
+                index_values = pd.MultiIndex.from_arrays([chunk['District'], chunk['Crop']])
+            else:
+                index_values = chunk['Crop']
+            blocks.append(self._lookup(prices, index_values))
+        for name in ('damage', 'weather'):
+            table = lookups[name]
+            if table is not None:
+                blocks.append(self._lookup(table, chunk['Year'].astype(np.float32)))
+
+        block = np.hstack(blocks)
+        # Missing values are filled with 0 like the rest of the pipeline
+        np.nan_to_num(block, copy=False, nan=0.0, posinf=0.0, neginf=0.0)
+        return block
+
+    def iter_chunks(self, datasets):
+        """
+        Yield the training matrix chunk by chunk.
+
+        Parameters:
+        datasets (dict): Datasets keyed 'area', 'yield', 'production', 'price', 'damage', 'nasa_power'
+
+        Yields:
+        tuple: (X_chunk, y_chunk) as a float32 DataFrame and Series
+        """
+        prepared = self._prepare(datasets)
+        if prepared is None:
+            return
+        observations, lookups = prepared
+        for start in range(0, len(observations), self.chunk_size):
+            stop = min(start + self.chunk_size, len(observations))
+            block = self._feature_chunk(observations, lookups, start, stop)
+            index = pd.RangeIndex(start, stop)
+            yield (pd.DataFrame(block, columns=self.feature_names, index=index),
+                   pd.Series(observations[TARGET_COLUMN].to_numpy(dtype=np.float32)[start:stop], index=index, name=TARGET_COLUMN))
+
+    def build_next_season(self, datasets):
+        """
+        Build the feature rows for predicting each crop's next season.
+
+        Rows have the training matrix columns: the year after the crop's last
+        observation, its latest area, and lags and rolling yield taken from the
+        end of its history. Damage and weather come from the latest year on
+        record, as the coming year's are not known yet.
+
+        Parameters:
+        datasets (dict): Datasets keyed 'area', 'yield', 'production', 'price', 'damage', 'nasa_power'
+
+        Returns:
+        pd.DataFrame: 'Crop' (and 'District') keys plus the float32 features, one row per
+        crop (and district), or None without yield data
+        """
+        prepared = self._prepare(datasets)
+        if prepared is None:
+            return None
+        observations, lookups = prepared
+
+        group_keys = [key for key in self.observation_keys if key != 'Year']
+        grouped = observations.groupby(group_keys, sort=False, observed=True)
+        recent = np.column_stack([grouped['Yield'].shift(k).to_numpy(dtype=np.float32) for k in (0, 1, 2)])
+        observations['next_rolling3'] = np.nanmean(recent, axis=1)
+        season = observations.groupby(group_keys, sort=False, observed=True).tail(1).reset_index(drop=True)
+
+        # The last observation becomes the lags of the next season
+        season['Year'] = season['Year'] + 1
+        season['yield_lag1'] = season['Yield']
+        season['yield_rolling3'] = season['next_rolling3']
+        season['area_lag1'] = season['Area']
+        season['production_lag1'] = season['Production']
+        for name in ('damage', 'weather'):
+            table = lookups[name]
+            if table is not None:
+                years = table.index.union(season['Year'].astype(np.float32).unique())
+                lookups[name] = table.reindex(years).ffill()
+
+        features = pd.DataFrame(self._feature_chunk(season, lookups, 0, len(season)), columns=self.feature_names)
+        for key in reversed(group_keys):
+            features.insert(0, key, season[key].astype(str).to_numpy())
+        return features
+
+    def build(self, datasets):
+        """
+        Build the full training matrix.
+
+        The feature array is allocated once as float32 and filled chunk by
+        chunk, so peak memory stays close to the size of the final matrix.
+
+        Parameters:
+        datasets (dict): Datasets keyed 'area', 'yield', 'production', 'price', 'damage', 'nasa_power'
+
+        Returns:
+        tuple: (X, y) as a float32 DataFrame and Series, or (None, None) without yield data
+        """
+        prepared = self._prepare(datasets)
+        if prepared is None:
+            return None, None
+        observations, lookups = prepared
+
+        n_rows = len(observations)
+        matrix = np.empty((n_rows, len(self.feature_names)), dtype=np.float32)
+        for start in range(0, n_rows, self.chunk_size):
+            stop = min(start + self.chunk_size, n_rows)
+            matrix[start:stop] = self._feature_chunk(observations, lookups, start, stop)
+
+        X = pd.DataFrame(matrix, columns=self.feature_names, copy=False)
+        y = pd.Series(observations[TARGET_COLUMN].to_numpy(dtype=np.float32), name=TARGET_COLUMN)
+        print(f"Built training matrix: {n_rows} observations x {len(self.feature_names)} features "
+              f"({matrix.nbytes / 1e6:.2f} MB float32)")
+        return X, y
@@ -14,13 +14,40 @@ import argparse
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from preprocessing.data_processor import AgriDataPreprocessor
+from preprocessing.firestore_reader import fetch_documents
+from preprocessing.feedback_ingestion import FeedbackIngestor, DEFAULT_SNAPSHOT_DIR
+from preprocessing.snapshot_store import SnapshotStore, DEFAULT_STORE_DIR
+from preprocessing.feedback_data import prepare_feedback_training_data, feedback_training_set
 from training.model_trainer import AgriYieldModel, AgriROIModel
-from firebase_admin import credentials, initialize_app, firestore
-import firebase_admin
+from training.incremental import IncrementalRetrainer, regression_metrics
+
+# Firebase is only needed to read feedback; snapshot training and evaluation run without it
+FIREBASE_AVAILABLE = False
+try:
+    from firebase_admin import credentials, initialize_app, firestore
+    import firebase_admin
+    FIREBASE_AVAILABLE = True
+except ImportError:
+    print("Firebase Admin SDK not available. Feedback can only be read from local snapshots.")
+
+# Fewest feedback records with a reported outcome needed to retrain a model
+MIN_FEEDBACK_ROWS = 10
+
+# Directory holding one v{version} subdirectory per retrained model version
+MODEL_VERSIONS_DIR = "models/saved_models"
+
+# Largest share of requested predictions that may fail to fetch before the run is aborted
+MAX_FAILED_PREDICTION_SHARE = 0.05
+
+class PredictionFetchError(Exception):
+    """Raised when too many predictions could not be fetched to train on the feedback."""
 
 # Initialize Firebase Admin SDK
 def initialize_firebase():
     """Initialize Firebase Admin SDK."""
+    if not FIREBASE_AVAILABLE:
+        print("Firebase Admin SDK not installed; install firebase-admin to read feedback from Firebase")
+        return None
     try:
         # Use service account key file (you'll need to create this)
         cred = credentials.Certificate("firebase-service-account.json")
@@ -66,33 +93,103 @@ def fetch_feedback_data(db, days_back=30):
         print(f"Error fetching feedback data: {e}")
         return []
 
-def fetch_prediction_data(db, prediction_ids):
+def fetch_prediction_data(db, prediction_ids, max_failed_share=MAX_FAILED_PREDICTION_SHARE):
     """
     Fetch prediction data for the given prediction IDs.
     
+    Predictions that still fail after the batch retries are reported; their
+    feedback cannot be joined, so the run is aborted when too many fail.
+    
     Parameters:
     db: Firestore client
     prediction_ids (list): List of prediction IDs
+    max_failed_share (float): Largest share of the predictions that may fail to fetch
     
     Returns:
     dict: Dictionary mapping prediction IDs to prediction data
+    
+    Raises:
+    PredictionFetchError: If more than max_failed_share of the predictions could not be fetched
     """
+    requested = len({prediction_id for prediction_id in prediction_ids if prediction_id})
     try:
-        prediction_data = {}
-        
-        for pred_id in prediction_ids:
-            try:
-                doc = db.collection('predictions').document(pred_id).get()
-                if doc.exists:
-                    prediction_data[pred_id] = doc.to_dict()
-            except Exception as e:
-                print(f"Error fetching prediction {pred_id}: {e}")
-        
-        print(f"Fetched {len(prediction_data)} prediction records")
-        return prediction_data
+        prediction_data, failed_ids = fetch_documents(db, 'predictions', prediction_ids)
+    except Exception as e:
+        raise PredictionFetchError(f"Error fetching prediction data: {e}") from e
+    print(f"Fetched {len(prediction_data)} prediction records")
+    if failed_ids:
+        print(f"Failed to fetch {len(failed_ids)} of {requested} prediction records, e.g. {', '.join(failed_ids[:5])}")
+        if len(failed_ids) > max_failed_share * requested:
+            raise PredictionFetchError(
+                f"{len(failed_ids)} of {requested} prediction records could not be fetched "
+                f"(more than {max_failed_share:.0%})"
+            )
+    return prediction_data
+
+def ingest_feedback_snapshot(db, days_back=30, snapshot_dir=DEFAULT_SNAPSHOT_DIR, store=None):
+    """
+    Append feedback written since the last run to the local snapshots.
+    
+    Only new feedback is read from Firebase, along with any predictions the
+    snapshot does not hold yet. The new feedback, and older feedback whose
+    prediction could not be fetched before, are joined and added to the
+    training snapshot store; the rest of the feedback snapshot is not re-read.
+    The watermark moves before the join, so if the join or the append fails
+    the new feedback is kept waiting for the next run.
+    
+    Parameters:
+    db: Firestore client
+    days_back (int): How far back to read on the first run
+    snapshot_dir (str): Local feedback snapshot directory
+    store (SnapshotStore): Training snapshot store (the default store if None)
+    
+    Returns:
+    set: IDs of the new feedback records
+    
+    Raises:
+    PredictionFetchError: If too many predictions could not be fetched; the
+        new feedback is kept waiting for the next run
+    """
+    try:
+        ingestor = FeedbackIngestor(db, snapshot_dir)
+        store = store or SnapshotStore()
+        # Read before ingesting, so the first run after an upgrade scans only the older feedback
+        unjoined = ingestor.load_unjoined()
+        new_feedback = ingestor.ingest(days_back)
+        new_feedback_ids = {feedback['id'] for feedback in new_feedback}
+        # Includes feedback whose prediction a previous run failed to fetch
+        pending = {feedback['id']: feedback for feedback in unjoined + new_feedback}
+        try:
+            prediction_data = ingestor.load_predictions()
+            missing_ids = {
+                feedback.get('prediction_id') for feedback in pending.values()
+                if feedback.get('prediction_id') and feedback.get('prediction_id') not in prediction_data
+            }
+            if missing_ids:
+                new_predictions = fetch_prediction_data(db, list(missing_ids))
+                ingestor.append_predictions(new_predictions)
+                prediction_data.update(new_predictions)
+            
+            # Join the new feedback, and older feedback whose prediction just arrived
+            ready = [
+                feedback for feedback in pending.values()
+                if feedback['id'] in new_feedback_ids or feedback.get('prediction_id') in prediction_data
+            ]
+            store.append(prepare_training_data(ready, prediction_data))
+        except Exception:
+            # The watermark has already moved past the new feedback, so keep all of it for the next run
+            ingestor.save_unjoined(list(pending.values()))
+            raise
+        ingestor.save_unjoined([
+            feedback for feedback in pending.values()
+            if feedback.get('prediction_id') and feedback.get('prediction_id') not in prediction_data
+        ])
+        return new_feedback_ids
+    except PredictionFetchError:
+        raise
     except Exception as e:
-        print(f"Error fetching prediction data: {e}")
-        return {}
+        print(f"Error ingesting feedback data: {e}")
+        return set()
 
 def prepare_training_data(feedback_data, prediction_data):
     """
@@ -106,52 +203,7 @@ def prepare_training_data(feedback_data, prediction_data):
     pd.DataFrame: Training data
     """
     try:
-        training_records = []
-        
-        for feedback in feedback_data:
-            pred_id = feedback.get('prediction_id')
-            if not pred_id or pred_id not in prediction_data:
-                continue
-                
-            prediction = prediction_data[pred_id]
-            farmer_data = prediction.get('farmer_data', {})
-            predictions = prediction.get('predictions', {})
-            
-            # Create a training record
-            record = {
-                # Original predictions
-                'predicted_yield': predictions.get('yield_kg_per_acre', 0),
-                'predicted_roi': predictions.get('roi', 0),
-                
-                # Actual values from feedback
-                'actual_yield': feedback.get('yield_actual', 0),
-                'actual_roi': feedback.get('roi_actual', 0),
-                
-                # Farmer input data
-                'land_area_acres': farmer_data.get('land_area_acres', 1),
-                'budget_inr': farmer_data.get('budget_inr', 50000),
-                
-                # Soil data
-                'soil_ph': farmer_data.get('soil', {}).get('ph', 6.5),
-                'soil_organic_carbon': farmer_data.get('soil', {}).get('organic_carbon', 1.0),
-                'soil_nitrogen': farmer_data.get('soil', {}).get('nitrogen', 150),
-                'soil_phosphorus': farmer_data.get('soil', {}).get('phosphorus', 30),
-                'soil_potassium': farmer_data.get('soil', {}).get('potassium', 150),
-                
-                # Weather data (if available in prediction)
-                'avg_temperature_c': prediction.get('weather_data', {}).get('avg_temperature_c', 25),
-                'avg_rainfall_mm': prediction.get('weather_data', {}).get('avg_rainfall_mm', 1000),
-                'avg_humidity': prediction.get('weather_data', {}).get('avg_humidity', 65),
-                'solar_radiation': prediction.get('weather_data', {}).get('solar_radiation', 5),
-                
-                # Feedback metadata
-                'accuracy_rating': feedback.get('accuracy_rating', 3),
-                'timestamp': feedback.get('timestamp')
-            }
-            
-            training_records.append(record)
-        
-        training_df = pd.DataFrame(training_records)
+        training_df = prepare_feedback_training_data(feedback_data, prediction_data)
         print(f"Prepared {len(training_df)} training records")
         return training_df
     except Exception as e:
@@ -166,64 +218,188 @@ def retrain_models(training_data):
     training_data (pd.DataFrame): Training data
     
     Returns:
-    tuple: (yield_model, roi_model) or (None, None) if failed
+    tuple: (yield_model, roi_model, metrics) or (None, None, {}) if failed
     """
     try:
         if training_data.empty:
             print("No training data available")
-            return None, None
+            return None, None, {}
         
         print("Retraining models with feedback data...")
         
-        # Initialize models
-        yield_model = AgriYieldModel()
-        roi_model = AgriROIModel()
+        metrics = {'yield_metrics': {}, 'roi_metrics': {}, 'data_points': len(training_data)}
         
-        # For this simplified implementation, we'll create mock datasets
-        # In a real implementation, you would use the training_data to update the models
-        mock_datasets = {
-            '1. NASA POWER Data (Rainfall, Temperature, Humidity, Radiation) 👆🏻': None,
-            'All India level Average Yield of Principal Crops from 2001-02 to 2015-16': None,
-            'All India level Area Under Principal Crops from 2001-02 to 2015-16': None,
-            'Production of principle crops': None,
-            'price': None,
-            'Year-wise Damage Caused Due To Floods, Cyclonic Storm, Landslides etc': None
-        }
+        # Train each model on the records that report its actual outcome
+        yield_model = None
+        X_yield, y_yield = feedback_training_set(training_data, 'yield')
+        if len(X_yield) >= MIN_FEEDBACK_ROWS:
+            yield_model = AgriYieldModel()
+            metrics['yield_metrics'] = yield_model.fit(X_yield, y_yield)
+        else:
+            print(f"Only {len(X_yield)} records report an actual yield; skipping yield model")
         
-        # Train models (in a real implementation, you would incorporate the feedback data)
-        yield_metrics = yield_model.train(mock_datasets)
-        roi_metrics = roi_model.train(mock_datasets)
+        roi_model = None
+        X_roi, y_roi = feedback_training_set(training_data, 'roi')
+        if len(X_roi) >= MIN_FEEDBACK_ROWS:
+            roi_model = AgriROIModel()
+            metrics['roi_metrics'] = roi_model.fit(X_roi, y_roi)
+        else:
+            print(f"Only {len(X_roi)} records report an actual ROI; skipping ROI model")
         
         print("Models retrained successfully")
-        return yield_model, roi_model
+        return yield_model, roi_model, metrics
     except Exception as e:
         print(f"Error retraining models: {e}")
+        return None, None, {}
+
+def warm_start_retrain(training_data, new_feedback_ids, compare=False):
+    """
+    Update the latest retrained models with the new feedback only.
+    
+    Parameters:
+    training_data (pd.DataFrame): All training rows in the snapshot
+    new_feedback_ids (set): IDs of the feedback added since the last retraining
+    compare (bool): Also run a full retrain and report both side by side
+    
+    Returns:
+    tuple: (yield_model, roi_model, metrics); a model is None if it was left
+    unchanged (too little new feedback) or could not be trained, and both are None if retraining failed
+    """
+    try:
+        is_new = training_data['feedback_id'].isin(new_feedback_ids)
+        old_data = training_data[~is_new]
+        new_data = training_data[is_new]
+        
+        previous_yield, previous_roi = load_latest_models()
+        yield_model, roi_model, report = IncrementalRetrainer().retrain(
+            previous_yield, previous_roi, old_data, new_data, compare=compare
+        )
+        
+        metrics = {
+            'yield_metrics': report['yield']['runs'].get(report['yield']['mode'], {}),
+            'roi_metrics': report['roi']['runs'].get(report['roi']['mode'], {}),
+            'retrain_modes': {'yield': report['yield']['mode'], 'roi': report['roi']['mode']},
+            'data_points': len(training_data)
+        }
+        # Unchanged models are the previous version's; they are not saved again
+        if report['yield']['mode'] == 'unchanged':
+            yield_model = None
+        if report['roi']['mode'] == 'unchanged':
+            roi_model = None
+        return yield_model, roi_model, metrics
+    except Exception as e:
+        print(f"Error warm-start retraining models: {e}")
+        return None, None, {}
+
+def evaluate_saved_models(version, training_data):
+    """
+    Score a saved model version on snapshot rows, without Firebase.
+    
+    Parameters:
+    version (str): Model version identifier
+    training_data (pd.DataFrame): Rows from the training snapshot store
+    
+    Returns:
+    dict: Metrics per model
+    """
+    model_dir = os.path.join(MODEL_VERSIONS_DIR, f"v{version}")
+    results = {}
+    for target, model_class, name in (('yield', AgriYieldModel, 'yield_model'), ('roi', AgriROIModel, 'roi_model')):
+        X, y = feedback_training_set(training_data, target)
+        if X.empty:
+            print(f"No snapshot rows report an actual {target}")
+            continue
+        if not has_saved_model(model_dir, name):
+            print(f"Version v{version} has no {name}")
+            continue
+        model = model_class()
+        model.load_model(os.path.join(model_dir, name))
+        results[f"{target}_metrics"] = regression_metrics(y, IncrementalRetrainer.predict_rows(model, X))
+        metrics = results[f"{target}_metrics"]
+        print(f"{name} v{version} on {len(X)} rows: MSE {metrics['mse']:.4f}, MAE {metrics['mae']:.4f}, R² {metrics['r2']:.4f}")
+    return results
+
+def has_saved_model(model_dir, name):
+    """
+    Whether a version directory holds a model, as a bundle or legacy pickles.
+    
+    Parameters:
+    model_dir (str): Version directory
+    name (str): Model name, e.g. 'yield_model'
+    
+    Returns:
+    bool: True if the model was saved in the directory
+    """
+    return any(filename.startswith(f"{name}.") or filename.startswith(f"{name}_") for filename in os.listdir(model_dir))
+
+def load_latest_models(versions_dir=None):
+    """
+    Load the most recently saved retrained models.
+    
+    Versions hold only the models that changed, so each model is loaded from
+    the latest version that saved it.
+    
+    Parameters:
+    versions_dir (str): Directory holding the v{version} model directories (MODEL_VERSIONS_DIR if None)
+    
+    Returns:
+    tuple: (yield_model, roi_model), None for models that are not available
+    """
+    versions_dir = versions_dir or MODEL_VERSIONS_DIR
+    if not os.path.isdir(versions_dir):
         return None, None
+    version_dirs = sorted((
+        os.path.join(versions_dir, name) for name in os.listdir(versions_dir)
+        if name.startswith('v') and os.path.isdir(os.path.join(versions_dir, name))
+    ), key=os.path.getmtime, reverse=True)
+    
+    models = []
+    for model_class, name in ((AgriYieldModel, 'yield_model'), (AgriROIModel, 'roi_model')):
+        latest = next((model_dir for model_dir in version_dirs if has_saved_model(model_dir, name)), None)
+        if latest is None:
+            models.append(None)
+            continue
+        try:
+            model = model_class()
+            model.load_model(os.path.join(latest, name))
+            models.append(model)
+            print(f"Loaded previous {name} from {latest}")
+        except Exception as e:
+            print(f"Could not load previous {name} from {latest}: {e}")
+            models.append(None)
+    return tuple(models)
 
 def save_retrained_models(yield_model, roi_model, version):
     """
-    Save the retrained models with a new version.
+    Save the retrained models under a new version.
+    
+    Each model is saved on its own, so a version holds only the models that
+    were retrained; no version is created if neither was.
     
     Parameters:
-    yield_model: Retrained yield model
-    roi_model: Retrained ROI model
+    yield_model: Retrained yield model (None if it was not retrained)
+    roi_model: Retrained ROI model (None if it was not retrained)
     version (str): Model version identifier
+    
+    Returns:
+    list: Names of the saved models
     """
-    try:
-        if yield_model and roi_model:
-            # Create versioned model directory
-            model_dir = f"models/saved_models/v{version}"
+    saved = []
+    model_dir = os.path.join(MODEL_VERSIONS_DIR, f"v{version}")
+    for model, name in ((yield_model, 'yield_model'), (roi_model, 'roi_model')):
+        if model is None:
+            continue
+        try:
             os.makedirs(model_dir, exist_ok=True)
-            
-            # Save models
-            yield_model.save_model(f"{model_dir}/yield_model")
-            roi_model.save_model(f"{model_dir}/roi_model")
-            
-            print(f"Retrained models saved to {model_dir}")
-        else:
-            print("No models to save")
-    except Exception as e:
-        print(f"Error saving retrained models: {e}")
+            model.save_model(os.path.join(model_dir, name))
+            saved.append(name)
+        except Exception as e:
+            print(f"Error saving retrained {name}: {e}")
+    if saved:
+        print(f"Retrained {' and '.join(saved)} saved to {model_dir}")
+    else:
+        print("No models to save")
+    return saved
 
 def update_model_version_info(db, version, metrics):
     """
@@ -253,54 +429,93 @@ def main():
     parser = argparse.ArgumentParser(description='Retrain models with feedback data')
     parser.add_argument('--days', type=int, default=30, help='Number of days back to fetch feedback data')
     parser.add_argument('--version', type=str, default=None, help='Model version identifier')
+    parser.add_argument('--incremental', action='store_true', help='Only fetch feedback added since the last run and train on the local snapshot')
+    parser.add_argument('--snapshot-dir', type=str, default=DEFAULT_SNAPSHOT_DIR, help='Local feedback snapshot directory')
+    parser.add_argument('--warm-start', action='store_true', help='Update the latest models with the new feedback instead of retraining from scratch (needs --incremental)')
+    parser.add_argument('--compare', action='store_true', help='With --warm-start, also run a full retrain and report both')
+    parser.add_argument('--from-snapshot', action='store_true', help='Train on the local training snapshot store without contacting Firebase')
+    parser.add_argument('--store-dir', type=str, default=DEFAULT_STORE_DIR, help='Training snapshot store directory')
+    parser.add_argument('--start-date', type=str, default=None, help='First feedback date (YYYY-MM-DD) to train or evaluate on')
+    parser.add_argument('--end-date', type=str, default=None, help='Last feedback date (YYYY-MM-DD) to train or evaluate on')
+    parser.add_argument('--evaluate', type=str, default=None, metavar='VERSION', help='Score a saved model version on the training snapshot store and exit')
     args = parser.parse_args()
     
     print("=== Sasya-Mitra Model Retraining ===")
-    print(f"Fetching feedback data from the last {args.days} days")
-    
-    # Initialize Firebase
-    db = initialize_firebase()
-    if not db:
-        print("Failed to initialize Firebase. Exiting.")
-        return
+    store = SnapshotStore(args.store_dir)
     
-    # Fetch feedback data
-    feedback_data = fetch_feedback_data(db, args.days)
-    if not feedback_data:
-        print("No feedback data available for retraining")
+    if args.evaluate:
+        evaluate_saved_models(args.evaluate, store.read(args.start_date, args.end_date))
         return
     
-    # Extract prediction IDs
-    prediction_ids = [feedback.get('prediction_id') for feedback in feedback_data if feedback.get('prediction_id')]
-    prediction_ids = list(set(prediction_ids))  # Remove duplicates
+    db = None
+    if not args.from_snapshot:
+        # Initialize Firebase
+        db = initialize_firebase()
+        if not db:
+            print("Failed to initialize Firebase. Exiting.")
+            return
     
-    # Fetch prediction data
-    prediction_data = fetch_prediction_data(db, prediction_ids)
+    new_feedback_ids = set()
+    if args.from_snapshot:
+        print(f"Loading training data from {args.store_dir}")
+        training_data = store.read(args.start_date, args.end_date)
+    elif args.incremental:
+        print(f"Fetching new feedback data into {args.snapshot_dir}")
+        try:
+            new_feedback_ids = ingest_feedback_snapshot(db, args.days, args.snapshot_dir, store)
+        except PredictionFetchError as e:
+            print(f"{e}. Exiting.")
+            return
+        if not new_feedback_ids:
+            print("No new feedback data since the last retraining")
+            return
+        training_data = store.read(args.start_date, args.end_date)
+    else:
+        print(f"Fetching feedback data from the last {args.days} days")
+        
+        # Fetch feedback data
+        feedback_data = fetch_feedback_data(db, args.days)
+        if not feedback_data:
+            print("No feedback data available for retraining")
+            return
+        
+        # Extract prediction IDs
+        prediction_ids = [feedback.get('prediction_id') for feedback in feedback_data if feedback.get('prediction_id')]
+        prediction_ids = list(set(prediction_ids))  # Remove duplicates
+        
+        # Fetch prediction data
+        try:
+            prediction_data = fetch_prediction_data(db, prediction_ids)
+        except PredictionFetchError as e:
+            print(f"{e}. Exiting.")
+            return
+        
+        # Prepare training data
+        training_data = prepare_training_data(feedback_data, prediction_data)
     
-    # Prepare training data
-    training_data = prepare_training_data(feedback_data, prediction_data)
     if training_data.empty:
         print("No training data prepared. Exiting.")
         return
     
     # Retrain models
-    yield_model, roi_model = retrain_models(training_data)
+    if args.incremental and args.warm_start:
+        yield_model, roi_model, metrics = warm_start_retrain(training_data, new_feedback_ids, args.compare)
+    else:
+        yield_model, roi_model, metrics = retrain_models(training_data)
     
     # Save retrained models
     version = args.version or datetime.now().strftime("%Y%m%d_%H%M%S")
-    save_retrained_models(yield_model, roi_model, version)
+    if not save_retrained_models(yield_model, roi_model, version):
+        print("No model changed; no new version was created.")
+        return
     
     # Update model version info in Firebase
-    metrics = {
-        'yield_metrics': {},  # In a real implementation, you would include actual metrics
-        'roi_metrics': {},    # In a real implementation, you would include actual metrics
-        'data_points': len(training_data)
-    }
-    update_model_version_info(db, version, metrics)
+    if db:
+        update_model_version_info(db, version, metrics)
     
     print("\n=== Retraining Complete ===")
     print(f"Models have been retrained with {len(training_data)} feedback records")
     print(f"New model version: {version}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,59 +1,359 @@
 """
-Script to schedule periodic model retraining.
-This script can be run as a cron job or scheduled task.
+Long-lived model retraining service.
+
+Runs in one process that keeps pandas/scikit-learn/XGBoost imported, the
+Firebase client open and the feedback snapshot in memory. It polls for new
+feedback and retrains when enough new feedback has arrived or when the
+retraining interval has passed. Each retraining job runs in a forked child
+with CPU and memory limits, under a file lock so two retrains never overlap,
+and every run's duration and outcome is appended to a JSON lines log.
 """
 
-import schedule
-import time
-import subprocess
-import sys
 import os
-from datetime import datetime
+import sys
+import json
+import time
+import fcntl
+import resource
+import argparse
+import multiprocessing
+from multiprocessing.connection import wait
+from datetime import datetime, timedelta
+
+# Add the current directory to the path to import modules
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from retrain_model import (
+    initialize_firebase, fetch_prediction_data, prepare_training_data, retrain_models,
+    warm_start_retrain, save_retrained_models, update_model_version_info, PredictionFetchError
+)
+import pandas as pd
+
+from preprocessing.feedback_ingestion import FeedbackIngestor, DEFAULT_SNAPSHOT_DIR
+from preprocessing.snapshot_store import SnapshotStore, DEFAULT_STORE_DIR
+
+# Retrain at least this often
+DEFAULT_INTERVAL_DAYS = 30
+
+# Retrain early once this much new feedback has arrived
+DEFAULT_MIN_NEW_FEEDBACK = 500
+
+# How often to check for new feedback
+DEFAULT_POLL_MINUTES = 10
+
+# Per-job resource limits
+DEFAULT_CPU_SECONDS = 2 * 60 * 60
+DEFAULT_MEMORY_MB = 4096
+DEFAULT_WALL_SECONDS = 3 * 60 * 60
+
+# Service state, run log and job lock
+DEFAULT_STATE_DIR = "models/retraining"
 
-def run_retraining():
-    """Run the model retraining script."""
-    print(f"[{datetime.now()}] Starting model retraining...")
-    
+def _apply_job_limits(cpu_seconds, memory_mb, cores):
+    """
+    Cap the CPU time, address space and cores of the current (child) process.
+
+    Parameters:
+    cpu_seconds (int): CPU seconds before the kernel stops the job
+    memory_mb (int): Address space limit in MB
+    cores (int): Number of cores the job may run on (all if None)
+    """
+    resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds))
+    memory_bytes = memory_mb * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_AS, (memory_bytes, memory_bytes))
+    if cores and hasattr(os, 'sched_setaffinity'):
+        available = sorted(os.sched_getaffinity(0))
+        os.sched_setaffinity(0, available[:cores])
+
+def _retraining_job(sender, training_data, new_feedback_ids, version, warm_start, limits):
+    """
+    Train and save new model versions inside the forked job process.
+
+    The child inherits the parent's imported libraries and in-memory training
+    rows; it does not touch Firebase.
+
+    Parameters:
+    sender (multiprocessing.Connection): Receives the job outcome
+    training_data (pd.DataFrame): All training rows
+    new_feedback_ids (set): Feedback added since the last retraining
+    version (str): Model version identifier
+    warm_start (bool): Update the previous models instead of retraining from scratch
+    limits (dict): cpu_seconds, memory_mb and cores for the job
+    """
     try:
-        # Run the retraining script
-        result = subprocess.run([
-            sys.executable, 
-            os.path.join(os.path.dirname(__file__), 'retrain_model.py'),
-            '--days', '30'
-        ], capture_output=True, text=True)
-        
-        if result.returncode == 0:
-            print(f"[{datetime.now()}] Model retraining completed successfully")
-            print(result.stdout)
+        _apply_job_limits(**limits)
+        if warm_start:
+            yield_model, roi_model, metrics = warm_start_retrain(training_data, new_feedback_ids)
         else:
-            print(f"[{datetime.now()}] Model retraining failed")
-            print(result.stderr)
+            yield_model, roi_model, metrics = retrain_models(training_data)
+        saved = save_retrained_models(yield_model, roi_model, version)
+        if not saved:
+            sender.send({'outcome': 'failed', 'error': 'not enough feedback to retrain either model'})
+            return
+        sender.send({'outcome': 'success', 'models': saved, 'metrics': metrics})
+    except MemoryError:
+        sender.send({'outcome': 'failed', 'error': f"memory limit of {limits['memory_mb']} MB exceeded"})
     except Exception as e:
-        print(f"[{datetime.now()}] Error running retraining script: {e}")
-
-def schedule_retraining():
-    """Schedule model retraining."""
-    # Schedule monthly retraining (runs on the 1st of every month at 2:00 AM)
-    schedule.every().month.do(run_retraining)
-    
-    # Alternatively, you can schedule:
-    # Weekly: schedule.every().week.do(run_retraining)
-    # Daily: schedule.every().day.do(run_retraining)
-    # Hourly: schedule.every().hour.do(run_retraining)
-    
-    print("Model retraining scheduled:")
-    print("- Monthly on the 1st at 2:00 AM")
-    print("Scheduler started. Press Ctrl+C to stop.")
-    
-    # Run the scheduler
-    while True:
-        schedule.run_pending()
-        time.sleep(60)  # Check every minute
+        sender.send({'outcome': 'failed', 'error': str(e)})
+
+class RetrainingService:
+    """
+    Retrains models in-process on feedback-count and time triggers.
+    """
+
+    def __init__(self, db, snapshot_dir=DEFAULT_SNAPSHOT_DIR, store_dir=DEFAULT_STORE_DIR, state_dir=DEFAULT_STATE_DIR,
+                 interval_days=DEFAULT_INTERVAL_DAYS, min_new_feedback=DEFAULT_MIN_NEW_FEEDBACK,
+                 cpu_seconds=DEFAULT_CPU_SECONDS, memory_mb=DEFAULT_MEMORY_MB,
+                 wall_seconds=DEFAULT_WALL_SECONDS, cores=None, warm_start=False, days_back=30):
+        self.db = db
+        self.ingestor = FeedbackIngestor(db, snapshot_dir)
+        self.store = SnapshotStore(store_dir)
+        self.interval = timedelta(days=interval_days)
+        self.min_new_feedback = min_new_feedback
+        self.limits = {'cpu_seconds': cpu_seconds, 'memory_mb': memory_mb, 'cores': cores}
+        self.wall_seconds = wall_seconds
+        self.warm_start = warm_start
+        self.days_back = days_back
+
+        os.makedirs(state_dir, exist_ok=True)
+        self.state_path = os.path.join(state_dir, "service_state.json")
+        self.run_log_path = os.path.join(state_dir, "runs.jsonl")
+        self.lock_path = os.path.join(state_dir, "retrain.lock")
+
+        # The snapshots are read from disk once and then kept up to date in memory
+        feedback_data, self.prediction_data = self.ingestor.load_snapshot()
+        self.feedback = {record['id']: record for record in feedback_data}
+        self.training_data = self.store.read()
+        self.state = self.load_state()
+        print(f"Loaded {len(self.training_data)} training rows, "
+              f"{len(self.state['pending_feedback_ids'])} not yet used for training")
+
+    def load_state(self):
+        """
+        Load the time of the last successful retrain and the feedback not yet trained on.
+
+        Returns:
+        dict: last_success (datetime or None) and pending_feedback_ids (set)
+        """
+        state = {'last_success': None, 'pending_feedback_ids': set()}
+        if os.path.exists(self.state_path):
+            with open(self.state_path, 'r') as f:
+                saved = json.load(f)
+            if saved.get('last_success'):
+                state['last_success'] = datetime.fromisoformat(saved['last_success'])
+            state['pending_feedback_ids'] = set(saved.get('pending_feedback_ids', []))
+        return state
+
+    def save_state(self):
+        """Persist the service state atomically."""
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({
+                'last_success': self.state['last_success'].isoformat() if self.state['last_success'] else None,
+                'pending_feedback_ids': sorted(self.state['pending_feedback_ids'])
+            }, f)
+        os.replace(tmp_path, self.state_path)
+
+    def record_run(self, run):
+        """Append one run's trigger, duration and outcome to the run log."""
+        with open(self.run_log_path, 'a') as f:
+            f.write(json.dumps(run, default=str) + "\n")
+
+    def poll_feedback(self):
+        """
+        Add feedback written since the last poll to the in-memory snapshot.
+
+        Returns:
+        int: Number of new feedback records
+        """
+        new_feedback = self.ingestor.ingest(self.days_back)
+        for record in new_feedback:
+            self.feedback[record['id']] = record
+        new_feedback_ids = {record['id'] for record in new_feedback}
+        self.state['pending_feedback_ids'].update(new_feedback_ids)
+
+        missing_ids = {
+            record.get('prediction_id') for record in self.feedback.values()
+            if record.get('prediction_id') and record.get('prediction_id') not in self.prediction_data
+        }
+        new_predictions = {}
+        if missing_ids:
+            new_predictions = fetch_prediction_data(self.db, list(missing_ids))
+            self.ingestor.append_predictions(new_predictions)
+            self.prediction_data.update(new_predictions)
+        # Keep the snapshot's unjoined list current for incremental retrain_model runs
+        self.ingestor.save_unjoined([
+            record for record in self.feedback.values()
+            if record.get('prediction_id') and record.get('prediction_id') not in self.prediction_data
+        ])
+
+        # Join the new feedback, and older feedback whose prediction just arrived
+        ready = [
+            record for record in self.feedback.values()
+            if record['id'] in new_feedback_ids or record.get('prediction_id') in new_predictions
+        ]
+        rows = prepare_training_data(ready, self.prediction_data)
+        if not rows.empty:
+            self.store.append(rows)
+            self.training_data = pd.concat([self.training_data, rows], ignore_index=True)
+            self.training_data = self.training_data.drop_duplicates(subset='feedback_id', keep='last')
+
+        self.save_state()
+        return len(new_feedback)
+
+    def due_trigger(self, now=None):
+        """
+        Decide whether a retrain is due.
+
+        Returns:
+        str: 'feedback_count' or 'interval', or None if no retrain is due
+        """
+        now = now or datetime.now()
+        if not self.state['pending_feedback_ids']:
+            return None
+        if len(self.state['pending_feedback_ids']) >= self.min_new_feedback:
+            return 'feedback_count'
+        if self.state['last_success'] is None or now - self.state['last_success'] >= self.interval:
+            return 'interval'
+        return None
+
+    def run_job(self, trigger):
+        """
+        Run one retraining job in a forked, resource-limited child under the job lock.
+
+        Parameters:
+        trigger (str): What triggered the run
+
+        Returns:
+        dict: The run record
+        """
+        started = datetime.now()
+        version = started.strftime("%Y%m%d_%H%M%S")
+        pending_ids = set(self.state['pending_feedback_ids'])
+        run = {
+            'version': version,
+            'trigger': trigger,
+            'started_at': started.isoformat(),
+            'training_rows': len(self.training_data),
+            'new_feedback_records': len(pending_ids),
+            'warm_start': self.warm_start
+        }
+
+        with open(self.lock_path, 'w') as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                run.update(outcome='skipped', error='another retraining job holds the lock', duration_seconds=0.0)
+                self.record_run(run)
+                print(f"[{datetime.now()}] Retraining skipped: another job is running")
+                return run
+
+            print(f"[{started}] Starting model retraining ({trigger}, {len(pending_ids)} new feedback records)...")
+            wall_start = time.perf_counter()
+
+            # Forking keeps the imported libraries and the in-memory snapshot warm
+            context = multiprocessing.get_context('fork')
+            receiver, sender = context.Pipe(duplex=False)
+            job = context.Process(target=_retraining_job, args=(
+                sender, self.training_data, pending_ids, version, self.warm_start, self.limits
+            ))
+            job.start()
+            sender.close()
+
+            if not wait([receiver], self.wall_seconds):
+                job.terminate()
+                result = {'outcome': 'failed', 'error': f"wall time limit of {self.wall_seconds}s exceeded"}
+            else:
+                try:
+                    result = receiver.recv()
+                except EOFError:
+                    # The job died without reporting, e.g. killed at its CPU time limit
+                    job.join()
+                    result = {'outcome': 'failed', 'error': f"job exited with code {job.exitcode}"}
+            job.join()
+            receiver.close()
+
+            run.update(result)
+            run['duration_seconds'] = time.perf_counter() - wall_start
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+        if run['outcome'] == 'success':
+            self.state['last_success'] = started
+            self.state['pending_feedback_ids'] -= pending_ids
+            self.save_state()
+            update_model_version_info(self.db, version, run['metrics'])
+            print(f"[{datetime.now()}] Model retraining completed successfully in {run['duration_seconds']:.1f}s")
+        else:
+            print(f"[{datetime.now()}] Model retraining failed: {run.get('error')}")
+
+        self.record_run(run)
+        return run
+
+    def run_once(self):
+        """
+        Poll for new feedback and retrain if a trigger is due.
+
+        A poll that could not fetch the predictions of too much new feedback is
+        recorded as a failed run and nothing is retrained until the predictions arrive.
+
+        Returns:
+        dict: The run record, or None if no retrain was due
+        """
+        try:
+            self.poll_feedback()
+        except PredictionFetchError as e:
+            run = {'trigger': 'poll', 'started_at': datetime.now().isoformat(), 'outcome': 'failed',
+                   'error': str(e), 'duration_seconds': 0.0}
+            self.record_run(run)
+            print(f"[{datetime.now()}] Retraining skipped: {e}")
+            return run
+        except Exception as e:
+            print(f"[{datetime.now()}] Error polling feedback: {e}")
+        trigger = self.due_trigger()
+        return self.run_job(trigger) if trigger else None
+
+    def run_forever(self, poll_minutes=DEFAULT_POLL_MINUTES):
+        """Poll and retrain until interrupted."""
+        print(f"Retraining service started: every {self.interval.days} days or "
+              f"after {self.min_new_feedback} new feedback records, polling every {poll_minutes} minutes.")
+        print("Press Ctrl+C to stop.")
+        while True:
+            self.run_once()
+            time.sleep(poll_minutes * 60)
+
+def main():
+    """Start the retraining service."""
+    parser = argparse.ArgumentParser(description='Run the model retraining service')
+    parser.add_argument('--interval-days', type=float, default=DEFAULT_INTERVAL_DAYS, help='Retrain at least this often')
+    parser.add_argument('--min-new-feedback', type=int, default=DEFAULT_MIN_NEW_FEEDBACK, help='Retrain once this many new feedback records arrived')
+    parser.add_argument('--poll-minutes', type=float, default=DEFAULT_POLL_MINUTES, help='How often to check for new feedback')
+    parser.add_argument('--cpu-seconds', type=int, default=DEFAULT_CPU_SECONDS, help='CPU time limit per retraining job')
+    parser.add_argument('--memory-mb', type=int, default=DEFAULT_MEMORY_MB, help='Memory limit per retraining job')
+    parser.add_argument('--wall-seconds', type=int, default=DEFAULT_WALL_SECONDS, help='Wall time limit per retraining job')
+    parser.add_argument('--cores', type=int, default=None, help='Cores per retraining job (default: all)')
+    parser.add_argument('--warm-start', action='store_true', help='Update the latest models instead of retraining from scratch')
+    parser.add_argument('--once', action='store_true', help='Check once and exit (for cron)')
+    args = parser.parse_args()
+
+    db = initialize_firebase()
+    if not db:
+        print("Failed to initialize Firebase. Exiting.")
+        return
+
+    service = RetrainingService(
+        db, interval_days=args.interval_days, min_new_feedback=args.min_new_feedback,
+        cpu_seconds=args.cpu_seconds, memory_mb=args.memory_mb, wall_seconds=args.wall_seconds,
+        cores=args.cores, warm_start=args.warm_start
+    )
+    if args.once:
+        service.run_once()
+    else:
+        service.run_forever(args.poll_minutes)
 
 if __name__ == "__main__":
     try:
-        schedule_retraining()
+        main()
     except KeyboardInterrupt:
-        print("\nScheduler stopped.")
+        print("\nRetraining service stopped.")
     except Exception as e:
-        print(f"Scheduler error: {e}")
\ No newline at end of file
+        print(f"Retraining service error: {e}")
@@ -9,6 +9,8 @@ This script demonstrates how to use your historical datasets:
 
 import sys
 import os
+import json
+import argparse
 import pandas as pd
 import numpy as np
 from pathlib import Path
@@ -17,7 +19,10 @@ from pathlib import Path
 sys.path.append(str(Path(__file__).parent))
 
 from preprocessing.data_processor import AgriDataPreprocessor
-from training.model_trainer import AgriYieldModel, AgriROIModel
+from training.model_trainer import AgriYieldModel, AgriROIModel, split_training_data
+from training.forest_compaction import ForestCompactor
+from training.parallel_trainer import ParallelModelTrainer
+from training.tuning import HyperparameterTuner, save_tuning_results, load_tuned_params
 
 class HistoricalDataTrainer:
     """
@@ -164,18 +169,11 @@ class HistoricalDataTrainer:
         
         return preprocessed_datasets
     
-    def train_yield_model(self, preprocessed_datasets):
+    def package_model_datasets(self, preprocessed_datasets):
         """
-        Train the yield prediction model using historical datasets.
+        Package preprocessed datasets under the keys the models expect.
         """
-        print("\nTraining Yield Prediction Model...")
-        print("=" * 35)
-        
-        # Initialize model
-        yield_model = AgriYieldModel()
-        
-        # Package datasets in the expected format
-        model_datasets = {
+        return {
             '1. NASA POWER Data (Rainfall, Temperature, Humidity, Radiation) 👆🏻': preprocessed_datasets.get('nasa_power'),
             'All India level Average Yield of Principal Crops from 2001-02 to 2015-16': preprocessed_datasets.get('yield'),
             'All India level Area Under Principal Crops from 2001-02 to 2015-16': preprocessed_datasets.get('area'),
@@ -183,6 +181,97 @@ class HistoricalDataTrainer:
             'price': preprocessed_datasets.get('price'),
             'Year-wise Damage Caused Due To Floods, Cyclonic Storm, Landslides etc': preprocessed_datasets.get('damage')
         }
+    
+    def train_models_in_parallel(self, preprocessed_datasets):
+        """
+        Train the yield and ROI models concurrently using historical datasets.
+        """
+        print("\nTraining Yield and ROI Models in Parallel...")
+        print("=" * 44)
+        
+        model_datasets = self.package_model_datasets(preprocessed_datasets)
+        yield_params = load_tuned_params("saved_models/yield_model")
+        yield_model = AgriYieldModel(rf_params=yield_params.get('rf'), xgb_params=yield_params.get('xgb'))
+        roi_model = AgriROIModel(xgb_params=load_tuned_params("saved_models/roi_model").get('xgb'))
+        
+        try:
+            X_yield, y_yield = yield_model.prepare_training_data(model_datasets)
+            X_roi, y_roi = roi_model.prepare_training_data(model_datasets)
+            
+            trainer = ParallelModelTrainer()
+            yield_model, roi_model, report = trainer.train(
+                X_yield, y_yield, X_roi, y_roi, yield_model=yield_model, roi_model=roi_model
+            )
+            
+            print(f"\nRandom Forest R²: {report['yield_metrics']['rf_metrics']['r2']:.4f}")
+            print(f"XGBoost R²: {report['yield_metrics']['xgb_metrics']['r2']:.4f}")
+            print(f"ROI Model R²: {report['roi_metrics']['r2']:.4f}")
+            
+            yield_model.save_model("saved_models/yield_model")
+            roi_model.save_model("saved_models/roi_model")
+            print("✅ Yield and ROI models saved to: saved_models/")
+            
+            return yield_model, roi_model
+            
+        except Exception as e:
+            print(f"❌ Error training models in parallel: {e}")
+            import traceback
+            traceback.print_exc()
+            return None, None
+    
+    def tune_hyperparameters(self, preprocessed_datasets, method='halving', time_budget=600):
+        """
+        Search for the best yield and ROI model parameters.
+        
+        The winning configurations are written next to the saved models, where
+        the training steps pick them up.
+        
+        Parameters:
+        preprocessed_datasets (dict): Preprocessed datasets
+        method (str): 'halving' or 'random'
+        time_budget (float): Total tuning time in seconds
+        """
+        print("\nTuning Model Hyperparameters...")
+        print("=" * 32)
+        
+        model_datasets = self.package_model_datasets(preprocessed_datasets)
+        try:
+            X_yield, y_yield = AgriYieldModel().prepare_training_data(model_datasets)
+            X_roi, y_roi = AgriROIModel().prepare_training_data(model_datasets)
+            
+            # The forest is the slowest to fit, so it gets half of the budget
+            yield_results = {
+                'rf': HyperparameterTuner('rf', method=method, time_budget=time_budget * 0.5).tune(X_yield, y_yield),
+                'xgb': HyperparameterTuner('xgb', method=method, time_budget=time_budget * 0.25).tune(X_yield, y_yield)
+            }
+            roi_results = {
+                'xgb': HyperparameterTuner('xgb', method=method, time_budget=time_budget * 0.25).tune(X_roi, y_roi)
+            }
+            
+            print(f"✅ Saved tuned parameters to: {save_tuning_results(yield_results, 'saved_models/yield_model')}")
+            print(f"✅ Saved tuned parameters to: {save_tuning_results(roi_results, 'saved_models/roi_model')}")
+            return yield_results, roi_results
+            
+        except Exception as e:
+            print(f"❌ Error tuning hyperparameters: {e}")
+            import traceback
+            traceback.print_exc()
+            return None, None
+    
+    def train_yield_model(self, preprocessed_datasets):
+        """
+        Train the yield prediction model using historical datasets.
+        """
+        print("\nTraining Yield Prediction Model...")
+        print("=" * 35)
+        
+        # Initialize model with the tuned parameters, if any
+        model_path = "saved_models/yield_model"
+        tuned_params = load_tuned_params(model_path)
+        yield_model = AgriYieldModel(rf_params=tuned_params.get('rf'), xgb_params=tuned_params.get('xgb'))
+        
+        # Package datasets in the expected format
+        model_datasets = self.package_model_datasets(preprocessed_datasets)
         
         # Train the model
         try:
@@ -202,7 +291,6 @@ class HistoricalDataTrainer:
                 print(f"  R²: {metrics['xgb_metrics']['r2']:.4f}")
             
             # Save the model
-            model_path = "saved_models/yield_model"
             yield_model.save_model(model_path)
             print(f"✅ Yield model saved to: {model_path}")
             
@@ -221,18 +309,12 @@ class HistoricalDataTrainer:
         print("\nTraining ROI Prediction Model...")
         print("=" * 32)
         
-        # Initialize model
-        roi_model = AgriROIModel()
+        # Initialize model with the tuned parameters, if any
+        model_path = "saved_models/roi_model"
+        roi_model = AgriROIModel(xgb_params=load_tuned_params(model_path).get('xgb'))
         
         # Package datasets in the expected format
-        model_datasets = {
-            '1. NASA POWER Data (Rainfall, Temperature, Humidity, Radiation) 👆🏻': preprocessed_datasets.get('nasa_power'),
-            'All India level Average Yield of Principal Crops from 2001-02 to 2015-16': preprocessed_datasets.get('yield'),
-            'All India level Area Under Principal Crops from 2001-02 to 2015-16': preprocessed_datasets.get('area'),
-            'Production of principle crops': preprocessed_datasets.get('production'),
-            'price': preprocessed_datasets.get('price'),
-            'Year-wise Damage Caused Due To Floods, Cyclonic Storm, Landslides etc': preprocessed_datasets.get('damage')
-        }
+        model_datasets = self.package_model_datasets(preprocessed_datasets)
         
         # Train the model
         try:
@@ -247,7 +329,6 @@ class HistoricalDataTrainer:
                 print(f"  R²: {metrics['r2']:.4f}")
             
             # Save the model
-            model_path = "saved_models/roi_model"
             roi_model.save_model(model_path)
             print(f"✅ ROI model saved to: {model_path}")
             
@@ -259,6 +340,43 @@ class HistoricalDataTrainer:
             traceback.print_exc()
             return None
     
+    def compact_yield_model(self, preprocessed_datasets, yield_model, distill=False):
+        """
+        Compact the yield model's RandomForest and save it next to the full model.
+        
+        The compaction is measured on the rows the model was evaluated on,
+        which fit() held out from training.
+        
+        Parameters:
+        preprocessed_datasets (dict): Preprocessed datasets
+        yield_model (AgriYieldModel): Trained yield model
+        distill (bool): Also try distilling a smaller forest
+        
+        Returns:
+        AgriYieldModel: The compact model, or None on failure
+        """
+        print("\nCompacting Yield Model Forest...")
+        print("=" * 32)
+        
+        model_path = "saved_models/yield_model_compact"
+        try:
+            X, y = yield_model.prepare_training_data(self.package_model_datasets(preprocessed_datasets))
+            X_train, X_test, _, y_test = split_training_data(X[yield_model.feature_names], y)
+            compact_model, report = ForestCompactor(distill=distill).compact(
+                yield_model, X_test, y_test, X_train=X_train
+            )
+            compact_model.save_model(model_path)
+            with open(f"{model_path}_report.json", 'w') as f:
+                json.dump(report, f, indent=2)
+            print(f"✅ Compact yield model saved to: {model_path}")
+            return compact_model
+            
+        except Exception as e:
+            print(f"❌ Error compacting yield model: {e}")
+            import traceback
+            traceback.print_exc()
+            return None
+    
     def analyze_feature_importance(self, yield_model, roi_model):
         """
         Analyze feature importance from trained models.
@@ -287,9 +405,18 @@ class HistoricalDataTrainer:
             except Exception as e:
                 print(f"❌ Error analyzing ROI model feature importance: {e}")
     
-    def run_training_pipeline(self):
+    def run_training_pipeline(self, parallel=False, tune=False, tune_method='halving', tune_budget=600,
+                              compact=False, distill=False):
         """
         Run the complete training pipeline using historical datasets.
+        
+        Parameters:
+        parallel (bool): Train the yield and ROI models concurrently
+        tune (bool): Tune hyperparameters before training
+        tune_method (str): 'halving' or 'random'
+        tune_budget (float): Total tuning time in seconds
+        compact (bool): Also save a compacted yield model
+        distill (bool): Try distillation when compacting
         """
         print("SASYA-MITRA HISTORICAL DATA TRAINING PIPELINE")
         print("=" * 50)
@@ -311,11 +438,21 @@ class HistoricalDataTrainer:
             print("❌ Failed to preprocess datasets.")
             return None, None
         
-        # Step 4: Train yield model
-        yield_model = self.train_yield_model(preprocessed_datasets)
+        if tune:
+            self.tune_hyperparameters(preprocessed_datasets, method=tune_method, time_budget=tune_budget)
         
-        # Step 5: Train ROI model
-        roi_model = self.train_roi_model(preprocessed_datasets)
+        if parallel:
+            # Steps 4-5: Train yield and ROI models concurrently
+            yield_model, roi_model = self.train_models_in_parallel(preprocessed_datasets)
+        else:
+            # Step 4: Train yield model
+            yield_model = self.train_yield_model(preprocessed_datasets)
+            
+            # Step 5: Train ROI model
+            roi_model = self.train_roi_model(preprocessed_datasets)
+        
+        if compact and yield_model and yield_model.is_trained:
+            self.compact_yield_model(preprocessed_datasets, yield_model, distill=distill)
         
         # Step 6: Analyze feature importance
         self.analyze_feature_importance(yield_model, roi_model)
@@ -343,6 +480,18 @@ class HistoricalDataTrainer:
         return yield_model, roi_model
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Train models with historical datasets')
+    parser.add_argument('--parallel', action='store_true', help='Train the yield and ROI models concurrently')
+    parser.add_argument('--tune', action='store_true', help='Tune hyperparameters before training')
+    parser.add_argument('--tune-method', choices=['halving', 'random'], default='halving', help='Hyperparameter search method')
+    parser.add_argument('--tune-budget', type=float, default=600, help='Total tuning time budget in seconds')
+    parser.add_argument('--compact', action='store_true', help='Also save a compacted yield model')
+    parser.add_argument('--distill', action='store_true', help='Try distilling a smaller forest when compacting')
+    args = parser.parse_args()
+    
     # Create trainer and run training pipeline
     trainer = HistoricalDataTrainer(".")
-    yield_model, roi_model = trainer.run_training_pipeline()
\ No newline at end of file
+    yield_model, roi_model = trainer.run_training_pipeline(
+        parallel=args.parallel, tune=args.tune, tune_method=args.tune_method, tune_budget=args.tune_budget,
+        compact=args.compact, distill=args.distill
+    )
\ No newline at end of file
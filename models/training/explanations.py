@@ -0,0 +1,189 @@
+"""
+Per-prediction feature contributions for the Sasya-Mitra models.
+
+Each prediction is split into a base value plus one contribution per feature,
+summing to the prediction. XGBoost models use the booster's native
+contribution output (TreeSHAP). The RandomForest uses the path decomposition:
+every split a row passes through moves its prediction from the parent node's
+value to the child's, and that change is credited to the split's feature.
+
+The decomposition is a sparse (nodes x features) matrix built once per forest,
+so a whole batch is explained by one sparse product with the forest's
+decision-path indicator. ModelExplainer keeps those matrices for one model
+version and caches the explanations of rows it has already seen; one explainer
+is shared by the API's request threads.
+"""
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import scipy.sparse as sp
+import xgboost as xgb
+
+# Explained rows remembered per model version
+EXPLANATION_CACHE_SIZE = 4096
+
+def tree_path_matrix(tree, n_features):
+    """
+    Contribution of every node of a fitted tree to the rows that reach it.
+
+    Parameters:
+    tree (DecisionTreeRegressor): Fitted tree
+    n_features (int): Number of model features
+
+    Returns:
+    scipy.sparse.csr_matrix: (n_nodes, n_features) value change at each node,
+    in the column of the feature its parent split on
+    """
+    structure = tree.tree_
+    values = structure.value[:, 0, 0]
+    parents = np.flatnonzero(structure.children_left >= 0)
+    children = np.concatenate([structure.children_left[parents], structure.children_right[parents]])
+    parents = np.concatenate([parents, parents])
+    return sp.csr_matrix(
+        (values[children] - values[parents], (children, structure.feature[parents])),
+        shape=(structure.node_count, n_features)
+    )
+
+def forest_path_matrix(forest):
+    """
+    Path decomposition of a whole forest, stacked in decision_path node order.
+
+    Parameters:
+    forest (RandomForestRegressor): Fitted forest
+
+    Returns:
+    tuple: (csr_matrix of per-node contributions averaged over the trees, base value)
+    """
+    n_features = forest.n_features_in_
+    matrix = sp.vstack([tree_path_matrix(tree, n_features) for tree in forest.estimators_], format='csr')
+    base_value = np.mean([tree.tree_.value[0, 0, 0] for tree in forest.estimators_])
+    return matrix / len(forest.estimators_), float(base_value)
+
+def forest_contributions(forest, X, path_matrix=None):
+    """
+    Feature contributions of a forest's predictions for a batch.
+
+    Parameters:
+    forest (RandomForestRegressor): Fitted forest
+    X: Feature matrix in the forest's column order
+    path_matrix (tuple): Result of forest_path_matrix, to reuse it
+
+    Returns:
+    tuple: (base value, contributions array of shape (n_rows, n_features))
+    """
+    matrix, base_value = path_matrix or forest_path_matrix(forest)
+    # Trees split on float32 inputs; the low-level paths skip per-tree validation
+    X = np.ascontiguousarray(X, dtype=np.float32)
+    indicator = sp.hstack([tree.tree_.decision_path(X) for tree in forest.estimators_], format='csr')
+    return base_value, np.asarray((indicator @ matrix).todense())
+
+def xgboost_contributions(model, X):
+    """
+    Feature contributions of an XGBoost model's predictions for a batch.
+
+    Parameters:
+    model (XGBRegressor): Fitted model
+    X: Feature matrix in the model's column order
+
+    Returns:
+    tuple: (base value array, contributions array of shape (n_rows, n_features))
+    """
+    booster = model.get_booster()
+    matrix = xgb.DMatrix(np.asarray(X, dtype=np.float32), feature_names=booster.feature_names)
+    contributions = booster.predict(matrix, pred_contribs=True)
+    return contributions[:, -1], contributions[:, :-1]
+
+def model_version(model):
+    """
+    Identifier of a model's version: its bundle's id, or the object for unsaved models.
+
+    Parameters:
+    model: AgriYieldModel or AgriROIModel
+
+    Returns:
+    str: Version identifier
+    """
+    bundle = getattr(model, '_bundle', None)
+    if bundle is not None:
+        return bundle.bundle_id
+    return f"unsaved-{id(model)}"
+
+class ModelExplainer:
+    """
+    Explains batches of predictions of one yield or ROI model version.
+    """
+
+    def __init__(self, model, cache_size=EXPLANATION_CACHE_SIZE):
+        self.model = model
+        self.version = model_version(model)
+        self.feature_names = list(model.feature_names)
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        # Guards the cache; explanations are computed outside it
+        self._lock = threading.Lock()
+        self._path_matrix = None
+
+    def _compute(self, X):
+        """Base values and contributions for rows not in the cache."""
+        if hasattr(self.model, 'rf_model'):
+            # The yield ensemble averages its forest and XGBoost predictions
+            if self._path_matrix is None:
+                self._path_matrix = forest_path_matrix(self.model.rf_model)
+            rf_base, rf_contributions = forest_contributions(self.model.rf_model, X, self._path_matrix)
+            xgb_base, xgb_contributions = xgboost_contributions(self.model.xgb_model, X)
+            return (rf_base + xgb_base) / 2, (rf_contributions + xgb_contributions) / 2
+        return xgboost_contributions(self.model.model, X)
+
+    def explain(self, X):
+        """
+        Explain the model's predictions for a batch.
+
+        Parameters:
+        X: Feature rows in the model's column order
+
+        Returns:
+        dict: prediction and base_value arrays (n_rows,), contributions (n_rows, n_features)
+        """
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        keys = [row.tobytes() for row in X]
+        with self._lock:
+            found = {key: self._cache[key] for key in keys if key in self._cache}
+            for key in found:
+                self._cache.move_to_end(key)
+        missing = [i for i, key in enumerate(keys) if key not in found]
+        if missing:
+            base_values, contributions = self._compute(X[missing])
+            base_values = np.broadcast_to(base_values, (len(missing),))
+            for i, base_value, row in zip(missing, base_values, contributions):
+                found[keys[i]] = (float(base_value), row)
+            with self._lock:
+                for i in missing:
+                    self._cache[keys[i]] = found[keys[i]]
+                    self._cache.move_to_end(keys[i])
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+        explained = [found[key] for key in keys]
+        base_values = np.array([base_value for base_value, _ in explained])
+        contributions = np.array([row for _, row in explained]).reshape(len(keys), len(self.feature_names))
+        return {
+            'prediction': base_values + contributions.sum(axis=1),
+            'base_value': base_values,
+            'contributions': contributions,
+        }
+
+    def ranked_contributions(self, contributions, top=None):
+        """
+        Name and order one row's contributions by magnitude.
+
+        Parameters:
+        contributions (np.array): One row of explain()'s contributions
+        top (int): Keep only the largest contributions
+
+        Returns:
+        list: {'feature', 'contribution'} dicts, largest magnitude first
+        """
+        order = np.argsort(-np.abs(contributions), kind='stable')[:top]
+        return [{'feature': self.feature_names[i], 'contribution': float(contributions[i])} for i in order]
@@ -0,0 +1,367 @@
+"""
+RandomForest compaction for the Sasya-Mitra yield model.
+
+The yield model's forest has 100 trees of unbounded depth, so its size and
+prediction latency grow with the training data. Compaction shrinks it in
+stages and measures the accuracy, size and latency of each stage:
+
+1. Greedy ensemble selection keeps the smallest subset of trees whose average
+   stays within a tolerance of the full forest's validation error.
+2. Depth capping turns the nodes at the shallowest acceptable depth into
+   leaves predicting the mean of the samples that reached them.
+3. Thresholds and leaf values are rounded to float32. Thresholds are rounded
+   down, which leaves every split decision unchanged because sklearn compares
+   float32 inputs; the bundle then stores the trees at half size.
+4. Optionally, a smaller forest is distilled from the compacted one by training
+   it on the teacher's predictions for the training rows and jittered copies.
+
+The compacted model is a regular AgriYieldModel and replaces the original
+wherever it is loaded. Its prediction intervals are recalibrated on the
+validation rows, since the original correction was fitted to the residuals of
+the uncompacted forest.
+"""
+
+import copy
+import time
+
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.metrics import mean_squared_error, r2_score
+from sklearn.tree._tree import Tree, TREE_LEAF, TREE_UNDEFINED
+
+from training.model_bundle import bundle_size
+
+# Allowed relative increase in validation RMSE over the original forest
+DEFAULT_TOLERANCE = 0.02
+
+# Fewest trees kept by selection; smaller subsets overfit the validation rows
+DEFAULT_MIN_TREES = 10
+
+# Depth caps tried, deepest first; the shallowest within tolerance is kept
+DEFAULT_DEPTHS = (20, 16, 12, 10, 8, 6)
+
+# Size of the distilled forest
+DEFAULT_DISTILL_TREES = 30
+DEFAULT_DISTILL_DEPTH = 12
+
+# Jittered copies of the training rows added per row when distilling
+DISTILL_AUGMENT_COPIES = 2
+
+# Jitter applied to the copies, as a fraction of each feature's standard deviation
+DISTILL_NOISE = 0.05
+
+# Timed repetitions when measuring single-row latency
+LATENCY_REPEATS = 50
+
+def tree_depths(tree):
+    """
+    Depth of every node of a fitted tree.
+
+    Parameters:
+    tree (Tree): sklearn tree structure
+
+    Returns:
+    np.array: Depth per node (root at 0)
+    """
+    depth = np.zeros(tree.node_count, dtype=np.int64)
+    frontier, level = np.array([0]), 0
+    while frontier.size:
+        depth[frontier] = level
+        children = np.concatenate([tree.children_left[frontier], tree.children_right[frontier]])
+        frontier, level = children[children != TREE_LEAF], level + 1
+    return depth
+
+def _rebuild_tree(tree, nodes, values, max_depth):
+    """Create a tree with the same shape metadata from node and value arrays."""
+    rebuilt = Tree(tree.n_features, tree.n_classes, tree.n_outputs)
+    rebuilt.__setstate__({
+        'max_depth': int(max_depth),
+        'node_count': len(nodes),
+        'nodes': np.ascontiguousarray(nodes),
+        'values': np.ascontiguousarray(values),
+    })
+    return rebuilt
+
+def cap_tree_depth(estimator, max_depth):
+    """
+    Prune a fitted decision tree to a maximum depth.
+
+    Regression trees store the mean target at every node, so the nodes at the
+    cap become leaves with no retraining.
+
+    Parameters:
+    estimator (DecisionTreeRegressor): Fitted tree
+    max_depth (int): Depth of the deepest nodes kept
+
+    Returns:
+    DecisionTreeRegressor: Pruned copy of the tree
+    """
+    tree = estimator.tree_
+    if tree.max_depth <= max_depth:
+        return estimator
+    state = tree.__getstate__()
+    depth = tree_depths(tree)
+    keep = depth <= max_depth
+    new_index = np.cumsum(keep) - 1
+
+    nodes = state['nodes'][keep].copy()
+    for side in ('left_child', 'right_child'):
+        internal = nodes[side] != TREE_LEAF
+        nodes[side][internal] = new_index[nodes[side][internal]]
+    cut = depth[keep] == max_depth
+    nodes['left_child'][cut] = TREE_LEAF
+    nodes['right_child'][cut] = TREE_LEAF
+    nodes['feature'][cut] = TREE_UNDEFINED
+    nodes['threshold'][cut] = TREE_UNDEFINED
+    nodes['missing_go_to_left'][cut] = 0
+
+    pruned = copy.copy(estimator)
+    pruned.tree_ = _rebuild_tree(tree, nodes, state['values'][keep], max_depth)
+    pruned.max_depth = max_depth
+    return pruned
+
+def _round_down_float32(values):
+    """Round float64 values down to the nearest float32."""
+    rounded = values.astype(np.float32)
+    above = rounded.astype(np.float64) > values
+    rounded[above] = np.nextafter(rounded[above], np.float32(-np.inf))
+    return rounded.astype(np.float64)
+
+def quantize_tree(estimator):
+    """
+    Round a fitted tree's thresholds and node values to float32.
+
+    Parameters:
+    estimator (DecisionTreeRegressor): Fitted tree
+
+    Returns:
+    DecisionTreeRegressor: Copy of the tree holding float32-exact values
+    """
+    tree = estimator.tree_
+    state = tree.__getstate__()
+    nodes = state['nodes'].copy()
+    nodes['threshold'] = _round_down_float32(nodes['threshold'])
+    for field in ('impurity', 'weighted_n_node_samples'):
+        nodes[field] = nodes[field].astype(np.float32).astype(np.float64)
+    values = state['values'].astype(np.float32).astype(np.float64)
+    quantized = copy.copy(estimator)
+    quantized.tree_ = _rebuild_tree(tree, nodes, values, state['max_depth'])
+    return quantized
+
+def _with_estimators(forest, estimators):
+    """Copy of a forest holding the given trees."""
+    compact = copy.copy(forest)
+    compact.estimators_ = list(estimators)
+    compact.n_estimators = len(estimators)
+    return compact
+
+def _rmse(y_true, y_pred):
+    """Root mean squared error."""
+    return float(np.sqrt(mean_squared_error(y_true, y_pred)))
+
+def greedy_select(tree_predictions, y, max_rmse, min_trees=DEFAULT_MIN_TREES):
+    """
+    Greedy forward selection of the trees whose average best fits the targets.
+
+    Parameters:
+    tree_predictions (np.array): Predictions per tree, shape (n_trees, n_rows)
+    y (np.array): Targets
+    max_rmse (float): Stop once the selected trees are at least this accurate
+    min_trees (int): Fewest trees to select
+
+    Returns:
+    list: Indices of the selected trees in selection order
+    """
+    n_trees = len(tree_predictions)
+    selected, remaining = [], list(range(n_trees))
+    running_sum = np.zeros(tree_predictions.shape[1])
+    while remaining:
+        candidates = (running_sum + tree_predictions[remaining]) / (len(selected) + 1)
+        errors = np.sqrt(((candidates - y) ** 2).mean(axis=1))
+        best = int(np.argmin(errors))
+        selected.append(remaining.pop(best))
+        running_sum += tree_predictions[selected[-1]]
+        if errors[best] <= max_rmse and len(selected) >= min_trees:
+            break
+    return selected
+
+class ForestCompactor:
+    """
+    Shrinks the yield model's RandomForest and reports what each stage costs.
+    """
+
+    def __init__(self, tolerance=DEFAULT_TOLERANCE, min_trees=DEFAULT_MIN_TREES, depths=DEFAULT_DEPTHS,
+                 quantize=True, distill=False, distill_trees=DEFAULT_DISTILL_TREES, distill_depth=DEFAULT_DISTILL_DEPTH,
+                 random_state=42):
+        self.tolerance = tolerance
+        self.min_trees = min_trees
+        self.depths = depths
+        self.quantize = quantize
+        self.distill = distill
+        self.distill_trees = distill_trees
+        self.distill_depth = distill_depth
+        self.random_state = random_state
+        self.report = None
+
+    def measure(self, stage, forest, X, y, xgb_model=None):
+        """
+        Measure the size, latency and accuracy of a forest.
+
+        Parameters:
+        stage (str): Name of the compaction stage
+        forest (RandomForestRegressor): Forest to measure
+        X, y: Evaluation rows
+        xgb_model: XGBoost half of the yield ensemble, to report ensemble accuracy
+
+        Returns:
+        dict: Measurements
+        """
+        start = time.perf_counter()
+        predictions = forest.predict(X)
+        batch_seconds = time.perf_counter() - start
+
+        row = X.iloc[:1] if hasattr(X, 'iloc') else X[:1]
+        timings = []
+        for _ in range(LATENCY_REPEATS):
+            start = time.perf_counter()
+            forest.predict(row)
+            timings.append(time.perf_counter() - start)
+
+        result = {
+            'stage': stage,
+            'trees': len(forest.estimators_),
+            'nodes': int(sum(estimator.tree_.node_count for estimator in forest.estimators_)),
+            'max_depth': int(max(estimator.tree_.max_depth for estimator in forest.estimators_)),
+            'bytes': bundle_size(forest),
+            'row_ms': float(np.median(timings) * 1000),
+            'batch_ms': batch_seconds * 1000,
+            'rmse': _rmse(y, predictions),
+            'r2': float(r2_score(y, predictions)) if len(y) >= 2 else float('nan'),
+        }
+        if xgb_model is not None:
+            result['ensemble_rmse'] = _rmse(y, (predictions + xgb_model.predict(X)) / 2)
+        return result
+
+    def _select_trees(self, forest, X, y, max_rmse):
+        """Keep the fewest trees whose average is within tolerance."""
+        tree_predictions = np.stack([
+            estimator.predict(np.asarray(X, dtype=np.float32)) for estimator in forest.estimators_
+        ])
+        selected = greedy_select(tree_predictions, np.asarray(y), max_rmse, self.min_trees)
+        return _with_estimators(forest, [forest.estimators_[i] for i in selected])
+
+    def _cap_depth(self, forest, X, y, max_rmse):
+        """Cap the trees at the shallowest depth within tolerance."""
+        best = forest
+        for depth in sorted(self.depths, reverse=True):
+            capped = _with_estimators(forest, [cap_tree_depth(e, depth) for e in forest.estimators_])
+            if _rmse(y, capped.predict(X)) > max_rmse:
+                break
+            best = capped
+            best.max_depth = depth
+        return best
+
+    def _distill(self, teacher, X_train):
+        """Train a smaller forest on the teacher's predictions."""
+        rng = np.random.default_rng(self.random_state)
+        X = np.asarray(X_train, dtype=np.float64)
+        noise = X.std(axis=0) * DISTILL_NOISE
+        copies = [X] + [X + rng.normal(0, 1, X.shape) * noise for _ in range(DISTILL_AUGMENT_COPIES)]
+        X_augmented = np.vstack(copies)
+        if hasattr(X_train, 'columns'):
+            X_augmented = X_train.__class__(X_augmented, columns=X_train.columns)
+        student = RandomForestRegressor(
+            n_estimators=self.distill_trees, max_depth=self.distill_depth,
+            random_state=self.random_state, n_jobs=teacher.n_jobs
+        )
+        student.fit(X_augmented, teacher.predict(X_augmented))
+        return student
+
+    def compact(self, yield_model, X_val, y_val, X_train=None, X_test=None, y_test=None):
+        """
+        Compact the forest of a trained yield model.
+
+        Trees are selected and the depth is chosen on the validation rows; the
+        report is measured on separate test rows (half of the validation rows
+        when none are given) so the choices are not scored on their own data.
+
+        Parameters:
+        yield_model (AgriYieldModel): Trained yield model
+        X_val, y_val: Validation rows the compaction choices are made on
+        X_train: Training rows, needed for distillation
+        X_test, y_test: Rows the report is measured on
+
+        Returns:
+        tuple: (compact AgriYieldModel, report dict)
+        """
+        if X_test is None:
+            half = len(X_val) // 2
+            rows = lambda data, part: data.iloc[part] if hasattr(data, 'iloc') else data[part]
+            X_val, X_test = rows(X_val, slice(None, half)), rows(X_val, slice(half, None))
+            y_val, y_test = rows(y_val, slice(None, half)), rows(y_val, slice(half, None))
+        if self.distill and X_train is None:
+            raise ValueError("Distillation needs the training rows")
+
+        forest = yield_model.rf_model
+        xgb_model = yield_model.xgb_model
+        max_rmse = _rmse(y_val, forest.predict(X_val)) * (1 + self.tolerance)
+
+        stages = [('original', forest)]
+        forest = self._select_trees(forest, X_val, y_val, max_rmse)
+        stages.append(('tree selection', forest))
+        forest = self._cap_depth(forest, X_val, y_val, max_rmse)
+        stages.append(('depth cap', forest))
+        if self.quantize:
+            forest = _with_estimators(forest, [quantize_tree(e) for e in forest.estimators_])
+            stages.append(('float32', forest))
+        compact_forest = forest
+        if self.distill:
+            student = self._distill(forest, X_train)
+            if self.quantize:
+                student = _with_estimators(student, [quantize_tree(e) for e in student.estimators_])
+            stages.append(('distilled', student))
+            # Keep the student only if it is smaller and within tolerance
+            if bundle_size(student) < bundle_size(forest) and _rmse(y_val, student.predict(X_val)) <= max_rmse:
+                compact_forest = student
+
+        compact_model = copy.copy(yield_model)
+        compact_model.rf_model = compact_forest
+        compact_model.rf_params = {
+            **yield_model.rf_params,
+            'n_estimators': len(compact_forest.estimators_),
+            'max_depth': compact_forest.max_depth,
+        }
+        # The interval correction was fitted to the original forest's residuals
+        compact_model.calibrate_intervals(X_val, y_val)
+        intervals = compact_model.predict_intervals(X_test)
+        y_test_values = np.asarray(y_test)
+
+        measurements = [self.measure(stage, model, X_test, y_test, xgb_model) for stage, model in stages]
+        chosen = next(stage for stage, model in stages if model is compact_forest)
+        original, result = measurements[0], next(m for m in measurements if m['stage'] == chosen)
+        self.report = {
+            'tolerance': self.tolerance,
+            'chosen': chosen,
+            'stages': measurements,
+            'size_reduction': 1 - result['bytes'] / original['bytes'],
+            'latency_reduction': 1 - result['row_ms'] / original['row_ms'],
+            'rmse_change': result['rmse'] / original['rmse'] - 1,
+            'interval_coverage': float(np.mean(
+                (y_test_values >= intervals['lower']) & (y_test_values <= intervals['upper'])
+            )),
+        }
+        self.print_report()
+        return compact_model, self.report
+
+    def print_report(self):
+        """Print the size, latency and accuracy of each compaction stage."""
+        print(f"{'Stage':<16}{'Trees':>6}{'Nodes':>10}{'Depth':>7}{'KB':>10}{'Row ms':>9}{'Batch ms':>10}"
+              f"{'RMSE':>10}{'R²':>8}")
+        for m in self.report['stages']:
+            chosen = '*' if m['stage'] == self.report['chosen'] else ' '
+            print(f"{m['stage'] + chosen:<16}{m['trees']:>6}{m['nodes']:>10}{m['max_depth']:>7}"
+                  f"{m['bytes'] / 1024:>10.1f}{m['row_ms']:>9.2f}{m['batch_ms']:>10.1f}"
+                  f"{m['rmse']:>10.4f}{m['r2']:>8.4f}")
+        print(f"Compact forest ({self.report['chosen']}): {self.report['size_reduction']:.0%} smaller, "
+              f"{self.report['latency_reduction']:.0%} faster per row, RMSE {self.report['rmse_change']:+.1%}, "
+              f"interval coverage {self.report['interval_coverage']:.0%}")
@@ -0,0 +1,273 @@
+"""
+Warm-start incremental retraining for Sasya-Mitra AI models.
+
+Updates the previous models with new feedback instead of refitting from
+scratch: XGBoost keeps boosting from the previous booster and the
+RandomForest grows extra trees with warm_start, dropping its oldest trees
+beyond a size cap. A drift guard falls back to a full retrain when the new
+feedback no longer looks like the data the previous models learned from.
+"""
+
+import copy
+import time
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from sklearn.metrics import mean_squared_error, r2_score, mean_absolute_error
+
+from preprocessing.feedback_data import feedback_training_set
+from training.model_trainer import AgriYieldModel, AgriROIModel, split_training_data
+
+# Trees added to the forest per update
+DEFAULT_NEW_TREES = 20
+
+# Boosting rounds added per update
+DEFAULT_NEW_ROUNDS = 50
+
+# Forest size cap; the oldest trees are dropped beyond it
+DEFAULT_MAX_TREES = 300
+
+# Mean feature shift, in training standard deviations, that counts as drift
+FEATURE_DRIFT_THRESHOLD = 1.0
+
+# Previous model R² on the new rows below which it no longer fits them
+MIN_R2_ON_NEW_DATA = 0.0
+
+# Fewest new rows worth updating a model with
+MIN_NEW_ROWS = 5
+
+def regression_metrics(y_true, y_pred):
+    """
+    Compute the evaluation metrics reported for every model.
+
+    Parameters:
+    y_true: True targets
+    y_pred: Predictions
+
+    Returns:
+    dict: mse, mae and r2 (NaN with fewer than two rows)
+    """
+    return {
+        'mse': mean_squared_error(y_true, y_pred),
+        'mae': mean_absolute_error(y_true, y_pred),
+        'r2': r2_score(y_true, y_pred) if len(y_true) >= 2 else float('nan')
+    }
+
+def detect_drift(scaler, X_new, y_new, y_pred, feature_threshold=FEATURE_DRIFT_THRESHOLD,
+                 min_r2=MIN_R2_ON_NEW_DATA):
+    """
+    Compare new rows against the data the previous model was trained on.
+
+    The model's fitted scaler holds the mean and standard deviation of its
+    training features, which serve as the reference distribution.
+
+    Parameters:
+    scaler (StandardScaler): Scaler fitted on the previous training data
+    X_new (pd.DataFrame): New feature rows
+    y_new (pd.Series): New targets
+    y_pred (np.array): Previous model's predictions for the new rows
+
+    Returns:
+    dict: feature_shift, worst_feature, r2_on_new_data and drifted
+    """
+    shift = np.abs((X_new.to_numpy().mean(axis=0) - scaler.mean_) / scaler.scale_)
+    r2_on_new = r2_score(y_new, y_pred) if len(y_new) >= 2 else float('nan')
+    return {
+        'feature_shift': float(shift.mean()),
+        'worst_feature': X_new.columns[int(np.argmax(shift))],
+        'r2_on_new_data': float(r2_on_new),
+        'drifted': bool(shift.mean() > feature_threshold or r2_on_new < min_r2)
+    }
+
+class IncrementalRetrainer:
+    """
+    Updates trained yield and ROI models with new feedback rows.
+    """
+
+    def __init__(self, new_trees=DEFAULT_NEW_TREES, new_rounds=DEFAULT_NEW_ROUNDS,
+                 max_trees=DEFAULT_MAX_TREES, feature_threshold=FEATURE_DRIFT_THRESHOLD,
+                 min_r2=MIN_R2_ON_NEW_DATA):
+        self.new_trees = new_trees
+        self.new_rounds = new_rounds
+        self.max_trees = max_trees
+        self.feature_threshold = feature_threshold
+        self.min_r2 = min_r2
+        self.report = None
+
+    def grow_forest(self, forest, X, y):
+        """
+        Add trees fitted on the new rows to a copy of the forest.
+
+        Parameters:
+        forest (RandomForestRegressor): Fitted forest
+        X, y: New training rows
+
+        Returns:
+        RandomForestRegressor: Forest with the new trees, capped at max_trees
+        """
+        forest = copy.deepcopy(forest)
+        forest.set_params(warm_start=True, n_estimators=len(forest.estimators_) + self.new_trees)
+        forest.fit(X, y)
+        if len(forest.estimators_) > self.max_trees:
+            # Trees are stored oldest first
+            forest.estimators_ = forest.estimators_[-self.max_trees:]
+            forest.set_params(n_estimators=self.max_trees)
+        forest.set_params(warm_start=False)
+        return forest
+
+    def continue_boosting(self, model, X, y):
+        """
+        Add boosting rounds fitted on the new rows to the previous booster.
+
+        Parameters:
+        model (XGBRegressor): Fitted model
+        X, y: New training rows
+
+        Returns:
+        XGBRegressor: Model holding the previous and the new trees
+        """
+        updated = xgb.XGBRegressor(**{**model.get_params(), 'n_estimators': self.new_rounds})
+        updated.fit(X, y, xgb_model=model.get_booster())
+        return updated
+
+    def update_model(self, model, X, y):
+        """
+        Warm-start a copy of a yield or ROI model on new rows.
+
+        Parameters:
+        model (AgriYieldModel or AgriROIModel): Trained model
+        X, y: New training rows
+
+        Returns:
+        Updated copy of the model
+        """
+        updated = copy.copy(model)
+        if isinstance(model, AgriYieldModel):
+            updated.rf_model = self.grow_forest(model.rf_model, X, y)
+            updated.xgb_model = self.continue_boosting(model.xgb_model, X, y)
+            if getattr(model, 'quantile_model', None) is not None:
+                updated.quantile_model = self.continue_boosting(model.quantile_model, X, y)
+        else:
+            updated.model = self.continue_boosting(model.model, X, y)
+        # Keep the drift reference as running statistics over all rows seen
+        updated.scaler = copy.deepcopy(model.scaler).partial_fit(X)
+        return updated
+
+    @staticmethod
+    def predict_rows(model, X):
+        """Predict a feature matrix with a yield (ensemble) or ROI model."""
+        if isinstance(model, AgriYieldModel):
+            return (model.rf_model.predict(X) + model.xgb_model.predict(X)) / 2
+        return model.model.predict(X)
+
+    def _fit_full(self, model_class, previous, X, y):
+        """Train a fresh model with the previous model's parameters."""
+        if model_class is AgriYieldModel:
+            params = {
+                'rf_params': previous.rf_params, 'xgb_params': previous.xgb_params,
+                'interval_coverage': previous.interval_coverage
+            } if previous else {}
+        else:
+            params = {
+                'xgb_params': previous.xgb_params, 'interval_coverage': previous.interval_coverage
+            } if previous else {}
+        model = model_class(**params)
+        model.fit(X, y)
+        return model
+
+    def retrain_target(self, target, previous, old_data, new_data, compare=False):
+        """
+        Retrain one model incrementally, falling back to a full retrain on drift.
+
+        Parameters:
+        target (str): 'yield' or 'roi'
+        previous: Previously trained model (None to force a full retrain)
+        old_data (pd.DataFrame): Feedback table the previous model was trained on
+        new_data (pd.DataFrame): Feedback table added since then
+        compare (bool): Also run the alternative retrain and report both
+
+        Returns:
+        tuple: (model, report dict)
+        """
+        model_class = AgriYieldModel if target == 'yield' else AgriROIModel
+        X_old, y_old = feedback_training_set(old_data, target)
+        X_new, y_new = feedback_training_set(new_data, target)
+        report = {'new_rows': len(X_new), 'runs': {}}
+
+        if len(X_new) < MIN_NEW_ROWS:
+            report['mode'] = 'unchanged'
+            report['reason'] = f"only {len(X_new)} new rows"
+            return previous, report
+
+        # Hold out part of the new rows so both retrains are scored on the same unseen data
+        X_update, X_holdout, y_update, y_holdout = split_training_data(X_new, y_new)
+
+        can_update = (
+            previous is not None and previous.is_trained
+            and previous.feature_names == list(X_new.columns)
+        )
+        if can_update:
+            report['drift'] = detect_drift(
+                previous.scaler, X_new, y_new, self.predict_rows(previous, X_new),
+                self.feature_threshold, self.min_r2
+            )
+            report['mode'] = 'full' if report['drift']['drifted'] else 'incremental'
+            report['reason'] = 'drift detected' if report['drift']['drifted'] else 'no drift'
+        else:
+            report['mode'] = 'full'
+            report['reason'] = 'no compatible previous model'
+
+        models = {}
+        modes = ['incremental', 'full'] if compare and can_update else [report['mode']]
+        for mode in modes:
+            start = time.perf_counter()
+            if mode == 'incremental':
+                model = self.update_model(previous, X_update, y_update)
+            else:
+                model = self._fit_full(model_class, previous, pd.concat([X_old, X_update]), pd.concat([y_old, y_update]))
+            seconds = time.perf_counter() - start
+            models[mode] = model
+            report['runs'][mode] = {
+                'seconds': seconds,
+                **regression_metrics(y_holdout, self.predict_rows(model, X_holdout))
+            }
+
+        model = models[report['mode']]
+        model.feature_names = list(X_new.columns)
+        model.is_trained = True
+        # Recalibrate the intervals on new rows neither retrain was fitted on
+        model.calibrate_intervals(X_holdout, y_holdout)
+        return model, report
+
+    def retrain(self, previous_yield, previous_roi, old_data, new_data, compare=False):
+        """
+        Retrain the yield and ROI models on new feedback.
+
+        Parameters:
+        previous_yield (AgriYieldModel): Previous yield model (or None)
+        previous_roi (AgriROIModel): Previous ROI model (or None)
+        old_data (pd.DataFrame): Feedback table the previous models were trained on
+        new_data (pd.DataFrame): Feedback table added since then
+        compare (bool): Run incremental and full retrains and report both
+
+        Returns:
+        tuple: (yield_model, roi_model, report)
+        """
+        yield_model, yield_report = self.retrain_target('yield', previous_yield, old_data, new_data, compare)
+        roi_model, roi_report = self.retrain_target('roi', previous_roi, old_data, new_data, compare)
+        self.report = {'yield': yield_report, 'roi': roi_report}
+        self.print_report()
+        return yield_model, roi_model, self.report
+
+    def print_report(self):
+        """Print the latency and holdout accuracy of each retrain side by side."""
+        print(f"{'Model':<7}{'Mode':<13}{'Seconds':>9}{'MSE':>12}{'MAE':>10}{'R²':>8}")
+        for target, report in self.report.items():
+            for mode, run in report['runs'].items():
+                chosen = '*' if mode == report['mode'] else ' '
+                print(f"{target:<7}{mode + chosen:<13}{run['seconds']:>9.3f}{run['mse']:>12.4f}"
+                      f"{run['mae']:>10.4f}{run['r2']:>8.4f}")
+            drift = report.get('drift')
+            detail = f", feature shift {drift['feature_shift']:.2f}, R² on new data {drift['r2_on_new_data']:.2f}" if drift else ""
+            print(f"  {target}: {report['mode']} ({report['reason']}{detail})")
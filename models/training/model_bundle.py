@@ -0,0 +1,446 @@
+"""
+Single-file model bundles for Sasya-Mitra AI models.
+
+A bundle is an uncompressed zip archive holding a JSON manifest and one or more
+files per model member:
+
+- XGBoost models in XGBoost's native UBJSON format rather than pickled
+- RandomForest tree arrays (nodes and values of all trees concatenated) as .npy
+  files aligned inside the archive, so they are memory-mapped instead of read
+- the fitted StandardScaler as JSON
+
+The manifest records a SHA-256 checksum for every file. Members are loaded on
+first use and verified as they are read, so a process that only serves one
+model never reads the others. Bundles are written to a temporary file and moved
+into place with os.replace, so readers see either the old or the new bundle.
+"""
+
+import io
+import os
+import json
+import copy
+import math
+import mmap
+import struct
+import hashlib
+import zipfile
+from datetime import datetime
+
+import numpy as np
+import xgboost as xgb
+from sklearn.preprocessing import StandardScaler
+from sklearn.tree._tree import Tree, NODE_DTYPE
+import joblib
+
+# File suffix of a model bundle
+BUNDLE_SUFFIX = ".bundle"
+
+# Bundle layout version; readers reject bundles newer than they understand
+BUNDLE_FORMAT_VERSION = 1
+
+# Name of the manifest inside the archive
+MANIFEST_NAME = "manifest.json"
+
+# Alignment of array data inside the archive, matching numpy's own header padding
+ARRAY_ALIGNMENT = 64
+
+# Zip extra-field ID used to pad local headers so array data is aligned
+PADDING_EXTRA_ID = 0xA5A5
+
+# Fitted StandardScaler attributes stored in a bundle
+SCALER_ARRAYS = ('mean_', 'var_', 'scale_')
+
+# Tree node layout used when every float field of a forest is exact in float32
+FLOAT32_NODE_DTYPE = np.dtype([
+    ('left_child', '<i4'), ('right_child', '<i4'), ('feature', '<i4'), ('threshold', '<f4'),
+    ('impurity', '<f4'), ('n_node_samples', '<i4'), ('weighted_n_node_samples', '<f4'),
+    ('missing_go_to_left', 'u1')
+])
+
+class BundleError(Exception):
+    """Raised when a bundle is missing, corrupt or of an unknown format."""
+
+def _sha256(data):
+    """Hex SHA-256 of bytes or a buffer."""
+    return hashlib.sha256(data).hexdigest()
+
+def _json_default(value):
+    """Serialize numpy scalars and arrays found in estimator parameters."""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    return str(value)
+
+def _npy_bytes(array):
+    """Serialize an array in .npy format."""
+    buffer = io.BytesIO()
+    np.lib.format.write_array(buffer, np.ascontiguousarray(array), allow_pickle=False)
+    return buffer.getvalue()
+
+def _float32_exact(array):
+    """Whether a float64 array survives a round trip through float32 unchanged."""
+    return np.array_equal(array.astype(np.float32).astype(np.float64), array)
+
+def _forest_files(name, forest):
+    """
+    Split a fitted RandomForest into tree arrays and a small parameter skeleton.
+
+    Compacted forests (see forest_compaction) hold only float32-exact values,
+    so their trees are stored at half size without changing any prediction.
+
+    Returns:
+    tuple: (files dict, member metadata dict)
+    """
+    states = [estimator.tree_.__getstate__() for estimator in forest.estimators_]
+    # The skeleton keeps the estimator parameters; the trees are rebuilt from the arrays
+    skeleton = copy.copy(forest)
+    skeleton.estimators_ = []
+    for estimator in forest.estimators_:
+        shell = copy.copy(estimator)
+        del shell.tree_
+        skeleton.estimators_.append(shell)
+    skeleton_buffer = io.BytesIO()
+    joblib.dump(skeleton, skeleton_buffer)
+
+    first = forest.estimators_[0].tree_
+    nodes = np.concatenate([state['nodes'] for state in states])
+    values = np.concatenate([state['values'] for state in states])
+    precision = 'float64'
+    if all(_float32_exact(nodes[field]) for field in ('threshold', 'impurity', 'weighted_n_node_samples')) \
+            and _float32_exact(values):
+        precision = 'float32'
+        nodes, values = nodes.astype(FLOAT32_NODE_DTYPE), values.astype(np.float32)
+    files = {
+        f"{name}.pkl": skeleton_buffer.getvalue(),
+        f"{name}_nodes.npy": _npy_bytes(nodes),
+        f"{name}_values.npy": _npy_bytes(values),
+    }
+    meta = {
+        'kind': 'forest',
+        'precision': precision,
+        'node_counts': [int(state['node_count']) for state in states],
+        'max_depths': [int(state['max_depth']) for state in states],
+        'n_features': int(first.n_features),
+        'n_classes': first.n_classes.tolist(),
+        'n_outputs': int(first.n_outputs),
+    }
+    return files, meta
+
+def _xgboost_files(name, model):
+    """Store an XGBoost model in its native format plus its sklearn parameters."""
+    raw = model.get_booster().save_raw('ubj')
+    return {f"{name}.ubj": bytes(raw)}, {'kind': 'xgboost', 'params': model.get_params()}
+
+def _scaler_files(name, scaler):
+    """Store a fitted StandardScaler as JSON."""
+    state = {
+        'params': scaler.get_params(),
+        'n_features_in_': int(scaler.n_features_in_),
+        'n_samples_seen_': np.asarray(scaler.n_samples_seen_).tolist(),
+    }
+    for attribute in SCALER_ARRAYS:
+        value = getattr(scaler, attribute, None)
+        state[attribute] = None if value is None else value.tolist()
+    if hasattr(scaler, 'feature_names_in_'):
+        state['feature_names_in_'] = scaler.feature_names_in_.tolist()
+    return {f"{name}.json": json.dumps(state).encode()}, {'kind': 'scaler'}
+
+def _member_files(name, value):
+    """Choose the storage for one model member."""
+    if isinstance(value, xgb.XGBModel):
+        return _xgboost_files(name, value)
+    if isinstance(value, StandardScaler):
+        return _scaler_files(name, value)
+    if hasattr(value, 'estimators_') and all(hasattr(e, 'tree_') for e in value.estimators_):
+        return _forest_files(name, value)
+    raise BundleError(f"Cannot bundle member {name} of type {type(value).__name__}")
+
+def bundle_size(value):
+    """
+    Bytes a fitted estimator or scaler takes up in a bundle.
+
+    Parameters:
+    value: Fitted estimator or scaler
+
+    Returns:
+    int: Total size of the files it is stored as
+    """
+    files, _ = _member_files('member', value)
+    return sum(len(data) for data in files.values())
+
+def _padding_extra(offset, filename):
+    """Zip extra field that makes a member's data start on an aligned offset."""
+    # Local file header is 30 bytes plus the file name plus the extra field
+    data_start = offset + 30 + len(filename.encode()) + 4
+    padding = -data_start % ARRAY_ALIGNMENT
+    return struct.pack('<HH', PADDING_EXTRA_ID, padding) + b'\0' * padding
+
+def write_bundle(path, model_type, members, feature_names, params=None):
+    """
+    Write a model bundle atomically.
+
+    Parameters:
+    path (str): Bundle file path
+    model_type (str): Model class name
+    members (dict): Member attribute name -> fitted estimator or scaler
+    feature_names (list): Feature names the model was trained on
+    params (dict): Constructor parameters of the model
+
+    Returns:
+    dict: The manifest written
+    """
+    manifest = {
+        'format_version': BUNDLE_FORMAT_VERSION,
+        'model_type': model_type,
+        'created_at': datetime.now().isoformat(),
+        'feature_names': list(feature_names) if feature_names is not None else None,
+        'params': params or {},
+        'members': {},
+        'files': {},
+    }
+    files = {}
+    for name, value in members.items():
+        member_files, meta = _member_files(name, value)
+        meta['files'] = list(member_files)
+        manifest['members'][name] = meta
+        files.update(member_files)
+    for filename, data in files.items():
+        manifest['files'][filename] = {'sha256': _sha256(data), 'size': len(data)}
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    try:
+        with open(tmp_path, 'wb') as f:
+            with zipfile.ZipFile(f, 'w', compression=zipfile.ZIP_STORED) as archive:
+                archive.writestr(MANIFEST_NAME, json.dumps(manifest, indent=2, default=_json_default))
+                for filename, data in files.items():
+                    info = zipfile.ZipInfo(filename, date_time=(1980, 1, 1, 0, 0, 0))
+                    if filename.endswith('.npy'):
+                        info.extra = _padding_extra(f.tell(), filename)
+                    archive.writestr(info, data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return manifest
+
+class ModelBundle:
+    """
+    Read access to a model bundle, loading and verifying members on demand.
+
+    The bundle file stays open, so members loaded later come from the same
+    bundle even if a newer one has been moved into its place meanwhile.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        if not os.path.exists(path):
+            raise BundleError(f"Model bundle not found: {path}")
+        self._file = open(path, 'rb')
+        # Read-only map of the whole file, created when the first array is mapped
+        self._map = None
+        try:
+            self._archive = zipfile.ZipFile(self._file)
+            manifest_bytes = self._archive.read(MANIFEST_NAME)
+        except (zipfile.BadZipFile, KeyError) as e:
+            self._file.close()
+            raise BundleError(f"Not a model bundle: {path} ({e})")
+        self.bundle_id = _sha256(manifest_bytes)
+        self.manifest = json.loads(manifest_bytes)
+        if self.manifest.get('format_version', 0) > BUNDLE_FORMAT_VERSION:
+            self._file.close()
+            raise BundleError(f"Bundle format {self.manifest['format_version']} is newer than supported")
+
+    def __getstate__(self):
+        # Open files cannot be copied; copies reopen the bundle by path
+        return {'path': self.path, 'bundle_id': self.bundle_id}
+
+    def __setstate__(self, state):
+        self.__init__(state['path'])
+        if self.bundle_id != state['bundle_id']:
+            raise BundleError(f"Model bundle {self.path} was replaced after it was opened")
+
+    def close(self):
+        """Close the bundle file."""
+        self._file.close()
+
+    @property
+    def member_names(self):
+        """Names of the members stored in the bundle."""
+        return list(self.manifest['members'])
+
+    def _verify(self, filename, data):
+        """Check a file against its manifest checksum."""
+        expected = self.manifest['files'][filename]['sha256']
+        if _sha256(data) != expected:
+            raise BundleError(f"Checksum mismatch for {filename} in {self.path}")
+
+    def read_file(self, filename):
+        """
+        Read and verify one file of the bundle.
+
+        Parameters:
+        filename (str): File name inside the archive
+
+        Returns:
+        bytes: File contents
+        """
+        data = self._archive.read(filename)
+        self._verify(filename, data)
+        return data
+
+    def map_array(self, filename):
+        """
+        Memory-map a verified .npy file of the bundle.
+
+        Arrays are views of one read-only map of the bundle file, so mapping
+        never moves the file position that the archive's member reads share
+        and can run alongside them in other threads.
+
+        Parameters:
+        filename (str): File name inside the archive
+
+        Returns:
+        np.ndarray: Read-only view of the array
+        """
+        info = self._archive.getinfo(filename)
+        if info.compress_type != zipfile.ZIP_STORED:
+            return np.load(io.BytesIO(self.read_file(filename)), allow_pickle=False)
+        if self._map is None:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        # The local header may differ from the central directory, so read its lengths
+        name_length, extra_length = struct.unpack_from('<HH', self._map, info.header_offset + 26)
+        data_offset = info.header_offset + 30 + name_length + extra_length
+
+        mapped = np.frombuffer(self._map, dtype=np.uint8, count=info.file_size, offset=data_offset)
+        self._verify(filename, mapped)
+        member = io.BytesIO(mapped[:ARRAY_ALIGNMENT * 64].tobytes())
+        if np.lib.format.read_magic(member) == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(member)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(member)
+        array = np.frombuffer(self._map, dtype=dtype, count=math.prod(shape), offset=data_offset + member.tell())
+        return array.reshape(shape, order='F' if fortran_order else 'C')
+
+    def _load_forest(self, name, meta):
+        """Rebuild a RandomForest from its skeleton and tree arrays."""
+        forest = joblib.load(io.BytesIO(self.read_file(f"{name}.pkl")))
+        nodes = self.map_array(f"{name}_nodes.npy")
+        values = self.map_array(f"{name}_values.npy")
+        if meta.get('precision') == 'float32':
+            # Widen back to the layout sklearn expects
+            nodes, values = nodes.astype(NODE_DTYPE), values.astype(np.float64)
+        n_classes = np.asarray(meta['n_classes'], dtype=np.intp)
+        start = 0
+        for estimator, node_count, max_depth in zip(forest.estimators_, meta['node_counts'], meta['max_depths']):
+            tree = Tree(meta['n_features'], n_classes, meta['n_outputs'])
+            tree.__setstate__({
+                'max_depth': max_depth,
+                'node_count': node_count,
+                'nodes': np.asarray(nodes[start:start + node_count]),
+                'values': np.asarray(values[start:start + node_count]),
+            })
+            estimator.tree_ = tree
+            start += node_count
+        return forest
+
+    def _load_xgboost(self, name, meta):
+        """Load an XGBoost model from its native format."""
+        model = xgb.XGBRegressor(**meta['params'])
+        model.load_model(bytearray(self.read_file(f"{name}.ubj")))
+        return model
+
+    def _load_scaler(self, name, meta):
+        """Rebuild a fitted StandardScaler."""
+        state = json.loads(self.read_file(f"{name}.json"))
+        scaler = StandardScaler(**state['params'])
+        scaler.n_features_in_ = state['n_features_in_']
+        scaler.n_samples_seen_ = np.asarray(state['n_samples_seen_'], dtype=np.int64)
+        for attribute in SCALER_ARRAYS:
+            if state[attribute] is not None:
+                setattr(scaler, attribute, np.asarray(state[attribute], dtype=np.float64))
+        if 'feature_names_in_' in state:
+            scaler.feature_names_in_ = np.asarray(state['feature_names_in_'], dtype=object)
+        return scaler
+
+    def load(self, name):
+        """
+        Load one member of the bundle.
+
+        Parameters:
+        name (str): Member attribute name
+
+        Returns:
+        The fitted estimator or scaler
+        """
+        if name not in self.manifest['members']:
+            raise BundleError(f"Bundle {self.path} has no member {name}")
+        meta = self.manifest['members'][name]
+        loaders = {'forest': self._load_forest, 'xgboost': self._load_xgboost, 'scaler': self._load_scaler}
+        return loaders[meta['kind']](name, meta)
+
+    def verify(self):
+        """
+        Verify the checksums of every file in the bundle.
+
+        Returns:
+        bool: True if all files match the manifest
+        """
+        for filename in self.manifest['files']:
+            self.read_file(filename)
+        return True
+
+class LazyMember:
+    """
+    Model attribute loaded from the model's bundle on first access.
+
+    Once loaded (or assigned) the value lives in the instance dictionary,
+    which takes precedence over this descriptor, so later access is free.
+    Members missing from the bundle raise AttributeError, so getattr()
+    defaults work for optional members.
+    """
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        bundle = instance.__dict__.get('_bundle')
+        if bundle is None or self.name not in bundle.manifest['members']:
+            raise AttributeError(self.name)
+        value = bundle.load(self.name)
+        instance.__dict__[self.name] = value
+        return value
+
+def convert_legacy_model(filepath, model_class):
+    """
+    Convert a model saved as separate pickles into a bundle next to them.
+
+    Parameters:
+    filepath (str): Path the model was saved under (without suffix)
+    model_class: AgriYieldModel or AgriROIModel
+
+    Returns:
+    str: Path of the bundle written
+    """
+    model = model_class()
+    model.load_model(filepath)
+    model.save_model(filepath)
+    return f"{filepath}{BUNDLE_SUFFIX}"
+
+if __name__ == "__main__":
+    import sys
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from training.model_trainer import AgriYieldModel, AgriROIModel
+
+    if len(sys.argv) < 2:
+        print("Usage: python training/model_bundle.py <model path> [<model path> ...]")
+        print("Converts pickled yield_model / roi_model files into bundles.")
+        sys.exit(1)
+    for filepath in sys.argv[1:]:
+        model_class = AgriROIModel if os.path.basename(filepath).startswith('roi') else AgriYieldModel
+        print(f"✅ Wrote {convert_legacy_model(filepath, model_class)}")
@@ -12,17 +12,177 @@ import xgboost as xgb
 import joblib
 import os
 
+from preprocessing.training_matrix import TrainingMatrixBuilder, crop_key
+from training.model_bundle import BUNDLE_SUFFIX, ModelBundle, LazyMember, write_bundle
+from training.prediction_intervals import DEFAULT_COVERAGE, make_quantile_model, ensemble_interval, conformal_correction
+
+# Dataset keys used by the training scripts, by the short name the matrix builder expects
+TRAINING_MATRIX_SOURCES = {
+    'nasa_power': '1. NASA POWER Data (Rainfall, Temperature, Humidity, Radiation) 👆🏻',
+    'yield': 'All India level Average Yield of Principal Crops from 2001-02 to 2015-16',
+    'area': 'All India level Area Under Principal Crops from 2001-02 to 2015-16',
+    'production': 'Production of principle crops',
+    'price': 'price',
+    'damage': 'Year-wise Damage Caused Due To Floods, Cyclonic Storm, Landslides etc'
+}
+
+# Fewest observations for which the row-per-observation matrix is used
+MIN_MATRIX_ROWS = 10
+
+# Fewest of a model's features an input must supply, as a share; below it predictions are refused
+MIN_FEATURE_COVERAGE = 0.5
+
+# Matrix features coding a crop or district by the model's own category order, never taken from inputs
+CATEGORY_CODE_FEATURES = ('crop_code', 'district_code')
+
+# Estimator parameters used unless tuned parameters are supplied
+DEFAULT_RF_PARAMS = {'n_estimators': 100, 'random_state': 42}
+DEFAULT_XGB_PARAMS = {'n_estimators': 100, 'random_state': 42, 'tree_method': 'hist'}
+
+def build_training_matrix(datasets):
+    """
+    Build the row-per-observation training matrix from the training datasets.
+    
+    Parameters:
+    datasets (dict): Dictionary containing all loaded datasets
+    
+    Returns:
+    tuple: (X, y_yield), or (None, None) if there are too few observations
+    """
+    sources = {name: datasets.get(key, datasets.get(name)) for name, key in TRAINING_MATRIX_SOURCES.items()}
+    try:
+        X, y = TrainingMatrixBuilder().build(sources)
+    except Exception as e:
+        print(f"Warning: Error building training matrix: {e}")
+        return None, None
+    if X is None or len(X) < MIN_MATRIX_ROWS:
+        return None, None
+    return X, y
+
+def build_season_features(datasets):
+    """
+    Build the next-season feature rows of each crop, with the training matrix columns.
+    
+    Parameters:
+    datasets (dict): Dictionary containing all loaded datasets
+    
+    Returns:
+    pd.DataFrame: 'Crop' (and 'District') keys plus the matrix features, or None
+    """
+    sources = {name: datasets.get(key, datasets.get(name)) for name, key in TRAINING_MATRIX_SOURCES.items()}
+    try:
+        return TrainingMatrixBuilder().build_next_season(sources)
+    except Exception as e:
+        print(f"Warning: Error building season features: {e}")
+        return None
+
+def feature_matrix(rows, feature_names, season_features=None):
+    """
+    Arrange input rows in a model's training column order.
+    
+    Models trained on the training matrix carry the next-season features of
+    each crop: a row takes those of its 'crop' (and 'district') and overrides
+    them with the features it supplies itself, such as the request's weather.
+    Other models take the rows' own columns.
+    
+    Parameters:
+    rows (pd.DataFrame): Prepared input rows
+    feature_names (list): Columns the model was trained on
+    season_features (pd.DataFrame): The model's season features, if it has them
+    
+    Returns:
+    pd.DataFrame: float32 feature rows, with the few missing columns set to 0
+    
+    Raises:
+    ValueError: If a row's crop has no season features, or the rows supply
+    fewer than MIN_FEATURE_COVERAGE of the model's features
+    """
+    if season_features is not None:
+        if 'crop' not in rows.columns:
+            raise ValueError("Rows need a 'crop' for a model trained on the training matrix")
+        keys = [key for key in ('District', 'Crop') if key in season_features.columns]
+        # Crop names are reduced to keys; names that already are keys are kept as they are
+        known = set(season_features['Crop'])
+        wanted = pd.DataFrame({'Crop': [crop if crop in known else crop_key(crop) for crop in rows['crop']]})
+        if 'District' in keys:
+            wanted['District'] = rows['district'].astype(str).to_numpy() if 'district' in rows.columns else None
+        season = wanted.merge(season_features, on=keys, how='left')
+        season.index = rows.index
+        unknown = season[feature_names].isna().all(axis=1)
+        if unknown.any():
+            raise ValueError(
+                f"No season features for {sorted(set(map(str, rows.loc[unknown, 'crop'])))}; "
+                f"known crops: {sorted(season_features['Crop'].unique())}"
+            )
+        supplied = [name for name in feature_names if name in rows.columns and name not in CATEGORY_CODE_FEATURES]
+        season[supplied] = rows[supplied]
+        rows = season
+    
+    missing = [name for name in feature_names if name not in rows.columns]
+    if len(feature_names) - len(missing) < MIN_FEATURE_COVERAGE * len(feature_names):
+        raise ValueError(
+            f"Input supplies {len(feature_names) - len(missing)} of the model's {len(feature_names)} "
+            f"features; missing {missing[:10]}{' ...' if len(missing) > 10 else ''}"
+        )
+    return rows.reindex(columns=feature_names, fill_value=0).astype(np.float32)
+
+def season_features_params(season_features):
+    """Season features as JSON-serializable bundle parameters (None if the model has none)."""
+    return season_features.to_dict(orient='list') if season_features is not None else None
+
+def load_season_features(params):
+    """Season features from a bundle's parameters, or None."""
+    season_features = params.get('season_features')
+    if not season_features:
+        return None
+    season_features = pd.DataFrame(season_features)
+    features = [name for name in season_features.columns if name not in ('District', 'Crop')]
+    season_features[features] = season_features[features].astype(np.float32)
+    return season_features
+
+def split_training_data(X, y):
+    """
+    Split a feature matrix into train and test sets.
+    
+    Parameters:
+    X (pd.DataFrame): Feature matrix
+    y (pd.Series): Targets
+    
+    Returns:
+    tuple: (X_train, X_test, y_train, y_test)
+    """
+    if len(X) >= 2:
+        test_size = max(0.2, 1.0 / len(X))  # Keep at least one test sample
+        return train_test_split(X, y, test_size=test_size, random_state=42)
+    # Fallback if we still don't have enough data
+    return X, X, y, y
+
 class AgriYieldModel:
     """
     Yield prediction model using RandomForest and XGBoost.
     """
     
-    def __init__(self):
-        self.rf_model = RandomForestRegressor(n_estimators=100, random_state=42)
-        self.xgb_model = xgb.XGBRegressor(n_estimators=100, random_state=42)
+    # Loaded from the model bundle on first use
+    rf_model = LazyMember()
+    xgb_model = LazyMember()
+    quantile_model = LazyMember()
+    scaler = LazyMember()
+    
+    def __init__(self, rf_params=None, xgb_params=None, interval_coverage=DEFAULT_COVERAGE):
+        self._bundle = None
+        self.rf_params = {**DEFAULT_RF_PARAMS, **(rf_params or {})}
+        self.xgb_params = {**DEFAULT_XGB_PARAMS, **(xgb_params or {})}
+        self.interval_coverage = interval_coverage
+        self.interval_correction = 0.0
+        self.rf_model = RandomForestRegressor(**self.rf_params)
+        self.xgb_model = xgb.XGBRegressor(**self.xgb_params)
+        # Predicts the prediction interval bounds; None for models saved without one
+        self.quantile_model = None
         self.scaler = StandardScaler()
         self.is_trained = False
         self.feature_names = None
+        # Next-season features per crop for models trained on the training matrix
+        self.season_features = None
         
     def prepare_features(self, datasets):
         """
@@ -165,7 +325,6 @@ class AgriYieldModel:
         
         # Convert to DataFrame
         feature_df = pd.DataFrame([features])
-        self.feature_names = list(features.keys())
         
         return feature_df
     
@@ -190,13 +349,26 @@ class AgriYieldModel:
         
         return pd.Series(yield_targets), pd.Series(roi_targets)
     
-    def train(self, datasets):
+    def prepare_training_data(self, datasets):
         """
-        Train the yield prediction models using provided datasets.
+        Prepare the feature matrix and yield targets for training.
+        
+        Uses one row per (crop, year) observation when the historical tables
+        allow it, and falls back to the summary features otherwise.
         
         Parameters:
         datasets (dict): Dictionary containing all loaded datasets
+        
+        Returns:
+        tuple: (X, y_yield)
         """
+        X, y_yield = build_training_matrix(datasets)
+        if X is not None:
+            print(f"Prepared training matrix with shape: {X.shape}")
+            self.season_features = build_season_features(datasets)
+            return X, y_yield
+        self.season_features = None
+        
         # Prepare features
         X = self.prepare_features(datasets)
         
@@ -235,15 +407,31 @@ class AgriYieldModel:
             y_yield = pd.concat([y_yield] * n_duplicates, ignore_index=True)
             y_roi = pd.concat([y_roi] * n_duplicates, ignore_index=True)
         
+        return X, y_yield
+    
+    def train(self, datasets):
+        """
+        Train the yield prediction models using provided datasets.
+        
+        Parameters:
+        datasets (dict): Dictionary containing all loaded datasets
+        """
+        X, y_yield = self.prepare_training_data(datasets)
+        return self.fit(X, y_yield)
+    
+    def fit(self, X, y_yield):
+        """
+        Train the yield prediction models on a prepared feature matrix.
+        
+        Parameters:
+        X (pd.DataFrame): Feature matrix
+        y_yield (pd.Series): Yield targets
+        
+        Returns:
+        dict: Evaluation metrics for both models
+        """
         # Split the data - ensure we have enough samples
-        if len(X) >= 2:
-            test_size = min(0.2, 1.0 / len(X))  # Adjust test size if needed
-            X_train, X_test, y_train, y_test = train_test_split(
-                X, y_yield, test_size=test_size, random_state=42
-            )
-        else:
-            # Fallback if we still don't have enough data
-            X_train, X_test, y_train, y_test = X, X, y_yield, y_yield
+        X_train, X_test, y_train, y_test = split_training_data(X, y_yield)
         
         # Scale features
         X_train_scaled = self.scaler.fit_transform(X_train)
@@ -251,13 +439,18 @@ class AgriYieldModel:
         
         # Train Random Forest with the approach you shared
         print("Training Random Forest model...")
-        self.rf_model = RandomForestRegressor(n_estimators=100, random_state=42)
+        self.rf_model = RandomForestRegressor(**self.rf_params)
         self.rf_model.fit(X_train, y_train)
         
         # Train XGBoost
         print("Training XGBoost model...")
+        self.xgb_model = xgb.XGBRegressor(**self.xgb_params)
         self.xgb_model.fit(X_train, y_train)
         
+        # Train the interval bounds model
+        self.quantile_model = make_quantile_model(self.xgb_params, self.interval_coverage)
+        self.quantile_model.fit(X_train, y_train)
+        
         # Evaluate models
         rf_pred = self.rf_model.predict(X_test)
         xgb_pred = self.xgb_model.predict(X_test)
@@ -283,12 +476,34 @@ class AgriYieldModel:
         
         self.is_trained = True
         self.feature_names = X.columns.tolist()
+        self.calibrate_intervals(X_test, y_test)
         
         return {
             'rf_metrics': {'mse': rf_mse, 'mae': rf_mae, 'r2': rf_r2},
             'xgb_metrics': {'mse': xgb_mse, 'mae': xgb_mae, 'r2': xgb_r2}
         }
     
+    def prediction_features(self, datasets):
+        """
+        Build the feature rows to predict on from datasets, in the training column order.
+        
+        A model trained on the training matrix predicts each crop's next season;
+        others predict on the summary features.
+        
+        Parameters:
+        datasets (dict): Dictionary containing all loaded datasets
+        
+        Returns:
+        pd.DataFrame: Feature rows
+        """
+        if self.season_features is None:
+            return feature_matrix(self.prepare_features(datasets).fillna(0), self.feature_names)
+        rows = build_season_features(datasets)
+        if rows is None:
+            raise ValueError("The datasets have no yield history to build season features from")
+        rows = rows.rename(columns={'Crop': 'crop', 'District': 'district'})
+        return feature_matrix(rows, self.feature_names, self.season_features)
+    
     def predict(self, datasets):
         """
         Make predictions using the trained models.
@@ -302,20 +517,7 @@ class AgriYieldModel:
         if not self.is_trained:
             raise ValueError("Model must be trained before making predictions")
             
-        # Prepare features
-        X = self.prepare_features(datasets)
-        
-        # Handle any remaining missing values
-        X = X.fillna(0)
-        
-        # Ensure feature columns match training data
-        if self.feature_names:
-            # Add missing columns with 0 values
-            for col in self.feature_names:
-                if col not in X.columns:
-                    X[col] = 0
-            # Remove extra columns
-            X = X[self.feature_names]
+        X = self.prediction_features(datasets)
         
         rf_pred = self.rf_model.predict(X)
         xgb_pred = self.xgb_model.predict(X)
@@ -329,6 +531,41 @@ class AgriYieldModel:
             'ensemble_prediction': ensemble_pred
         }
     
+    def predict_intervals(self, X):
+        """
+        Predict yields with prediction intervals for a batch of feature rows.
+        
+        Parameters:
+        X (pd.DataFrame): Feature rows in the training column order
+        
+        Returns:
+        dict: prediction, lower and upper arrays, plus the nominal coverage
+        """
+        if not self.is_trained:
+            raise ValueError("Model must be trained before making predictions")
+        return ensemble_interval(
+            self.rf_model, self.xgb_model, getattr(self, 'quantile_model', None), X,
+            self.interval_coverage, self.interval_correction
+        )
+    
+    def calibrate_intervals(self, X, y):
+        """
+        Set the interval widening from rows the models were not trained on.
+        
+        Parameters:
+        X (pd.DataFrame): Held-out feature rows
+        y (pd.Series): Held-out yields
+        
+        Returns:
+        float: The conformal correction
+        """
+        self.interval_correction = 0.0
+        intervals = self.predict_intervals(X)
+        self.interval_correction = conformal_correction(
+            intervals['lower'], intervals['upper'], y, self.interval_coverage
+        )
+        return self.interval_correction
+    
     def get_feature_importance(self):
         """
         Get feature importance from the trained models.
@@ -366,7 +603,7 @@ class AgriYieldModel:
     
     def save_model(self, filepath):
         """
-        Save the trained models to disk.
+        Save the trained models to disk as a single bundle ({filepath}.bundle).
         
         Parameters:
         filepath (str): Path to save the models
@@ -374,26 +611,44 @@ class AgriYieldModel:
         if not self.is_trained:
             raise ValueError("Model must be trained before saving")
             
-        # Create directory if it doesn't exist
-        os.makedirs(os.path.dirname(filepath), exist_ok=True)
-        
-        # Save both models and scaler
-        joblib.dump(self.rf_model, f"{filepath}_rf.pkl")
-        joblib.dump(self.xgb_model, f"{filepath}_xgb.pkl")
-        joblib.dump(self.scaler, f"{filepath}_scaler.pkl")
-        joblib.dump(self.feature_names, f"{filepath}_features.pkl")
+        members = {'rf_model': self.rf_model, 'xgb_model': self.xgb_model, 'scaler': self.scaler}
+        if getattr(self, 'quantile_model', None) is not None:
+            members['quantile_model'] = self.quantile_model
+        write_bundle(
+            f"{filepath}{BUNDLE_SUFFIX}", type(self).__name__, members, self.feature_names,
+            {'rf_params': self.rf_params, 'xgb_params': self.xgb_params,
+             'interval_coverage': self.interval_coverage, 'interval_correction': self.interval_correction,
+             'season_features': season_features_params(self.season_features)}
+        )
         
     def load_model(self, filepath):
         """
         Load trained models from disk.
         
+        A bundle is opened and its members are loaded on first use; models
+        saved as separate pickles are still loaded eagerly.
+        
         Parameters:
         filepath (str): Path to load the models from
         """
+        if os.path.exists(f"{filepath}{BUNDLE_SUFFIX}"):
+            bundle = ModelBundle(f"{filepath}{BUNDLE_SUFFIX}")
+            for name in ('rf_model', 'xgb_model', 'quantile_model', 'scaler'):
+                self.__dict__.pop(name, None)
+            self._bundle = bundle
+            self.rf_params = bundle.manifest['params'].get('rf_params', self.rf_params)
+            self.xgb_params = bundle.manifest['params'].get('xgb_params', self.xgb_params)
+            self.interval_coverage = bundle.manifest['params'].get('interval_coverage', self.interval_coverage)
+            self.interval_correction = bundle.manifest['params'].get('interval_correction', 0.0)
+            self.feature_names = bundle.manifest['feature_names']
+            self.season_features = load_season_features(bundle.manifest['params'])
+            self.is_trained = True
+            return
         self.rf_model = joblib.load(f"{filepath}_rf.pkl")
         self.xgb_model = joblib.load(f"{filepath}_xgb.pkl")
         self.scaler = joblib.load(f"{filepath}_scaler.pkl")
         self.feature_names = joblib.load(f"{filepath}_features.pkl")
+        self.season_features = None
         self.is_trained = True
 
 class AgriROIModel:
@@ -401,11 +656,21 @@ class AgriROIModel:
     ROI prediction model using XGBoost.
     """
     
-    def __init__(self):
-        self.model = xgb.XGBRegressor(n_estimators=100, random_state=42)
+    # Loaded from the model bundle on first use
+    model = LazyMember()
+    scaler = LazyMember()
+    
+    def __init__(self, xgb_params=None, interval_coverage=DEFAULT_COVERAGE):
+        self._bundle = None
+        self.xgb_params = {**DEFAULT_XGB_PARAMS, **(xgb_params or {})}
+        self.interval_coverage = interval_coverage
+        self.interval_correction = 0.0
+        self.model = xgb.XGBRegressor(**self.xgb_params)
         self.scaler = StandardScaler()
         self.is_trained = False
         self.feature_names = None
+        # Next-season features per crop for models trained on the training matrix
+        self.season_features = None
         
     def prepare_features(self, datasets):
         """
@@ -494,17 +759,55 @@ class AgriROIModel:
         
         # Convert to DataFrame
         feature_df = pd.DataFrame([features])
-        self.feature_names = list(features.keys())
         
         return feature_df
     
-    def train(self, datasets):
+    def create_roi_targets(self, X):
         """
-        Train the ROI prediction model using provided datasets.
+        Create ROI targets (percentage) for a row-per-observation training matrix.
+        
+        The historical tables carry no cultivation costs, so ROI is derived from
+        the relative price and yield level of each observation.
+        
+        Parameters:
+        X (pd.DataFrame): Training matrix
+        
+        Returns:
+        pd.Series: ROI targets
+        """
+        np.random.seed(42)
+        zeros = pd.Series(0.0, index=X.index)
+        
+        price = X.get('price_modal', zeros).astype(float)
+        known_prices = price[price > 0]
+        price_factor = (price / known_prices.median() - 1).where(price > 0, 0) if not known_prices.empty else zeros
+        
+        recent_yield = X.get('yield_lag1', zeros).astype(float)
+        usual_yield = X.get('yield_rolling3', zeros).astype(float)
+        yield_factor = (recent_yield / usual_yield.where(usual_yield > 0) - 1).fillna(0)
+        
+        return 15 + price_factor * 10 + yield_factor * 10 + np.random.normal(0, 2, len(X))
+    
+    def prepare_training_data(self, datasets):
+        """
+        Prepare the feature matrix and ROI targets for training.
+        
+        Uses one row per (crop, year) observation when the historical tables
+        allow it, and falls back to the summary features otherwise.
         
         Parameters:
         datasets (dict): Dictionary containing all loaded datasets
+        
+        Returns:
+        tuple: (X, y_roi)
         """
+        X, _ = build_training_matrix(datasets)
+        if X is not None:
+            print(f"Prepared training matrix with shape: {X.shape}")
+            self.season_features = build_season_features(datasets)
+            return X, self.create_roi_targets(X)
+        self.season_features = None
+        
         # Prepare features
         X = self.prepare_features(datasets)
         
@@ -546,15 +849,31 @@ class AgriROIModel:
             yield_factor = X.get('yield_mean_0_RICE', pd.Series([3000] * n_samples)) - 3000
             y_roi = 15 + price_factor * 0.1 + yield_factor * 0.001 + np.random.normal(0, 2, n_samples)
         
+        return X, y_roi
+    
+    def train(self, datasets):
+        """
+        Train the ROI prediction model using provided datasets.
+        
+        Parameters:
+        datasets (dict): Dictionary containing all loaded datasets
+        """
+        X, y_roi = self.prepare_training_data(datasets)
+        return self.fit(X, y_roi)
+    
+    def fit(self, X, y_roi):
+        """
+        Train the ROI prediction model on a prepared feature matrix.
+        
+        Parameters:
+        X (pd.DataFrame): Feature matrix
+        y_roi (pd.Series): ROI targets
+        
+        Returns:
+        dict: Evaluation metrics
+        """
         # Split the data - ensure we have enough samples
-        if len(X) >= 2:
-            test_size = min(0.2, 1.0 / len(X))  # Adjust test size if needed
-            X_train, X_test, y_train, y_test = train_test_split(
-                X, y_roi, test_size=test_size, random_state=42
-            )
-        else:
-            # Fallback if we still don't have enough data
-            X_train, X_test, y_train, y_test = X, X, y_roi, y_roi
+        X_train, X_test, y_train, y_test = split_training_data(X, y_roi)
         
         # Scale features
         X_train_scaled = self.scaler.fit_transform(X_train)
@@ -562,7 +881,7 @@ class AgriROIModel:
         
         # Train the model with the approach you shared
         print("Training ROI model...")
-        self.model = xgb.XGBRegressor(n_estimators=100, random_state=42)
+        self.model = xgb.XGBRegressor(**self.xgb_params)
         self.model.fit(X_train, y_train)
         
         # Evaluate the model
@@ -580,9 +899,31 @@ class AgriROIModel:
         
         self.is_trained = True
         self.feature_names = X.columns.tolist()
+        self.calibrate_intervals(X_test, y_test)
         
         return {'mse': mse, 'mae': mae, 'r2': r2}
     
+    def prediction_features(self, datasets):
+        """
+        Build the feature rows to predict on from datasets, in the training column order.
+        
+        A model trained on the training matrix predicts each crop's next season;
+        others predict on the summary features.
+        
+        Parameters:
+        datasets (dict): Dictionary containing all loaded datasets
+        
+        Returns:
+        pd.DataFrame: Feature rows
+        """
+        if self.season_features is None:
+            return feature_matrix(self.prepare_features(datasets).fillna(0), self.feature_names)
+        rows = build_season_features(datasets)
+        if rows is None:
+            raise ValueError("The datasets have no yield history to build season features from")
+        rows = rows.rename(columns={'Crop': 'crop', 'District': 'district'})
+        return feature_matrix(rows, self.feature_names, self.season_features)
+    
     def predict(self, datasets):
         """
         Make ROI predictions.
@@ -596,22 +937,47 @@ class AgriROIModel:
         if not self.is_trained:
             raise ValueError("Model must be trained before making predictions")
             
-        # Prepare features
-        X = self.prepare_features(datasets)
+        X = self.prediction_features(datasets)
         
-        # Handle any remaining missing values
-        X = X.fillna(0)
+        return self.model.predict(X)
+    
+    def predict_intervals(self, X):
+        """
+        Predict ROI with prediction intervals for a batch of feature rows.
         
-        # Ensure feature columns match training data
-        if self.feature_names:
-            # Add missing columns with 0 values
-            for col in self.feature_names:
-                if col not in X.columns:
-                    X[col] = 0
-            # Remove extra columns
-            X = X[self.feature_names]
+        The single XGBoost model has no spread of its own, so the interval is
+        the prediction widened by the conformal correction on both sides.
         
-        return self.model.predict(X)
+        Parameters:
+        X (pd.DataFrame): Feature rows in the training column order
+        
+        Returns:
+        dict: prediction, lower and upper arrays, plus the nominal coverage
+        """
+        if not self.is_trained:
+            raise ValueError("Model must be trained before making predictions")
+        prediction = self.model.predict(X)
+        return {
+            'prediction': prediction,
+            'lower': prediction - self.interval_correction,
+            'upper': prediction + self.interval_correction,
+            'coverage': self.interval_coverage,
+        }
+    
+    def calibrate_intervals(self, X, y):
+        """
+        Set the interval width from rows the model was not trained on.
+        
+        Parameters:
+        X (pd.DataFrame): Held-out feature rows
+        y (pd.Series): Held-out ROI values
+        
+        Returns:
+        float: The conformal correction
+        """
+        prediction = self.model.predict(X)
+        self.interval_correction = conformal_correction(prediction, prediction, y, self.interval_coverage)
+        return self.interval_correction
     
     def get_feature_importance(self):
         """
@@ -636,7 +1002,7 @@ class AgriROIModel:
     
     def save_model(self, filepath):
         """
-        Save the trained model to disk.
+        Save the trained model to disk as a single bundle ({filepath}.bundle).
         
         Parameters:
         filepath (str): Path to save the model
@@ -644,23 +1010,41 @@ class AgriROIModel:
         if not self.is_trained:
             raise ValueError("Model must be trained before saving")
             
-        # Create directory if it doesn't exist
-        os.makedirs(os.path.dirname(filepath), exist_ok=True)
-        
-        joblib.dump(self.model, f"{filepath}_roi.pkl")
-        joblib.dump(self.scaler, f"{filepath}_scaler.pkl")
-        joblib.dump(self.feature_names, f"{filepath}_features.pkl")
+        write_bundle(
+            f"{filepath}{BUNDLE_SUFFIX}", type(self).__name__,
+            {'model': self.model, 'scaler': self.scaler},
+            self.feature_names,
+            {'xgb_params': self.xgb_params,
+             'interval_coverage': self.interval_coverage, 'interval_correction': self.interval_correction,
+             'season_features': season_features_params(self.season_features)}
+        )
         
     def load_model(self, filepath):
         """
         Load trained model from disk.
         
+        A bundle is opened and its members are loaded on first use; models
+        saved as separate pickles are still loaded eagerly.
+        
         Parameters:
         filepath (str): Path to load the model from
         """
+        if os.path.exists(f"{filepath}{BUNDLE_SUFFIX}"):
+            bundle = ModelBundle(f"{filepath}{BUNDLE_SUFFIX}")
+            for name in ('model', 'scaler'):
+                self.__dict__.pop(name, None)
+            self._bundle = bundle
+            self.xgb_params = bundle.manifest['params'].get('xgb_params', self.xgb_params)
+            self.interval_coverage = bundle.manifest['params'].get('interval_coverage', self.interval_coverage)
+            self.interval_correction = bundle.manifest['params'].get('interval_correction', 0.0)
+            self.feature_names = bundle.manifest['feature_names']
+            self.season_features = load_season_features(bundle.manifest['params'])
+            self.is_trained = True
+            return
         self.model = joblib.load(f"{filepath}_roi.pkl")
         self.scaler = joblib.load(f"{filepath}_scaler.pkl")
         self.feature_names = joblib.load(f"{filepath}_features.pkl")
+        self.season_features = None
         self.is_trained = True
 
 # Example usage
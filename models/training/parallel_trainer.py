@@ -0,0 +1,191 @@
+"""
+Parallel training orchestrator for Sasya-Mitra AI models.
+
+Fits the yield RandomForest, the yield XGBoost model, the yield interval model
+and the ROI XGBoost model concurrently, each in its own worker process with its
+own core budget.
+"""
+
+import os
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from sklearn.base import clone
+from sklearn.metrics import mean_squared_error, r2_score, mean_absolute_error
+
+from training.model_trainer import AgriYieldModel, AgriROIModel, split_training_data
+from training.prediction_intervals import make_quantile_model
+
+# Share of the available cores given to each model; RandomForest trees are
+# independent so it gets the largest budget
+DEFAULT_CORE_SHARES = {
+    'yield_rf': 0.4,
+    'yield_xgb': 0.2,
+    'yield_quantile': 0.2,
+    'roi_xgb': 0.2
+}
+
+def _fit_estimator(name, estimator, X_train, y_train, X_test, y_test):
+    """
+    Fit one estimator inside a worker process and time it.
+
+    Parameters:
+    name (str): Model name
+    estimator: Unfitted scikit-learn compatible estimator
+    X_train, y_train: Training data
+    X_test, y_test: Evaluation data
+
+    Returns:
+    tuple: (name, fitted estimator, metrics dict, timing dict)
+    """
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+
+    estimator.fit(X_train, y_train)
+
+    timing = {
+        'wall_seconds': time.perf_counter() - wall_start,
+        # Process CPU time covers every thread the estimator used
+        'cpu_seconds': time.process_time() - cpu_start
+    }
+
+    y_pred = estimator.predict(X_test)
+    if y_pred.ndim == 2:
+        # Interval bounds: report how often they contain the target
+        metrics = {
+            'coverage': float(((y_test >= y_pred[:, 0]) & (y_test <= y_pred[:, 1])).mean()),
+            'mean_width': float((y_pred[:, 1] - y_pred[:, 0]).mean())
+        }
+    else:
+        metrics = {
+            'mse': mean_squared_error(y_test, y_pred),
+            'mae': mean_absolute_error(y_test, y_pred),
+            'r2': r2_score(y_test, y_pred)
+        }
+    return name, estimator, metrics, timing
+
+class ParallelModelTrainer:
+    """
+    Trains the yield ensemble and the ROI model concurrently on a process pool.
+    """
+
+    def __init__(self, n_cores=None, core_shares=None):
+        self.n_cores = n_cores or os.cpu_count() or 1
+        self.core_shares = core_shares or DEFAULT_CORE_SHARES
+        self.report = None
+
+    def core_budgets(self):
+        """
+        Split the available cores between the models.
+
+        Returns:
+        dict: Number of cores per model (at least one each)
+        """
+        return {
+            name: max(1, int(self.n_cores * share))
+            for name, share in self.core_shares.items()
+        }
+
+    def build_jobs(self, yield_model, roi_model):
+        """
+        Create unfitted estimators configured with their core budgets.
+
+        Parameters:
+        yield_model (AgriYieldModel): Template yield model
+        roi_model (AgriROIModel): Template ROI model
+
+        Returns:
+        dict: Estimators keyed by model name
+        """
+        budgets = self.core_budgets()
+        return {
+            'yield_rf': clone(yield_model.rf_model).set_params(n_jobs=budgets['yield_rf']),
+            'yield_xgb': clone(yield_model.xgb_model).set_params(n_jobs=budgets['yield_xgb'], tree_method='hist'),
+            'yield_quantile': make_quantile_model(yield_model.xgb_params, yield_model.interval_coverage).set_params(
+                n_jobs=budgets['yield_quantile'], tree_method='hist'
+            ),
+            'roi_xgb': clone(roi_model.model).set_params(n_jobs=budgets['roi_xgb'], tree_method='hist')
+        }
+
+    def train(self, X_yield, y_yield, X_roi=None, y_roi=None, yield_model=None, roi_model=None):
+        """
+        Train the yield and ROI models concurrently.
+
+        Parameters:
+        X_yield (pd.DataFrame): Yield feature matrix
+        y_yield (pd.Series): Yield targets
+        X_roi (pd.DataFrame): ROI feature matrix (defaults to X_yield)
+        y_roi (pd.Series): ROI targets (ROI model is skipped if None)
+        yield_model (AgriYieldModel): Model to train (a new one if None)
+        roi_model (AgriROIModel): Model to train (a new one if None)
+
+        Returns:
+        tuple: (yield_model, roi_model, report)
+        """
+        yield_model = yield_model or AgriYieldModel()
+        roi_model = roi_model or AgriROIModel()
+        if X_roi is None:
+            X_roi = X_yield
+
+        splits = {'yield': split_training_data(X_yield, y_yield)}
+        if y_roi is not None:
+            splits['roi'] = split_training_data(X_roi, y_roi)
+
+        jobs = self.build_jobs(yield_model, roi_model)
+        if y_roi is None:
+            jobs.pop('roi_xgb')
+
+        print(f"Training {len(jobs)} models in parallel on {self.n_cores} cores: {self.core_budgets()}")
+
+        wall_start = time.perf_counter()
+        results = {}
+        # Spawned workers avoid inheriting OpenMP state from the parent process
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=len(jobs), mp_context=context) as executor:
+            futures = []
+            for name, estimator in jobs.items():
+                X_train, X_test, y_train, y_test = splits['roi' if name == 'roi_xgb' else 'yield']
+                futures.append(executor.submit(_fit_estimator, name, estimator, X_train, y_train, X_test, y_test))
+            for future in futures:
+                name, estimator, metrics, timing = future.result()
+                results[name] = (estimator, metrics, timing)
+        total_wall = time.perf_counter() - wall_start
+
+        # Assemble the trained models
+        X_train = splits['yield'][0]
+        yield_model.rf_model = results['yield_rf'][0]
+        yield_model.xgb_model = results['yield_xgb'][0]
+        yield_model.quantile_model = results['yield_quantile'][0]
+        yield_model.scaler.fit(X_train)
+        yield_model.feature_names = X_yield.columns.tolist()
+        yield_model.is_trained = True
+        yield_model.calibrate_intervals(splits['yield'][1], splits['yield'][3])
+
+        if 'roi_xgb' in results:
+            roi_model.model = results['roi_xgb'][0]
+            roi_model.scaler.fit(splits['roi'][0])
+            roi_model.feature_names = X_roi.columns.tolist()
+            roi_model.is_trained = True
+            roi_model.calibrate_intervals(splits['roi'][1], splits['roi'][3])
+
+        budgets = self.core_budgets()
+        self.report = {
+            'total_wall_seconds': total_wall,
+            'yield_metrics': {
+                'rf_metrics': results['yield_rf'][1],
+                'xgb_metrics': results['yield_xgb'][1],
+                'interval_metrics': results['yield_quantile'][1]
+            },
+            'roi_metrics': results['roi_xgb'][1] if 'roi_xgb' in results else {},
+            'timings': {
+                name: {**timing, 'cores': budgets[name]}
+                for name, (_, _, timing) in results.items()
+            }
+        }
+
+        print(f"Parallel training finished in {total_wall:.2f}s")
+        for name, timing in self.report['timings'].items():
+            print(f"  {name}: wall {timing['wall_seconds']:.2f}s, CPU {timing['cpu_seconds']:.2f}s on {timing['cores']} cores")
+
+        return yield_model, roi_model, self.report
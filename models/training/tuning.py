@@ -0,0 +1,286 @@
+"""
+Hyperparameter tuning for Sasya-Mitra AI models.
+
+Runs a randomized or successive-halving search over RandomForest and XGBoost
+parameters. Cross-validation folds are materialized once and shared by every
+candidate, and the (candidate, fold) fits run in parallel across cores.
+"""
+
+import os
+import json
+import math
+import time
+from datetime import datetime
+
+import numpy as np
+from joblib import Parallel, delayed, effective_n_jobs
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.metrics import mean_squared_error
+from sklearn.model_selection import KFold
+import xgboost as xgb
+
+from training.model_trainer import DEFAULT_RF_PARAMS, DEFAULT_XGB_PARAMS
+
+# Search spaces sampled by the tuner
+PARAM_SPACES = {
+    'rf': {
+        'n_estimators': [50, 100, 200, 400],
+        'max_depth': [None, 8, 12, 16, 24],
+        'min_samples_leaf': [1, 2, 4, 8],
+        'max_features': [1.0, 0.5, 'sqrt']
+    },
+    'xgb': {
+        'n_estimators': [100, 200, 400, 800],
+        'max_depth': [3, 4, 6, 8],
+        'learning_rate': [0.03, 0.05, 0.1, 0.2],
+        'subsample': [0.7, 0.85, 1.0],
+        'colsample_bytree': [0.6, 0.8, 1.0],
+        'min_child_weight': [1, 3, 5]
+    }
+}
+
+# Fewest training rows a successive-halving round may use
+MIN_RESOURCE_ROWS = 30
+
+def make_estimator(model_type, params):
+    """
+    Create an unfitted estimator for a candidate configuration.
+
+    Parameters:
+    model_type (str): 'rf' or 'xgb'
+    params (dict): Candidate parameters
+
+    Returns:
+    Estimator using a single core (parallelism is across folds)
+    """
+    if model_type == 'rf':
+        return RandomForestRegressor(**{**DEFAULT_RF_PARAMS, **params, 'n_jobs': 1})
+    if model_type == 'xgb':
+        return xgb.XGBRegressor(**{**DEFAULT_XGB_PARAMS, **params, 'n_jobs': 1})
+    raise ValueError(f"Unknown model type: {model_type}")
+
+def _evaluate_fold(model_type, params, fold, n_rows):
+    """
+    Fit a candidate on one fold and score it on the held-out rows.
+
+    Parameters:
+    model_type (str): 'rf' or 'xgb'
+    params (dict): Candidate parameters
+    fold (tuple): (X_train, y_train, X_val, y_val) arrays
+    n_rows (int): Number of training rows to use
+
+    Returns:
+    float: Validation MSE
+    """
+    X_train, y_train, X_val, y_val = fold
+    estimator = make_estimator(model_type, params)
+    estimator.fit(X_train[:n_rows], y_train[:n_rows])
+    return mean_squared_error(y_val, estimator.predict(X_val))
+
+def load_tuned_params(filepath):
+    """
+    Load the winning configuration saved next to a model.
+
+    Parameters:
+    filepath (str): Model path prefix (e.g. "saved_models/yield_model")
+
+    Returns:
+    dict: Best parameters keyed by model type, or {} if none were saved
+    """
+    path = f"{filepath}_best_params.json"
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r') as f:
+        return json.load(f).get('best_params', {})
+
+def save_tuning_results(results, filepath):
+    """
+    Write the winning configuration next to a saved model.
+
+    Parameters:
+    results (dict): Tuning results keyed by model type
+    filepath (str): Model path prefix (e.g. "saved_models/yield_model")
+
+    Returns:
+    str: Path of the written file
+    """
+    path = f"{filepath}_best_params.json"
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    payload = {
+        'tuned_at': datetime.now().isoformat(),
+        'best_params': {name: result['best_params'] for name, result in results.items()},
+        'scores': {
+            name: {key: value for key, value in result.items() if key not in ('best_params', 'history')}
+            for name, result in results.items()
+        }
+    }
+    with open(path, 'w') as f:
+        json.dump(payload, f, indent=2)
+    return path
+
+class FoldCache:
+    """
+    Cross-validation folds materialized once and reused by every candidate.
+    """
+
+    def __init__(self, X, y, n_folds=5, random_state=42):
+        X = np.asarray(X, dtype=np.float32)
+        y = np.asarray(y, dtype=np.float32)
+        n_folds = max(2, min(n_folds, len(X)))
+        rng = np.random.default_rng(random_state)
+        kfold = KFold(n_splits=n_folds, shuffle=True, random_state=random_state)
+
+        self.folds = []
+        for train_idx, val_idx in kfold.split(X):
+            # Shuffle training rows so that any prefix is a random subsample
+            train_idx = rng.permutation(train_idx)
+            self.folds.append((
+                np.ascontiguousarray(X[train_idx]), y[train_idx],
+                np.ascontiguousarray(X[val_idx]), y[val_idx]
+            ))
+        self.n_train_rows = min(len(fold[0]) for fold in self.folds)
+
+class HyperparameterTuner:
+    """
+    Randomized or successive-halving search over model parameters.
+    """
+
+    def __init__(self, model_type, method='halving', n_candidates=27, n_folds=5, eta=3,
+                 time_budget=600, n_jobs=-1, random_state=42, param_space=None):
+        if model_type not in PARAM_SPACES:
+            raise ValueError(f"Unknown model type: {model_type}")
+        if method not in ('halving', 'random'):
+            raise ValueError(f"Unknown search method: {method}")
+        self.model_type = model_type
+        self.method = method
+        self.n_candidates = n_candidates
+        self.n_folds = n_folds
+        self.eta = eta
+        self.time_budget = time_budget
+        self.n_jobs = n_jobs
+        self.random_state = random_state
+        self.param_space = param_space or PARAM_SPACES[model_type]
+        self.results = None
+
+    def sample_candidates(self):
+        """
+        Draw distinct random configurations from the search space.
+
+        Returns:
+        list: Candidate parameter dicts
+        """
+        rng = np.random.default_rng(self.random_state)
+        n_combinations = math.prod(len(values) for values in self.param_space.values())
+        n_candidates = min(self.n_candidates, n_combinations)
+
+        candidates, seen = [], set()
+        while len(candidates) < n_candidates:
+            params = {
+                name: values[rng.integers(len(values))]
+                for name, values in self.param_space.items()
+            }
+            key = json.dumps(params, sort_keys=True, default=str)
+            if key not in seen:
+                seen.add(key)
+                candidates.append(params)
+        return candidates
+
+    def _schedule(self, n_candidates, n_rows):
+        """
+        Training rows per round: the last round always uses every row.
+
+        Parameters:
+        n_candidates (int): Number of starting candidates
+        n_rows (int): Training rows per fold
+
+        Returns:
+        list: Row counts, one per round
+        """
+        if self.method == 'random':
+            return [n_rows]
+        # Halve until at most eta candidates reach the final round
+        n_rounds = 1
+        while n_candidates > self.eta and n_rows // self.eta ** n_rounds >= MIN_RESOURCE_ROWS:
+            n_candidates = math.ceil(n_candidates / self.eta)
+            n_rounds += 1
+        return [n_rows // self.eta ** (n_rounds - 1 - i) for i in range(n_rounds)]
+
+    def tune(self, X, y):
+        """
+        Search for the configuration with the lowest cross-validated MSE.
+
+        Parameters:
+        X (pd.DataFrame): Feature matrix
+        y (pd.Series): Targets
+
+        Returns:
+        dict: best_params, best_rmse, evaluation counts, timings and history
+        """
+        start = time.perf_counter()
+        deadline = start + self.time_budget
+        cache = FoldCache(X, y, self.n_folds, self.random_state)
+        candidates = self.sample_candidates()
+        schedule = self._schedule(len(candidates), cache.n_train_rows)
+        n_workers = effective_n_jobs(self.n_jobs)
+        # Candidates per dispatch: enough (candidate, fold) tasks to fill the pool
+        batch_size = max(1, math.ceil(2 * n_workers / len(cache.folds)))
+
+        print(f"Tuning {self.model_type} ({self.method}): {len(candidates)} candidates, "
+              f"{len(cache.folds)} folds, rows per round {schedule}, {n_workers} workers")
+
+        history = []
+        best = None
+        completed = True
+        # Reuse one worker pool for every round
+        with Parallel(n_jobs=self.n_jobs, max_nbytes='1M') as parallel:
+            for round_index, n_rows in enumerate(schedule):
+                scores = []
+                for i in range(0, len(candidates), batch_size):
+                    if time.perf_counter() >= deadline:
+                        completed = False
+                        break
+                    batch = candidates[i:i + batch_size]
+                    mses = parallel(
+                        delayed(_evaluate_fold)(self.model_type, params, fold, n_rows)
+                        for params in batch
+                        for fold in cache.folds
+                    )
+                    for j, params in enumerate(batch):
+                        fold_mses = mses[j * len(cache.folds):(j + 1) * len(cache.folds)]
+                        scores.append((float(np.mean(fold_mses)), params))
+                        history.append({
+                            'round': round_index,
+                            'n_rows': n_rows,
+                            'params': params,
+                            'mse': float(np.mean(fold_mses))
+                        })
+
+                if scores:
+                    scores.sort(key=lambda item: item[0])
+                    best = scores[0]
+                if not completed or round_index == len(schedule) - 1:
+                    break
+                # Keep the best 1/eta of the candidates for the next round
+                n_keep = max(1, math.ceil(len(scores) / self.eta))
+                candidates = [params for _, params in scores[:n_keep]]
+
+        elapsed = time.perf_counter() - start
+        if best is None:
+            raise RuntimeError(f"Time budget of {self.time_budget}s ran out before any candidate was evaluated")
+
+        self.results = {
+            'method': self.method,
+            'best_params': best[1],
+            'best_rmse': math.sqrt(best[0]),
+            'n_evaluated': len(history),
+            'n_rounds': round_index + 1,
+            'completed': completed,
+            'elapsed_seconds': elapsed,
+            'history': history
+        }
+        status = "" if completed else " (time budget reached)"
+        print(f"Best {self.model_type} RMSE {self.results['best_rmse']:.4f} after "
+              f"{len(history)} evaluations in {elapsed:.1f}s{status}: {best[1]}")
+        return self.results
@@ -261,6 +261,7 @@ const Dashboard = () => {
         center_lon: center.lng,
         land_area_acres: 2.5,
         location: "Farmer Location",
+        user_id: auth.currentUser ? auth.currentUser.uid : null,
         soil_data: {
           ph: soilData ? soilData.pH : 6.8,
           organic_carbon: soilData ? parseFloat(soilData.organicCarbon) : 1.2,
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Test script for the spatial index of laid out farms.
+"""
+
+import sys
+import os
+import shutil
+import tempfile
+
+from shapely.geometry import box, shape
+
+# Add the models and API directories to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), 'models'))
+sys.path.append(os.path.join(os.path.dirname(__file__), 'models', 'api'))
+
+from map_visualization.farm_index import FarmIndex
+from map_test_utils import temporary_map_storage
+import map_api
+
+def square(lon, lat, size=0.001):
+    """A square farm with its south-west corner at a point."""
+    return box(lon, lat, lon + size, lat + size)
+
+def test_radius_nearest_and_bbox_queries():
+    """Test distance, nearest and bounding box queries across the tree and recently added farms."""
+    index_dir = tempfile.mkdtemp()
+    try:
+        db_path = os.path.join(index_dir, 'farms.sqlite3')
+        index = FarmIndex(db_path, rebuild_threshold=7)
+        # A 10 x 10 grid of farms 0.01 degrees (about 1.1 km) apart; most go into the tree, the last few stay recent
+        for i in range(10):
+            for j in range(10):
+                index.add(f'farm-{i}-{j}', square(73.80 + 0.01 * i, 18.50 + 0.01 * j), {'weather_data': {'i': i, 'j': j}})
+        assert len(index) == 100 and index._tree_size < 100
+
+        inside = index.within_km(18.5005, 73.8005, 0.5)
+        assert [farm['farm_id'] for farm in inside] == ['farm-0-0'] and inside[0]['distance_km'] == 0
+        assert inside[0]['weather_data'] == {'i': 0, 'j': 0}
+        # Neighbours east and north of a farm's north-east corner are about 0.95 km and 1.0 km away
+        assert {farm['farm_id'] for farm in index.within_km(18.501, 73.801, 1.05)} == {'farm-0-0', 'farm-1-0', 'farm-0-1'}
+        assert [farm['farm_id'] for farm in index.nearest(18.595, 73.895, k=1)] == ['farm-9-9']
+        assert len(index.nearest(18.55, 73.85, k=7)) == 7
+        assert {farm['farm_id'] for farm in index.in_bbox(73.8395, 18.5395, 73.8505, 18.5505)} == \
+            {'farm-4-4', 'farm-4-5', 'farm-5-4', 'farm-5-5'}
+        assert len(index.in_bbox(73.8395, 18.5395, 73.8505, 18.5505, limit=3)) == 3
+
+        # Replacing a farm moves it, and the index reloads from disk
+        index.add('farm-0-0', square(74.5, 19.5), {'weather_data': {'moved': True}})
+        assert index.within_km(18.5005, 73.8005, 0.5) == []
+        reopened = FarmIndex(db_path)
+        assert len(reopened) == 100
+        assert reopened.nearest(19.5005, 74.5005, k=1)[0]['weather_data'] == {'moved': True}
+    finally:
+        shutil.rmtree(index_dir)
+    print("✅ Farm index answers radius, nearest and bounding box queries")
+
+def test_generated_farms_are_indexed():
+    """Test that generated maps index their farms, share weather with neighbours and are served as GeoJSON."""
+    with temporary_map_storage(map_api.mapper):
+        client = map_api.app.test_client()
+        weather = {'rainfall_mm': 1200, 'temperature_c': 24, 'humidity': 80, 'solar_radiation': 4.5}
+        first = client.post('/api/generate-land-layout-map',
+                            json={"center_lat": 18.52, "center_lon": 73.85, "weather_data": weather}).get_json()
+        assert len(map_api.mapper.farm_index) == 1
+
+        # A farm next door without its own weather uses its neighbour's
+        assert map_api.mapper.neighbour_weather(18.53, 73.85) == weather
+        assert map_api.parse_layout_request({"center_lat": 18.53, "center_lon": 73.85})[5].rainfall_mm == 1200
+        assert map_api.parse_layout_request({"center_lat": 19.5, "center_lon": 73.85})[5].rainfall_mm == 850
+        client.post('/api/generate-land-layout-map', json={"center_lat": 18.53, "center_lon": 73.85})
+
+        nearby = client.get('/api/farms/nearby?lat=18.52&lon=73.85&k=2').get_json()
+        assert len(nearby['features']) == 2
+        assert nearby['features'][0]['properties']['map_url'] == first['map_url']
+        assert shape(nearby['features'][0]['geometry']).contains(shape({'type': 'Point', 'coordinates': [73.85, 18.52]}))
+        assert nearby['features'][1]['properties']['weather_data'] == weather
+        assert len(client.get('/api/farms/nearby?lat=18.52&lon=73.85&radius_km=0.5').get_json()['features']) == 1
+        assert len(client.get('/api/farms/bbox?bbox=73.84,18.51,73.86,18.54').get_json()['features']) == 2
+        assert client.get('/api/farms/nearby?lat=18.52').status_code == 400
+        assert client.get('/api/farms/bbox?bbox=1,2,3').status_code == 400
+    print("✅ Generated farms are indexed and served to neighbours")
+
+def test_redrawn_farm_replaces_the_users_farm():
+    """Test that a user's resized or redrawn farm replaces their earlier plan instead of overlapping it."""
+    with temporary_map_storage(map_api.mapper):
+        client = map_api.app.test_client()
+        farm = {"center_lat": 18.52, "center_lon": 73.85, "user_id": "u1"}
+        client.post('/api/generate-land-layout-map', json=farm)
+        client.post('/api/generate-land-layout-map', json={**farm, "land_area_acres": 8.0})
+        client.post('/api/generate-land-layout-map', json={
+            **farm, "boundary": box(73.849, 18.519, 73.852, 18.522).__geo_interface__
+        })
+        farms = map_api.mapper.farm_index.within_km(18.52, 73.85, 0.5)
+        assert len(farms) == 1 and shape(farms[0]['boundary']).equals(box(73.849, 18.519, 73.852, 18.522))
+
+        # Another user's farm on the same land, and the same user's farm elsewhere, are kept
+        client.post('/api/generate-land-layout-map', json={**farm, "user_id": "u2", "land_area_acres": 6.0})
+        client.post('/api/generate-land-layout-map', json={**farm, "center_lat": 18.60})
+        assert len(map_api.mapper.farm_index) == 3
+    print("✅ A redrawn farm replaces the user's earlier plan")
+
+def test_cached_maps_index_their_farms():
+    """Test that a map served from the cache still indexes the requesting user's farm."""
+    with temporary_map_storage(map_api.mapper):
+        client = map_api.app.test_client()
+        farm = {"center_lat": 18.52, "center_lon": 73.85, "user_id": "alice"}
+        first = client.post('/api/generate-land-layout-map', json=farm).get_json()
+        second = client.post('/api/generate-land-layout-map', json={**farm, "user_id": "bob"}).get_json()
+        assert second['map_url'] == first['map_url']
+        farms = map_api.mapper.farm_index.within_km(18.52, 73.85, 0.5)
+        assert sorted(farm['user_id'] for farm in farms) == ['alice', 'bob']
+
+        # A map cached before its farm was indexed indexes it, cutting its zones from the boundary
+        alice_id = next(farm['farm_id'] for farm in farms if farm['user_id'] == 'alice')
+        map_api.mapper.farm_index.remove(alice_id)
+        client.post('/api/generate-land-layout-map', json=farm)
+        farms = map_api.mapper.farm_index.within_km(18.52, 73.85, 0.5)
+        assert len(farms) == 2 and alice_id in {farm['farm_id'] for farm in farms}
+        farm_ids, _, zones = map_api.mapper.farm_index.zones_in_bbox(73.84, 18.51, 73.86, 18.53)
+        assert alice_id in farm_ids and zones.shape == (2, 3)
+    print("✅ Cached maps still index their farms")
+
+if __name__ == "__main__":
+    print("Testing farm index...")
+    test_radius_nearest_and_bbox_queries()
+    test_generated_farms_are_indexed()
+    test_redrawn_farm_replaces_the_users_farm()
+    test_cached_maps_index_their_farms()
+    print("\n🎉 All farm index tests passed!")
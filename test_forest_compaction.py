@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Test script for RandomForest compaction.
+"""
+
+import sys
+import os
+import copy
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+# Add the models directory to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), 'models'))
+
+from training.forest_compaction import ForestCompactor, cap_tree_depth, quantize_tree, tree_depths
+from training.model_bundle import bundle_size
+from training.model_trainer import AgriYieldModel, split_training_data
+
+def make_data(n=3000, seed=0):
+    """Create a learnable yield-like feature matrix."""
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame(rng.random((n, 8)), columns=[f"feature_{i}" for i in range(8)])
+    y = 3000 * X['feature_0'] + 800 * np.sin(6 * X['feature_1']) + 400 * X['feature_2'] * X['feature_3']
+    return X, y + rng.normal(0, 100, n)
+
+def train_model(X, y):
+    """Train a yield model with a deep forest."""
+    model = AgriYieldModel(rf_params={'n_estimators': 40}, xgb_params={'n_estimators': 30})
+    model.fit(X, y)
+    return model
+
+def test_depth_cap_matches_truncated_paths():
+    """Test that a capped tree predicts the value of each row's node at the cap."""
+    X, y = make_data()
+    tree = train_model(X, y).rf_model.estimators_[0]
+    capped = cap_tree_depth(tree, 5)
+    assert capped.tree_.max_depth == 5 and tree_depths(capped.tree_).max() == 5
+    assert capped.tree_.node_count < tree.tree_.node_count
+
+    rows = X.to_numpy(np.float32)[:200]
+    depths = tree_depths(tree.tree_)
+    path = tree.decision_path(rows).toarray().astype(bool)
+    # The deepest node on each path within the cap
+    node = np.array([np.flatnonzero(row & (depths <= 5))[-1] for row in path])
+    assert np.allclose(capped.predict(rows), tree.tree_.value[node, 0, 0])
+    print("✅ Depth cap turns the nodes at the cap into leaves")
+
+def test_float32_trees_keep_every_split():
+    """Test that float32 thresholds route every row to the same leaf and halve storage."""
+    X, y = make_data()
+    forest = train_model(X, y).rf_model
+    rows = X.to_numpy(np.float32)
+    for tree in forest.estimators_[:5]:
+        quantized = quantize_tree(tree)
+        assert np.array_equal(quantized.apply(rows), tree.apply(rows))
+        assert np.allclose(quantized.predict(rows), tree.predict(rows), rtol=1e-6)
+
+    quantized_forest = copy.copy(forest)
+    quantized_forest.estimators_ = [quantize_tree(tree) for tree in forest.estimators_]
+    assert bundle_size(quantized_forest) < 0.6 * bundle_size(forest)
+    print("✅ float32 trees keep every split at half the size")
+
+def test_compaction_is_drop_in():
+    """Test that the compacted model is smaller, reported, and saves and loads like the original."""
+    X, y = make_data()
+    model = train_model(X, y)
+    X_train, X_test, _, y_test = split_training_data(X, y)
+    compact_model, report = ForestCompactor(tolerance=0.05, distill=True, distill_trees=10).compact(
+        model, X_test, y_test, X_train=X_train
+    )
+    stages = [stage['stage'] for stage in report['stages']]
+    assert stages == ['original', 'tree selection', 'depth cap', 'float32', 'distilled']
+    assert report['size_reduction'] > 0.5
+    assert len(compact_model.rf_model.estimators_) < len(model.rf_model.estimators_)
+    # The original model is untouched
+    assert len(model.rf_model.estimators_) == 40
+
+    # Intervals are recalibrated for the compact forest and keep their coverage on new rows
+    assert compact_model.interval_correction != model.interval_correction
+    X_new, y_new = make_data(2000, seed=1)
+    intervals = compact_model.predict_intervals(X_new)
+    coverage = ((y_new >= intervals['lower']) & (y_new <= intervals['upper'])).mean()
+    assert 0.85 <= coverage <= 0.95, coverage
+    assert 0.8 <= report['interval_coverage'] <= 1
+
+    model_dir = tempfile.mkdtemp()
+    try:
+        path = os.path.join(model_dir, "yield_model_compact")
+        compact_model.save_model(path)
+        loaded = AgriYieldModel()
+        loaded.load_model(path)
+        assert loaded._bundle.manifest['members']['rf_model']['precision'] == 'float32'
+        assert np.array_equal(loaded.rf_model.predict(X_test), compact_model.rf_model.predict(X_test))
+        assert loaded.rf_params['n_estimators'] == len(compact_model.rf_model.estimators_)
+        assert loaded.interval_correction == compact_model.interval_correction
+    finally:
+        shutil.rmtree(model_dir)
+    print("✅ Compacted model is a drop-in replacement")
+
+if __name__ == "__main__":
+    print("Testing forest compaction...")
+    test_depth_cap_matches_truncated_paths()
+    test_float32_trees_keep_every_split()
+    test_compaction_is_drop_in()
+    print("\n🎉 All forest compaction tests passed!")
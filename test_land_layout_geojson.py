@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Test script for the GeoJSON land layout endpoint.
+"""
+
+import sys
+import os
+import json
+from types import SimpleNamespace
+
+from shapely.geometry import shape
+
+# Add the models and API directories to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), 'models'))
+sys.path.append(os.path.join(os.path.dirname(__file__), 'models', 'api'))
+
+from map_visualization.land_layout_mapper import LandLayoutMapper, round_coordinates
+import map_api
+
+RECOMMENDATION = SimpleNamespace(main_crop='Maize', intercrop='Cowpea', trees=['Mango', 'Gliricidia'])
+
+def test_layout_geojson():
+    """Test that the GeoJSON layout holds the boundary and land use polygons with their shares."""
+    mapper = LandLayoutMapper()
+    layout = mapper.generate_layout_geojson(RECOMMENDATION, 12.971, 77.592, 5.0, precision=None)
+    features = layout['features']
+    assert [feature['properties']['land_use_type'] for feature in features] == ['Farm Boundary', 'Main Crop', 'Intercrop', 'Trees']
+
+    boundary = shape(features[0]['geometry'])
+    assert boundary.equals(mapper.generate_land_polygon(12.971, 77.592, 5.0))
+    shares = [feature['properties']['share'] for feature in features[1:]]
+    assert shares == [0.6, 0.25, 0.15]
+    assert abs(sum(shape(feature['geometry']).area for feature in features[1:]) - boundary.area) < 1e-12
+    assert features[3]['properties']['tooltip'] == "Trees: ['Mango', 'Gliricidia']"
+
+    # Truncated coordinates stay within half a unit of the last kept decimal
+    rounded = mapper.generate_layout_geojson(RECOMMENDATION, 12.971, 77.592, 5.0, precision=5)
+    for exact, truncated in zip(features, rounded['features']):
+        for (x, y), (rx, ry) in zip(exact['geometry']['coordinates'][0], truncated['geometry']['coordinates'][0]):
+            assert abs(x - rx) <= 5e-6 and abs(y - ry) <= 5e-6
+    # Points that collapse together are dropped
+    assert round_coordinates([[[1.0, 2.0], [1.0000001, 2.0], [3.0, 4.0]]], 3) == [[[1.0, 2.0], [3.0, 4.0]]]
+    print("✅ GeoJSON layout holds the boundary and land use polygons")
+
+def test_geojson_endpoint():
+    """Test that the endpoint answers GET and POST with compact GeoJSON."""
+    client = map_api.app.test_client()
+    response = client.get('/api/land-layout.geojson?center_lat=18.52&center_lon=73.85&land_area_acres=3&precision=6')
+    assert response.status_code == 200 and response.mimetype == 'application/geo+json'
+    layout = json.loads(response.data)
+    assert layout['type'] == 'FeatureCollection' and len(layout['features']) == 4
+    assert layout['recommendation']['main_crop'] == layout['features'][1]['properties']['tooltip'].split(': ')[1]
+    assert b'": ' not in response.data and b'], [' not in response.data
+
+    full = client.post('/api/land-layout.geojson', json={"center_lat": 18.52, "center_lon": 73.85, "land_area_acres": 3})
+    assert full.status_code == 200 and len(response.data) < len(full.data)
+    assert client.get('/api/land-layout.geojson?precision=20').status_code == 400
+
+    # Much smaller than the standalone HTML page of the same layout
+    mapper = LandLayoutMapper()
+    land_use_gdf = mapper.create_land_use_polygons(
+        mapper.generate_land_polygon(18.52, 73.85, 3), mapper.calculate_layout_ratios(RECOMMENDATION)
+    )
+    map_html = mapper.generate_interactive_map(land_use_gdf, 18.52, 73.85, RECOMMENDATION).get_root().render()
+    assert len(response.data) < len(map_html) / 3
+    print(f"✅ GeoJSON endpoint returns {len(response.data)} bytes instead of a {len(map_html)} byte page")
+
+if __name__ == "__main__":
+    print("Testing land layout GeoJSON...")
+    test_layout_geojson()
+    test_geojson_endpoint()
+    print("\n🎉 All land layout GeoJSON tests passed!")
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Test script for area-proportional subdivision of farm boundaries.
+"""
+
+import sys
+import os
+import json
+
+import numpy as np
+from shapely.geometry import MultiPolygon, Polygon, shape
+
+# Add the models and API directories to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), 'models'))
+sys.path.append(os.path.join(os.path.dirname(__file__), 'models', 'api'))
+
+from map_visualization.land_layout_mapper import LandLayoutMapper
+from map_visualization.land_subdivision import (
+    area_acres, benchmark_subdivision, boundary_from_geojson, subdivide_farm, subdivide_farms
+)
+import map_api
+
+RATIOS = {'main_crop_ratio': 0.6, 'intercrop_ratio': 0.25, 'tree_ratio': 0.15}
+
+# An L-shaped field near Pune with a pond, about 5 acres
+L_FIELD = Polygon(
+    [(73.850, 18.520), (73.852, 18.520), (73.852, 18.5205), (73.8505, 18.5205), (73.8505, 18.522), (73.850, 18.522)],
+    [[(73.8502, 18.5202), (73.8504, 18.5202), (73.8504, 18.5204), (73.8502, 18.5204)]]
+)
+
+def test_zones_have_exact_shares():
+    """Test that irregular boundaries with holes and several parts are split into exact shares."""
+    second_field = Polygon([(73.860, 18.530), (73.861, 18.5302), (73.8605, 18.531)])
+    for boundary in (L_FIELD, MultiPolygon([L_FIELD, second_field])):
+        zones = subdivide_farm(boundary, RATIOS)
+        zone_acres = area_acres(zones, farm=boundary)
+        farm_acres = area_acres([boundary])[0]
+        assert np.allclose(zone_acres / farm_acres, [0.6, 0.25, 0.15], atol=1e-8)
+        assert all(zone.is_valid for zone in zones)
+        # Zones cover the farm without overlapping, and leave the pond out
+        union = zones[0].union(zones[1]).union(zones[2])
+        assert abs(union.symmetric_difference(boundary).area) < 1e-9 * boundary.area
+        assert zones[0].intersection(zones[1]).area < 1e-12 * boundary.area
+        assert not any(zone.contains(L_FIELD.interiors[0].centroid) for zone in zones)
+        # Main crop lies to the south of the trees
+        assert zones[0].centroid.y < zones[2].centroid.y
+
+    # The generated square is sized with an approximate metres-per-degree
+    square = LandLayoutMapper().generate_land_polygon(12.971, 77.592, 5.0)
+    assert abs(area_acres([square])[0] - 5.0) < 0.05
+    print("✅ Farm boundaries are split into exact area shares")
+
+def test_batch_subdivision():
+    """Test that a batch of farms is split in one call with the same result as one at a time."""
+    boundaries = [L_FIELD, LandLayoutMapper().generate_land_polygon(12.971, 77.592, 5.0)]
+    zones = subdivide_farms(boundaries, RATIOS)
+    assert zones.shape == (2, 3)
+    for boundary, batch_zones in zip(boundaries, zones):
+        for zone, single in zip(batch_zones, subdivide_farm(boundary, RATIOS)):
+            assert zone.equals(single)
+
+    results = benchmark_subdivision(farms=200)
+    assert results['max_share_error'] < 1e-6 and results['farms_per_second'] > 0
+    print(f"✅ Batch subdivision splits {results['farms_per_second']:.0f} farms/s")
+
+def test_drawn_boundaries_in_api():
+    """Test that the API accepts drawn boundaries and rejects ones that are not polygons."""
+    geometry = L_FIELD.__geo_interface__
+    assert boundary_from_geojson({'type': 'Feature', 'geometry': geometry}).equals(L_FIELD)
+    bowtie = boundary_from_geojson({'type': 'Polygon', 'coordinates': [[[0, 0], [1, 1], [1, 0], [0, 1], [0, 0]]]})
+    assert bowtie.is_valid and abs(bowtie.area - 0.5) < 1e-12
+
+    client = map_api.app.test_client()
+    response = client.post('/api/land-layout.geojson', json={"boundary": geometry})
+    assert response.status_code == 200
+    features = json.loads(response.data)['features']
+    assert shape(features[0]['geometry']).equals_exact(L_FIELD, 1e-7)
+    assert [feature['properties']['share'] for feature in features[1:]] == [0.6, 0.25, 0.15]
+    assert abs(features[0]['properties']['area_acres'] - area_acres([L_FIELD])[0]) < 1e-9
+
+    assert client.post('/api/land-layout.geojson', json={"boundary": {"type": "Point", "coordinates": [73.85, 18.52]}}).status_code == 400
+    assert client.post('/api/generate-land-layout-map', json={"boundary": {"type": "Polygon", "coordinates": [[[0, 0], [1, 1], [0, 0]]]}}).status_code == 400
+    print("✅ Drawn farm boundaries are accepted by the API")
+
+if __name__ == "__main__":
+    print("Testing land subdivision...")
+    test_zones_have_exact_shares()
+    test_batch_subdivision()
+    test_drawn_boundaries_in_api()
+    print("\n🎉 All land subdivision tests passed!")
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Test script for the generated map cache.
+"""
+
+import sys
+import os
+import gzip
+import time
+import shutil
+import hashlib
+import tempfile
+import threading
+
+# Add the models and API directories to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), 'models'))
+sys.path.append(os.path.join(os.path.dirname(__file__), 'models', 'api'))
+
+from map_visualization.land_layout_mapper import LandLayoutMapper
+from map_visualization.map_cache import BROTLI_AVAILABLE, MapCache, map_cache_key
+from recommendation.engine import SoilData, WeatherData, EconomicData
+from map_test_utils import temporary_map_storage
+import map_api
+
+def farm_inputs(nitrogen=150, rainfall=850):
+    """Soil, weather and economic inputs of a sample farm."""
+    return (
+        SoilData(ph=6.7, organic_carbon=1.2, nitrogen=nitrogen, phosphorus=40, potassium=200, texture='Loam', drainage='Moderate'),
+        WeatherData(rainfall_mm=rainfall, temperature_c=28, humidity=65, solar_radiation=5.5),
+        EconomicData(budget_inr=60000, labor_availability='Medium', input_cost_type='Organic')
+    )
+
+def test_cache_keys():
+    """Test that keys depend on every input but not on how numbers are written."""
+    soil, weather, economic = farm_inputs()
+    key = map_cache_key({'soil_data': soil, 'lat': 12.971, 'area': 5})
+    assert key == map_cache_key({'area': 5.0, 'lat': 12.97100000001, 'soil_data': vars(soil)})
+    assert key != map_cache_key({'soil_data': farm_inputs(nitrogen=151)[0], 'lat': 12.971, 'area': 5})
+    assert key != map_cache_key({'soil_data': soil, 'lat': 12.9711, 'area': 5})
+    print("✅ Map keys cover the full normalized input")
+
+def test_maps_are_reused_and_kept_apart():
+    """Test that neighbouring farms get separate maps and repeated requests skip rendering."""
+    cache_dir = tempfile.mkdtemp()
+    try:
+        mapper = LandLayoutMapper()
+        mapper.map_cache = MapCache(cache_dir)
+        calls = []
+        generate_recommendation = mapper.engine.generate_recommendation
+        mapper.engine.generate_recommendation = lambda *args: calls.append(args) or generate_recommendation(*args)
+
+        # Within 100 m of each other: the old lat/lon file names collided
+        first_path, first = mapper.get_real_time_recommendation_and_map(*farm_inputs(), 5.0, 12.9710, 77.5920, "Bangalore")
+        second_path, second = mapper.get_real_time_recommendation_and_map(
+            *farm_inputs(nitrogen=60, rainfall=400), 5.0, 12.9712, 77.5921, "Bangalore"
+        )
+        assert first_path != second_path and os.path.exists(first_path) and os.path.exists(second_path)
+        assert len(calls) == 2
+
+        modified = os.path.getmtime(first_path)
+        again_path, again = mapper.get_real_time_recommendation_and_map(*farm_inputs(), 5.0, 12.971, 77.592, "Bangalore")
+        assert again_path == first_path and again == first and len(calls) == 2
+        assert os.path.getmtime(first_path) >= modified
+        assert mapper.map_cache.stats()['maps'] == 2
+    finally:
+        shutil.rmtree(cache_dir)
+    print("✅ Repeated map requests reuse the cached map")
+
+def test_eviction_by_size_and_age():
+    """Test that eviction removes expired maps, then the least recently used beyond the budget."""
+    cache_dir = tempfile.mkdtemp()
+    try:
+        page = "x" * 1000
+        cache = MapCache(cache_dir, max_bytes=10 ** 9, max_age_seconds=3600)
+        for i, key in enumerate(['a' * 20, 'b' * 20, 'c' * 20, 'd' * 20]):
+            cache.put(key, page, {'i': i})
+            # Older maps were last used longer ago
+            stamp = time.time() - 100 * (4 - i)
+            os.utime(cache.map_path(key), (stamp, stamp))
+        # Unrelated files are left alone
+        with open(os.path.join(cache_dir, "sasyayojana_live_map_12971_77592.html"), 'w') as f:
+            f.write(page)
+
+        # Using 'a' makes it the most recently used
+        assert cache.get('a' * 20)[1]['i'] == 0
+        # Room for two maps, with their sidecars and compressed variants
+        cache.max_bytes = 2 * cache.entries()['a' * 20]['bytes']
+        assert sorted(cache.evict()) == ['b' * 20, 'c' * 20]
+        assert cache.get('b' * 20) is None and cache.get('a' * 20) is not None
+
+        # Writes within the budget do not scan the directory; expired maps wait for the next sweep
+        stamp = time.time() - 7200
+        os.utime(cache.map_path('d' * 20), (stamp, stamp))
+        assert cache.get('d' * 20) is None
+        scans = []
+        entries = cache.entries
+        cache.entries = lambda: scans.append(1) or entries()
+        cache.max_bytes = 10 ** 9
+        cache.put('e' * 20, page, {})
+        assert scans == [] and 'd' * 20 in entries()
+        cache.eviction_interval = 0
+        cache.put('f' * 20, page, {})
+        assert scans == [1] and set(entries()) == {'a' * 20, 'e' * 20, 'f' * 20}
+        assert os.path.exists(os.path.join(cache_dir, "sasyayojana_live_map_12971_77592.html"))
+
+        # Going over the budget is noticed from the running total
+        cache.eviction_interval = 3600
+        cache.max_bytes = 3 * entries()['a' * 20]['bytes']
+        cache.put('1' * 20, page, {})
+        assert scans == [1, 1] and len(entries()) == 3 and '1' * 20 in entries()
+    finally:
+        shutil.rmtree(cache_dir)
+    print("✅ Map cache evicts by age and size")
+
+def test_maps_are_served_before_they_reach_disk():
+    """Test that a new map is returned and served from memory while its write is still pending."""
+    with temporary_map_storage(map_api.mapper):
+        cache = map_api.mapper.map_cache
+        release = threading.Event()
+        write = cache._write
+        cache._write = lambda path, data: release.wait(10) and write(path, data)
+
+        client = map_api.app.test_client()
+        response = client.post('/api/generate-land-layout-map', json={"center_lat": 18.52, "center_lon": 73.85})
+        assert response.status_code == 200
+        body = response.get_json()
+        filename = os.path.basename(body['map_file_path'])
+        assert not os.path.exists(body['map_file_path'])
+
+        served = client.get(f'/api/get-map/{filename}')
+        assert served.status_code == 200 and b'var layout' in served.data
+        # A repeated request is answered from the pending buffer too
+        again = client.post('/api/generate-land-layout-map', json={"center_lat": 18.52, "center_lon": 73.85})
+        assert again.get_json()['map_file_path'] == body['map_file_path']
+
+        release.set()
+        cache.flush()
+        with open(body['map_file_path'], 'rb') as f:
+            assert f.read() == served.data
+        rendered = map_api.mapper.generate_map(*farm_inputs(), 5.0, 18.52, 73.85, 'Unknown')
+        assert not rendered.created and rendered.etag == hashlib.sha256(served.data).hexdigest()
+    print("✅ New maps are served from memory while they are written")
+
+def test_compressed_variants_and_conditional_requests():
+    """Test that maps are served precompressed with ETags and revalidated with 304 responses."""
+    with temporary_map_storage(map_api.mapper) as cache_dir:
+        client = map_api.app.test_client()
+        body = client.post('/api/generate-land-layout-map', json={"center_lat": 21.15, "center_lon": 79.09}).get_json()
+        map_api.mapper.map_cache.flush()
+        with open(body['map_file_path'], 'rb') as f:
+            content = f.read()
+        etag = hashlib.sha256(content).hexdigest()
+        key = os.path.basename(body['map_file_path'])[len('sasyayojana_live_map_'):-len('.html')]
+        assert map_api.mapper.map_cache.etag(key) == etag
+        assert os.path.exists(map_api.mapper.map_cache.variant_path(key, 'gzip'))
+        assert os.path.exists(map_api.mapper.map_cache.variant_path(key, 'br')) == BROTLI_AVAILABLE
+
+        plain = client.get(body['map_url'], headers={'Accept-Encoding': 'identity'})
+        assert plain.data == content and 'Content-Encoding' not in plain.headers
+        assert plain.headers['ETag'] == f'"{etag}"' and plain.headers['Vary'] == 'Accept-Encoding'
+
+        compressed = client.get(body['map_url'], headers={'Accept-Encoding': 'gzip;q=1.0, br;q=0.5'})
+        assert compressed.headers['Content-Encoding'] == 'gzip' and compressed.headers['ETag'] == f'"{etag}-gzip"'
+        assert gzip.decompress(compressed.data) == content and len(compressed.data) < len(content) / 2
+
+        revalidated = client.get(body['map_url'], headers={'Accept-Encoding': 'gzip', 'If-None-Match': f'"{etag}-gzip"'})
+        assert revalidated.status_code == 304 and revalidated.data == b''
+        assert revalidated.headers['ETag'] == f'"{etag}-gzip"'
+        # A tag of the uncompressed map does not match the compressed representation
+        assert client.get(body['map_url'], headers={'Accept-Encoding': 'gzip', 'If-None-Match': f'"{etag}"'}).status_code == 200
+        assert client.get('/api/latest-map', headers={'If-None-Match': f'"{etag}"'}).status_code == 304
+
+        # Evicting the map removes its variants too
+        map_api.mapper.map_cache.remove(key)
+        assert not any(name.startswith('sasyayojana_live_map_') for name in os.listdir(cache_dir))
+    print("✅ Maps are served precompressed and revalidated with ETags")
+
+def test_only_maps_are_served():
+    """Test that sidecars, variants, databases and other files next to the maps are not served."""
+    with temporary_map_storage(map_api.mapper) as cache_dir:
+        client = map_api.app.test_client()
+        body = client.post('/api/generate-land-layout-map', json={"center_lat": 18.52, "center_lon": 73.85}).get_json()
+        map_api.mapper.map_cache.flush()
+        assert client.get(body['map_url']).status_code == 200
+        filename = body['map_url'][len('/api/get-map/'):]
+
+        legacy = "sasyayojana_live_map_12971_77592.html"
+        with open(os.path.join(cache_dir, legacy), 'w') as f:
+            f.write("<html>legacy</html>")
+        for name in ("farm_index.sqlite3", "notes.txt"):
+            with open(os.path.join(cache_dir, name), 'w') as f:
+                f.write("private")
+        assert client.get(f'/api/get-map/{legacy}').data == b"<html>legacy</html>"
+        for name in (filename[:-len('.html')] + '.json', filename + '.gz', 'farm_index.sqlite3', 'notes.txt',
+                     'data/map_catalogue.sqlite3', '../map_data/farm_index.sqlite3'):
+            assert client.get(f'/api/get-map/{name}').status_code == 404, name
+
+    # The API's mapper keeps its databases out of the served maps directory
+    assert not [name for name in os.listdir(map_api.mapper.output_dir) if 'sqlite3' in name]
+    assert os.path.exists(os.path.join(map_api.mapper.data_dir, 'map_catalogue.sqlite3'))
+    print("✅ Only map HTML is served from the maps directory")
+
+if __name__ == "__main__":
+    print("Testing map cache...")
+    test_cache_keys()
+    test_maps_are_reused_and_kept_apart()
+    test_eviction_by_size_and_age()
+    test_maps_are_served_before_they_reach_disk()
+    test_compressed_variants_and_conditional_requests()
+    test_only_maps_are_served()
+    print("\n🎉 All map cache tests passed!")
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Test script for the map catalogue.
+"""
+
+import sys
+import os
+import shutil
+import tempfile
+
+# Add the models and API directories to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), 'models'))
+sys.path.append(os.path.join(os.path.dirname(__file__), 'models', 'api'))
+
+from map_visualization.map_cache import MapCache, MAP_CATALOGUE_DB
+from map_visualization.map_catalogue import MapCatalogue, distance_km
+from map_test_utils import temporary_map_storage
+import map_api
+
+def farm(lat, lon, user_id=None, location='Pune'):
+    """Metadata of a sample farm's map."""
+    return {'center_lat': lat, 'center_lon': lon, 'land_area_acres': 5.0,
+            'location': location, 'user_id': user_id, 'recommendation': {}}
+
+def test_latest_and_nearby_queries():
+    """Test latest, latest-for-user and nearby lookups, and that evicted maps are forgotten."""
+    cache_dir = tempfile.mkdtemp()
+    try:
+        cache = MapCache(cache_dir)
+        cache.put('a' * 20, "<html>a</html>", farm(18.520, 73.850, 'u1'))
+        cache.put('b' * 20, "<html>b</html>", farm(18.525, 73.850, 'u2'))
+        cache.put('c' * 20, "<html>c</html>", farm(19.070, 72.870, 'u1', 'Mumbai'))
+        catalogue = cache.catalogue
+
+        assert catalogue.latest()['map_key'] == 'c' * 20
+        assert catalogue.latest('u2')['map_key'] == 'b' * 20
+        assert catalogue.latest('u3') is None
+        assert catalogue.latest()['size'] == len("<html>c</html>")
+
+        # 'b' is about 556 m north of 'a'; Mumbai is about 120 km away
+        near = catalogue.near(18.520, 73.850, radius_km=1.0)
+        assert [record['map_key'] for record in near] == ['a' * 20, 'b' * 20]
+        assert abs(near[1]['distance_km'] - distance_km(18.520, 73.850, 18.525, 73.850)) < 1e-9
+        assert [record['map_key'] for record in catalogue.near(18.520, 73.850, radius_km=0.3)] == ['a' * 20]
+        assert len(catalogue.near(18.520, 73.850, radius_km=200)) == 3
+
+        # Reuse by another user makes the map their latest and updates its single row
+        cache.record('a' * 20, 14, farm(18.520, 73.850, 'u2'))
+        assert catalogue.latest('u2')['map_key'] == 'a' * 20
+        assert catalogue.latest()['map_key'] == 'a' * 20
+        assert catalogue.count() == 3 and len(catalogue.near(18.520, 73.850)) == 2
+        reused = catalogue.latest('u2')
+        assert reused['uses'] == 2 and reused['user_id'] == 'u1' and reused['last_used'] > reused['created_at']
+
+        cache.remove('c' * 20)
+        assert catalogue.latest('u1')['map_key'] == 'a' * 20
+    finally:
+        shutil.rmtree(cache_dir)
+    print("✅ Catalogue answers latest and nearby queries")
+
+def test_existing_maps_are_indexed_once():
+    """Test that maps stored before the catalogue existed are indexed from their sidecars."""
+    cache_dir = tempfile.mkdtemp()
+    try:
+        cache = MapCache(cache_dir)
+        cache.put('a' * 20, "<html>a</html>", farm(18.52, 73.85, 'u1'))
+        cache.put('b' * 20, "<html>b</html>", farm(18.53, 73.85))
+        os.remove(os.path.join(cache_dir, MAP_CATALOGUE_DB))
+
+        reopened = MapCache(cache_dir)
+        assert reopened.catalogue.count() == 2
+        assert reopened.catalogue.latest('u1')['location'] == 'Pune'
+        assert MapCache(cache_dir).catalogue.count() == 2
+    finally:
+        shutil.rmtree(cache_dir)
+    print("✅ Existing maps are indexed once")
+
+def test_map_api_uses_catalogue():
+    """Test the latest map and nearby maps endpoints."""
+    with temporary_map_storage(map_api.mapper):
+        client = map_api.app.test_client()
+        assert client.get('/api/latest-map').status_code == 404
+
+        first = client.post('/api/generate-land-layout-map',
+                            json={"center_lat": 18.52, "center_lon": 73.85, "user_id": "u1"}).get_json()
+        second = client.post('/api/generate-land-layout-map',
+                             json={"center_lat": 18.53, "center_lon": 73.85, "user_id": "u2"}).get_json()
+
+        latest = client.get('/api/latest-map')
+        assert latest.status_code == 200 and b'var layout' in latest.data
+        assert client.get('/api/latest-map?user_id=u1').data == client.get(first['map_url']).data
+        assert client.get('/api/latest-map?user_id=u2').data == client.get(second['map_url']).data
+
+        near = client.get('/api/maps/near?lat=18.52&lon=73.85&radius_km=0.5').get_json()
+        assert [entry['map_url'] for entry in near['maps']] == [first['map_url']]
+        assert client.get('/api/maps/near?lat=18.52').status_code == 400
+    print("✅ Map API serves the latest and nearby maps from the catalogue")
+
+if __name__ == "__main__":
+    print("Testing map catalogue...")
+    test_latest_and_nearby_queries()
+    test_existing_maps_are_indexed_once()
+    test_map_api_uses_catalogue()
+    print("\n🎉 All map catalogue tests passed!")
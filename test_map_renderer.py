@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Test script for the template-based land layout map renderer.
+"""
+
+import sys
+import os
+import re
+import json
+from types import SimpleNamespace
+
+# Add the models directory to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), 'models'))
+
+from map_visualization.land_layout_mapper import LandLayoutMapper
+from map_visualization.map_renderer import MapTemplate, benchmark_renderers
+from map_test_utils import temporary_map_storage
+
+RECOMMENDATION = SimpleNamespace(main_crop='Maize', intercrop='Cowpea <Vigna>', trees=['Mango', 'Gliricidia'])
+
+def make_layout(mapper, lat=12.971, lon=77.592, acres=5.0):
+    """Land use polygons of a sample farm."""
+    land_poly = mapper.generate_land_polygon(lat, lon, acres)
+    return mapper.create_land_use_polygons(land_poly, mapper.calculate_layout_ratios(RECOMMENDATION))
+
+def template_layout(map_html):
+    """Layout data embedded in a template-rendered page."""
+    return json.loads(re.search(r"var layout = (.*);\n", map_html).group(1).replace("<\\/", "</"))
+
+def test_template_matches_folium_map():
+    """Test that the template page carries the same polygons, colours and tooltips as the folium map."""
+    mapper = LandLayoutMapper()
+    land_use_gdf = make_layout(mapper)
+    folium_html = mapper.generate_interactive_map(land_use_gdf, 12.971, 77.592, RECOMMENDATION).get_root().render()
+    map_html = mapper.render_map_html(land_use_gdf, 12.971, 77.592, RECOMMENDATION)
+
+    layout = template_layout(map_html)
+    assert layout['center'] == [12.971, 77.592] and layout['zoom'] == 16
+    assert [layer['name'] for layer in layout['layers']] == ['Main Crop', 'Intercrop', 'Trees']
+    for layer, geometry in zip(layout['layers'], land_use_gdf.geometry):
+        assert layer['geojson']['coordinates'] == [[list(point) for point in geometry.exterior.coords]]
+        assert f'"fillColor": "{layer["color"]}"' in folium_html
+    assert 'Intercrop: Cowpea &lt;Vigna&gt;' in map_html
+    assert "Trees: ['Mango', 'Gliricidia']" in folium_html
+    assert "Trees: [&#x27;Mango&#x27;, &#x27;Gliricidia&#x27;]" in map_html
+    # Legend percentages come from the polygons' areas
+    assert 'Main Crop (60%)' in map_html and 'Intercrop (25%)' in map_html and 'Trees (15%)' in map_html
+    print("✅ Template map matches the folium map")
+
+def test_template_slots():
+    """Test that templates are split once and filled in order."""
+    template = MapTemplate("<a>{{ x }}</a>{{y}}<b>{{ x }}</b>")
+    assert template.slots == ['x', 'y', 'x']
+    assert template.render(x="1", y="{{ x }}") == "<a>1</a>{{ x }}<b>1</b>"
+    print("✅ Template slots are filled in order")
+
+def test_template_renderer_is_faster():
+    """Test that saved maps use the template renderer, which is faster than folium."""
+    mapper = LandLayoutMapper()
+    # Timings vary with the machine's load; map_renderer.py's benchmark reports the actual speedup
+    results = benchmark_renderers(mapper, repeats=5)
+    assert results['speedup'] > 1, results
+    assert results['template_bytes'] < results['folium_bytes']
+
+    with temporary_map_storage(mapper) as map_dir:
+        filepath = mapper.generate_layout_from_recommendation(RECOMMENDATION, 12.971, 77.592, 5.0)
+        assert os.path.dirname(filepath) == map_dir
+        with open(filepath, 'r', encoding='utf-8') as f:
+            assert len(template_layout(f.read())['layers']) == 3
+    print(f"✅ Template renderer is {results['speedup']:.0f}x faster than folium")
+
+if __name__ == "__main__":
+    print("Testing map renderer...")
+    test_template_matches_folium_map()
+    test_template_slots()
+    test_template_renderer_is_faster()
+    print("\n🎉 All map renderer tests passed!")
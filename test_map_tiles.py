@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Test script for regional tiles of farm layouts.
+"""
+
+import sys
+import os
+import gzip
+import json
+import shutil
+import tempfile
+
+from shapely.geometry import box, shape
+
+# Add the models and API directories to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), 'models'))
+sys.path.append(os.path.join(os.path.dirname(__file__), 'models', 'api'))
+
+from map_visualization.farm_index import FarmIndex
+from map_visualization.map_tiles import DETAIL_ZOOM, MapTiler, tile_bounds, tile_containing
+from map_visualization.land_subdivision import subdivide_farm
+from map_test_utils import temporary_map_storage
+import map_api
+
+RATIOS = {'main_crop_ratio': 0.6, 'intercrop_ratio': 0.25, 'tree_ratio': 0.15}
+
+def add_farm(index, farm_id, lon, lat, ratios=RATIOS):
+    """Index a square farm of about 1.2 hectares with its zones."""
+    boundary = box(lon, lat, lon + 0.001, lat + 0.001)
+    index.add(farm_id, boundary, {'recommendation': {'main_crop': 'Rice', 'intercrop': 'Moong', 'trees': 'Teak'},
+                                  'map_url': f'/api/get-map/{farm_id}'}, subdivide_farm(boundary, ratios))
+    return boundary
+
+def test_tile_coordinates():
+    """Test web mercator tile bounds and lookup."""
+    assert tile_bounds(0, 0, 0)[0] == -180 and abs(tile_bounds(0, 0, 0)[3] - 85.0511287798) < 1e-9
+    assert tile_containing(0.0, 0.0, 1) == (1, 1) and tile_containing(-179.9, 85.0, 1) == (0, 0)
+    x, y = tile_containing(73.8505, 18.5205, 15)
+    min_lon, min_lat, max_lon, max_lat = tile_bounds(15, x, y)
+    assert min_lon <= 73.8505 < max_lon and min_lat <= 18.5205 < max_lat
+    print("✅ Tile coordinates follow the web mercator quadtree")
+
+def test_tiles_are_cut_cached_and_invalidated():
+    """Test detail and overview tiles, and that a changed layout invalidates only the tiles showing it."""
+    tile_dir = tempfile.mkdtemp()
+    try:
+        index = FarmIndex(os.path.join(tile_dir, 'farms.sqlite3'))
+        tiler = MapTiler(index, os.path.join(tile_dir, 'tiles'))
+        farm = add_farm(index, 'pune', 73.850, 18.520)
+        add_farm(index, 'pune-east', 73.851, 18.520)
+        add_farm(index, 'mumbai', 72.870, 19.070)
+
+        # Detail tiles list each farm's zones with its crops
+        x, y = tile_containing(73.8505, 18.5205, 16)
+        detail = json.loads(tiler.tile(16, x, y))
+        pune = [feature for feature in detail['features'] if feature['properties']['farm_id'] == 'pune']
+        assert [feature['properties']['land_use_type'] for feature in pune] == ['Main Crop', 'Intercrop', 'Trees']
+        assert pune[0]['properties']['crops'] == 'Rice' and pune[2]['properties']['crops'] == 'Teak'
+        assert abs(shape(pune[0]['geometry']).area / farm.area - 0.6) < 0.01
+        assert 'mumbai' not in {feature['properties']['farm_id'] for feature in detail['features']}
+
+        # Overview tiles merge each land use type across farms
+        x, y = tile_containing(73.85, 18.52, 8)
+        overview = json.loads(tiler.tile(8, x, y))
+        assert [feature['properties']['land_use_type'] for feature in overview['features']] == \
+            ['Main Crop', 'Intercrop', 'Trees']
+        assert all(feature['properties']['farms'] == 2 for feature in overview['features'])
+        # At zoom 0 a farm is far smaller than a pixel and drops out
+        assert json.loads(tiler.tile(0, 0, 0))['features'] == []
+        assert 8 < DETAIL_ZOOM <= 16
+
+        # Tiles are served from disk until a farm they show changes
+        assert os.path.exists(tiler.tile_path(8, x, y)) and os.path.exists(tiler.tile_path(8, x, y, 'gzip'))
+        assert gzip.decompress(tiler.tile(8, x, y, 'gzip')) == tiler.tile(8, x, y)
+        mumbai_x, mumbai_y = tile_containing(72.87, 19.07, 8)
+        tiler.tile(8, mumbai_x, mumbai_y)
+        add_farm(index, 'pune', 73.850, 18.520, {'main_crop_ratio': 1.0})
+        assert tiler.invalidate(farm.bounds) > 0
+        assert not os.path.exists(tiler.tile_path(8, x, y)) and not os.path.exists(tiler.tile_path(8, x, y, 'gzip'))
+        assert os.path.exists(tiler.tile_path(8, mumbai_x, mumbai_y))
+        assert [feature['properties']['farms'] for feature in json.loads(tiler.tile(8, x, y))['features']] == [2, 1, 1]
+
+        for z, x, y in [(21, 0, 0), (2, 4, 0), (1, -1, 0)]:
+            try:
+                tiler.tile(z, x, y)
+                assert False, "tile outside the quadtree was built"
+            except ValueError:
+                pass
+    finally:
+        shutil.rmtree(tile_dir)
+    print("✅ Tiles are cut per zoom, cached and invalidated incrementally")
+
+def test_tile_endpoint():
+    """Test that generated maps appear in served tiles, with compression and revalidation."""
+    with temporary_map_storage(map_api.mapper):
+        client = map_api.app.test_client()
+        x, y = tile_containing(73.85, 18.52, 10)
+        url = f'/api/tiles/10/{x}/{y}.geojson'
+        assert client.get(url).get_json()['features'] == []
+
+        # A new map invalidates the cached empty tile; asking for it again does not
+        client.post('/api/generate-land-layout-map', json={"center_lat": 18.52, "center_lon": 73.85})
+        client.post('/api/generate-land-layout-map', json={"center_lat": 18.52, "center_lon": 73.85})
+        assert not os.path.exists(map_api.mapper.tiler.tile_path(10, x, y))
+        client.get(url)
+        client.post('/api/generate-land-layout-map', json={"center_lat": 18.52, "center_lon": 73.85})
+        assert os.path.exists(map_api.mapper.tiler.tile_path(10, x, y))
+        response = client.get(url, headers={'Accept-Encoding': 'gzip'})
+        assert response.status_code == 200 and response.headers['Content-Encoding'] == 'gzip'
+        assert response.headers['Content-Type'] == 'application/geo+json'
+        assert len(json.loads(gzip.decompress(response.data))['features']) == 3
+        assert client.get(url, headers={'Accept-Encoding': 'gzip', 'If-None-Match': response.headers['ETag']}).status_code == 304
+        assert client.get(url, headers={'If-None-Match': response.headers['ETag']}).status_code == 200
+        assert client.get('/api/tiles/25/0/0.geojson').status_code == 400
+    print("✅ Map API serves regional tiles of generated farms")
+
+if __name__ == "__main__":
+    print("Testing map tiles...")
+    test_tile_coordinates()
+    test_tiles_are_cut_cached_and_invalidated()
+    test_tile_endpoint()
+    print("\n🎉 All map tiles tests passed!")
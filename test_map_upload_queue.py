@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Test script for the Firebase map upload queue.
+"""
+
+import sys
+import os
+import time
+import shutil
+import tempfile
+
+# Add the models and API directories to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), 'models'))
+sys.path.append(os.path.join(os.path.dirname(__file__), 'models', 'api'))
+
+from map_visualization.upload_queue import MapUploadQueue, MAX_ATTEMPTS, backoff_seconds
+from map_test_utils import temporary_map_storage
+import map_api
+
+class FakeFirebase:
+    """Records uploads and document batches; fails the first `failures` calls of each."""
+
+    def __init__(self, failures=0):
+        self.uploads = []
+        self.batches = []
+        self.upload_failures = failures
+        self.write_failures = failures
+
+    def upload_map(self, filename, content):
+        if self.upload_failures:
+            self.upload_failures -= 1
+            raise ConnectionError("storage unavailable")
+        self.uploads.append((filename, content))
+        return f"https://storage.example/{filename}"
+
+    def write_documents(self, documents):
+        if self.write_failures:
+            self.write_failures -= 1
+            raise ConnectionError("firestore unavailable")
+        self.batches.append(documents)
+        return [f"doc{len(self.batches)}_{i}" for i in range(len(documents))]
+
+def test_uploads_are_deduplicated_and_batched():
+    """Test that identical maps are uploaded once and their documents written in one batch."""
+    queue_dir = tempfile.mkdtemp()
+    try:
+        firebase = FakeFirebase()
+        queue = MapUploadQueue(os.path.join(queue_dir, "queue.sqlite3"), firebase.upload_map, firebase.write_documents)
+        queue.enqueue(b"<html>a</html>", "a.html", {'location': 'Pune'})
+        queue.enqueue(b"<html>a</html>", "a.html", {'location': 'Pune', 'user_id': 'u2'})
+        queue.enqueue(b"<html>b</html>", "b.html", {'location': 'Nashik'})
+        assert queue.stats()['depth'] == 5
+
+        assert queue.drain() == {'uploaded': 2, 'written': 3}
+        assert sorted(filename for filename, _ in firebase.uploads) == ['a.html', 'b.html']
+        assert len(firebase.batches) == 1 and len(firebase.batches[0]) == 3
+        assert firebase.batches[0][0] == {'location': 'Pune', 'filename': 'a.html',
+                                          'map_url': 'https://storage.example/a.html'}
+        stats = queue.stats()
+        assert stats['depth'] == 0 and stats['uploads_done'] == 2 and stats['documents_done'] == 3
+
+        # A map that was already uploaded only gets its new document written
+        queue.enqueue(b"<html>a</html>", "a.html", {'location': 'Pune'})
+        assert queue.drain() == {'uploaded': 0, 'written': 1} and len(firebase.uploads) == 2
+    finally:
+        shutil.rmtree(queue_dir)
+    print("✅ Uploads are de-duplicated by content and documents are batched")
+
+def test_failures_are_retried_with_backoff_and_survive_restarts():
+    """Test that failed uploads wait out their backoff, are retried, and stay queued across restarts."""
+    queue_dir = tempfile.mkdtemp()
+    db_path = os.path.join(queue_dir, "queue.sqlite3")
+    try:
+        firebase = FakeFirebase(failures=1)
+        queue = MapUploadQueue(db_path, firebase.upload_map, firebase.write_documents)
+        queue.enqueue(b"<html>a</html>", "a.html", {'location': 'Pune'})
+        assert queue.drain() == {'uploaded': 0, 'written': 0}
+        # Not due again until the backoff has passed
+        assert queue.drain() == {'uploaded': 0, 'written': 0} and queue.stats()['uploads_pending'] == 1
+        assert backoff_seconds(1) < backoff_seconds(2) < backoff_seconds(30) == backoff_seconds(40)
+
+        # A new process sees the queued map
+        restarted = MapUploadQueue(db_path, firebase.upload_map, firebase.write_documents)
+        with restarted._connect() as connection:
+            connection.execute("UPDATE uploads SET next_attempt = 0")
+        assert restarted.drain() == {'uploaded': 1, 'written': 0}
+        with restarted._connect() as connection:
+            connection.execute("UPDATE documents SET next_attempt = 0")
+        assert restarted.drain() == {'uploaded': 0, 'written': 1} and restarted.stats()['depth'] == 0
+
+        # Uploads that keep failing are given up on, together with their documents
+        def broken_upload(filename, content):
+            raise ConnectionError("storage unavailable")
+        restarted.upload_map = broken_upload
+        restarted.enqueue(b"<html>c</html>", "c.html", {})
+        for _ in range(MAX_ATTEMPTS):
+            with restarted._connect() as connection:
+                connection.execute("UPDATE uploads SET next_attempt = 0")
+            restarted.drain()
+        stats = restarted.stats()
+        assert stats['uploads_failed'] == 1 and stats['documents_failed'] == 1 and stats['depth'] == 0
+
+        # Queuing the map again retries its upload
+        restarted.upload_map = firebase.upload_map
+        restarted.enqueue(b"<html>c</html>", "c.html", {'user_id': 'u2'})
+        assert restarted.drain() == {'uploaded': 1, 'written': 1}
+    finally:
+        shutil.rmtree(queue_dir)
+    print("✅ Failed uploads are retried with backoff and survive restarts")
+
+def test_api_responds_before_upload():
+    """Test that the map API queues new maps and responds without waiting for Firebase."""
+    with temporary_map_storage(map_api.mapper) as cache_dir:
+        firebase = FakeFirebase()
+        map_api.mapper.upload_queue = MapUploadQueue(
+            os.path.join(cache_dir, "queue.sqlite3"), firebase.upload_map, firebase.write_documents
+        )
+        client = map_api.app.test_client()
+
+        response = client.post('/api/generate-land-layout-map', json={"center_lat": 19.07, "center_lon": 72.87})
+        body = response.get_json()
+        assert response.status_code == 200 and body['upload_status'] == 'queued'
+        assert body['map_url'] == f"/api/get-map/{os.path.basename(body['map_file_path'])}"
+        assert not firebase.uploads and client.get('/api/upload-queue').get_json()['depth'] == 2
+
+        # A reused map gets its own document; its file is uploaded once
+        again = client.post('/api/generate-land-layout-map',
+                            json={"center_lat": 19.07, "center_lon": 72.87, "user_id": "u2"})
+        assert again.get_json()['upload_status'] == 'cached'
+        assert client.get('/api/upload-queue').get_json()['depth'] == 3
+
+        map_api.mapper.upload_queue.start()
+        deadline = time.time() + 10
+        while map_api.mapper.upload_queue.stats()['depth'] and time.time() < deadline:
+            time.sleep(0.05)
+        map_api.mapper.upload_queue.stop()
+        assert len(firebase.uploads) == 1 and firebase.batches[0][0]['location'] == 'Unknown'
+        assert [document.get('user_id') for batch in firebase.batches for document in batch] == [None, 'u2']
+    assert client.get('/api/upload-queue').get_json()['enabled'] is False
+    print("✅ The map API responds before maps are uploaded")
+
+if __name__ == "__main__":
+    print("Testing map upload queue...")
+    test_uploads_are_deduplicated_and_batched()
+    test_failures_are_retried_with_backoff_and_survive_restarts()
+    test_api_responds_before_upload()
+    print("\n🎉 All map upload queue tests passed!")
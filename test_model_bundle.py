@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Test script for the single-file model bundle format.
+"""
+
+import sys
+import os
+import shutil
+import tempfile
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import joblib
+import numpy as np
+import pandas as pd
+
+# Add the models directory to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), 'models'))
+
+from training.model_bundle import BUNDLE_SUFFIX, BundleError, ModelBundle
+from training.model_trainer import AgriYieldModel, AgriROIModel
+
+def make_data(n=300, seed=0):
+    """Create a small learnable feature matrix."""
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame(rng.random((n, 6)), columns=[f"feature_{i}" for i in range(6)])
+    y = 3 * X['feature_0'] + X['feature_1'] ** 2 + rng.normal(0, 0.05, n)
+    return X, y
+
+def train_models():
+    """Train small yield and ROI models."""
+    X, y = make_data()
+    yield_model = AgriYieldModel(rf_params={'n_estimators': 15}, xgb_params={'n_estimators': 20, 'max_depth': 4})
+    yield_model.fit(X, y)
+    roi_model = AgriROIModel(xgb_params={'n_estimators': 20})
+    roi_model.fit(X, y)
+    return yield_model, roi_model, X
+
+def test_bundle_round_trip():
+    """Test that a bundled model predicts exactly like the model it was saved from."""
+    yield_model, roi_model, X = train_models()
+    model_dir = tempfile.mkdtemp()
+    try:
+        yield_model.save_model(os.path.join(model_dir, "yield_model"))
+        roi_model.save_model(os.path.join(model_dir, "roi_model"))
+        assert sorted(os.listdir(model_dir)) == ['roi_model.bundle', 'yield_model.bundle']
+
+        loaded_yield = AgriYieldModel()
+        loaded_yield.load_model(os.path.join(model_dir, "yield_model"))
+        loaded_roi = AgriROIModel()
+        loaded_roi.load_model(os.path.join(model_dir, "roi_model"))
+
+        assert loaded_yield.feature_names == list(X.columns)
+        assert loaded_yield.xgb_params['max_depth'] == 4
+        assert np.array_equal(loaded_yield.rf_model.predict(X), yield_model.rf_model.predict(X))
+        assert np.allclose(loaded_yield.xgb_model.predict(X), yield_model.xgb_model.predict(X))
+        assert np.allclose(loaded_yield.scaler.transform(X), yield_model.scaler.transform(X))
+        assert np.allclose(loaded_roi.model.predict(X), roi_model.model.predict(X))
+        assert loaded_yield.xgb_model.get_params()['max_depth'] == 4
+
+        # XGBoost is stored natively and the trees as aligned arrays, nothing else pickled
+        with zipfile.ZipFile(os.path.join(model_dir, "yield_model.bundle")) as archive:
+            names = archive.namelist()
+        assert 'xgb_model.ubj' in names and 'rf_model_nodes.npy' in names
+    finally:
+        shutil.rmtree(model_dir)
+    print("✅ Bundled models predict like the originals")
+
+def test_bundle_loads_members_lazily():
+    """Test that members are read only when used and the open bundle survives a replace."""
+    yield_model, _, X = train_models()
+    model_dir = tempfile.mkdtemp()
+    try:
+        path = os.path.join(model_dir, "yield_model")
+        yield_model.save_model(path)
+        loaded = AgriYieldModel()
+        loaded.load_model(path)
+        assert 'rf_model' not in vars(loaded) and 'xgb_model' not in vars(loaded)
+        loaded.xgb_model
+        assert 'xgb_model' in vars(loaded) and 'rf_model' not in vars(loaded)
+
+        # Promoting a new bundle does not change the one already being served
+        expected = yield_model.rf_model.predict(X)
+        retrained = AgriYieldModel(rf_params={'n_estimators': 3})
+        retrained.fit(X, X['feature_5'])
+        retrained.save_model(path)
+        assert np.array_equal(loaded.rf_model.predict(X), expected)
+        assert len(loaded.rf_model.estimators_) == 15
+    finally:
+        shutil.rmtree(model_dir)
+    print("✅ Bundle members load on first use")
+
+def test_bundle_is_read_from_threads():
+    """Test that threads mapping arrays and reading members of one open bundle all get verified data."""
+    yield_model, _, _ = train_models()
+    model_dir = tempfile.mkdtemp()
+    try:
+        path = os.path.join(model_dir, "yield_model")
+        yield_model.save_model(path)
+        bundle = ModelBundle(f"{path}{BUNDLE_SUFFIX}")
+        nodes = np.array(bundle.map_array('rf_model_nodes.npy'))
+        xgb_bytes = bundle.read_file('xgb_model.ubj')
+
+        def read(i):
+            for _ in range(30):
+                if i % 2:
+                    assert np.array_equal(bundle.map_array('rf_model_nodes.npy'), nodes)
+                else:
+                    assert bundle.read_file('xgb_model.ubj') == xgb_bytes
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(read, range(16)))
+        assert not bundle.map_array('rf_model_values.npy').flags.writeable
+        bundle.close()
+    finally:
+        shutil.rmtree(model_dir)
+    print("✅ Bundle members are read safely from threads")
+
+def test_bundle_rejects_corruption():
+    """Test that a damaged member fails its checksum instead of loading."""
+    yield_model, _, _ = train_models()
+    model_dir = tempfile.mkdtemp()
+    try:
+        path = os.path.join(model_dir, "yield_model")
+        yield_model.save_model(path)
+        bundle = ModelBundle(f"{path}{BUNDLE_SUFFIX}")
+        assert bundle.verify()
+        info = bundle._archive.getinfo('rf_model_values.npy')
+        bundle.close()
+
+        with open(f"{path}{BUNDLE_SUFFIX}", 'r+b') as f:
+            f.seek(info.header_offset + 200)
+            f.write(b'\xff' * 8)
+        loaded = AgriYieldModel()
+        loaded.load_model(path)
+        loaded.xgb_model  # Undamaged members still load
+        try:
+            loaded.rf_model
+            raise AssertionError("Corrupt member loaded")
+        except BundleError as e:
+            assert 'Checksum mismatch' in str(e)
+    finally:
+        shutil.rmtree(model_dir)
+    print("✅ Corrupt bundle members are rejected")
+
+def test_legacy_pickles_still_load():
+    """Test that models saved as separate pickles load and convert to a bundle."""
+    _, roi_model, X = train_models()
+    model_dir = tempfile.mkdtemp()
+    try:
+        path = os.path.join(model_dir, "roi_model")
+        joblib.dump(roi_model.model, f"{path}_roi.pkl")
+        joblib.dump(roi_model.scaler, f"{path}_scaler.pkl")
+        joblib.dump(roi_model.feature_names, f"{path}_features.pkl")
+
+        legacy = AgriROIModel()
+        legacy.load_model(path)
+        assert np.allclose(legacy.model.predict(X), roi_model.model.predict(X))
+        legacy.save_model(path)
+
+        bundled = AgriROIModel()
+        bundled.load_model(path)
+        assert bundled._bundle is not None
+        assert np.allclose(bundled.model.predict(X), roi_model.model.predict(X))
+    finally:
+        shutil.rmtree(model_dir)
+    print("✅ Pickled models still load and convert")
+
+if __name__ == "__main__":
+    print("Testing model bundles...")
+    test_bundle_round_trip()
+    test_bundle_loads_members_lazily()
+    test_bundle_is_read_from_threads()
+    test_bundle_rejects_corruption()
+    test_legacy_pickles_still_load()
+    print("\n🎉 All model bundle tests passed!")
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Test script for parallel training of the yield and ROI models.
+"""
+
+import sys
+import os
+
+import numpy as np
+import pandas as pd
+
+# Add the models directory to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), 'models'))
+
+from training.parallel_trainer import DEFAULT_CORE_SHARES, ParallelModelTrainer
+from training.model_trainer import AgriYieldModel, AgriROIModel
+
+def make_data(n=400, seed=0):
+    """Create learnable yield and ROI targets on one feature matrix."""
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame(rng.random((n, 5)), columns=[f"feature_{i}" for i in range(5)])
+    y_yield = 3000 * X['feature_0'] + 500 * X['feature_1'] + rng.normal(0, 50, n)
+    y_roi = 40 * X['feature_2'] - 10 * X['feature_3'] + rng.normal(0, 2, n)
+    return X, y_yield, y_roi
+
+def small_models():
+    """Yield and ROI models small enough to train in a test."""
+    return (AgriYieldModel(rf_params={'n_estimators': 20}, xgb_params={'n_estimators': 20}),
+            AgriROIModel(xgb_params={'n_estimators': 20}))
+
+def test_core_budgets():
+    """Test that cores are shared between the models with at least one each."""
+    assert ParallelModelTrainer(n_cores=10).core_budgets() == \
+        {'yield_rf': 4, 'yield_xgb': 2, 'yield_quantile': 2, 'roi_xgb': 2}
+    assert set(ParallelModelTrainer(n_cores=1).core_budgets().values()) == {1}
+    assert ParallelModelTrainer(n_cores=8, core_shares={'yield_rf': 0.75, 'roi_xgb': 0.1}).core_budgets() == \
+        {'yield_rf': 6, 'roi_xgb': 1}
+
+    # Each estimator is configured with its model's budget
+    yield_model, roi_model = small_models()
+    jobs = ParallelModelTrainer(n_cores=10).build_jobs(yield_model, roi_model)
+    assert set(jobs) == set(DEFAULT_CORE_SHARES)
+    assert {name: estimator.get_params()['n_jobs'] for name, estimator in jobs.items()} == \
+        ParallelModelTrainer(n_cores=10).core_budgets()
+    assert jobs['yield_rf'].get_params()['n_estimators'] == 20 and jobs['yield_rf'] is not yield_model.rf_model
+    print("✅ Cores are budgeted per model")
+
+def test_parallel_training_assembles_the_models():
+    """Test that models trained in worker processes match sequential training and are reported."""
+    X, y_yield, y_roi = make_data()
+    trainer = ParallelModelTrainer(n_cores=4)
+    yield_model, roi_model, report = trainer.train(X, y_yield, y_roi=y_roi, yield_model=small_models()[0],
+                                                   roi_model=small_models()[1])
+
+    assert yield_model.is_trained and roi_model.is_trained
+    assert yield_model.feature_names == roi_model.feature_names == X.columns.tolist()
+    assert yield_model.quantile_model is not None
+
+    # Seeded estimators give the same forests as training one model after the other
+    sequential_yield, sequential_roi = small_models()
+    sequential_yield.fit(X, y_yield)
+    sequential_roi.fit(X, y_roi)
+    rows = X.iloc[:50]
+    assert np.allclose(yield_model.rf_model.predict(rows), sequential_yield.rf_model.predict(rows))
+    assert np.allclose(yield_model.xgb_model.predict(rows), sequential_yield.xgb_model.predict(rows), rtol=1e-5)
+    assert np.allclose(roi_model.model.predict(rows), sequential_roi.model.predict(rows), rtol=1e-5)
+    intervals = yield_model.predict_intervals(rows)
+    assert (intervals['lower'] <= intervals['upper']).all()
+
+    # The report has each model's metrics, timings and cores
+    assert report is trainer.report
+    assert report['yield_metrics']['rf_metrics']['r2'] > 0.8 and report['roi_metrics']['r2'] > 0.5
+    assert 0 <= report['yield_metrics']['interval_metrics']['coverage'] <= 1
+    assert set(report['timings']) == set(DEFAULT_CORE_SHARES)
+    for name, timing in report['timings'].items():
+        assert timing['cores'] == trainer.core_budgets()[name]
+        assert 0 < timing['wall_seconds'] <= report['total_wall_seconds'] and timing['cpu_seconds'] > 0
+    print("✅ Parallel training assembles the models and reports their timings")
+
+def test_roi_model_is_skipped_without_targets():
+    """Test that only the yield models are trained when there are no ROI targets."""
+    X, y_yield, _ = make_data(n=200)
+    yield_model, roi_model, report = ParallelModelTrainer(n_cores=2).train(
+        X, y_yield, yield_model=small_models()[0], roi_model=small_models()[1]
+    )
+    assert yield_model.is_trained and not roi_model.is_trained
+    assert report['roi_metrics'] == {} and 'roi_xgb' not in report['timings']
+    print("✅ ROI model is skipped without ROI targets")
+
+if __name__ == "__main__":
+    print("Testing parallel training...")
+    test_core_budgets()
+    test_parallel_training_assembles_the_models()
+    test_roi_model_is_skipped_without_targets()
+    print("\n🎉 All parallel training tests passed!")
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Test script for the prediction API's model-backed responses.
+"""
+
+import sys
+import os
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# Add the models and API directories to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), 'models'))
+sys.path.append(os.path.join(os.path.dirname(__file__), 'models', 'api'))
+
+from training.model_trainer import AgriYieldModel, AgriROIModel
+from training.prediction_intervals import tree_predictions
+from training.explanations import ModelExplainer, forest_contributions
+import app as api
+
+def make_data(n=4000, seed=0):
+    """Create yields whose noise grows with rainfall."""
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame({
+        'avg_temperature': rng.uniform(15, 35, n),
+        'avg_humidity': rng.uniform(30, 90, n),
+        'avg_rainfall': rng.uniform(300, 2000, n),
+        'solar_radiation': rng.uniform(3, 7, n),
+        'soil_ph': rng.uniform(5, 8, n),
+        'soil_nitrogen': rng.uniform(50, 250, n),
+    })
+    noise = rng.normal(0, 1, n) * (50 + X['avg_rainfall'] / 10)
+    y = 1500 + 40 * X['avg_temperature'] + 0.8 * X['avg_rainfall'] + 3 * X['soil_nitrogen'] + noise
+    return X, y
+
+def train_models():
+    """Train small yield and ROI models on the API's features."""
+    X, y = make_data()
+    yield_model = AgriYieldModel(rf_params={'n_estimators': 50, 'min_samples_leaf': 5},
+                                 xgb_params={'n_estimators': 100, 'max_depth': 4})
+    yield_model.fit(X, y)
+    roi_model = AgriROIModel(xgb_params={'n_estimators': 50})
+    roi_model.fit(X, y / 1000)
+    return yield_model, roi_model, X, y
+
+def fake_weather(lat, lon):
+    """Weather returned instead of calling NASA POWER."""
+    return {"avg_temperature_c": 20 + lat / 10, "avg_humidity": 60, "avg_rainfall_mm": 900 + lon, "solar_radiation": 5}
+
+def farmer_request(lat, lng, nitrogen=150):
+    """Request body as the dashboard sends it."""
+    return {
+        "location": {"lat": lat, "lng": lng},
+        "land_area_acres": 2,
+        "soil": {"ph": 6.5, "nitrogen": nitrogen},
+        "budget_inr": 50000
+    }
+
+def test_prediction_intervals():
+    """Test that the ensemble's intervals cover new yields and match the point model."""
+    yield_model, _, _, _ = train_models()
+    # Fresh rows, since fit() calibrates the intervals on its own held-out rows
+    X_test, y_test = make_data(2000, seed=1)
+    intervals = yield_model.predict_intervals(X_test)
+
+    # The vectorized pass over the trees gives the forest's own prediction
+    forest_mean = tree_predictions(yield_model.rf_model, X_test).mean(axis=0)
+    assert np.allclose(forest_mean, yield_model.rf_model.predict(X_test))
+    expected = (yield_model.rf_model.predict(X_test) + yield_model.xgb_model.predict(X_test)) / 2
+    assert np.allclose(intervals['prediction'], expected, rtol=1e-5)
+
+    coverage = ((y_test >= intervals['lower']) & (y_test <= intervals['upper'])).mean()
+    assert 0.85 <= coverage <= 0.95, coverage
+    # Noisier (rainier) rows get wider intervals
+    width = intervals['upper'] - intervals['lower']
+    rainy = X_test['avg_rainfall'].to_numpy() > 1500
+    assert width[rainy].mean() > width[~rainy].mean()
+
+    model_dir = tempfile.mkdtemp()
+    try:
+        yield_model.save_model(os.path.join(model_dir, "yield_model"))
+        loaded = AgriYieldModel()
+        loaded.load_model(os.path.join(model_dir, "yield_model"))
+        reloaded = loaded.predict_intervals(X_test)
+        assert np.allclose(reloaded['lower'], intervals['lower'], rtol=1e-5)
+    finally:
+        shutil.rmtree(model_dir)
+    print(f"✅ Prediction intervals cover {coverage:.0%} of new yields")
+
+def test_yield_endpoints_return_intervals():
+    """Test that the yield endpoints report model intervals instead of a fixed confidence."""
+    yield_model, roi_model, _, _ = train_models()
+    api.yield_model, api.roi_model = yield_model, roi_model
+    api.fetch_nasa_power_weather = fake_weather
+    client = api.app.test_client()
+
+    response = client.post('/predict/yield', json=farmer_request(12.9, 77.5))
+    assert response.status_code == 200
+    body = response.get_json()
+    interval = body['prediction_interval']
+    assert interval['lower'] <= interval['yield'] <= interval['upper']
+    assert body['confidence'] == interval['confidence'] and 0 <= body['confidence'] <= 1
+    # The reported yield is the model's per-hectare yield scaled to the farm's 2 acres
+    features = api.prepare_features_for_prediction(farmer_request(12.9, 77.5), fake_weather(12.9, 77.5))
+    per_hectare = yield_model.predict_intervals(api.model_feature_matrix(features, yield_model))
+    assert body['predicted_yield_kg'] == interval['yield'] != 2500 * 2
+    assert np.isclose(interval['yield'], per_hectare['prediction'][0] / api.ACRES_PER_HECTARE * 2)
+    assert np.isclose(interval['upper'], per_hectare['upper'][0] / api.ACRES_PER_HECTARE * 2)
+
+    records = [farmer_request(12.9, 77.5, nitrogen) for nitrogen in (60, 150, 240)] + [farmer_request(28.6, 1000)]
+    response = client.post('/predict/yield/batch', json={"records": records})
+    assert response.status_code == 200
+    predictions = response.get_json()['predictions']
+    assert len(predictions) == 4
+    # Batch rows match single requests
+    assert np.isclose(predictions[1]['yield'], interval['yield'])
+    assert predictions[2]['yield'] > predictions[0]['yield']
+
+    assert client.post('/predict/yield/batch', json={"records": []}).status_code == 400
+
+    # The realtime endpoint reports the same yield per acre
+    realtime = client.post('/predict/realtime', json=farmer_request(12.9, 77.5)).get_json()['predictions']
+    assert np.isclose(realtime['yield_kg_per_acre'], interval['yield'] / 2)
+    print("✅ Yield endpoints return prediction intervals")
+
+def test_roi_endpoints_return_intervals():
+    """Test that ROI predictions come from the model with an interval-derived confidence."""
+    yield_model, roi_model, _, _ = train_models()
+    X_test, y_test = make_data(2000, seed=1)
+    intervals = roi_model.predict_intervals(X_test)
+    coverage = ((y_test / 1000 >= intervals['lower']) & (y_test / 1000 <= intervals['upper'])).mean()
+    assert 0.85 <= coverage <= 0.95, coverage
+
+    model_dir = tempfile.mkdtemp()
+    try:
+        roi_model.save_model(os.path.join(model_dir, "roi_model"))
+        loaded = AgriROIModel()
+        loaded.load_model(os.path.join(model_dir, "roi_model"))
+        assert loaded.interval_correction == roi_model.interval_correction > 0
+    finally:
+        shutil.rmtree(model_dir)
+
+    api.yield_model, api.roi_model = yield_model, roi_model
+    api.fetch_nasa_power_weather = fake_weather
+    client = api.app.test_client()
+    body = client.post('/predict/roi', json=farmer_request(12.9, 77.5)).get_json()
+    interval = body['prediction_interval']
+    assert body['predicted_roi'] == interval['roi'] and interval['lower'] <= interval['roi'] <= interval['upper']
+    assert body['confidence'] == interval['confidence'] != 0.80
+
+    realtime = client.post('/predict/realtime', json=farmer_request(12.9, 77.5)).get_json()['predictions']
+    assert realtime['roi'] == interval['roi'] != 2.8
+    assert realtime['roi_prediction_interval'] == interval
+    print(f"✅ ROI endpoints return prediction intervals covering {coverage:.0%} of new ROI")
+
+def test_contributions_sum_to_predictions():
+    """Test that per-feature contributions add up to each model's predictions."""
+    yield_model, roi_model, X, _ = train_models()
+    X = X[:300]
+
+    # Path decomposition of a single tree: each row's leaf value minus the root value
+    forest = yield_model.rf_model
+    tree = forest.estimators_[0]
+    single = type(forest)(n_estimators=1)
+    single.estimators_, single.n_features_in_ = [tree], forest.n_features_in_
+    base_value, contributions = forest_contributions(single, X)
+    assert np.allclose(base_value + contributions.sum(axis=1), tree.predict(X.to_numpy(np.float32)))
+
+    explainer = ModelExplainer(yield_model)
+    explained = explainer.explain(X)
+    assert np.allclose(explained['prediction'], yield_model.predict_intervals(X)['prediction'], rtol=1e-4)
+    roi_explained = ModelExplainer(roi_model).explain(X)
+    assert np.allclose(roi_explained['prediction'], roi_model.model.predict(X), rtol=1e-4, atol=1e-4)
+    # Features the yields do not depend on get little credit
+    mean_abs = dict(zip(explainer.feature_names, np.abs(explained['contributions']).mean(axis=0)))
+    assert mean_abs['avg_rainfall'] > 5 * mean_abs['avg_humidity']
+
+    # Repeated rows come from the cache
+    again = explainer.explain(X[:10])
+    assert np.array_equal(again['contributions'], explained['contributions'][:10])
+    assert len(explainer._cache) == 300
+    print("✅ Feature contributions add up to the predictions")
+
+def test_explainer_cache_is_shared_by_threads():
+    """Test that threads explaining overlapping batches through one small cache get the same answers."""
+    yield_model, _, X, _ = train_models()
+    X = X[:200]
+    expected = ModelExplainer(yield_model).explain(X)['contributions']
+    explainer = ModelExplainer(yield_model, cache_size=40)
+    # Overlapping batches keep evicting each other's rows
+    starts = [(17 * i) % 150 for i in range(64)]
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda start: explainer.explain(X[start:start + 50])['contributions'], starts))
+    for start, contributions in zip(starts, results):
+        assert np.allclose(contributions, expected[start:start + 50])
+    assert len(explainer._cache) <= 40
+    print("✅ Explanation cache is shared safely by threads")
+
+def test_explain_endpoint():
+    """Test that the explain endpoint returns ranked contributions per record and target."""
+    yield_model, roi_model, _, _ = train_models()
+    api.yield_model, api.roi_model = yield_model, roi_model
+    api.fetch_nasa_power_weather = fake_weather
+    client = api.app.test_client()
+
+    records = [farmer_request(12.9, 77.5, nitrogen) for nitrogen in (60, 240)]
+    response = client.post('/predict/explain', json={"records": records, "top": 3})
+    assert response.status_code == 200
+    explanations = response.get_json()['explanations']
+    assert len(explanations) == 2 and set(explanations[0]) == {"yield", "roi"}
+    yield_explanation = explanations[1]['yield']
+    magnitudes = [abs(item['contribution']) for item in yield_explanation['contributions']]
+    assert len(magnitudes) == 3 and magnitudes == sorted(magnitudes, reverse=True)
+    interval = client.post('/predict/yield', json=records[1]).get_json()['prediction_interval']
+    # Contributions explain the model's own kg per hectare, not the farm total
+    assert np.isclose(yield_explanation['prediction'], interval['yield'] / 2 * api.ACRES_PER_HECTARE, rtol=1e-4)
+
+    # A single request body, one target; the explainer is reused for the same model version
+    explainer = api.explainers['yield']
+    response = client.post('/predict/explain', json={**records[0], "targets": ["yield"]})
+    assert list(response.get_json()['explanations'][0]) == ["yield"]
+    assert api.explainers['yield'] is explainer
+    assert client.post('/predict/explain', json={"records": records, "targets": ["price"]}).status_code == 400
+    for top in ("three", -1, 0, 2.5, True):
+        assert client.post('/predict/explain', json={"records": records, "top": top}).status_code == 400
+    response = client.post('/predict/explain', json={"records": records, "top": "2"})
+    assert len(response.get_json()['explanations'][0]['yield']['contributions']) == 2
+    print("✅ Explain endpoint returns ranked contributions")
+
+if __name__ == "__main__":
+    print("Testing prediction API...")
+    test_prediction_intervals()
+    test_yield_endpoints_return_intervals()
+    test_roi_endpoints_return_intervals()
+    test_contributions_sum_to_predictions()
+    test_explainer_cache_is_shared_by_threads()
+    test_explain_endpoint()
+    print("\n🎉 All prediction API tests passed!")
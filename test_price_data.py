@@ -0,0 +1,73 @@
+"""
+Test script for the compact price table encoding in Sasya-Mitra.
+"""
+
+import sys
+import os
+
+import numpy as np
+import pandas as pd
+
+# Add the models directory to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), 'models'))
+
+from preprocessing.data_processor import AgriDataPreprocessor, MISSING_DAY_NUMBER
+
+def price_table(rows):
+    """Build a raw Agmarknet price table from (district, commodity, date, modal price) rows."""
+    return pd.DataFrame({
+        'State': 'Karnataka',
+        'District': [row[0] for row in rows],
+        'Commodity': [row[1] for row in rows],
+        'Arrival_Date': [row[2] for row in rows],
+        'Modal_x0020_Price': [row[3] for row in rows],
+    })
+
+def test_categories_round_trip():
+    """Test that encoded text columns and arrival dates decode to the original values."""
+    preprocessor = AgriDataPreprocessor()
+    raw = price_table([('Mysore', 'Tomato', '15/10/2025', 1500), ('Kolar', 'Onion', '01/01/1970', '2100'),
+                       ('Mysore', 'Onion', 'not a date', 'n/a')])
+    prices = preprocessor.load_crop_price_data(raw.copy())
+
+    assert prices['District'].dtype.name == 'category'
+    assert prices['District'].astype(str).tolist() == raw['District'].tolist()
+    assert prices['Commodity'].astype(str).tolist() == raw['Commodity'].tolist()
+    assert prices['Modal_x0020_Price'].dtype == np.float32
+    assert prices['Modal_x0020_Price'].tolist() == [1500, 2100, 0]
+
+    assert prices['Arrival_Date'].tolist() == [20376, 0, MISSING_DAY_NUMBER]
+    decoded = preprocessor.decode_price_dates(prices['Arrival_Date'])
+    assert decoded.iloc[0] == pd.Timestamp(2025, 10, 15) and decoded.iloc[1] == pd.Timestamp(1970, 1, 1)
+    assert pd.isna(decoded.iloc[2])
+    # Encoding again is a no-op
+    assert preprocessor.encode_price_dates(prices['Arrival_Date']).equals(prices['Arrival_Date'])
+    print("✅ Price categories and dates round-trip")
+
+def test_concatenated_tables_stay_categorical():
+    """Test that tables loaded one after another share codes and concatenate as categoricals."""
+    preprocessor = AgriDataPreprocessor()
+    first = preprocessor.load_crop_price_data(price_table([('Mysore', 'Tomato', '15/10/2025', 1500),
+                                                           ('Kolar', 'Onion', '15/10/2025', 2100)]))
+    second = preprocessor.load_crop_price_data(price_table([('Kolar', 'Potato', '16/10/2025', 1800)]))
+
+    # Dictionaries only grow, so earlier codes keep their meaning
+    assert list(second['Commodity'].cat.categories) == ['Onion', 'Tomato', 'Potato']
+    assert first['Commodity'].cat.codes.tolist() == [1, 0] and second['Commodity'].cat.codes.tolist() == [2]
+    combined = preprocessor.concat_price_tables([first, second])
+    assert combined['Commodity'].dtype.name == 'category' and combined['District'].dtype.name == 'category'
+    assert combined['Commodity'].astype(str).tolist() == ['Tomato', 'Onion', 'Potato']
+    assert combined['Commodity'].cat.codes.tolist() == [1, 0, 2]
+
+    # The shared dictionaries hold categories a table may not contain; observed=True leaves them out
+    on_first_day = combined[combined['Arrival_Date'] == combined['Arrival_Date'].min()]
+    assert len(on_first_day.groupby('Commodity', observed=False)['Modal_x0020_Price'].mean()) == 3
+    means = on_first_day.groupby('Commodity', observed=True)['Modal_x0020_Price'].mean()
+    assert means.to_dict() == {'Onion': 2100, 'Tomato': 1500}
+    print("✅ Concatenated price tables stay categorical")
+
+if __name__ == "__main__":
+    print("Testing price table encoding...")
+    test_categories_round_trip()
+    test_concatenated_tables_stay_categorical()
+    print("\n🎉 All price table tests passed!")
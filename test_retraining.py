@@ -0,0 +1,627 @@
+"""
+Test script for the feedback retraining pipeline in Sasya-Mitra.
+"""
+
+import sys
+import os
+import shutil
+import tempfile
+import threading
+import time
+import fcntl
+import json
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+# Add the models directory to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), 'models'))
+
+from preprocessing.feedback_data import (
+    flatten_records, prepare_feedback_training_data, FEEDBACK_FEATURE_COLUMNS
+)
+from preprocessing.firestore_reader import fetch_documents
+from preprocessing.feedback_ingestion import FeedbackIngestor
+from preprocessing.snapshot_store import SnapshotStore
+from training.incremental import IncrementalRetrainer
+from training.model_trainer import AgriYieldModel, AgriROIModel
+import retrain_model
+from retrain_model import (
+    ingest_feedback_snapshot, fetch_prediction_data, warm_start_retrain, save_retrained_models, PredictionFetchError
+)
+import schedule_retraining
+from schedule_retraining import RetrainingService
+
+class FakeSnapshot:
+    """Document snapshot returned by the in-memory Firestore stand-in."""
+
+    def __init__(self, document_id, data):
+        self.id = document_id
+        self.exists = data is not None
+        self._data = data
+
+    def to_dict(self):
+        return dict(self._data) if self._data is not None else None
+
+class FakeDocument:
+    """Document reference in the in-memory Firestore stand-in."""
+
+    def __init__(self, collection, document_id):
+        self.collection = collection
+        self.id = document_id
+
+    def get(self):
+        return FakeSnapshot(self.id, self.collection.documents.get(self.id))
+
+class FakeQuery:
+    """Ordered, paged query over a collection in the in-memory Firestore stand-in."""
+
+    def __init__(self, collection, filters=(), orders=(), cursor=None, limit_to=None):
+        self.collection = collection
+        self.filters = filters
+        self.orders = orders
+        self.cursor = cursor
+        self.limit_to = limit_to
+
+    def _copy(self, **changes):
+        fields = {'filters': self.filters, 'orders': self.orders, 'cursor': self.cursor, 'limit_to': self.limit_to}
+        return FakeQuery(self.collection, **{**fields, **changes})
+
+    def where(self, field, op, value):
+        assert op == '>='
+        return self._copy(filters=self.filters + ((field, value),))
+
+    def order_by(self, field):
+        return self._copy(orders=self.orders + (field,))
+
+    def start_after(self, values):
+        return self._copy(cursor=tuple(values[field] for field in self.orders))
+
+    def limit(self, count):
+        return self._copy(limit_to=count)
+
+    def _sort_key(self, document_id, data):
+        return tuple(document_id if field == '__name__' else data[field] for field in self.orders)
+
+    def stream(self):
+        rows = [
+            (self._sort_key(document_id, data), document_id, data)
+            for document_id, data in self.collection.documents.items()
+            if all(data[field] >= value for field, value in self.filters)
+        ]
+        rows.sort(key=lambda row: row[0])
+        if self.cursor is not None:
+            rows = [row for row in rows if row[0] > self.cursor]
+        rows = rows[:self.limit_to]
+        self.collection.db.streamed += len(rows)
+        return [FakeSnapshot(document_id, data) for _, document_id, data in rows]
+
+class FakeCollection(FakeQuery):
+    """Collection in the in-memory Firestore stand-in."""
+
+    def __init__(self, db, documents):
+        super().__init__(self)
+        self.db = db
+        self.documents = documents
+
+    def document(self, document_id):
+        return FakeDocument(self, document_id)
+
+    def add(self, data):
+        document_id = f"doc_{len(self.documents)}"
+        self.documents[document_id] = dict(data)
+        return None, FakeDocument(self, document_id)
+
+class FakeFirestore:
+    """In-memory Firestore client with per-call latency and injectable failures."""
+
+    def __init__(self, collections, latency=0.0, failures=0):
+        self.collections = collections
+        self.latency = latency
+        self.failures = failures
+        self.calls = 0
+        self.streamed = 0
+        self.batch_sizes = []
+        self.lock = threading.Lock()
+
+    def collection(self, name):
+        return FakeCollection(self, self.collections.setdefault(name, {}))
+
+    def get_all(self, references):
+        with self.lock:
+            self.calls += 1
+            self.batch_sizes.append(len(references))
+            fail = self.failures > 0
+            self.failures -= fail
+        time.sleep(self.latency)
+        if fail:
+            raise ConnectionError("deadline exceeded")
+        return [reference.get() for reference in references]
+
+def make_prediction(i):
+    """Create a prediction document shaped like the ones the API stores."""
+    return {
+        'farmer_data': {
+            'land_area_acres': 1 + i % 5,
+            'budget_inr': 40000 + 1000 * i,
+            'soil': {'ph': 6.0 + (i % 10) / 10, 'nitrogen': 120 + i % 50}
+        },
+        'predictions': {'yield_kg_per_acre': 1500 + i, 'roi': 20 + i % 7},
+        'weather_data': {'avg_temperature_c': 24 + i % 6, 'avg_rainfall_mm': 800 + 10 * i}
+    }
+
+def make_feedback(n_predictions, n_feedback):
+    """Create predictions and feedback records that reference them."""
+    predictions = {f"pred_{i}": make_prediction(i) for i in range(n_predictions)}
+    feedback = [
+        {
+            'id': f"fb_{i}",
+            'prediction_id': f"pred_{i % n_predictions}",
+            'yield_actual': 1400 + i % 300,
+            'roi_actual': 15 + i % 11,
+            'accuracy_rating': 1 + i % 5
+        }
+        for i in range(n_feedback)
+    ]
+    return feedback, predictions
+
+def test_flatten_records():
+    """Test that nested records flatten to key-path columns."""
+    records = [{'a': {'b': 1, 'c': {'d': 2}}, 'e': 3}, {'a': None, 'e': 4}]
+    flat = flatten_records(records)
+    assert list(flat.columns) == ['a.b', 'a.c.d', 'e']
+    assert flat['a.c.d'].iloc[0] == 2 and np.isnan(flat['a.b'].iloc[1])
+
+    # Only the requested columns are extracted
+    flat = flatten_records(records, columns=['a.c.d', 'missing'])
+    assert list(flat.columns) == ['a.c.d', 'missing']
+    print("✅ Nested records flattened")
+
+def test_feedback_join():
+    """Test that feedback joins to its prediction with defaults filled in."""
+    feedback, predictions = make_feedback(3, 5)
+    feedback.append({'id': 'orphan', 'prediction_id': 'unknown', 'yield_actual': 1})
+    feedback.append({'id': 'no_prediction', 'yield_actual': 1})
+    feedback.append({'id': 'no_actuals', 'prediction_id': 'pred_0'})
+
+    training_df = prepare_feedback_training_data(feedback, predictions)
+
+    # Orphaned feedback is dropped and order is preserved
+    assert len(training_df) == 6
+    assert training_df['land_area_acres'].tolist() == [1, 2, 3, 1, 2, 1]
+    assert training_df['predicted_yield'].iloc[4] == 1501
+    assert training_df['soil_ph'].iloc[2] == 6.2
+    # Missing inputs take their defaults, missing actuals stay unknown
+    assert (training_df['soil_potassium'] == 150).all()
+    assert (training_df['avg_humidity'] == 65).all()
+    assert training_df['accuracy_rating'].iloc[-1] == 3
+    assert np.isnan(training_df['actual_yield'].iloc[-1])
+    print("✅ Feedback joined to predictions")
+
+def test_feedback_trains_model():
+    """Test that the joined feedback feeds the model trainer."""
+    feedback, predictions = make_feedback(200, 400)
+    training_df = prepare_feedback_training_data(feedback, predictions)
+
+    model = AgriYieldModel(rf_params={'n_estimators': 10}, xgb_params={'n_estimators': 10})
+    metrics = model.fit(training_df[FEEDBACK_FEATURE_COLUMNS], training_df['actual_yield'])
+    assert model.is_trained
+    assert model.feature_names == FEEDBACK_FEATURE_COLUMNS
+    assert 'r2' in metrics['rf_metrics']
+    print("✅ Models trained on feedback data")
+
+def test_batched_prediction_reads():
+    """Test that predictions are read in concurrent batches with retries."""
+    _, predictions = make_feedback(250, 0)
+    db = FakeFirestore({'predictions': predictions}, latency=0.05, failures=2)
+    ids = [f"pred_{i}" for i in range(250)] + ['pred_0', '', 'missing']
+
+    start = time.perf_counter()
+    documents, failed_ids = fetch_documents(db, 'predictions', ids, batch_size=50, max_workers=4, retry_delay=0)
+    elapsed = time.perf_counter() - start
+
+    assert failed_ids == []
+    assert len(documents) == 250
+    assert documents['pred_7'] == predictions['pred_7']
+    # 6 batches (including the one holding 'missing') plus 2 retried after failures
+    assert max(db.batch_sizes) == 50 and len(db.batch_sizes) == 8
+    # Batches overlap instead of running back to back
+    assert elapsed < 8 * 0.05
+    print(f"✅ Fetched {len(documents)} predictions in {len(db.batch_sizes)} batched reads")
+
+def test_batched_reads_report_failures():
+    """Test that batches failing every retry are reported, not dropped silently."""
+    _, predictions = make_feedback(10, 0)
+    db = FakeFirestore({'predictions': predictions}, failures=100)
+    documents, failed_ids = fetch_documents(db, 'predictions', list(predictions), batch_size=4,
+                                            max_retries=2, retry_delay=0)
+    assert documents == {}
+    assert sorted(failed_ids) == sorted(predictions)
+    print("✅ Failed batches reported")
+
+def test_incremental_feedback_ingestion():
+    """Test that each ingestion run reads only feedback added since the last one."""
+    feedback, predictions = make_feedback(20, 0)
+    start = datetime(2025, 6, 1)
+    documents = {}
+    def add_feedback(first, last):
+        for i in range(first, last):
+            # Pairs of records share a timestamp, so the document ID must break ties
+            documents[f"fb_{i:03d}"] = {
+                'prediction_id': f"pred_{i % 20}", 'yield_actual': 1400 + i,
+                'timestamp': start + timedelta(minutes=i // 2)
+            }
+    add_feedback(0, 25)
+    db = FakeFirestore({'feedback': documents, 'predictions': predictions})
+    snapshot_dir = tempfile.mkdtemp()
+    try:
+        ingestor = FeedbackIngestor(db, snapshot_dir, page_size=10)
+        assert len(ingestor.ingest(days_back=10000)) == 25
+        assert db.streamed == 25
+
+        # Nothing new: the run reads nothing
+        assert FeedbackIngestor(db, snapshot_dir, page_size=10).ingest() == []
+        assert db.streamed == 25
+
+        # Only the new records are read, across a page boundary
+        add_feedback(25, 38)
+        new_feedback = FeedbackIngestor(db, snapshot_dir, page_size=10).ingest()
+        assert [record['id'] for record in new_feedback] == [f"fb_{i:03d}" for i in range(25, 38)]
+        assert db.streamed == 38
+
+        ingestor.append_predictions({'pred_1': predictions['pred_1']})
+        feedback_data, prediction_data = ingestor.load_snapshot()
+        assert len(feedback_data) == 38 and len({record['id'] for record in feedback_data}) == 38
+        assert prediction_data == {'pred_1': predictions['pred_1']}
+        assert ingestor.load_watermark()['document_id'] == 'fb_037'
+    finally:
+        shutil.rmtree(snapshot_dir)
+    print("✅ Feedback ingested incrementally")
+
+def test_snapshot_ingestion_joins_only_new_feedback():
+    """Test that each run joins the new feedback and feedback waiting for its prediction, without re-reading the snapshot."""
+    feedback, predictions = make_feedback(10, 30)
+    documents = {}
+    for i, record in enumerate(feedback):
+        documents[record.pop('id')] = {**record, 'timestamp': datetime(2025, 6, 1, 12, i)}
+    # pred_3 is written late, so its feedback has to wait for a later run
+    late = predictions.pop('pred_3')
+    db = FakeFirestore({'feedback': dict(list(documents.items())[:20]), 'predictions': predictions})
+    snapshot_dir = tempfile.mkdtemp()
+    read_paths = []
+    read = FeedbackIngestor._read
+    FeedbackIngestor._read = lambda ingestor, path: read_paths.append(os.path.basename(path)) or read(ingestor, path)
+    try:
+        store = SnapshotStore(os.path.join(snapshot_dir, 'store'))
+        assert len(ingest_feedback_snapshot(db, 10000, snapshot_dir, store)) == 20
+        assert len(store.read()) == 18
+        assert [record['id'] for record in FeedbackIngestor(db, snapshot_dir).load_unjoined()] == ['fb_3', 'fb_13']
+
+        # The next run reads the new feedback from Firestore and never the feedback snapshot
+        read_paths.clear()
+        db.collections['feedback'].update(documents)
+        db.collections['predictions']['pred_3'] = late
+        assert ingest_feedback_snapshot(db, 10000, snapshot_dir, store) == {f"fb_{i}" for i in range(20, 30)}
+        assert 'feedback.jsonl' not in read_paths
+        rows = store.read()
+        assert len(rows) == 30 and set(rows['feedback_id']) == {record_id for record_id in documents}
+        assert FeedbackIngestor(db, snapshot_dir).load_unjoined() == []
+    finally:
+        FeedbackIngestor._read = read
+        shutil.rmtree(snapshot_dir)
+    print("✅ Snapshot ingestion joins only new and waiting feedback")
+
+def test_failed_append_keeps_new_feedback_waiting():
+    """Test that feedback behind the watermark is kept for the next run when the append fails."""
+    feedback, predictions = make_feedback(10, 10)
+    documents = {record.pop('id'): {**record, 'timestamp': datetime(2025, 6, 1, 12, i)}
+                 for i, record in enumerate(feedback)}
+    db = FakeFirestore({'feedback': documents, 'predictions': predictions})
+    snapshot_dir = tempfile.mkdtemp()
+    try:
+        store = SnapshotStore(os.path.join(snapshot_dir, 'store'))
+        append = store.append
+        def failing_append(table):
+            raise OSError("disk full")
+        store.append = failing_append
+        assert ingest_feedback_snapshot(db, 10000, snapshot_dir, store) == set()
+        assert len(FeedbackIngestor(db, snapshot_dir).load_unjoined()) == 10
+
+        # The next run reads no new feedback but joins the waiting feedback
+        store.append = append
+        assert ingest_feedback_snapshot(db, 10000, snapshot_dir, store) == set()
+        assert len(store.read()) == 10 and FeedbackIngestor(db, snapshot_dir).load_unjoined() == []
+    finally:
+        shutil.rmtree(snapshot_dir)
+    print("✅ A failed append keeps the new feedback waiting")
+
+def test_failed_prediction_fetches_abort_the_run():
+    """Test that predictions failing to fetch are reported and abort the run past the threshold."""
+    feedback, predictions = make_feedback(40, 40)
+    documents = {}
+    for i, record in enumerate(feedback):
+        documents[record.pop('id')] = {**record, 'timestamp': datetime.now() - timedelta(minutes=40 - i)}
+    db = FakeFirestore({'feedback': documents, 'predictions': predictions})
+    broken = set()
+    def fetch_with_failures(db, collection, document_ids):
+        documents, _ = fetch_documents(db, collection, document_ids)
+        failed_ids = sorted(broken & set(documents))
+        return {key: value for key, value in documents.items() if key not in broken}, failed_ids
+
+    snapshot_dir = tempfile.mkdtemp()
+    fetch = retrain_model.fetch_documents
+    retrain_model.fetch_documents = fetch_with_failures
+    try:
+        # One failure in 40 is within the threshold and its feedback waits for the next run
+        broken.update({'pred_0'})
+        assert len(fetch_prediction_data(db, list(predictions))) == 39
+        broken.update({'pred_1', 'pred_2'})
+        try:
+            fetch_prediction_data(db, list(predictions))
+            assert False, "run continued without 3 of 40 predictions"
+        except PredictionFetchError as e:
+            assert '3 of 40' in str(e)
+
+        # An aborted ingestion keeps its new feedback waiting instead of dropping it
+        store = SnapshotStore(os.path.join(snapshot_dir, 'store'))
+        try:
+            ingest_feedback_snapshot(db, 1, snapshot_dir, store)
+            assert False, "ingestion continued without 3 of 40 predictions"
+        except PredictionFetchError:
+            pass
+        assert len(FeedbackIngestor(db, snapshot_dir).load_unjoined()) == 40 and store.read().empty
+        broken.clear()
+        assert ingest_feedback_snapshot(db, 1, snapshot_dir, store) == set()
+        assert len(store.read()) == 40
+
+        # The retraining service records the failed poll and does not retrain
+        broken.update({'pred_0', 'pred_1', 'pred_2'})
+        service, _ = make_service(os.path.join(snapshot_dir, 'service'), min_new_feedback=1)
+        run = service.run_once()
+        assert run['outcome'] == 'failed' and run['trigger'] == 'poll'
+        assert read_runs(service) == [run] and service.training_data.empty
+    finally:
+        retrain_model.fetch_documents = fetch
+        shutil.rmtree(snapshot_dir)
+    print("✅ Failed prediction fetches abort the run past the threshold")
+
+def make_feedback_table(n, shift=0.0, seed=0):
+    """Create a joined feedback table whose outcomes depend on the inputs."""
+    rng = np.random.default_rng(seed)
+    table = pd.DataFrame(rng.normal(size=(n, len(FEEDBACK_FEATURE_COLUMNS))) + shift,
+                         columns=FEEDBACK_FEATURE_COLUMNS)
+    table['actual_yield'] = 1500 + 200 * table['soil_ph'] + 50 * table['avg_rainfall_mm'] ** 2 + rng.normal(size=n) * 20
+    table['actual_roi'] = 20 + 5 * table['budget_inr'] + rng.normal(size=n)
+    return table
+
+def test_warm_start_retraining():
+    """Test that new feedback updates the previous models unless the data drifted."""
+    old_data = make_feedback_table(1000)
+    previous_yield = AgriYieldModel(rf_params={'n_estimators': 20}, xgb_params={'n_estimators': 30})
+    previous_yield.fit(old_data[FEEDBACK_FEATURE_COLUMNS].astype(np.float32), old_data['actual_yield'])
+    previous_roi = AgriROIModel(xgb_params={'n_estimators': 30})
+    previous_roi.fit(old_data[FEEDBACK_FEATURE_COLUMNS].astype(np.float32), old_data['actual_roi'])
+
+    retrainer = IncrementalRetrainer(new_trees=5, new_rounds=10, max_trees=22)
+    yield_model, roi_model, report = retrainer.retrain(
+        previous_yield, previous_roi, old_data, make_feedback_table(200, seed=1), compare=True
+    )
+    assert report['yield']['mode'] == 'incremental' and report['roi']['mode'] == 'incremental'
+    assert set(report['yield']['runs']) == {'incremental', 'full'}
+    # The forest grew but kept only its newest trees; boosting continued from the old booster
+    assert len(yield_model.rf_model.estimators_) == 22
+    assert yield_model.rf_model.estimators_[-1] not in previous_yield.rf_model.estimators_
+    assert yield_model.xgb_model.get_booster().num_boosted_rounds() == 40
+    assert roi_model.model.get_booster().num_boosted_rounds() == 40
+    # The previous models are left untouched
+    assert len(previous_yield.rf_model.estimators_) == 20
+
+    # Shifted inputs fall back to a full retrain
+    _, _, report = retrainer.retrain(previous_yield, previous_roi, old_data, make_feedback_table(200, shift=3.0, seed=2))
+    assert report['yield']['mode'] == 'full' and report['yield']['drift']['drifted']
+    print("✅ Warm-start retraining with drift fallback")
+
+def test_warm_start_saves_only_changed_models():
+    """Test that each retrained model is saved on its own and unchanged models start no new version."""
+    table = make_feedback_table(400)
+    table['feedback_id'] = [f"fb_{i}" for i in range(len(table))]
+    table.loc[250:, 'actual_roi'] = np.nan
+    versions_dir = retrain_model.MODEL_VERSIONS_DIR
+    retrain_model.MODEL_VERSIONS_DIR = tempfile.mkdtemp()
+    try:
+        def versions():
+            return {name: sorted(os.listdir(os.path.join(retrain_model.MODEL_VERSIONS_DIR, name)))
+                    for name in os.listdir(retrain_model.MODEL_VERSIONS_DIR)}
+
+        # Without previous models, too little feedback trains nothing and creates no version
+        yield_model, roi_model, _ = warm_start_retrain(table.loc[[0, 1, 2, 250]], {'fb_0', 'fb_1', 'fb_2', 'fb_250'})
+        assert yield_model is None and roi_model is None
+        assert save_retrained_models(yield_model, roi_model, '0') == [] and versions() == {}
+
+        # A model with too little feedback is skipped and the other is still saved
+        yield_only = table.loc[list(range(3)) + list(range(250, 400))]
+        yield_model, roi_model, _ = warm_start_retrain(yield_only, set(yield_only['feedback_id']))
+        assert yield_model is not None and roi_model is None
+        assert save_retrained_models(yield_model, roi_model, '0') == ['yield_model']
+        yield_model, roi_model, metrics = warm_start_retrain(table[:250], set(table['feedback_id'][:250]))
+        assert save_retrained_models(yield_model, roi_model, '1') == ['yield_model', 'roi_model']
+
+        # Only yield feedback arrived: the ROI model is unchanged and not saved again
+        yield_model, roi_model, metrics = warm_start_retrain(table, set(table['feedback_id'][250:]))
+        assert metrics['retrain_modes']['roi'] == 'unchanged' and roi_model is None
+        assert save_retrained_models(yield_model, roi_model, '2') == ['yield_model']
+        assert versions() == {'v0': ['yield_model.bundle'], 'v1': ['roi_model.bundle', 'yield_model.bundle'],
+                              'v2': ['yield_model.bundle']}
+        latest_yield, latest_roi = retrain_model.load_latest_models()
+        assert len(latest_yield.rf_model.estimators_) == len(yield_model.rf_model.estimators_)
+        assert latest_roi is not None and latest_roi.feature_names == FEEDBACK_FEATURE_COLUMNS
+
+        # Too little new feedback for either model creates no version
+        yield_model, roi_model, _ = warm_start_retrain(table, {'fb_0', 'fb_1'})
+        assert save_retrained_models(yield_model, roi_model, '3') == [] and 'v3' not in versions()
+    finally:
+        shutil.rmtree(retrain_model.MODEL_VERSIONS_DIR)
+        retrain_model.MODEL_VERSIONS_DIR = versions_dir
+    print("✅ Warm-start retraining saves only the models that changed")
+
+def test_snapshot_store_partitions():
+    """Test that joined rows are stored by date and read back by range and columns."""
+    feedback, predictions = make_feedback(10, 30)
+    for i, record in enumerate(feedback):
+        record['timestamp'] = datetime(2025, 6, 1 + i // 10, 12, i)
+    store_dir = tempfile.mkdtemp()
+    try:
+        store = SnapshotStore(store_dir)
+        store.append(prepare_feedback_training_data(feedback[:20], predictions))
+        store.append(prepare_feedback_training_data(feedback[20:], predictions))
+        assert store.dates() == ['2025-06-01', '2025-06-02', '2025-06-03']
+
+        # A reopened store reads everything back in date order
+        rows = SnapshotStore(store_dir).read()
+        assert rows['feedback_id'].tolist() == [record['id'] for record in feedback]
+        assert rows['actual_yield'].tolist() == [record['yield_actual'] for record in feedback]
+
+        # Date pruning and column subsets
+        rows = store.read(start_date='2025-06-02', end_date='2025-06-02', columns=['soil_ph', 'actual_yield'])
+        assert list(rows.columns) == ['soil_ph', 'actual_yield'] and len(rows) == 10
+
+        # A corrected copy of a row replaces the original
+        feedback[0]['yield_actual'] = 9999
+        store.append(prepare_feedback_training_data(feedback[:1], predictions))
+        rows = store.read(end_date=date(2025, 6, 1))
+        assert len(rows) == 10 and rows['actual_yield'].iloc[-1] == 9999
+        assert store.describe()['rows'].tolist() == [11, 10, 10]
+    finally:
+        shutil.rmtree(store_dir)
+    print("✅ Snapshot store partitions pruned by date")
+
+def make_service(state_dir, n_feedback=40, **options):
+    """A retraining service on an in-memory Firestore holding timestamped feedback, storing everything under a directory."""
+    feedback, predictions = make_feedback(20, n_feedback)
+    documents = {}
+    for i, record in enumerate(feedback):
+        documents[record.pop('id')] = {**record, 'timestamp': datetime.now() - timedelta(minutes=n_feedback - i)}
+    db = FakeFirestore({'feedback': documents, 'predictions': predictions})
+    options = {'memory_mb': 1 << 20, **options}
+    service = RetrainingService(db, snapshot_dir=os.path.join(state_dir, 'snapshot'),
+                                store_dir=os.path.join(state_dir, 'store'), state_dir=state_dir,
+                                days_back=1, **options)
+    return service, db
+
+def read_runs(service):
+    """Run records appended to the service's run log."""
+    with open(service.run_log_path) as f:
+        return [json.loads(line) for line in f]
+
+def slow_retrain(training_data):
+    """Retraining that outlives any test's wall time limit."""
+    time.sleep(60)
+
+def test_retraining_triggers():
+    """Test that retraining is due after enough new feedback or once the interval has passed."""
+    state_dir = tempfile.mkdtemp()
+    try:
+        service, _ = make_service(state_dir, interval_days=30, min_new_feedback=5)
+        now = datetime(2025, 6, 30)
+        assert service.due_trigger(now) is None
+
+        service.state['pending_feedback_ids'] = {'fb_0', 'fb_1'}
+        assert service.due_trigger(now) == 'interval'
+        service.state['last_success'] = now - timedelta(days=29)
+        assert service.due_trigger(now) is None
+        service.state['last_success'] = now - timedelta(days=30)
+        assert service.due_trigger(now) == 'interval'
+
+        service.state['last_success'] = now
+        service.state['pending_feedback_ids'] = {f"fb_{i}" for i in range(5)}
+        assert service.due_trigger(now) == 'feedback_count'
+    finally:
+        shutil.rmtree(state_dir)
+    print("✅ Retraining is triggered by new feedback and by the interval")
+
+def test_service_retrains_once_and_persists_its_state():
+    """Test the --once path: poll, retrain in a forked job, save the models and record the run and state."""
+    state_dir = tempfile.mkdtemp()
+    versions_dir = retrain_model.MODEL_VERSIONS_DIR
+    retrain_model.MODEL_VERSIONS_DIR = os.path.join(state_dir, 'saved_models')
+    try:
+        service, db = make_service(state_dir, min_new_feedback=30)
+        run = service.run_once()
+        assert run['outcome'] == 'success' and run['trigger'] == 'feedback_count'
+        assert run['training_rows'] == 40 and run['new_feedback_records'] == 40
+        assert run['metrics']['data_points'] == 40 and 'r2' in run['metrics']['yield_metrics']['rf_metrics']
+        model_dir = os.path.join(retrain_model.MODEL_VERSIONS_DIR, f"v{run['version']}")
+        assert os.path.exists(os.path.join(model_dir, 'yield_model.bundle'))
+        assert os.path.exists(os.path.join(model_dir, 'roi_model.bundle'))
+        assert [version['version'] for version in db.collections['model_versions'].values()] == [run['version']]
+
+        # The run log and the state survive a restart, and nothing is left to train on
+        assert [logged['version'] for logged in read_runs(service)] == [run['version']]
+        assert read_runs(service)[0]['duration_seconds'] == run['duration_seconds'] > 0
+        with open(service.state_path) as f:
+            assert json.load(f)['pending_feedback_ids'] == []
+        restarted, _ = make_service(state_dir, min_new_feedback=30)
+        assert restarted.state['last_success'] == datetime.fromisoformat(run['started_at'])
+        assert restarted.state['pending_feedback_ids'] == set() and len(restarted.training_data) == 40
+        assert restarted.run_once() is None and len(read_runs(restarted)) == 1
+    finally:
+        retrain_model.MODEL_VERSIONS_DIR = versions_dir
+        shutil.rmtree(state_dir)
+    print("✅ Retraining service runs once and persists its runs and state")
+
+def test_locked_retraining_is_skipped():
+    """Test that a retrain is skipped while another job holds the lock, keeping the feedback pending."""
+    state_dir = tempfile.mkdtemp()
+    try:
+        service, _ = make_service(state_dir, min_new_feedback=30)
+        service.poll_feedback()
+        with open(service.lock_path, 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            run = service.run_job('feedback_count')
+        assert run['outcome'] == 'skipped' and 'lock' in run['error']
+        assert read_runs(service) == [run]
+        assert len(service.state['pending_feedback_ids']) == 40 and service.state['last_success'] is None
+    finally:
+        shutil.rmtree(state_dir)
+    print("✅ Retraining is skipped while another job holds the lock")
+
+def test_job_is_killed_at_its_wall_time_limit():
+    """Test that a job running past its wall time limit is terminated and recorded as failed."""
+    state_dir = tempfile.mkdtemp()
+    retrain_models = schedule_retraining.retrain_models
+    schedule_retraining.retrain_models = slow_retrain
+    try:
+        service, _ = make_service(state_dir, min_new_feedback=30, wall_seconds=1)
+        run = service.run_once()
+        assert run['outcome'] == 'failed' and 'wall time limit of 1s' in run['error']
+        assert 1 <= run['duration_seconds'] < 10
+        assert read_runs(service)[0]['outcome'] == 'failed'
+        assert len(service.state['pending_feedback_ids']) == 40 and service.state['last_success'] is None
+
+        # The lock is released for the next job
+        with open(service.lock_path, 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    finally:
+        schedule_retraining.retrain_models = retrain_models
+        shutil.rmtree(state_dir)
+    print("✅ Retraining jobs are killed at their wall time limit")
+
+if __name__ == "__main__":
+    test_flatten_records()
+    test_feedback_join()
+    test_feedback_trains_model()
+    test_batched_prediction_reads()
+    test_batched_reads_report_failures()
+    test_incremental_feedback_ingestion()
+    test_snapshot_ingestion_joins_only_new_feedback()
+    test_failed_append_keeps_new_feedback_waiting()
+    test_failed_prediction_fetches_abort_the_run()
+    test_warm_start_retraining()
+    test_warm_start_saves_only_changed_models()
+    test_snapshot_store_partitions()
+    test_retraining_triggers()
+    test_service_retrains_once_and_persists_its_state()
+    test_locked_retraining_is_skipped()
+    test_job_is_killed_at_its_wall_time_limit()
+    print("\n🎉 Retraining tests completed successfully!")
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Test script for shadow scoring of candidate models.
+"""
+
+import sys
+import os
+import time
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+# Add the models and API directories to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), 'models'))
+sys.path.append(os.path.join(os.path.dirname(__file__), 'models', 'api'))
+
+from training.model_trainer import AgriYieldModel, AgriROIModel
+from preprocessing.feedback_data import FEEDBACK_FEATURE_COLUMNS
+from shadow import ShadowScorer
+import app as api
+
+def make_data(n=1500, seed=0):
+    """Create yields from the features the API prepares."""
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame({
+        'avg_temperature': rng.uniform(15, 35, n),
+        'avg_humidity': rng.uniform(30, 90, n),
+        'avg_rainfall': rng.uniform(300, 2000, n),
+        'soil_ph': rng.uniform(5, 8, n),
+        'soil_nitrogen': rng.uniform(50, 250, n),
+    })
+    y = 1500 + 40 * X['avg_temperature'] + 0.8 * X['avg_rainfall'] + 3 * X['soil_nitrogen'] + rng.normal(0, 100, n)
+    return X, y
+
+def train_models(seed):
+    """Train small yield and ROI models; different seeds give diverging versions."""
+    X, y = make_data(seed=seed)
+    yield_model = AgriYieldModel(rf_params={'n_estimators': 20, 'random_state': seed},
+                                 xgb_params={'n_estimators': 30, 'random_state': seed})
+    yield_model.fit(X, y)
+    roi_model = AgriROIModel(xgb_params={'n_estimators': 30, 'random_state': seed})
+    roi_model.fit(X, y / 1000)
+    return yield_model, roi_model
+
+def save_version(versions_dir, version, yield_model, roi_model):
+    """Save models the way the retraining job lays out a version."""
+    model_dir = os.path.join(versions_dir, f"v{version}")
+    os.makedirs(model_dir)
+    yield_model.save_model(os.path.join(model_dir, "yield_model"))
+    roi_model.save_model(os.path.join(model_dir, "roi_model"))
+
+def wait_for(scorer, target, count, timeout=30):
+    """Wait until the scorer has recorded count rows for a target."""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        summary = scorer.snapshot()['targets'][target]
+        if summary['count'] >= count:
+            return summary
+        time.sleep(0.05)
+    raise AssertionError(f"Shadow scorer recorded {summary['count']} of {count} {target} rows")
+
+def test_divergence_matches_direct_scoring():
+    """Test that the background worker records the candidate's divergence from the active models."""
+    active_yield, active_roi = train_models(seed=0)
+    candidate_yield, candidate_roi = train_models(seed=1)
+    versions_dir = tempfile.mkdtemp()
+    try:
+        save_version(versions_dir, "2", candidate_yield, candidate_roi)
+        scorer = ShadowScorer.from_version("2", versions_dir).start()
+        X, _ = make_data(200, seed=2)
+        active = active_yield.predict_intervals(X)['prediction']
+        for start in range(0, 200, 10):
+            rows = X.iloc[start:start + 10].reset_index(drop=True)
+            assert scorer.submit('yield', rows, active_yield, active[start:start + 10], 0.5)
+            # Active ROI predictions are left to the worker
+            assert scorer.submit('roi', rows, active_roi)
+        yield_summary = wait_for(scorer, 'yield', 200)
+        roi_summary = wait_for(scorer, 'roi', 200)
+        scorer.stop()
+
+        candidate = candidate_yield.predict_intervals(X)['prediction']
+        assert np.isclose(yield_summary['mean_abs_diff'], np.abs(candidate - active).mean(), rtol=1e-4)
+        assert np.isclose(yield_summary['mean_diff'], (candidate - active).mean(), rtol=1e-3, atol=1e-3)
+        assert yield_summary['active_ms_per_row']['p50'] == 0.5
+        assert yield_summary['candidate_ms_per_row']['p50'] > 0
+
+        roi_diff = candidate_roi.model.predict(X) - active_roi.model.predict(X)
+        assert np.isclose(roi_summary['rmse'], np.sqrt((roi_diff ** 2).mean()), rtol=1e-4)
+        assert roi_summary['active_ms_per_row']['p50'] > 0
+        assert scorer.snapshot()['dropped'] == 0 and scorer.snapshot()['errors'] == 0
+    finally:
+        shutil.rmtree(versions_dir)
+    print("✅ Shadow scorer records candidate divergence and latency")
+
+def test_submit_drops_instead_of_blocking():
+    """Test that a full queue drops requests immediately."""
+    yield_model, _ = train_models(seed=0)
+    scorer = ShadowScorer({'yield': yield_model}, queue_size=5)
+    X, _ = make_data(1, seed=3)
+    # The worker is not started, so nothing drains the queue
+    start = time.perf_counter()
+    queued = [scorer.submit('yield', X, yield_model) for _ in range(50)]
+    elapsed = time.perf_counter() - start
+    assert sum(queued) == 5 and scorer.snapshot()['dropped'] == 45
+    assert elapsed < 0.05
+    # Targets without a candidate are ignored rather than queued
+    assert not scorer.submit('roi', X, yield_model)
+    print("✅ Shadow submissions never block the request")
+
+def train_feedback_model(n=1000, seed=0):
+    """Train a yield model on the feedback columns, as the retraining job does."""
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame({name: rng.uniform(1, 10, n) for name in FEEDBACK_FEATURE_COLUMNS}).astype(np.float32)
+    X['avg_temperature_c'] = rng.uniform(15, 35, n)
+    X['avg_rainfall_mm'] = rng.uniform(300, 2000, n)
+    y = 1000 + 40 * X['avg_temperature_c'] + 0.8 * X['avg_rainfall_mm'] + rng.normal(0, 50, n)
+    model = AgriYieldModel(rf_params={'n_estimators': 20}, xgb_params={'n_estimators': 30})
+    model.fit(X, y)
+    return model
+
+def test_feedback_candidate_scores_the_request_weather():
+    """Test that a candidate retrained on feedback gets the request's weather instead of zeros."""
+    candidate = train_feedback_model()
+    active_yield, _ = train_models(seed=0)
+    weather = {"avg_temperature_c": 30, "avg_humidity": 60, "avg_rainfall_mm": 1500, "solar_radiation": 5}
+    farmer_data = {"location": {"lat": 12.9, "lng": 77.5}, "land_area_acres": 2, "soil": {"ph": 6.5}}
+    rows = api.prepare_features_for_prediction(farmer_data, weather)
+    assert 'avg_temperature_c' not in rows.columns
+
+    scorer = ShadowScorer({'yield': candidate})
+    scorer.score_batch([('yield', rows, active_yield, [0.0], 0.5)])
+    expected = candidate.predict_intervals(rows.rename(columns={
+        'avg_temperature': 'avg_temperature_c', 'avg_rainfall': 'avg_rainfall_mm'
+    })[FEEDBACK_FEATURE_COLUMNS])['prediction']
+    summary = scorer.snapshot()['targets']['yield']
+    assert np.isclose(summary['mean_diff'], expected[0], rtol=1e-5)
+    # A model that had zero weather would predict far lower yields
+    assert expected[0] > 1000 + 40 * 25
+
+    # Rows without the weather are refused rather than zero-filled
+    try:
+        scorer.score_batch([('yield', rows.drop(columns=['avg_rainfall']), active_yield, [0.0], 0.5)])
+        assert False, "rows without rainfall were scored"
+    except ValueError as e:
+        assert 'avg_rainfall_mm' in str(e)
+    assert scorer.snapshot()['targets']['yield']['count'] == 1
+    print("✅ Feedback-trained candidates score the request's weather")
+
+def test_api_shadow_scores_requests():
+    """Test that the API hands requests to the shadow scorer and reports its statistics."""
+    api.yield_model, api.roi_model = train_models(seed=0)
+    api.fetch_nasa_power_weather = lambda lat, lon: {
+        "avg_temperature_c": 25, "avg_humidity": 60, "avg_rainfall_mm": 900, "solar_radiation": 5
+    }
+    client = api.app.test_client()
+    assert client.get('/shadow/stats').get_json() == {"enabled": False}
+
+    versions_dir = tempfile.mkdtemp()
+    try:
+        save_version(versions_dir, "3", *train_models(seed=1))
+        assert api.start_shadow_scoring("3", versions_dir)
+        request = {"location": {"lat": 12.9, "lng": 77.5}, "land_area_acres": 2, "soil": {"ph": 6.5, "nitrogen": 150}}
+        assert client.post('/predict/yield', json=request).status_code == 200
+        assert client.post('/predict/realtime', json=request).status_code == 200
+        wait_for(api.shadow_scorer, 'yield', 2)
+        wait_for(api.shadow_scorer, 'roi', 1)
+        stats = client.get('/shadow/stats').get_json()
+        assert stats['enabled'] and stats['candidate_version'] == "3" and stats['submitted'] == 3
+    finally:
+        api.shadow_scorer.stop()
+        api.shadow_scorer = None
+        shutil.rmtree(versions_dir)
+    print("✅ API shadow scores live requests")
+
+if __name__ == "__main__":
+    print("Testing shadow scoring...")
+    test_divergence_matches_direct_scoring()
+    test_submit_drops_instead_of_blocking()
+    test_feedback_candidate_scores_the_request_weather()
+    test_api_shadow_scores_requests()
+    print("\n🎉 All shadow scoring tests passed!")
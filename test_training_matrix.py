@@ -0,0 +1,151 @@
+"""
+Test script for the row-per-observation training matrix in Sasya-Mitra.
+"""
+
+import sys
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+# Add the models directory to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), 'models'))
+
+from preprocessing.data_processor import AgriDataPreprocessor
+from preprocessing.training_matrix import TrainingMatrixBuilder, crop_key
+from training.model_trainer import AgriYieldModel, feature_matrix
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
+
+def load_history():
+    """Load the historical crop tables shipped in data/."""
+    preprocessor = AgriDataPreprocessor()
+    return {
+        'area': pd.read_csv(os.path.join(DATA_DIR, "All India level Area Under Principal Crops from 2001-02 to 2015-16.csv")),
+        'yield': pd.read_csv(os.path.join(DATA_DIR, "All India level Average Yield of Principal Crops from 2001-02 to 2015-16.csv")),
+        'production': pd.read_csv(os.path.join(DATA_DIR, "Production of principle crops.csv")),
+        'price': preprocessor.load_crop_price_data(os.path.join(DATA_DIR, "price.csv")),
+        'damage': pd.read_csv(os.path.join(DATA_DIR, "Year-wise Damage Caused Due To Floods, Cyclonic Storm, Landslides etc.csv")),
+    }
+
+def test_compact_price_table():
+    """Test that the price table is loaded compactly."""
+    preprocessor = AgriDataPreprocessor()
+    raw = pd.read_csv(os.path.join(DATA_DIR, "price.csv"))
+    prices = preprocessor.load_crop_price_data(raw.copy())
+
+    assert prices['Commodity'].dtype.name == 'category'
+    assert prices['Modal_x0020_Price'].dtype == np.float32
+    assert prices['Arrival_Date'].dtype == np.int32
+    assert prices.memory_usage(deep=True).sum() < raw.memory_usage(deep=True).sum() / 4
+
+    # Aggregations give the same answer as on the raw table
+    expected = raw.groupby('Commodity')['Modal_x0020_Price'].mean()
+    actual = prices.groupby('Commodity', observed=True)['Modal_x0020_Price'].mean()
+    assert np.allclose(actual.loc[expected.index].to_numpy(), expected.to_numpy(), rtol=1e-5)
+
+    # Dates round-trip through day numbers
+    decoded = preprocessor.decode_price_dates(prices['Arrival_Date'])
+    assert decoded.iloc[0] == pd.Timestamp(2025, 10, 15)
+    print("✅ Price table loaded compactly")
+
+def test_crop_keys_match_across_tables():
+    """Test that crop names from different tables share a key."""
+    assert crop_key('Food grains (cereals) - Rice') == 'rice'
+    assert crop_key('Foodgrains(cereals) - Rice') == 'rice'
+    assert crop_key('Food Grains (Cereals) - Rice (000 tonnes)') == 'rice'
+    assert crop_key('Potatoes (MT/ha)') == crop_key('Potato')
+    print("✅ Crop keys match across tables")
+
+def test_matrix_has_one_row_per_observation():
+    """Test that the matrix has one row per (crop, year) observation."""
+    datasets = load_history()
+    builder = TrainingMatrixBuilder(chunk_size=50)
+    X, y = builder.build(datasets)
+
+    yield_table = datasets['yield']
+    n_expected = yield_table.drop(columns=['Year']).apply(pd.to_numeric, errors='coerce').notna().sum().sum()
+    assert len(X) == len(y) == n_expected
+    assert (X.dtypes == np.float32).all()
+    assert {'year', 'crop_code', 'area', 'yield_lag1', 'price_modal'}.issubset(X.columns)
+
+    # Chunked iteration yields the same rows
+    chunks = list(builder.iter_chunks(datasets))
+    assert len(chunks) > 1
+    assert np.array_equal(pd.concat([chunk for chunk, _ in chunks]).to_numpy(), X.to_numpy())
+    print(f"✅ Built {len(X)} observations x {X.shape[1]} features")
+
+def test_district_level_rows():
+    """Test that district-level long tables keep one row per district."""
+    keys = pd.MultiIndex.from_product(
+        [['Mandya', 'Tumkur'], ['Rice', 'Ragi'], [2001, 2002, 2003]],
+        names=['District', 'Crop', 'Year']
+    ).to_frame(index=False)
+    datasets = {
+        'yield': keys.assign(Yield=np.arange(1, len(keys) + 1, dtype=float)),
+        'area': keys.assign(Area=100.0),
+    }
+    X, y = TrainingMatrixBuilder().build(datasets)
+
+    assert len(X) == len(keys)
+    assert 'district_code' in X.columns
+    # The first year of each crop has no lag; later years see the previous year
+    assert (X['yield_lag1'] == 0).sum() == 4
+    print("✅ District-level observations built")
+
+def test_prediction_rows_match_the_matrix():
+    """Test that predictions are made on the training matrix columns, built from each crop's history."""
+    datasets = load_history()
+    builder = TrainingMatrixBuilder()
+    X, y = builder.build(datasets)
+    season = TrainingMatrixBuilder().build_next_season(datasets)
+    assert list(season.columns) == ['Crop'] + list(X.columns)
+    assert sorted(season['Crop']) == list(builder.crop_index)
+
+    # The last observation of a crop becomes the lags of its next season
+    rice = season[season['Crop'] == 'rice'].iloc[0]
+    code = builder.crop_index.get_loc('rice')
+    last = X[X['crop_code'] == code].index[-1]
+    assert rice['year'] == X.loc[last, 'year'] + 1 and rice['crop_code'] == code
+    assert rice['yield_lag1'] == y[last] and rice['area_lag1'] == X.loc[last, 'area']
+
+    # Requests name a crop and supply their weather; the rest comes from its history
+    rows = pd.DataFrame({'crop': ['Food grains (cereals) - Rice', 'Wheat'], 'avg_humidity': [55.0, 70.0]})
+    features = feature_matrix(rows, list(X.columns), season)
+    assert list(features.columns) == list(X.columns) and (features.dtypes == np.float32).all()
+    assert features.loc[0, 'crop_code'] == code and features.loc[0, 'yield_lag1'] == rice['yield_lag1']
+    for bad_rows, season_features in [(pd.DataFrame({'crop': ['Saffron']}), season),
+                                      (pd.DataFrame({'avg_humidity': [55.0]}), None)]:
+        try:
+            feature_matrix(bad_rows, list(X.columns), season_features)
+            assert False, "rows missing most features were zero-filled"
+        except ValueError:
+            pass
+
+    # A model trained on the matrix keeps the season features and predicts from the datasets
+    model = AgriYieldModel(rf_params={'n_estimators': 10}, xgb_params={'n_estimators': 10})
+    model.fit(*model.prepare_training_data({'yield': datasets['yield'], 'area': datasets['area'],
+                                            'production': datasets['production']}))
+    assert model.season_features is not None
+    predictions = model.predict({'yield': datasets['yield'], 'area': datasets['area'],
+                                 'production': datasets['production']})
+    assert len(predictions['ensemble_prediction']) == len(model.season_features)
+    model_dir = tempfile.mkdtemp()
+    try:
+        model.save_model(os.path.join(model_dir, "yield_model"))
+        loaded = AgriYieldModel()
+        loaded.load_model(os.path.join(model_dir, "yield_model"))
+        assert loaded.season_features.equals(model.season_features)
+    finally:
+        shutil.rmtree(model_dir)
+    print("✅ Prediction rows have the training matrix columns")
+
+if __name__ == "__main__":
+    test_compact_price_table()
+    test_crop_keys_match_across_tables()
+    test_matrix_has_one_row_per_observation()
+    test_district_level_rows()
+    test_prediction_rows_match_the_matrix()
+    print("\n🎉 Training matrix tests completed successfully!")
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Test script for hyperparameter tuning.
+"""
+
+import sys
+import os
+import json
+import math
+import shutil
+import tempfile
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+# Add the models directory to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), 'models'))
+
+from training import tuning
+from training.tuning import FoldCache, HyperparameterTuner, load_tuned_params, save_tuning_results
+
+# A small forest search space, 12 configurations
+SMALL_RF_SPACE = {'n_estimators': [5, 10], 'max_depth': [2, 4, None], 'min_samples_leaf': [1, 4]}
+
+def make_data(n=300, seed=0):
+    """Create a learnable feature matrix."""
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame(rng.random((n, 4)), columns=[f"feature_{i}" for i in range(4)])
+    return X, 100 * X['feature_0'] + 30 * X['feature_1'] ** 2 + rng.normal(0, 2, n)
+
+def small_tuner(**options):
+    """A single-process tuner over the small forest space."""
+    return HyperparameterTuner('rf', n_candidates=9, n_folds=3, n_jobs=1, param_space=SMALL_RF_SPACE, **options)
+
+class FoldRecorder:
+    """Stand-in for the fold evaluation that records its folds and advances a fake clock."""
+
+    def __init__(self, clock=None):
+        self.evaluate = tuning._evaluate_fold
+        self.clock = clock
+        self.calls = []
+
+    def __call__(self, model_type, params, fold, n_rows):
+        self.calls.append((fold, n_rows))
+        if self.clock is not None:
+            self.clock.now += 1
+        return self.evaluate(model_type, params, fold, n_rows)
+
+def test_halving_schedule():
+    """Test that each round trains on eta times more rows, ending with every row."""
+    tuner = HyperparameterTuner('rf', n_candidates=27, eta=3)
+    assert tuner._schedule(27, 1000) == [111, 333, 1000]
+    # Rounds stop before fewer than MIN_RESOURCE_ROWS rows would be used
+    assert tuner._schedule(27, 100) == [33, 100]
+    assert tuner._schedule(3, 1000) == [1000]
+    assert HyperparameterTuner('rf', method='random')._schedule(27, 1000) == [1000]
+
+    # Candidates are distinct and never more than the space holds
+    candidates = HyperparameterTuner('rf', n_candidates=50, param_space=SMALL_RF_SPACE).sample_candidates()
+    assert len(candidates) == 12 and len({json.dumps(c, sort_keys=True) for c in candidates}) == 12
+    print("✅ Successive halving schedules rounds of growing size")
+
+def test_halving_search_keeps_the_best_candidates():
+    """Test that each round keeps the best third of the candidates and the winner comes from the last round."""
+    X, y = make_data()
+    results = small_tuner().tune(X, y)
+
+    rounds = [[entry for entry in results['history'] if entry['round'] == r] for r in range(results['n_rounds'])]
+    assert results['completed'] and results['n_rounds'] == 2
+    assert [len(entries) for entries in rounds] == [9, 3] and results['n_evaluated'] == 12
+    assert [entries[0]['n_rows'] for entries in rounds] == [66, 200]
+    best_first = sorted(rounds[0], key=lambda entry: entry['mse'])[:3]
+    assert [entry['params'] for entry in rounds[1]] == [entry['params'] for entry in best_first]
+    winner = min(rounds[1], key=lambda entry: entry['mse'])
+    assert results['best_params'] == winner['params']
+    assert math.isclose(results['best_rmse'], math.sqrt(winner['mse']))
+
+    # A random search evaluates every candidate once on all rows
+    random_results = small_tuner(method='random').tune(X, y)
+    assert random_results['n_rounds'] == 1 and random_results['n_evaluated'] == 9
+    assert {entry['n_rows'] for entry in random_results['history']} == {200}
+    print("✅ Halving search keeps the best candidates")
+
+def test_folds_are_built_once_and_shared():
+    """Test that every candidate in every round is scored on the same cached folds."""
+    X, y = make_data()
+    cache = FoldCache(X, y, n_folds=3)
+    assert len(cache.folds) == 3 and cache.n_train_rows == 200
+    validation = np.concatenate([fold[2] for fold in cache.folds])
+    assert validation.dtype == np.float32 and len(validation) == len(X)
+    assert len(np.unique(validation, axis=0)) == len(X)
+    assert all(fold[0].flags['C_CONTIGUOUS'] for fold in cache.folds)
+
+    built = []
+    recorder = FoldRecorder()
+    original_cache = tuning.FoldCache
+    tuning._evaluate_fold = recorder
+    tuning.FoldCache = lambda *args: built.append(original_cache(*args)) or built[-1]
+    try:
+        small_tuner().tune(X, y)
+    finally:
+        tuning._evaluate_fold = recorder.evaluate
+        tuning.FoldCache = original_cache
+    assert len(built) == 1 and len(recorder.calls) == 12 * 3
+    assert {id(fold) for fold, _ in recorder.calls} == {id(fold) for fold in built[0].folds}
+    print("✅ Cross-validation folds are built once and shared")
+
+def test_time_budget_stops_the_search():
+    """Test that the search stops at its deadline with the best candidate so far."""
+    X, y = make_data()
+    clock = SimpleNamespace(now=0.0)
+    recorder = FoldRecorder(clock)
+    original_time = tuning.time
+    tuning._evaluate_fold = recorder
+    tuning.time = SimpleNamespace(perf_counter=lambda: clock.now)
+    try:
+        # Each fold fit takes one tick; a candidate's three folds fit before each check of the deadline
+        results = small_tuner(time_budget=7).tune(X, y)
+        try:
+            small_tuner(time_budget=0).tune(X, y)
+            assert False, "search without time ran"
+        except RuntimeError:
+            pass
+    finally:
+        tuning._evaluate_fold = recorder.evaluate
+        tuning.time = original_time
+    assert not results['completed'] and results['n_rounds'] == 1 and results['n_evaluated'] == 3
+    assert results['best_params'] in [entry['params'] for entry in results['history']]
+    assert results['elapsed_seconds'] == 9
+    print("✅ Time budget stops the search with the best candidate so far")
+
+def test_tuning_results_are_saved_next_to_the_model():
+    """Test that the winning parameters are written without the history and loaded back."""
+    X, y = make_data()
+    results = {'rf': small_tuner().tune(X, y)}
+    model_dir = tempfile.mkdtemp()
+    try:
+        prefix = os.path.join(model_dir, 'saved_models', 'yield_model')
+        assert load_tuned_params(prefix) == {}
+        path = save_tuning_results(results, prefix)
+        assert path == f"{prefix}_best_params.json"
+        with open(path) as f:
+            payload = json.load(f)
+        assert payload['best_params'] == {'rf': results['rf']['best_params']}
+        assert set(payload['scores']['rf']) == \
+            {'method', 'best_rmse', 'n_evaluated', 'n_rounds', 'completed', 'elapsed_seconds'}
+        assert 'tuned_at' in payload
+        assert load_tuned_params(prefix) == payload['best_params']
+    finally:
+        shutil.rmtree(model_dir)
+    print("✅ Tuning results are saved next to the model")
+
+if __name__ == "__main__":
+    print("Testing hyperparameter tuning...")
+    test_halving_schedule()
+    test_halving_search_keeps_the_best_candidates()
+    test_folds_are_built_once_and_shared()
+    test_time_budget_stops_the_search()
+    test_tuning_results_are_saved_next_to_the_model()
+    print("\n🎉 All hyperparameter tuning tests passed!")